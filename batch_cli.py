@@ -0,0 +1,151 @@
+# --- NEW FILE batch_cli.py ---
+# Batch mode: regenerates every saved project configuration (*.json) in a directory.
+#
+#   python main.py --batch <projects_dir> [-o <output_dir>] [-j <jobs>] [--report <timings.json>]
+#                          [--solution-cache <file>] [--low-power] [--clock-header] [--init-cost]
+#                          [--boot-profiling]
+#
+# Projects are fanned out over a ProcessPoolExecutor. Each worker loads the
+# core/stm32f*_defines.py family data once in its initializer and reuses it for
+# every project it gets. No PyQt5 import happens on this path. With --solution-cache, clock
+# solver results (core/solution_cache.py) are shared between workers and runs through that file.
+# With --low-power, F4 projects also get <project>_low_power.c, generated from the alternative RCC
+# config of core/power_planner.py (slowest clocks, lowest VOS scale that meet the peripherals' needs).
+# With --clock-header, every project also gets <project>_clock_config.h (compile-time clock constants).
+# With --init-cost, every project also gets <project>_init_cost.json (flash/cycle estimate per init function
+# and module, generators/init_cost_estimator.py); the --report entries carry its totals either way.
+# --boot-profiling turns on the MCU "boot_profiling" flag for every project (DWT cycle count per init call
+# in main(), generators/boot_profile_generator.py), e.g. for test rig builds.
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from core.mcu_defines_loader import load_defines, FAMILY_DEFINE_MODULES
+from core.power_planner import plan_low_power_clock_tree, low_power_project_config
+from core.solution_cache import SOLUTION_CACHE
+
+import engine
+
+
+def _init_worker(solution_cache_path=None):
+    for family in FAMILY_DEFINE_MODULES:
+        load_defines(family)
+    if solution_cache_path:
+        SOLUTION_CACHE.set_path(solution_cache_path)
+
+
+def _generate_one(project_path, output_dir, low_power=False, clock_header=False, init_cost=False,
+                  boot_profiling=False):
+    """Runs in a worker process. Returns a plain dict so it pickles cheaply."""
+    project_name = os.path.splitext(os.path.basename(project_path))[0]
+    result = {"project": project_name, "source": project_path, "output": None, "low_power_output": None,
+              "elapsed_s": 0.0, "error_messages": [], "exception": None, "init_cost_totals": None}
+    start_time = time.perf_counter()
+    try:
+        project_config = engine.load_project_config(project_path)
+        if boot_profiling:
+            project_config = dict(project_config, MCU=dict(project_config.get("MCU") or {}, boot_profiling=True))
+        generated_project = engine.generate(project_config)
+        out_path = os.path.join(output_dir, f"{project_name}.c")
+        with open(out_path, 'w', encoding='utf-8') as f:
+            f.write(generated_project.code)
+        result["output"] = out_path
+        if clock_header:
+            with open(os.path.join(output_dir, f"{project_name}_clock_config.h"), 'w', encoding='utf-8') as f:
+                f.write(generated_project.clock_config_header)
+        result["error_messages"] = list(generated_project.error_messages)
+        result["init_cost_totals"] = generated_project.init_cost.get("totals")
+        if init_cost:
+            with open(os.path.join(output_dir, f"{project_name}_init_cost.json"), 'w', encoding='utf-8') as f:
+                json.dump(generated_project.init_cost, f, indent=2)
+        if low_power and engine.get_project_mcu(project_config)[1] == "STM32F4":
+            plan = plan_low_power_clock_tree(project_config)
+            if plan is None:
+                result["error_messages"].append("Low power: no clock tree meets the peripherals' requirements.")
+            else:
+                low_power_path = os.path.join(output_dir, f"{project_name}_low_power.c")
+                with open(low_power_path, 'w', encoding='utf-8') as f:
+                    f.write(engine.generate(low_power_project_config(project_config, plan)).code)
+                result["low_power_output"] = low_power_path
+        SOLUTION_CACHE.save()  # No-op unless persistence is on and this project solved something new
+    except Exception as e:
+        result["exception"] = f"{type(e).__name__}: {e}"
+    result["elapsed_s"] = time.perf_counter() - start_time
+    return result
+
+
+def run_batch(projects_dir, output_dir=None, jobs=None, solution_cache_path=None, low_power=False,
+              clock_header=False, init_cost=False, boot_profiling=False):
+    """Regenerates all projects in projects_dir. Returns (results sorted by name, wall time in s)."""
+    project_paths = sorted(glob.glob(os.path.join(projects_dir, "*.json")))
+    if output_dir is None:
+        output_dir = projects_dir
+    os.makedirs(output_dir, exist_ok=True)
+
+    results = []
+    start_time = time.perf_counter()
+    if project_paths:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(solution_cache_path,)) as pool:
+            futures = [pool.submit(_generate_one, path, output_dir, low_power, clock_header, init_cost,
+                                   boot_profiling)
+                       for path in project_paths]
+            for future in as_completed(futures):
+                results.append(future.result())
+    wall_time_s = time.perf_counter() - start_time
+    results.sort(key=lambda r: r["project"])
+    return results, wall_time_s
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py --batch",
+                                     description="Regenerate C code for a directory of saved project configurations.")
+    parser.add_argument("projects_dir", help="Directory containing saved project configurations (*.json)")
+    parser.add_argument("-o", "--output-dir", default=None, help="Where to write <project>.c (default: projects_dir)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--report", default=None, help="Also write per-project timings as JSON to this file")
+    parser.add_argument("--solution-cache", default=None,
+                        help="Persist clock solver results in this file (default: $STM32_CODEGEN_SOLUTION_CACHE)")
+    parser.add_argument("--low-power", action="store_true",
+                        help="Also write <project>_low_power.c with a power-optimal clock/VOS plan (STM32F4)")
+    parser.add_argument("--clock-header", action="store_true",
+                        help="Also write <project>_clock_config.h with the clock frequencies as compile-time constants")
+    parser.add_argument("--init-cost", action="store_true",
+                        help="Also write <project>_init_cost.json with the flash/boot-cycle estimate per init function and module")
+    parser.add_argument("--boot-profiling", action="store_true",
+                        help="Time every init call in main() with the DWT cycle counter (boot_profile_cycles[] for SWD reads)")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.projects_dir):
+        print(f"Error: {args.projects_dir} is not a directory.")
+        return 2
+
+    results, wall_time_s = run_batch(args.projects_dir, args.output_dir, args.jobs, args.solution_cache,
+                                     args.low_power, args.clock_header, args.init_cost,
+                                     args.boot_profiling)
+    failed = 0
+    for r in results:
+        if r["exception"]:
+            failed += 1
+            print(f"  {r['project']:<32} FAILED  {r['elapsed_s'] * 1000:8.2f} ms  {r['exception']}")
+        else:
+            print(f"  {r['project']:<32} ok      {r['elapsed_s'] * 1000:8.2f} ms  "
+                  f"({len(r['error_messages'])} warnings/errors)")
+
+    projects_per_s = len(results) / wall_time_s if wall_time_s > 0 else 0.0
+    print(f"{len(results)} projects ({failed} failed) in {wall_time_s:.3f} s: {projects_per_s:.1f} projects/s")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({"wall_time_s": wall_time_s, "projects_per_s": projects_per_s, "projects": results}, f,
+                      indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+# --- NEW FILE core/clock_math.py ---
+# Peripheral clock arithmetic shared by the clock tree solver, the low-power planner and the clock
+# profile generator: the quantized baud/SCL/SCK/tick a peripheral gets from a given kernel clock, as
+# a relative error against its target. Plain arithmetic only, so generators can import it at module
+# level without pulling in the PLL solver (and NumPy).
+
+SPI_PRESCALERS = (2, 4, 8, 16, 32, 64, 128, 256)
+I2C_STANDARD_MODE_MAX_HZ = 100000
+I2C_FAST_MODE_MIN_PCLK1_HZ = 4000000
+TIMER_PSC_MAX = 65535
+# Largest relative error per requirement the planner and the clock profiles accept
+PLANNER_TOLERANCES = {"uart": 0.02, "i2c": 0.10, "spi": 0.25, "timer": 0.001, "usb": 0.0025}
+
+
+def module_config_list(module_config):
+    """A module's config as a list (multi-instance modules store a list, the others one dict)."""
+    if isinstance(module_config, list):
+        return module_config
+    return [module_config] if module_config else []
+
+
+def uart_baud_error(pclk_hz, baud_rate, over8):
+    """Relative baud error after BRR quantization (USARTDIV in 1/16 or 1/8 steps), None if out of range."""
+    brr_steps = round(pclk_hz / baud_rate)  # = USARTDIV * (16 or 8); the same for OVER16 and OVER8
+    if brr_steps < (8 if over8 else 16):  # USARTDIV mantissa must be >= 1
+        return None
+    return abs(pclk_hz / brr_steps - baud_rate) / baud_rate
+
+
+def i2c_scl_error(pclk1_hz, speed_hz, duty_16_9, min_pclk1_hz):
+    """Relative SCL error after CCR quantization, None if PCLK1 is too slow for the mode."""
+    if pclk1_hz < min_pclk1_hz or (speed_hz > I2C_STANDARD_MODE_MAX_HZ and pclk1_hz < I2C_FAST_MODE_MIN_PCLK1_HZ):
+        return None
+    if speed_hz <= I2C_STANDARD_MODE_MAX_HZ:
+        period_factor, min_ccr = 2, 4
+    else:
+        period_factor, min_ccr = (25, 1) if duty_16_9 else (3, 1)
+    ccr = max(min_ccr, round(pclk1_hz / (period_factor * speed_hz)))
+    return abs(pclk1_hz / (period_factor * ccr) - speed_hz) / speed_hz
+
+
+def spi_prescaler_and_error(pclk_hz, sck_hz):
+    """Fastest SCK not above the target (slowest prescaler if none is, SCK then above the target)."""
+    for prescaler in SPI_PRESCALERS:
+        if pclk_hz / prescaler <= sck_hz:
+            return prescaler, (sck_hz - pclk_hz / prescaler) / sck_hz
+    return SPI_PRESCALERS[-1], (pclk_hz / SPI_PRESCALERS[-1] - sck_hz) / sck_hz
+
+
+def timer_prescaler_and_error(kernel_hz, tick_hz):
+    """(PSC, relative tick error) for the tick rate, (None, None) if PSC is out of range."""
+    prescaler = round(kernel_hz / tick_hz) - 1
+    if prescaler < 0 or prescaler > TIMER_PSC_MAX:
+        return None, None
+    return prescaler, abs(kernel_hz / (prescaler + 1) - tick_hz) / tick_hz
@@ -0,0 +1,345 @@
+# --- NEW FILE core/clock_tree.py ---
+# Incremental clock-tree model: RCC params -> the RCC 'calculated' dict.
+#
+#   inputs -> pll -> sysclk -> hclk -> pclk1/pclk2 -> timer kernel clocks
+#                                 \-> power (VOS/overdrive, bus maxima) -> flash latency, limit errors
+#
+# Each node lists the nodes it reads. ClockTree.update() diffs the new params against the last
+# ones and only marks the nodes downstream of changed inputs dirty; values are recomputed lazily
+# on read. E.g. an APB2 prescaler change re-evaluates pclk2, its timer kernel clock and the limit
+# check, while the PLL, SYSCLK, VOS and flash latency results are reused.
+# Generators read the resulting frequencies through kernel_clock_hz()/timer_kernel_clock_hz(),
+# which fall back to deriving them for 'calculated' dicts saved before these keys existed.
+# The optional vos_policy param picks how VOS is chosen for F4 parts (see VOS_POLICY_*); the
+# low-power policy is what core/power_planner.py configs use.
+
+from core.mcu_defines_loader import load_defines
+
+CLOCK_TREE_INPUTS = ("mcu_family", "target_device", "hsi_enabled", "hse_enabled", "hse_value_hz",
+                     "pll_enabled_for_sysclk", "pll_source", "pllm_or_xtpre", "plln_or_mul", "pllp", "pllq",
+                     "sysclk_source", "ahb_div", "apb1_div", "apb2_div", "vos_policy", "usb_prescaler",
+                     "adc_prescaler")
+
+VOS_POLICY_MAX_PERFORMANCE = "MAX_PERFORMANCE"  # Default: VOS scale 1 whenever it can run HCLK
+VOS_POLICY_LOW_POWER = "LOW_POWER"  # Least demanding VOS scale for HCLK, over-drive only if unavoidable
+
+
+def _compute_defines(mcu_family):
+    return (load_defines(mcu_family) if mcu_family else None) or {}
+
+
+def _compute_device_limits(defines, mcu_family, target_device):
+    """(device_info, max SYSCLK)"""
+    device_info = defines.get('TARGET_DEVICES', {}).get(target_device, {})
+    max_sysclk_for_device = 0
+    if mcu_family == "STM32F1":
+        max_sysclk_for_device = device_info.get("max_sysclk_hz", defines.get('SYSCLK_MAX_HZ_F103', 72000000))
+    elif mcu_family == "STM32F2":
+        max_sysclk_for_device = device_info.get("max_sysclk_hz", defines.get('SYSCLK_MAX_HZ_F2', 120000000))
+    elif mcu_family == "STM32F4":
+        # For F4, determine from VOS map if possible, or device default
+        vos_map_f4 = defines.get('SYSCLK_MAX_HZ_MAP', {}).get(target_device, {})
+        max_sysclk_for_device = device_info.get("max_sysclk_hz", max(vos_map_f4.values()) if vos_map_f4 else 168000000)
+    return device_info, max_sysclk_for_device
+
+
+def _compute_hsi_hz(defines, mcu_family):
+    return defines.get('HSI_VALUE_HZ', 8000000 if mcu_family == "STM32F1" else 16000000)
+
+
+def _compute_pll(defines, mcu_family, device_limits, hsi_hz, hsi_enabled, hse_enabled, hse_value_hz,
+                 pll_enabled_for_sysclk, pll_source, pllm_or_xtpre, plln_or_mul, pllp, pllq, sysclk_source, usb_prescaler):
+    """PLL stage: the SYSCLK source/frequency after the PLL checks, PLL output frequencies and messages."""
+    max_sysclk_for_device = device_limits[1]
+    pll = {"sysclk_source": sysclk_source or "HSI", "sysclk_freq_hz": float(hsi_hz), "vco_input_freq_hz": 0,
+           "vco_output_freq_hz": 0, "pll_p_output_freq_hz": 0, "pll_q_output_freq_hz": 0, "errors": [], "warnings": []}
+    errors = pll["errors"]
+    if pll["sysclk_source"] != "PLL":
+        return pll
+    if not pll_enabled_for_sysclk:
+        pll["warnings"].append("PLL SYSCLK selected, but 'Use PLL' is off. Using HSI.")
+        pll["sysclk_source"] = "HSI"
+        return pll
+
+    pll_source_type = pll_source or "HSI"
+    pll_input_freq = 0.0
+    hse_val_param = float(hse_value_hz if hse_value_hz is not None else defines.get('HSE_DEFAULT_HZ', 8000000))
+    if pll_source_type == "HSI":
+        if not hsi_enabled: errors.append("HSI (PLL src) disabled.")
+        pll_input_freq = float(hsi_hz)
+    elif pll_source_type == "HSI/2" and mcu_family == "STM32F1":
+        if not hsi_enabled: errors.append("HSI (PLL src) disabled.")
+        pll_input_freq = float(hsi_hz) / 2.0
+    elif pll_source_type == "HSE":
+        if not hse_enabled: errors.append("HSE (PLL src) disabled.")
+        pll_input_freq = hse_val_param
+    if pll_input_freq <= 0 and not errors: errors.append("PLL Input Freq is zero or negative.")
+    if errors:
+        return pll
+
+    if mcu_family == "STM32F1":
+        pllxtpre = pllm_or_xtpre if pllm_or_xtpre is not None else 1
+        pllmul = plln_or_mul if plln_or_mul is not None else 9
+        if pllxtpre == 0: errors.append("PLLXTPRE cannot be 0 for F1.")
+        effective_pll_in_f1 = pll_input_freq
+        if pll_source_type == "HSE" and pllxtpre > 0: effective_pll_in_f1 = pll_input_freq / pllxtpre
+        sysclk_freq_hz = effective_pll_in_f1 * pllmul
+        if sysclk_freq_hz > max_sysclk_for_device: errors.append(
+            f"F1 SYSCLK ({sysclk_freq_hz / 1e6:.1f}MHz) exceeds max ({max_sysclk_for_device / 1e6:.1f}MHz).")
+        pll.update(sysclk_freq_hz=sysclk_freq_hz, pll_p_output_freq_hz=sysclk_freq_hz,
+                   vco_output_freq_hz=sysclk_freq_hz, vco_input_freq_hz=effective_pll_in_f1)
+        if usb_prescaler: pll["pll_q_output_freq_hz"] = sysclk_freq_hz / float(usb_prescaler)  # USBCLK (USBPRE)
+    elif mcu_family in ["STM32F2", "STM32F4"]:
+        pllm = pllm_or_xtpre if pllm_or_xtpre is not None else 0
+        plln = plln_or_mul if plln_or_mul is not None else 0
+        pllp = pllp if pllp is not None else 0
+        if not all(isinstance(val, int) and val > 0 for val in [pllm, plln, pllp]):
+            errors.append(f"{mcu_family} PLLM,N,P invalid. Using HSI.")
+            pll["sysclk_source"] = "HSI"
+        else:
+            vco_in = pll_input_freq / pllm
+            vco_out = vco_in * plln
+            sysclk_freq_hz = vco_out / pllp
+            if sysclk_freq_hz > max_sysclk_for_device: errors.append(
+                f"{mcu_family} SYSCLK ({sysclk_freq_hz / 1e6:.1f}MHz) exceeds max ({max_sysclk_for_device / 1e6:.1f}MHz).")
+            pll.update(sysclk_freq_hz=sysclk_freq_hz, vco_input_freq_hz=vco_in, vco_output_freq_hz=vco_out,
+                       pll_p_output_freq_hz=sysclk_freq_hz)
+            if (pllq or 0) > 0: pll["pll_q_output_freq_hz"] = vco_out / pllq
+    return pll
+
+
+def _compute_sysclk(defines, pll, device_limits, hsi_hz, hsi_enabled, hse_enabled, hse_value_hz):
+    """(SYSCLK Hz, errors, warnings) after source fallbacks and the device cap."""
+    max_sysclk_for_device = device_limits[1]
+    errors, warnings = [], []
+    sysclk_source = pll["sysclk_source"]
+    sysclk_freq_hz = pll["sysclk_freq_hz"]
+    if pll["errors"] and sysclk_source == "PLL":
+        sysclk_source = "HSI"; sysclk_freq_hz = float(hsi_hz)
+        warnings.append("Reverted to HSI due to PLL configuration errors.")
+
+    if sysclk_source == "HSE":
+        if not hse_enabled:
+            errors.append("HSE SYSCLK selected, but disabled. Using HSI."); sysclk_freq_hz = float(hsi_hz)
+        else:
+            sysclk_freq_hz = float(hse_value_hz if hse_value_hz is not None else defines.get('HSE_DEFAULT_HZ', 8000000))
+    if sysclk_source == "HSI":
+        if not hsi_enabled: warnings.append("HSI SYSCLK selected, but HSI not enabled by user.")
+        sysclk_freq_hz = float(hsi_hz)
+
+    if sysclk_freq_hz > max_sysclk_for_device and max_sysclk_for_device > 0:
+        if not any("SYSCLK" in err for err in pll["errors"] + errors): errors.append(
+            f"Final SYSCLK ({sysclk_freq_hz / 1e6:.1f}MHz) capped to max ({max_sysclk_for_device / 1e6:.1f}MHz).")
+        sysclk_freq_hz = float(max_sysclk_for_device)
+    return sysclk_freq_hz, errors, warnings
+
+
+def _compute_bus_clock(parent_freq_hz, div):
+    return parent_freq_hz / (div if div is not None else 1)
+
+
+def _compute_timer_kernel_clock(pclk_freq_hz, apb_div):
+    """Timers on an APB bus run at 2 x PCLK whenever that bus is divided (from the integer PCLK, as reported)."""
+    pclk_freq_hz = int(pclk_freq_hz)
+    return pclk_freq_hz if (apb_div if apb_div is not None else 1) == 1 else pclk_freq_hz * 2
+
+
+def _compute_power(defines, mcu_family, target_device, device_limits, hclk_freq_hz, vos_policy):
+    """VOS scale, overdrive and the HCLK/PCLK1/PCLK2 maxima that apply at this HCLK."""
+    device_info, max_sysclk_for_device = device_limits
+    max_hclk_dev = device_info.get("max_hclk_hz", max_sysclk_for_device)
+    max_pclk1_dev = device_info.get("max_pclk1_hz", 36000000 if mcu_family != "STM32F4" else 42000000)
+    max_pclk2_dev = device_info.get("max_pclk2_hz", 72000000 if mcu_family != "STM32F4" else 84000000)
+    vos_scale_id = "N/A"; vos_pwr_cr_val = None; overdrive_active = False
+
+    if mcu_family == "STM32F4" and vos_policy == VOS_POLICY_LOW_POWER and defines.get('get_lowest_power_vos'):
+        vos_scale_id, vos_pwr_cr_val = defines['get_lowest_power_vos'](hclk_freq_hz, target_device)
+        overdrive_active = (vos_scale_id == "VOS_SCALE_1_OD")
+        max_hclk_dev, max_pclk1_dev, max_pclk2_dev = defines['get_vos_clock_limits'](target_device, vos_scale_id)
+    elif mcu_family == "STM32F4":
+        get_required_vos_func = defines.get('get_required_vos')
+        if get_required_vos_func:
+            vos_max_hclk_dev = device_info.get("vos_max_hclk", {})
+            non_od_max_vos1 = vos_max_hclk_dev.get("VOS_SCALE_1", 0) if vos_max_hclk_dev else 0
+            od_intended = device_info.get("has_overdrive") and hclk_freq_hz > non_od_max_vos1
+            vos_scale_id, vos_pwr_cr_val = get_required_vos_func(hclk_freq_hz, target_device, od_intended)
+            overdrive_active = (vos_scale_id == "VOS_SCALE_1_OD")
+            vos_lookup_key = vos_scale_id.replace("_OD", "")
+            max_hclk_dev = vos_max_hclk_dev.get(vos_lookup_key, max_hclk_dev) if vos_max_hclk_dev else max_hclk_dev
+            if overdrive_active: max_hclk_dev = device_info.get("max_sysclk_vos1_od", max_hclk_dev)
+            max_pclk1_dev = defines.get('PCLK1_MAX_HZ_MAP', {}).get(target_device, {}).get(vos_lookup_key, max_pclk1_dev)
+            max_pclk2_dev = defines.get('PCLK2_MAX_HZ_MAP', {}).get(target_device, {}).get(vos_lookup_key, max_pclk2_dev)
+    return {"vos_scale_id": vos_scale_id, "vos_scale_pwr_cr_val": vos_pwr_cr_val, "overdrive_active": overdrive_active,
+            "max_hclk_hz": max_hclk_dev, "max_pclk1_hz": max_pclk1_dev, "max_pclk2_hz": max_pclk2_dev}
+
+
+def _compute_adc_clock(pclk2_freq_hz, adc_prescaler):
+    """F1 ADCCLK from the RCC ADCPRE divider (0 if the RCC params don't set one)."""
+    return pclk2_freq_hz / adc_prescaler if adc_prescaler else 0
+
+
+def _compute_limit_errors(power, device_limits, hclk_freq_hz, pclk1_freq_hz, pclk2_freq_hz, adc_freq_hz):
+    errors = []
+    if hclk_freq_hz > power["max_hclk_hz"]: errors.append(
+        f"HCLK ({hclk_freq_hz / 1e6:.1f}MHz) > max ({power['max_hclk_hz'] / 1e6:.1f}MHz).")
+    if pclk1_freq_hz > power["max_pclk1_hz"]: errors.append(
+        f"PCLK1 ({pclk1_freq_hz / 1e6:.1f}MHz) > max ({power['max_pclk1_hz'] / 1e6:.1f}MHz).")
+    if pclk2_freq_hz > power["max_pclk2_hz"]: errors.append(
+        f"PCLK2 ({pclk2_freq_hz / 1e6:.1f}MHz) > max ({power['max_pclk2_hz'] / 1e6:.1f}MHz).")
+    max_adc_hz = device_limits[0].get("adc_clk_max_hz")
+    if max_adc_hz and adc_freq_hz > max_adc_hz: errors.append(
+        f"ADCCLK ({adc_freq_hz / 1e6:.1f}MHz) > max ({max_adc_hz / 1e6:.1f}MHz).")
+    return errors
+
+
+def _compute_flash_latency(defines, mcu_family, target_device, power, hclk_freq_hz):
+    vos_scale_id = power["vos_scale_id"]
+    get_flash_latency_func = defines.get(f"get_{(mcu_family or '').lower()}_flash_latency")
+    if get_flash_latency_func:
+        if mcu_family == "STM32F4":
+            return get_flash_latency_func(hclk_freq_hz, target_device, vos_scale_id)
+        return get_flash_latency_func(hclk_freq_hz, target_device)
+    return defines.get('get_flash_latency', lambda f, d, v=None: 0)(
+        hclk_freq_hz, target_device, vos_scale_id if mcu_family == "STM32F4" else None)
+
+
+# node name -> (nodes/inputs it reads, compute function), in topological order
+CLOCK_TREE_NODES = {
+    "defines": (("mcu_family",), _compute_defines),
+    "device_limits": (("defines", "mcu_family", "target_device"), _compute_device_limits),
+    "hsi_hz": (("defines", "mcu_family"), _compute_hsi_hz),
+    "pll": (("defines", "mcu_family", "device_limits", "hsi_hz", "hsi_enabled", "hse_enabled", "hse_value_hz",
+             "pll_enabled_for_sysclk", "pll_source", "pllm_or_xtpre", "plln_or_mul", "pllp", "pllq",
+             "sysclk_source", "usb_prescaler"), _compute_pll),
+    "sysclk": (("defines", "pll", "device_limits", "hsi_hz", "hsi_enabled", "hse_enabled", "hse_value_hz"),
+               _compute_sysclk),
+    "sysclk_freq_hz": (("sysclk",), lambda sysclk: sysclk[0]),
+    "hclk_freq_hz": (("sysclk_freq_hz", "ahb_div"), _compute_bus_clock),
+    "pclk1_freq_hz": (("hclk_freq_hz", "apb1_div"), _compute_bus_clock),
+    "pclk2_freq_hz": (("hclk_freq_hz", "apb2_div"), _compute_bus_clock),
+    "tim_apb1_kernel_freq_hz": (("pclk1_freq_hz", "apb1_div"), _compute_timer_kernel_clock),
+    "tim_apb2_kernel_freq_hz": (("pclk2_freq_hz", "apb2_div"), _compute_timer_kernel_clock),
+    "power": (("defines", "mcu_family", "target_device", "device_limits", "hclk_freq_hz", "vos_policy"),
+              _compute_power),
+    "adc_freq_hz": (("pclk2_freq_hz", "adc_prescaler"), _compute_adc_clock),
+    "limit_errors": (("power", "device_limits", "hclk_freq_hz", "pclk1_freq_hz", "pclk2_freq_hz", "adc_freq_hz"),
+                     _compute_limit_errors),
+    "flash_latency_val": (("defines", "mcu_family", "target_device", "power", "hclk_freq_hz"), _compute_flash_latency),
+}
+
+
+def _build_downstream_map():
+    """name -> every node that (transitively) reads it."""
+    readers = {}
+    for node_name, (dependencies, _) in CLOCK_TREE_NODES.items():
+        for dependency in dependencies:
+            readers.setdefault(dependency, set()).add(node_name)
+    downstream = {}
+    for name in list(CLOCK_TREE_INPUTS) + list(CLOCK_TREE_NODES):
+        pending, seen = list(readers.get(name, ())), set()
+        while pending:
+            node_name = pending.pop()
+            if node_name not in seen:
+                seen.add(node_name)
+                pending.extend(readers.get(node_name, ()))
+        downstream[name] = frozenset(seen)
+    return downstream
+
+
+_DOWNSTREAM_NODES = _build_downstream_map()
+
+
+class ClockTree:
+    """Clock tree for one RCC configuration; update() with new params, then read values/calculated()."""
+    __slots__ = ("_values", "_dirty", "_calculated", "recomputed_nodes")
+
+    def __init__(self, params=None):
+        self._values = dict.fromkeys(CLOCK_TREE_INPUTS)
+        self._dirty = set(CLOCK_TREE_NODES)
+        self._calculated = None
+        self.recomputed_nodes = []  # Nodes evaluated since the last update() (what actually got recomputed)
+        if params:
+            self.update(params)
+
+    def update(self, params):
+        """Takes new RCC params; returns True if any clock-tree input changed."""
+        changed = False
+        for name in CLOCK_TREE_INPUTS:
+            value = params.get(name)
+            old_value = self._values[name]
+            if value != old_value or type(value) is not type(old_value):  # 1 vs True matters to the PLL checks
+                self._values[name] = value
+                self._dirty.update(_DOWNSTREAM_NODES[name])
+                changed = True
+        if changed:
+            self._calculated = None
+            self.recomputed_nodes = []
+        return changed
+
+    def value(self, name):
+        if name in self._dirty:
+            dependencies, compute_func = CLOCK_TREE_NODES[name]
+            self._values[name] = compute_func(*[self.value(dependency) for dependency in dependencies])
+            self._dirty.discard(name)
+            self.recomputed_nodes.append(name)
+        return self._values[name]
+
+    def calculated(self):
+        """The RCC 'calculated' dict (a fresh copy; the tree keeps its own)."""
+        if self._calculated is None:
+            pll = self.value("pll")
+            sysclk_freq_hz, sysclk_errors, sysclk_warnings = self.value("sysclk")
+            power = self.value("power")
+            calculated = {"errors": pll["errors"] + sysclk_errors + self.value("limit_errors"),
+                          "warnings": pll["warnings"] + sysclk_warnings}
+            calculated.update({
+                "sysclk_freq_hz": int(sysclk_freq_hz), "hclk_freq_hz": int(self.value("hclk_freq_hz")),
+                "pclk1_freq_hz": int(self.value("pclk1_freq_hz")), "pclk2_freq_hz": int(self.value("pclk2_freq_hz")),
+                "vco_input_freq_hz": int(pll["vco_input_freq_hz"]), "vco_output_freq_hz": int(pll["vco_output_freq_hz"]),
+                "pll_p_output_freq_hz": int(pll["pll_p_output_freq_hz"]),
+                "pll_q_output_freq_hz": int(pll["pll_q_output_freq_hz"]),
+                "flash_latency_val": self.value("flash_latency_val"), "vos_scale_id": power["vos_scale_id"],
+                "vos_scale_pwr_cr_val": power["vos_scale_pwr_cr_val"], "overdrive_active": power["overdrive_active"],
+                "ahb_div": self._values["ahb_div"] if self._values["ahb_div"] is not None else 1,
+                "apb1_div": self._values["apb1_div"] if self._values["apb1_div"] is not None else 1,
+                "apb2_div": self._values["apb2_div"] if self._values["apb2_div"] is not None else 1,
+                "tim_apb1_kernel_freq_hz": self.value("tim_apb1_kernel_freq_hz"),
+                "tim_apb2_kernel_freq_hz": self.value("tim_apb2_kernel_freq_hz"),
+                "adc_freq_hz": int(self.value("adc_freq_hz")),
+            })
+            self._calculated = calculated
+        calculated = dict(self._calculated)
+        calculated["errors"] = list(calculated["errors"]); calculated["warnings"] = list(calculated["warnings"])
+        return calculated
+
+
+def kernel_clock_hz(rcc_calculated, bus):
+    """Peripheral kernel clock of an APB bus ("APB1"/"APB2") from an RCC 'calculated' dict."""
+    return rcc_calculated.get(f"pclk{bus[-1]}_freq_hz", 0)
+
+
+def timer_kernel_clock_hz(rcc_calculated, bus):
+    """Timer kernel clock of an APB bus: the cached tree value, or 2 x PCLK if the bus is divided (older dicts)."""
+    cached = rcc_calculated.get(f"tim_apb{bus[-1]}_kernel_freq_hz")
+    if cached is not None:
+        return cached
+    return _compute_timer_kernel_clock(rcc_calculated.get(f"pclk{bus[-1]}_freq_hz", 0),
+                                       rcc_calculated.get(f"apb{bus[-1]}_div", 1))
+
+
+def stop_wakeup_latency_us(params, calculated):
+    """(estimated STOP wake-up latency in us, [(step, us)]) until SYSCLK is back on the configured source.
+    HSE and a PLL fed from HSI start in parallel; the F4 over-drive is re-enabled while the PLL locks."""
+    defines = _compute_defines(params.get("mcu_family"))
+    regulator = "low_power" if params.get("stop_low_power_regulator") else "main"
+    steps = [(f"STOP exit ({regulator} regulator), on HSI", defines.get('STOP_WAKEUP_TIME_US', {}).get(regulator, 20))]
+    uses_pll = params.get("sysclk_source") == "PLL" and bool(params.get("pll_enabled_for_sysclk"))
+    hse_us = 0 if params.get("hse_bypass") else params.get("hse_startup_us") or defines.get('HSE_STARTUP_TIME_US', 2000)
+    if uses_pll:
+        pll_us = defines.get('PLL_LOCK_TIME_US', 200)
+        if calculated.get("overdrive_active"): pll_us = max(pll_us, defines.get('OVERDRIVE_ENABLE_TIME_US', 100))
+        if params.get("pll_source") == "HSE": steps.append(("HSE start-up", hse_us))
+        steps.append(("PLL lock" + (" (over-drive enabled meanwhile)" if calculated.get("overdrive_active") else ""), pll_us))
+    elif params.get("sysclk_source") == "HSE":
+        steps.append(("HSE start-up", hse_us))
+    return sum(us for _, us in steps), steps
@@ -0,0 +1,213 @@
+# --- NEW FILE core/clock_tree_solver.py ---
+# Whole clock-tree search: PLL settings plus AHB/APB1/APB2 (and SPI baud) prescalers, scored
+# against declared targets. Every target contributes its relative error |actual - target| / target:
+#   SYSCLK, HCLK (defaults to the SYSCLK target), 48 MHz on PLLQ (F2/F4) or the USB prescaler (F1),
+#   the BRR-quantized baud rate of each enabled USART, the CCR-quantized SCL of each enabled I2C
+#   and the SCK of each SPI with a target_sck_hz.
+# PCLK1/PCLK2/HCLK maxima and I2C minimum PCLK1 are hard limits. The lowest total wins.
+#
+# Pruning: PLL candidates are visited in order of their own (SYSCLK + 48 MHz) error, which is a
+# lower bound on the total, so the search stops as soon as that bound can't beat the best found.
+# APB1 and APB2 peripherals are scored independently per PCLK value (memoized), so each bus
+# prescaler is picked on its own instead of trying every APB1 x APB2 pair.
+
+from core.clock_math import module_config_list, uart_baud_error, i2c_scl_error, spi_prescaler_and_error
+from core.define_resolver import resolve_defines
+from core.pll_solver import cached_solve_f2_f4_pll, get_f2_f4_pll_limits, PLL48_TARGET_HZ
+
+PLL_CANDIDATES_TO_SEARCH = 512
+
+
+class ClockTargets:
+    """Declared clock-tree targets (see clock_targets_from_project() for the usual way to build one)."""
+    __slots__ = ("sysclk_hz", "hclk_hz", "pll48_hz", "uarts", "i2cs", "spis")
+
+    def __init__(self, sysclk_hz, hclk_hz=None, pll48_hz=None):
+        self.sysclk_hz = sysclk_hz
+        self.hclk_hz = hclk_hz if hclk_hz else sysclk_hz
+        self.pll48_hz = pll48_hz  # None = no 48 MHz requirement
+        self.uarts = []  # (instance, "APB1"/"APB2", baud rate, over8)
+        self.i2cs = []  # (instance, SCL Hz, duty 16/9)
+        self.spis = []  # (instance, "APB1"/"APB2", target SCK Hz)
+
+    def add_uart(self, instance_name, bus, baud_rate, over8=0):
+        self.uarts.append((instance_name, bus, baud_rate, over8))
+
+    def add_i2c(self, instance_name, speed_hz, duty_16_9=False):
+        self.i2cs.append((instance_name, speed_hz, duty_16_9))
+
+    def add_spi(self, instance_name, bus, sck_hz):
+        self.spis.append((instance_name, bus, sck_hz))
+
+
+def clock_targets_from_project(project_config, mcu_family, target_device, target_sysclk_hz, need_48mhz=None):
+    """ClockTargets for the enabled USART/I2C/SPI modules of a project configuration dict."""
+    defines = resolve_defines(mcu_family, target_device)
+    if need_48mhz is None:
+        need_48mhz = mcu_family != "STM32F1"
+    targets = ClockTargets(target_sysclk_hz, pll48_hz=PLL48_TARGET_HZ if need_48mhz else None)
+
+    usart_info_map = defines.get("USART_PERIPHERALS_INFO", {})
+    oversampling_map = defines.get("USART_OVERSAMPLING_MAP", {"16": 0})
+    for module_config in module_config_list(project_config.get("USART")):
+        params = module_config.get("params", {})
+        instance_info = usart_info_map.get(params.get("instance_name"))
+        if params.get("enabled") and instance_info and params.get("baud_rate"):
+            over8 = 0 if mcu_family in ("STM32F1", "STM32F2") else oversampling_map.get(params.get("oversampling", "16"), 0)
+            targets.add_uart(params["instance_name"], instance_info["bus"], int(params["baud_rate"]), over8)
+
+    i2c_speeds_map = defines.get("I2C_CLOCK_SPEEDS_HZ", {})
+    duty_modes_map = defines.get("I2C_DUTY_CYCLE_MODES", {})
+    for module_config in module_config_list(project_config.get("I2C")):
+        params = module_config.get("params", {})
+        if params.get("enabled") and params.get("instance_name"):
+            speed_hz = i2c_speeds_map.get(params.get("clock_speed_str", "100000 Hz (Standard Mode)"), 100000)
+            targets.add_i2c(params["instance_name"], speed_hz, duty_modes_map.get(params.get("duty_cycle_str"), 0) == 1)
+
+    spi_info_map = defines.get("SPI_PERIPHERALS_INFO", {})
+    for module_config in module_config_list(project_config.get("SPI")):
+        params = module_config.get("params", {})
+        instance_info = spi_info_map.get(params.get("instance_name"))
+        if params.get("enabled") and instance_info and params.get("target_sck_hz"):
+            targets.add_spi(params["instance_name"], instance_info["bus"], int(params["target_sck_hz"]))
+    return targets
+
+
+def _bus_error(pclk_hz, bus, targets, min_i2c_pclk1_hz):
+    """(total relative error, {target name: error}, {spi instance: prescaler}) of one APB bus, or None."""
+    total = 0.0
+    errors = {}
+    spi_prescalers = {}
+    for instance_name, uart_bus, baud_rate, over8 in targets.uarts:
+        if uart_bus != bus: continue
+        error = uart_baud_error(pclk_hz, baud_rate, over8)
+        if error is None: return None
+        errors[instance_name] = error; total += error
+    if bus == "APB1":
+        for instance_name, speed_hz, duty_16_9 in targets.i2cs:
+            error = i2c_scl_error(pclk_hz, speed_hz, duty_16_9, min_i2c_pclk1_hz)
+            if error is None: return None
+            errors[instance_name] = error; total += error
+    for instance_name, spi_bus, sck_hz in targets.spis:
+        if spi_bus != bus: continue
+        prescaler, error = spi_prescaler_and_error(pclk_hz, sck_hz)
+        spi_prescalers[instance_name] = prescaler
+        errors[instance_name] = error; total += error
+    return total, errors, spi_prescalers
+
+
+def _device_clock_limits(mcu_family, target_device, defines):
+    device_info = defines.get('TARGET_DEVICES', {}).get(target_device, {})
+    if mcu_family == "STM32F1":
+        max_sysclk = device_info.get("max_sysclk_hz", defines.get('SYSCLK_MAX_HZ', 72000000))
+    else:
+        max_sysclk = get_f2_f4_pll_limits(mcu_family, target_device)["max_sysclk_hz"]
+    return (max_sysclk, device_info.get("max_hclk_hz", max_sysclk),
+            device_info.get("max_pclk1_hz", 36000000 if mcu_family != "STM32F4" else 42000000),
+            device_info.get("max_pclk2_hz", 72000000 if mcu_family != "STM32F4" else 84000000))
+
+
+def _f1_pll_candidates(pll_input_hz, pll_source, defines, max_sysclk):
+    """(sysclk, 48 MHz clock, PLL params) for every F1 PLLXTPRE x PLLMUL; USB prescaler is /1 or /1.5."""
+    candidates = []
+    xtpre_values = defines.get('PLLXTPRE_VALUES', [1, 2]) if pll_source == "HSE" else [1]
+    for xtpre in xtpre_values:
+        for mul in range(defines.get('PLLMUL_MIN', 2), defines.get('PLLMUL_MAX', 16) + 1):
+            sysclk = pll_input_hz / xtpre * mul
+            if sysclk > max_sysclk: continue
+            usb_clk = min((sysclk, sysclk / 1.5), key=lambda f: abs(f - PLL48_TARGET_HZ))
+            candidates.append((sysclk, usb_clk, {"pllm_or_xtpre": xtpre, "plln_or_mul": mul}))
+    return candidates
+
+
+def _f2_f4_pll_candidates(pll_input_hz, target_sysclk_hz, mcu_family, target_device):
+    """Best-ranked (M, N, P, Q) per distinct (SYSCLK, 48 MHz) pair."""
+    candidates = {}
+    for solution in cached_solve_f2_f4_pll(pll_input_hz, target_sysclk_hz, mcu_family, target_device,
+                                           PLL_CANDIDATES_TO_SEARCH):
+        candidates.setdefault((solution.sysclk_hz, solution.pll48_hz), {
+            "pllm_or_xtpre": solution.m, "plln_or_mul": solution.n, "pllp": solution.p, "pllq": solution.q})
+    return [(sysclk, pll48, pll_params) for (sysclk, pll48), pll_params in candidates.items()]
+
+
+def pll_input_hz_from_rcc_params(rcc_params, mcu_family, target_device):
+    """PLL input clock implied by the RCC params (pll_source, hse_value_hz), 0 if unknown."""
+    defines = resolve_defines(mcu_family, target_device)
+    hsi_hz = defines.get('HSI_VALUE_HZ', 8000000 if mcu_family == "STM32F1" else 16000000)
+    pll_source = rcc_params.get("pll_source", "HSI")
+    if pll_source == "HSE":
+        return float(rcc_params.get("hse_value_hz", defines.get('HSE_DEFAULT_HZ', 8000000)))
+    if pll_source == "HSI/2" and mcu_family == "STM32F1":
+        return hsi_hz / 2.0
+    return float(hsi_hz) if pll_source == "HSI" else 0.0
+
+
+def solve_clock_tree(mcu_family, target_device, pll_input_hz, targets, pll_source="HSE"):
+    """Lowest-total-error clock tree for targets, or None if no configuration meets the hard limits.
+
+    Returns {"params": RCC params (PLL values, ahb_div, apb1_div, apb2_div), "spi_prescalers": {instance: int},
+             "frequencies": {...}, "errors": {target: relative error}, "total_error": float}.
+    """
+    defines = resolve_defines(mcu_family, target_device)
+    if pll_input_hz <= 0 or not targets.sysclk_hz:
+        return None
+    max_sysclk, max_hclk, max_pclk1, max_pclk2 = _device_clock_limits(mcu_family, target_device, defines)
+    if mcu_family == "STM32F1":
+        pll_candidates = _f1_pll_candidates(pll_input_hz, pll_source, defines, max_sysclk)
+    else:
+        pll_candidates = _f2_f4_pll_candidates(pll_input_hz, targets.sysclk_hz, mcu_family, target_device)
+
+    def pll_error(sysclk, pll48):
+        error = abs(sysclk - targets.sysclk_hz) / targets.sysclk_hz
+        if targets.pll48_hz:
+            error += abs(pll48 - targets.pll48_hz) / targets.pll48_hz
+        return error
+
+    ranked_candidates = sorted(((pll_error(sysclk, pll48), sysclk, pll48, pll_params)
+                                for sysclk, pll48, pll_params in pll_candidates), key=lambda c: (c[0], -c[1]))
+    ahb_divs = sorted(defines.get('AHB_PRESCALER_MAP', {1: 0}))
+    apb_divs = sorted(defines.get('APB_PRESCALER_MAP', {1: 0}))
+    min_i2c_pclk1_hz = defines.get("I2C_MIN_PCLK_MHZ", 2) * 1000000
+    bus_error_memo = {}
+
+    def best_apb(hclk, bus, max_pclk):
+        best = None
+        for apb_div in apb_divs:
+            pclk = hclk / apb_div
+            if pclk > max_pclk: continue
+            memo_key = (bus, pclk)
+            if memo_key not in bus_error_memo:
+                bus_error_memo[memo_key] = _bus_error(pclk, bus, targets, min_i2c_pclk1_hz)
+            result = bus_error_memo[memo_key]
+            if result is not None and (best is None or result[0] < best[1][0]):  # Ties keep the faster PCLK
+                best = (apb_div, result)
+        return best
+
+    best_total, best_solution = float('inf'), None
+    for lower_bound, sysclk, pll48, pll_params in ranked_candidates:
+        if lower_bound >= best_total: break  # Sorted by lower bound: nothing left can win
+        for ahb_div in ahb_divs:
+            hclk = sysclk / ahb_div
+            if hclk > max_hclk: continue
+            hclk_error = abs(hclk - targets.hclk_hz) / targets.hclk_hz
+            if lower_bound + hclk_error >= best_total: continue
+            apb1 = best_apb(hclk, "APB1", max_pclk1)
+            apb2 = best_apb(hclk, "APB2", max_pclk2)
+            if apb1 is None or apb2 is None: continue
+            total = lower_bound + hclk_error + apb1[1][0] + apb2[1][0]
+            if total < best_total:
+                best_total = total
+                best_solution = (sysclk, pll48, pll_params, ahb_div, hclk, hclk_error, apb1, apb2)
+
+    if best_solution is None:
+        return None
+    sysclk, pll48, pll_params, ahb_div, hclk, hclk_error, (apb1_div, apb1_result), (apb2_div, apb2_result) = best_solution
+    errors = {"SYSCLK": abs(sysclk - targets.sysclk_hz) / targets.sysclk_hz, "HCLK": hclk_error}
+    if targets.pll48_hz:
+        errors["48MHz"] = abs(pll48 - targets.pll48_hz) / targets.pll48_hz
+    errors.update(apb1_result[1]); errors.update(apb2_result[1])
+    params = dict(pll_params, ahb_div=ahb_div, apb1_div=apb1_div, apb2_div=apb2_div)
+    return {"params": params, "spi_prescalers": dict(apb1_result[2], **apb2_result[2]),
+            "frequencies": {"sysclk_freq_hz": sysclk, "hclk_freq_hz": hclk, "pclk1_freq_hz": hclk / apb1_div,
+                            "pclk2_freq_hz": hclk / apb2_div, "pll48_freq_hz": pll48},
+            "errors": errors, "total_error": best_total}
@@ -0,0 +1,56 @@
+# --- NEW FILE core/define_resolver.py ---
+# Precomputed "effective value" index over a family's define table.
+#
+# The defines files spell variants of the same define with suffixes, e.g.
+#   USART_PERIPHERALS_INFO_F1, ADC_PIN_MAP_STM32F103RB, SYSCLK_MAX_HZ_F103, DMA_PERIPHERAL_MAP_F407VG
+# and generators used to chain .get(f"X_{mcu_family}", .get("X", default)) to pick one.
+# resolve_defines() folds those variants once per (family, device) into a flat read-only
+# mapping, so a generator does a single defines.get("X", default). Resolution order:
+#   device-specific (_STM32F103C8/_F103C8) -> device line (_STM32F103/_F103)
+#   -> family-specific (_STM32F1/_F1) -> generic (X) -> caller's default
+# Suffixed keys stay in the index under their own names as well.
+
+from types import MappingProxyType
+
+from core.mcu_defines_loader import load_defines
+
+_RESOLVED_INDEX_CACHE = {}  # (family, device) -> MappingProxyType
+
+
+def _suffix_groups(mcu_family, target_device):
+    """Suffix lists from lowest to highest priority; within a group the last one wins."""
+    family_short = mcu_family.upper().replace("STM32", "")  # "F1"
+    groups = [[f"_{family_short}", f"_STM32{family_short}"]]
+    if target_device:
+        device_short = target_device.upper().replace("STM32", "")  # "F103C8"
+        device_line = device_short[:4]  # "F103"
+        if device_line != device_short:
+            groups.append([f"_{device_line}", f"_STM32{device_line}"])
+        groups.append([f"_{device_short}", f"_STM32{device_short}"])
+    return groups
+
+
+def build_resolved_index(defines_table, mcu_family, target_device=None):
+    index = dict(defines_table)
+    for suffixes in _suffix_groups(mcu_family, target_device):
+        for suffix in suffixes:
+            for key, value in defines_table.items():
+                if key.endswith(suffix) and len(key) > len(suffix):
+                    index[key[:-len(suffix)]] = value
+    return MappingProxyType(index)
+
+
+def resolve_defines(mcu_family, target_device=None):
+    """Returns the resolved define index for a family/device (built once, then cached).
+
+    An empty mapping is returned for an unknown family so callers' .get() defaults apply.
+    """
+    cache_key = (mcu_family, target_device)
+    index = _RESOLVED_INDEX_CACHE.get(cache_key)
+    if index is None:
+        defines_table = load_defines(mcu_family) if mcu_family else None
+        if not defines_table:
+            return MappingProxyType({})
+        index = _RESOLVED_INDEX_CACHE.setdefault(cache_key,
+                                                 build_resolved_index(defines_table, mcu_family, target_device))
+    return index
@@ -1,17 +1,40 @@
-# Dictionaries to hold defines from each family file
-F1_DEFINES = {}
-F2_DEFINES = {}
-F4_DEFINES = {}
+from collections.abc import Mapping
+from importlib import import_module
+from types import MappingProxyType
+
+from core.register_db import EMPTY_REGISTER_DB, build_register_db, is_bitfield_define, merge_register_dbs
+from core.svd_importer import load_device_register_db
+
+# family name -> (defines module in this package, short family name)
+FAMILY_DEFINE_MODULES = {
+    "STM32F1": ("stm32f1_defines", "F1"),
+    "STM32F2": ("stm32f2_defines", "F2"),
+    "STM32F4": ("stm32f4_defines", "F4"),
+}
+
+# family name -> read-only define table, each built once on first use and never modified afterwards
+_FAMILY_DEFINE_TABLES = {}
+_EMPTY_DEFINES = MappingProxyType({})
+# family name -> RegisterDatabase built from the *_Pos/*_Msk globals, which stay out of the define table
+_FAMILY_REGISTER_DBS = {}
+# (family name, device) -> family RegisterDatabase overlaid with the device's SVD import (if there is one)
+_DEVICE_REGISTER_DBS = {}
 
 
 def _populate_defines_dict(module, family_name_short):
-    """Helper to populate defines and standardize TARGET_DEVICES key."""
+    """Helper to populate defines and standardize TARGET_DEVICES key.
+    Returns (defines_dict, bitfield_defines); the *_Pos/*_Msk globals go to the latter only."""
     defines_dict = {'FAMILY_NAME': f"STM32{family_name_short}"}
+    bitfield_defines = {}
 
     # Extract all module attributes
-    for k in dir(module):
-        if not k.startswith('_'):
-            defines_dict[k] = getattr(module, k)
+    for k, v in vars(module).items():
+        if k.startswith('_'):
+            continue
+        if is_bitfield_define(k):
+            bitfield_defines[k] = v
+        else:
+            defines_dict[k] = v
 
     # Standardize TARGET_DEVICES key
     family_specific_target_key = f"TARGET_DEVICES_{family_name_short}"  # e.g., TARGET_DEVICES_F1
@@ -34,62 +57,98 @@ def _populate_defines_dict(module, family_name_short):
     # if hasattr(module, f"get_{family_name_short.lower()}_flash_latency"):
     #     defines_dict["get_flash_latency"] = getattr(module, f"get_{family_name_short.lower()}_flash_latency")
 
-    return defines_dict
+    return defines_dict, bitfield_defines
 
 
 def load_defines(family_name):
     """
-    Loads and returns a dictionary of defines for the given family.
-    This is a simplified example; a real implementation might dynamically
-    import modules or parse files.
+    Loads and returns the read-only define table (a MappingProxyType) for the given family.
+    The table is built on first use and the same object is returned afterwards.
     """
     family_name_upper = family_name.upper()
-    if family_name_upper == "STM32F1":
-        if not F1_DEFINES:  # Load on demand
-            try:
-                from . import stm32f1_defines
-                F1_DEFINES.update(_populate_defines_dict(stm32f1_defines, "F1"))
-            except ImportError as e:
-                print(f"Error: Could not load stm32f1_defines.py: {e}")
-                return None
-        return F1_DEFINES
-    elif family_name_upper == "STM32F2":
-        if not F2_DEFINES:
-            try:
-                from . import stm32f2_defines
-                F2_DEFINES.update(_populate_defines_dict(stm32f2_defines, "F2"))
-            except ImportError as e:
-                print(f"Error: Could not load stm32f2_defines.py: {e}")
-                return None
-        return F2_DEFINES
-    elif family_name_upper == "STM32F4":
-        if not F4_DEFINES:
-            try:
-                from . import stm32f4_defines
-                F4_DEFINES.update(_populate_defines_dict(stm32f4_defines, "F4"))
-            except ImportError as e:
-                print(f"Error: Could not load stm32f4_defines.py: {e}")
-                return None
-        return F4_DEFINES
-    else:
+    table = _FAMILY_DEFINE_TABLES.get(family_name_upper)
+    if table is not None:
+        return table
+    if family_name_upper not in FAMILY_DEFINE_MODULES:
         print(f"Unsupported MCU family: {family_name}")
         return None
+    module_name, family_name_short = FAMILY_DEFINE_MODULES[family_name_upper]
+    try:
+        module = import_module(f".{module_name}", __package__)
+    except ImportError as e:
+        print(f"Error: Could not load {module_name}.py: {e}")
+        return None
+    defines_dict, bitfield_defines = _populate_defines_dict(module, family_name_short)
+    # setdefault: if two threads race here, both end up with the same table/database
+    _FAMILY_REGISTER_DBS.setdefault(family_name_upper, build_register_db(bitfield_defines, defines_dict))
+    return _FAMILY_DEFINE_TABLES.setdefault(family_name_upper, MappingProxyType(defines_dict))
+
+
+def load_register_db(family_name, target_device=None):
+    """Returns the RegisterDatabase for the given family (empty if the family can't be loaded).
+    With a target_device that has an SVD in core.svd_importer.DEFAULT_SVD_DIR, the SVD's fields and
+    addresses are laid over the family's; the result is built once per device."""
+    if not family_name or load_defines(family_name) is None:
+        return EMPTY_REGISTER_DB
+    family_db = _FAMILY_REGISTER_DBS[family_name.upper()]
+    if not target_device:
+        return family_db
+    cache_key = (family_name.upper(), target_device)
+    db = _DEVICE_REGISTER_DBS.get(cache_key)
+    if db is None:
+        svd_db = load_device_register_db(target_device)
+        db = _DEVICE_REGISTER_DBS.setdefault(cache_key,
+                                             merge_register_dbs(family_db, svd_db) if svd_db is not None else family_db)
+    return db
+
+
+class ActiveMcuDefines(Mapping):
+    """Read-only view of the currently selected family's define table.
+
+    Modules keep a reference to this one object (from core.mcu_defines_loader import CURRENT_MCU_DEFINES);
+    selecting a family only swaps the table reference behind it, which is O(1) and atomic, so a reader
+    on another thread sees either the old or the new table, never a half-filled one.
+    """
+    __slots__ = ("_table",)
+
+    def __init__(self):
+        self._table = _EMPTY_DEFINES
+
+    def __getitem__(self, key):
+        return self._table[key]
+
+    def get(self, key, default=None):
+        return self._table.get(key, default)
+
+    def __contains__(self, key):
+        return key in self._table
+
+    def __iter__(self):
+        return iter(self._table)
+
+    def __len__(self):
+        return len(self._table)
+
+    def table(self):
+        """The active table itself: an immutable snapshot that a family switch won't affect."""
+        return self._table
+
+    def _activate(self, table):
+        self._table = table
 
 
-CURRENT_MCU_DEFINES = {}  # Global dictionary to hold defines for the currently selected family
+CURRENT_MCU_DEFINES = ActiveMcuDefines()  # Defines for the currently selected family
 
 
 def set_current_mcu_defines(family_name):
-    """Sets the global CURRENT_MCU_DEFINES based on the family."""
-    global CURRENT_MCU_DEFINES
+    """Selects the family whose defines CURRENT_MCU_DEFINES exposes."""
     # print(f"Attempting to set MCU defines for family: {family_name}") # Debug
     defs = load_defines(family_name)
     if defs:
-        CURRENT_MCU_DEFINES.clear()  # Clear old defines
-        CURRENT_MCU_DEFINES.update(defs)  # Update with new ones
+        CURRENT_MCU_DEFINES._activate(defs)
         # print(f"Successfully set MCU defines for {family_name}. HSI: {CURRENT_MCU_DEFINES.get('HSI_VALUE_HZ')}, TARGET_DEVICES keys: {list(CURRENT_MCU_DEFINES.get('TARGET_DEVICES', {}).keys())}") # Debug
         return True
-    CURRENT_MCU_DEFINES.clear()  # Reset if loading failed
+    CURRENT_MCU_DEFINES._activate(_EMPTY_DEFINES)  # Reset if loading failed
     print(f"Failed to set MCU defines for {family_name}")  # Debug
     return False
 
@@ -97,4 +156,4 @@ def set_current_mcu_defines(family_name):
 # Initialize with F4 defines by default if possible
 # This initial call is important for the application startup state.
 if not set_current_mcu_defines("STM32F4"):  # Default to F4
-    print("Warning: Could not load default STM32F4 defines on startup.")
\ No newline at end of file
+    print("Warning: Could not load default STM32F4 defines on startup.")
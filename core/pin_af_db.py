@@ -0,0 +1,104 @@
+# --- NEW FILE core/pin_af_db.py ---
+# Pin / alternate-function database built from a device's PIN_ALTERNATE_FUNCTIONS entry
+# (core/stm32f*_defines.py): ((pin, peripheral signal, AF number), ...), e.g. ("PA9", "USART1_TX", 7).
+# Indexed by pin, by signal and by peripheral, once per device, so generators and widgets
+# resolve AF numbers and valid pins with dict lookups instead of parsing "PA9/AF7 or PB6/AF7" text.
+
+from core.mcu_defines_loader import load_defines
+
+_PIN_AF_DBS = {}  # (family, device) -> PinAfDatabase
+
+
+class PinAlternateFunction:
+    __slots__ = ("pin", "signal", "af")
+
+    def __init__(self, pin, signal, af):
+        self.pin = pin  # "PA9"
+        self.signal = signal  # "USART1_TX"
+        self.af = af  # 7, or -1 where the family has no AF number (F1 remaps)
+
+    @property
+    def port_char(self):
+        return self.pin[1]
+
+    @property
+    def pin_num(self):
+        return self.pin[2:]
+
+    @property
+    def peripheral(self):
+        return self.signal.rsplit("_", 1)[0]
+
+    @property
+    def signal_type(self):
+        return self.signal.rsplit("_", 1)[-1]
+
+    def __str__(self):
+        return f"{self.pin}/AF{self.af}" if self.af != -1 else f"{self.pin}/Remap"
+
+    def __repr__(self):
+        return f"PinAlternateFunction({self.pin}, {self.signal}, {self.af})"
+
+
+class PinAfDatabase:
+    __slots__ = ("_by_pin", "_by_signal", "_signal_types", "_af_by_pin_signal")
+
+    def __init__(self, entries=()):
+        self._by_pin = {}  # "PA9" -> [PinAlternateFunction, ...]
+        self._by_signal = {}  # "USART1_TX" -> [PinAlternateFunction, ...], preferred pin first
+        self._signal_types = {}  # "USART1" -> ["TX", "RX"] in table order
+        self._af_by_pin_signal = {}  # ("PA9", "USART1_TX") -> 7
+        for pin, signal, af in entries:
+            self.add(pin, signal, af)
+
+    def __len__(self):
+        return len(self._af_by_pin_signal)
+
+    def add(self, pin, signal, af):
+        entry = PinAlternateFunction(pin, signal, af)
+        self._by_pin.setdefault(pin, []).append(entry)
+        if signal not in self._by_signal:
+            self._by_signal[signal] = []
+            self._signal_types.setdefault(entry.peripheral, []).append(entry.signal_type)
+        self._by_signal[signal].append(entry)
+        self._af_by_pin_signal[(pin, signal)] = af
+        return entry
+
+    def af_for(self, pin, signal):
+        """AF number that routes signal ("USART1_TX") to pin ("PA9"), or None if it can't."""
+        return self._af_by_pin_signal.get((pin, signal))
+
+    def functions_on_pin(self, pin):
+        return tuple(self._by_pin.get(pin, ()))
+
+    def options(self, peripheral, signal_type):
+        """Valid pins for e.g. ("USART1", "TX"), preferred first."""
+        return tuple(self._by_signal.get(f"{peripheral}_{signal_type}", ()))
+
+    def default_option(self, peripheral, signal_type):
+        options = self._by_signal.get(f"{peripheral}_{signal_type}")
+        return options[0] if options else None
+
+    def signal_types(self, peripheral):
+        """e.g. "SPI1" -> ("SCK", "MISO", "MOSI", "NSS")."""
+        return tuple(self._signal_types.get(peripheral, ()))
+
+    def describe(self, peripheral, signal_type):
+        """Display text such as "PA9/AF7 or PB6/AF7" (empty string if there are no options)."""
+        return " or ".join(str(entry) for entry in self._by_signal.get(f"{peripheral}_{signal_type}", ()))
+
+
+EMPTY_PIN_AF_DB = PinAfDatabase()
+
+
+def load_pin_af_db(mcu_family, target_device):
+    """PinAfDatabase for a device (built once, then cached); empty if the device has no table."""
+    cache_key = (mcu_family, target_device)
+    db = _PIN_AF_DBS.get(cache_key)
+    if db is None:
+        defines_table = load_defines(mcu_family) if mcu_family else None
+        entries = defines_table.get("PIN_ALTERNATE_FUNCTIONS", {}).get(target_device) if defines_table else None
+        if not entries:
+            return EMPTY_PIN_AF_DB
+        db = _PIN_AF_DBS.setdefault(cache_key, PinAfDatabase(entries))
+    return db
@@ -0,0 +1,246 @@
+# --- NEW FILE core/pll_solver.py ---
+# STM32F2/F4 main PLL solver (RCC_PLLCFGR M, N, P, Q).
+#
+#   VCO_IN = PLL_IN / M,  VCO_OUT = VCO_IN * N,  SYSCLK = VCO_OUT / P,  PLL48CK = VCO_OUT / Q
+#
+# The whole valid grid is evaluated at once: every (M, N, P) that meets the VCO input/output
+# limits and the device SYSCLK maximum, with Q picked per VCO_OUT as the smallest divider that
+# keeps PLL48CK <= 48 MHz. Solutions are ranked exact SYSCLK first, then exact 48 MHz, then
+# lowest VCO (lowest PLL current). All arithmetic is on integers, so "exact" really means exact.
+# NumPy is used if installed; otherwise the same search runs in plain Python (same results, slower).
+# cached_solve_f2_f4_pll() memoizes results in the shared SOLUTION_CACHE (core/solution_cache.py).
+
+import heapq
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from core.define_resolver import resolve_defines
+from core.solution_cache import SOLUTION_CACHE
+
+PLL48_TARGET_HZ = 48000000
+
+PllSolution = namedtuple("PllSolution", ["m", "n", "p", "q", "vco_input_hz", "vco_output_hz", "sysclk_hz",
+                                         "pll48_hz", "sysclk_error_hz", "pll48_error_hz"])
+
+
+def get_f2_f4_pll_limits(mcu_family, target_device):
+    """PLL limits for a device as a dict of ints (from the family defines, with the usual fallbacks)."""
+    defines = resolve_defines(mcu_family, target_device)
+    is_f2 = mcu_family == "STM32F2"
+    plln_min = defines.get('PLLN_MIN_GENERAL', 192 if is_f2 else 50)
+    plln_max = defines.get('PLLN_MAX_GENERAL', 432)
+    get_plln_range_func = defines.get('get_plln_range')
+    if get_plln_range_func and mcu_family == "STM32F4":
+        plln_min, plln_max = get_plln_range_func(target_device)
+
+    device_info = defines.get('TARGET_DEVICES', {}).get(target_device, {})
+    if is_f2:
+        max_sysclk = device_info.get('max_sysclk_hz', defines.get('SYSCLK_MAX_HZ', 120000000))
+    elif mcu_family == "STM32F4":
+        vos_map_for_device = defines.get('SYSCLK_MAX_HZ_MAP', {}).get(target_device, {})
+        max_sysclk = device_info.get('max_sysclk_hz', max(vos_map_for_device.values()) if vos_map_for_device else 168000000)
+    else:
+        max_sysclk = device_info.get('max_sysclk_hz', 120000000)
+
+    return {
+        "pllm_min": int(defines.get('PLLM_MIN', 2)), "pllm_max": int(defines.get('PLLM_MAX', 63)),
+        "plln_min": int(plln_min), "plln_max": int(plln_max),
+        "pllp_values": tuple(int(p) for p in defines.get('PLLP_VALUES', [2, 4, 6, 8])),
+        "pllq_min": int(defines.get('PLLQ_MIN', 2)), "pllq_max": int(defines.get('PLLQ_MAX', 15)),
+        "vco_in_min_hz": int(defines.get('VCO_INPUT_MIN_HZ', 1000000)),
+        "vco_in_max_hz": int(defines.get('VCO_INPUT_MAX_HZ', 2000000)),
+        "vco_out_min_hz": int(defines.get('VCO_OUTPUT_MIN_HZ', 192000000 if is_f2 else 100000000)),
+        "vco_out_max_hz": int(defines.get('VCO_OUTPUT_MAX_HZ', 432000000)),
+        "max_sysclk_hz": int(max_sysclk),
+    }
+
+
+def _valid_pllm_values(pll_input_hz, limits):
+    return [m for m in range(max(1, limits["pllm_min"]), limits["pllm_max"] + 1)
+            if limits["vco_in_min_hz"] * m <= pll_input_hz <= limits["vco_in_max_hz"] * m]
+
+
+def _candidates_numpy(pll_input_hz, target_sysclk_hz, limits, pllm_values, max_solutions):
+    """Returns (m, n, p, q, sysclk_error_hz, pll48_error_hz) arrays of the best candidates, in rank order."""
+    m = np.array(pllm_values, dtype=np.int64)[:, None]
+    n = np.arange(limits["plln_min"], limits["plln_max"] + 1, dtype=np.int64)[None, :]
+    vco_num = pll_input_hz * n  # VCO_OUT = vco_num / m
+
+    # (M, N) pairs inside the VCO output range first, then P is broadcast over just those
+    m_idx, n_idx = np.nonzero((vco_num >= limits["vco_out_min_hz"] * m) & (vco_num <= limits["vco_out_max_hz"] * m))
+    m_mn, n_mn = m[m_idx, 0], n[0, n_idx]
+    vco_num_mn = pll_input_hz * n_mn
+    pll48_den = PLL48_TARGET_HZ * m_mn
+    q_mn = np.clip((vco_num_mn + pll48_den - 1) // pll48_den, limits["pllq_min"], limits["pllq_max"])
+    pll48_error_mn = np.abs(vco_num_mn - pll48_den * q_mn) / (m_mn * q_mn)
+
+    p = np.array(limits["pllp_values"], dtype=np.int64)[:, None]
+    sysclk_den = m_mn * p  # Axes: (P, MN)
+    p_idx, mn_idx = np.nonzero(vco_num_mn <= limits["max_sysclk_hz"] * sysclk_den)
+    sysclk_error = np.abs(vco_num_mn[mn_idx] - target_sysclk_hz * sysclk_den[p_idx, mn_idx]) / sysclk_den[p_idx, mn_idx]
+
+    # Only candidates that can rank in the top max_solutions need the full multi-key sort
+    if len(sysclk_error) > max_solutions:
+        cutoff = np.partition(sysclk_error, max_solutions - 1)[max_solutions - 1]
+        keep = np.nonzero(sysclk_error <= cutoff)[0]
+        p_idx, mn_idx, sysclk_error = p_idx[keep], mn_idx[keep], sysclk_error[keep]
+    m_sel, p_sel = m_mn[mn_idx], p[p_idx, 0]
+    pll48_error = pll48_error_mn[mn_idx]
+    order = np.lexsort((p_sel, m_sel, vco_num_mn[mn_idx] / m_sel, pll48_error, sysclk_error))  # Last key is primary
+    return m_sel[order], n_mn[mn_idx][order], p_sel[order], q_mn[mn_idx][order], sysclk_error[order], pll48_error[order]
+
+
+def _candidates_python(pll_input_hz, target_sysclk_hz, limits, pllm_values, max_solutions):
+    candidates = []
+    for m in pllm_values:
+        for n in range(limits["plln_min"], limits["plln_max"] + 1):
+            vco_num = pll_input_hz * n
+            if not (limits["vco_out_min_hz"] * m <= vco_num <= limits["vco_out_max_hz"] * m): continue
+            q = min(max(-(-vco_num // (PLL48_TARGET_HZ * m)), limits["pllq_min"]), limits["pllq_max"])
+            pll48_error = abs(vco_num - PLL48_TARGET_HZ * m * q) / (m * q)
+            for p in limits["pllp_values"]:
+                if vco_num > limits["max_sysclk_hz"] * m * p: continue
+                sysclk_error = abs(vco_num - target_sysclk_hz * m * p) / (m * p)
+                candidates.append((sysclk_error, pll48_error, vco_num / m, m, p, n, q))
+    candidates = heapq.nsmallest(max_solutions, candidates)
+    return ([c[3] for c in candidates], [c[5] for c in candidates], [c[4] for c in candidates],
+            [c[6] for c in candidates], [c[0] for c in candidates], [c[1] for c in candidates])
+
+
+def solve_f2_f4_pll(pll_input_hz, target_sysclk_hz, mcu_family, target_device, max_solutions=8, limits=None):
+    """Ranked list of PllSolution (best first, at most max_solutions); empty if nothing fits."""
+    if limits is None:
+        limits = get_f2_f4_pll_limits(mcu_family, target_device)
+    if max_solutions <= 0:
+        return []
+    pll_input_hz = int(round(pll_input_hz))
+    target_sysclk_hz = int(round(target_sysclk_hz))
+    if pll_input_hz <= 0 or target_sysclk_hz <= 0:
+        return []
+    pllm_values = _valid_pllm_values(pll_input_hz, limits)
+    if not pllm_values:
+        return []
+
+    candidates_func = _candidates_numpy if np is not None else _candidates_python
+    m_col, n_col, p_col, q_col, sysclk_err_col, pll48_err_col = candidates_func(pll_input_hz, target_sysclk_hz, limits,
+                                                                                pllm_values, max_solutions)
+    solutions = []
+    for i in range(min(max_solutions, len(m_col))):
+        m, n, p, q = int(m_col[i]), int(n_col[i]), int(p_col[i]), int(q_col[i])
+        vco_out = pll_input_hz * n / m
+        solutions.append(PllSolution(m, n, p, q, pll_input_hz / m, vco_out, vco_out / p, vco_out / q,
+                                     float(sysclk_err_col[i]), float(pll48_err_col[i])))
+    return solutions
+
+
+def cached_solve_f2_f4_pll(pll_input_hz, target_sysclk_hz, mcu_family, target_device, max_solutions=8, limits=None):
+    """solve_f2_f4_pll() through SOLUTION_CACHE, keyed by device, input clock, target and the PLL limits."""
+    if limits is None:
+        limits = get_f2_f4_pll_limits(mcu_family, target_device)
+    cache_key = ("f2_f4_pll", mcu_family, target_device, int(round(pll_input_hz)), int(round(target_sysclk_hz)),
+                 max_solutions, tuple(sorted(limits.items())))
+    return SOLUTION_CACHE.get_or_compute(cache_key, lambda: solve_f2_f4_pll(
+        pll_input_hz, target_sysclk_hz, mcu_family, target_device, max_solutions, limits))
+
+
+# --- STM32F1 PLL (RCC_CFGR PLLSRC, PLLXTPRE, PLLMUL) plus the prescalers hanging off it ---
+#
+#   PLL_IN = HSI / 2 or HSE / PLLXTPRE,  SYSCLK = PLL_IN * PLLMUL,  USBCLK = SYSCLK / (1 or 1.5)
+#   HCLK, PCLK1, PCLK2 = the fastest AHB/APB prescalers within the device maxima,  ADCCLK = PCLK2 / ADCPRE
+#
+# Only 45 (source, PLLXTPRE, PLLMUL) combinations exist, so they are simply all tried. Solutions are
+# ranked exact SYSCLK first, then exact 48 MHz USB (if asked for), then HSE before HSI/2, then the
+# lowest PLLMUL. With need_usb only HSE-based solutions within the USB clock tolerance qualify.
+
+F1PllSolution = namedtuple("F1PllSolution", ["pll_source", "xtpre", "mul", "pll_input_hz", "sysclk_hz",
+                                             "usb_prescaler", "usb_hz", "ahb_div", "apb1_div", "apb2_div",
+                                             "adc_prescaler", "adc_hz", "sysclk_error_hz", "usb_error_hz"])
+
+
+def get_f1_pll_limits(mcu_family, target_device):
+    """F1 PLL, bus and ADC/USB limits for a device as a dict of ints/tuples."""
+    defines = resolve_defines(mcu_family, target_device)
+    device_info = defines.get('TARGET_DEVICES', {}).get(target_device, {})
+    max_sysclk = device_info.get("max_sysclk_hz", defines.get('SYSCLK_MAX_HZ', 72000000))
+    adc_divisors = tuple(int(prescaler_str.rsplit("/", 1)[-1]) for prescaler_str in
+                         defines.get('ADC_PRESCALERS', ["PCLK2 / 2", "PCLK2 / 4", "PCLK2 / 6", "PCLK2 / 8"]))
+    return {
+        "pllmul_min": int(defines.get('PLLMUL_MIN', 2)), "pllmul_max": int(defines.get('PLLMUL_MAX', 16)),
+        "pllxtpre_values": tuple(int(x) for x in defines.get('PLLXTPRE_VALUES', [1, 2])),
+        "pll_in_min_hz": int(defines.get('PLL_INPUT_MIN_HZ', 1000000)),
+        "pll_in_max_hz": int(defines.get('PLL_INPUT_MAX_HZ', 25000000)),
+        "pll_out_min_hz": int(defines.get('PLL_OUTPUT_MIN_HZ', 16000000)),
+        "max_sysclk_hz": int(max_sysclk), "max_hclk_hz": int(device_info.get("max_hclk_hz", max_sysclk)),
+        "max_pclk1_hz": int(device_info.get("max_pclk1_hz", 36000000)),
+        "max_pclk2_hz": int(device_info.get("max_pclk2_hz", max_sysclk)),
+        "max_adc_hz": int(device_info.get("adc_clk_max_hz", defines.get('ADC_CLK_MAX_HZ', 14000000))),
+        "adc_divisors": tuple(sorted(adc_divisors)),
+        "ahb_divisors": tuple(sorted(defines.get('AHB_PRESCALER_MAP', {1: 0}))),
+        "apb_divisors": tuple(sorted(defines.get('APB_PRESCALER_MAP', {1: 0}))),
+        "has_usb": bool(device_info.get("has_usb", False)),
+        "usb_tolerance_ppm": int(round(defines.get('USB_CLOCK_TOLERANCE', 0.0025) * 1e6)),
+    }
+
+
+def _fastest_divisor(freq_hz, divisors, max_hz):
+    return next((divisor for divisor in divisors if freq_hz / divisor <= max_hz), None)
+
+
+def solve_f1_pll(hse_hz, target_sysclk_hz, mcu_family, target_device, need_usb=True, max_solutions=8, hsi_hz=None,
+                 limits=None):
+    """Ranked list of F1PllSolution (best first, at most max_solutions); empty if nothing fits.
+
+    hse_hz=0 leaves out the HSE sources, hsi_hz=0 the HSI/2 one (hsi_hz=None: the family's HSI value).
+    need_usb is ignored on devices without USB.
+    """
+    if limits is None:
+        limits = get_f1_pll_limits(mcu_family, target_device)
+    if hsi_hz is None:
+        hsi_hz = resolve_defines(mcu_family, target_device).get('HSI_VALUE_HZ', 8000000)
+    need_usb = need_usb and limits["has_usb"]
+    if max_solutions <= 0 or target_sysclk_hz <= 0:
+        return []
+
+    sources = [("HSI/2", 1, hsi_hz / 2.0)] if hsi_hz > 0 else []
+    if hse_hz > 0:
+        sources += [("HSE", xtpre, hse_hz / xtpre) for xtpre in limits["pllxtpre_values"]]
+    ranked = []
+    for pll_source, xtpre, pll_input_hz in sources:
+        if not (limits["pll_in_min_hz"] <= pll_input_hz <= limits["pll_in_max_hz"]): continue
+        for mul in range(limits["pllmul_min"], limits["pllmul_max"] + 1):
+            sysclk = pll_input_hz * mul
+            if not (limits["pll_out_min_hz"] <= sysclk <= limits["max_sysclk_hz"]): continue
+            usb_prescaler = min(("1", "1.5"), key=lambda prescaler: abs(sysclk / float(prescaler) - PLL48_TARGET_HZ))
+            usb_hz = sysclk / float(usb_prescaler)
+            usb_error = abs(usb_hz - PLL48_TARGET_HZ)
+            if need_usb and (pll_source != "HSE" or usb_error * 1e6 > limits["usb_tolerance_ppm"] * PLL48_TARGET_HZ):
+                continue  # USB needs a crystal-based, in-tolerance 48 MHz
+            ahb_div = _fastest_divisor(sysclk, limits["ahb_divisors"], limits["max_hclk_hz"])
+            if ahb_div is None: continue
+            hclk = sysclk / ahb_div
+            apb1_div = _fastest_divisor(hclk, limits["apb_divisors"], limits["max_pclk1_hz"])
+            apb2_div = _fastest_divisor(hclk, limits["apb_divisors"], limits["max_pclk2_hz"])
+            if apb1_div is None or apb2_div is None: continue
+            adc_prescaler = _fastest_divisor(hclk / apb2_div, limits["adc_divisors"], limits["max_adc_hz"])
+            if adc_prescaler is None: continue
+            sysclk_error = abs(sysclk - target_sysclk_hz)
+            ranked.append(((sysclk_error, usb_error if need_usb else 0.0, pll_source != "HSE", mul, xtpre),
+                           F1PllSolution(pll_source, xtpre, mul, pll_input_hz, sysclk, usb_prescaler, usb_hz, ahb_div,
+                                         apb1_div, apb2_div, adc_prescaler, hclk / apb2_div / adc_prescaler,
+                                         sysclk_error, usb_error)))
+    return [solution for _, solution in heapq.nsmallest(max_solutions, ranked, key=lambda r: r[0])]
+
+
+def cached_solve_f1_pll(hse_hz, target_sysclk_hz, mcu_family, target_device, need_usb=True, max_solutions=8,
+                        hsi_hz=None, limits=None):
+    """solve_f1_pll() through SOLUTION_CACHE, keyed like cached_solve_f2_f4_pll() plus the source/USB options."""
+    if limits is None:
+        limits = get_f1_pll_limits(mcu_family, target_device)
+    cache_key = ("f1_pll", mcu_family, target_device, int(round(hse_hz)), int(round(target_sysclk_hz)), bool(need_usb),
+                 max_solutions, None if hsi_hz is None else int(round(hsi_hz)), tuple(sorted(limits.items())))
+    return SOLUTION_CACHE.get_or_compute(cache_key, lambda: solve_f1_pll(
+        hse_hz, target_sysclk_hz, mcu_family, target_device, need_usb, max_solutions, hsi_hz, limits))
@@ -0,0 +1,205 @@
+# --- NEW FILE core/power_planner.py ---
+# Low-power clock planner for STM32F4 parts: instead of the usual "max clock" setup, find the
+# slowest clock tree that still meets every enabled peripheral's timing needs, and run it at the
+# least demanding VOS scale with the fewest flash wait states, without over-drive.
+#
+# Requirements (each relative error must stay within PLANNER_TOLERANCES):
+#   USART baud rate after BRR quantization, I2C SCL after CCR quantization (plus the I2C PCLK1
+#   minimum), SPI SCK against target_sck_hz, each enabled timer's current tick rate
+#   (kernel clock / (PSC + 1); the PSC is recomputed for the new kernel clock), an ADCCLK inside
+#   ADC_CLOCK_MIN_HZ..ADC_CLOCK_MAX_HZ for enabled ADCs (fastest PCLK2 prescaler that fits),
+#   48 MHz on PLLQ if need_48mhz, and HCLK >= min_hclk_hz (CPU headroom; 0 = peripherals only).
+# Candidates are visited cheapest first: HSI/HSE straight to SYSCLK before any PLL setting (PLL
+# and VCO current), then by ascending SYSCLK, then ascending HCLK (largest AHB prescaler first).
+# For each one the least demanding VOS scale for its HCLK is taken (over-drive only if no other
+# scale reaches it), and the bus maxima of that scale apply. The first candidate whose APB
+# prescalers meet every requirement wins; per APB bus the slowest passing PCLK is kept. Flash wait
+# states follow from HCLK, so they are the fewest possible for that tree.
+#
+# The plan is an alternative RCC config ({"params", "calculated"}) with vos_policy LOW_POWER
+# (core/clock_tree.py); low_power_project_config() gives the whole project running on it.
+
+import copy
+
+from core.clock_tree import ClockTree, VOS_POLICY_LOW_POWER
+from core.clock_math import (PLANNER_TOLERANCES, module_config_list, uart_baud_error, i2c_scl_error,
+                             spi_prescaler_and_error, timer_prescaler_and_error)
+from core.clock_tree_solver import clock_targets_from_project, pll_input_hz_from_rcc_params
+from core.define_resolver import resolve_defines
+from core.pll_solver import cached_solve_f2_f4_pll, PLL48_TARGET_HZ
+
+PLL_CANDIDATES_TO_PLAN = 1 << 15  # Enough for every (M, N, P) of the larger F4 PLLs
+ADC_PRESCALERS = (2, 4, 6, 8)  # ADC_CCR ADCPRE: "PCLK2 / n"
+ADC_CLOCK_MIN_HZ = 600000
+ADC_CLOCK_MAX_HZ = 36000000
+
+
+def _timer_requirements(project_config, defines, rcc_calculated):
+    """(instance, bus, tick Hz) for each enabled timer, from its PSC and the current kernel clock."""
+    timer_info_map = defines.get("TIMER_PERIPHERALS_INFO", {})
+    requirements = []
+    for module_config in module_config_list(project_config.get("TIMERS")):
+        params = module_config.get("params", {})
+        instance_info = timer_info_map.get(params.get("instance_name"))
+        if not params.get("enabled") or not instance_info:
+            continue
+        bus = instance_info["bus"]
+        kernel_hz = rcc_calculated.get(f"tim_apb{bus[-1]}_kernel_freq_hz") or 0
+        if kernel_hz:
+            requirements.append((params["instance_name"], bus, kernel_hz / (int(params.get("prescaler", 0)) + 1)))
+    return requirements
+
+
+def _adc_instances(project_config):
+    return [module_config.get("params", {}).get("adc_instance", module_config.get("params", {}).get("instance_name", "ADC1"))
+            for module_config in module_config_list(project_config.get("ADC")) if module_config.get("params", {}).get("enabled")]
+
+
+def _bus_plan(pclk_hz, tim_kernel_hz, bus, targets, timers, adcs, tolerances, min_i2c_pclk1_hz):
+    """({requirement: error}, {"spi"/"timer"/"adc": {instance: prescaler}}) if every requirement on
+    this APB bus is met at pclk_hz, else None."""
+    errors = {}
+    spi_prescalers = {}
+    timer_prescalers = {}
+    adc_prescalers = {}
+    for instance_name, uart_bus, baud_rate, over8 in targets.uarts:
+        if uart_bus != bus: continue
+        error = uart_baud_error(pclk_hz, baud_rate, over8)
+        if error is None or error > tolerances["uart"]: return None
+        errors[instance_name] = error
+    if bus == "APB1":
+        for instance_name, speed_hz, duty_16_9 in targets.i2cs:
+            error = i2c_scl_error(pclk_hz, speed_hz, duty_16_9, min_i2c_pclk1_hz)
+            if error is None or error > tolerances["i2c"]: return None
+            errors[instance_name] = error
+    for instance_name, spi_bus, sck_hz in targets.spis:
+        if spi_bus != bus: continue
+        prescaler, error = spi_prescaler_and_error(pclk_hz, sck_hz)
+        if error > tolerances["spi"]: return None
+        spi_prescalers[instance_name] = prescaler; errors[instance_name] = error
+    for instance_name, timer_bus, tick_hz in timers:
+        if timer_bus != bus: continue
+        prescaler, error = timer_prescaler_and_error(tim_kernel_hz, tick_hz)
+        if prescaler is None or error > tolerances["timer"]: return None
+        timer_prescalers[instance_name] = prescaler; errors[instance_name] = error
+    if bus == "APB2":
+        for instance_name in adcs:
+            prescaler = next((divisor for divisor in ADC_PRESCALERS if pclk_hz / divisor <= ADC_CLOCK_MAX_HZ), None)
+            if prescaler is None or pclk_hz / prescaler < ADC_CLOCK_MIN_HZ: return None
+            adc_prescalers[instance_name] = prescaler
+    return errors, {"spi": spi_prescalers, "timer": timer_prescalers, "adc": adc_prescalers}
+
+
+def _sysclk_candidates(rcc_params, mcu_family, target_device, defines, need_48mhz, usb_tolerance):
+    """(PLL on, SYSCLK, VCO out, 48 MHz clock, RCC param updates): HSI/HSE first, then each distinct
+    PLL SYSCLK in ascending order."""
+    candidates = []
+    if not need_48mhz:  # 48 MHz only comes from the PLL
+        hsi_hz = defines.get('HSI_VALUE_HZ', 16000000)
+        candidates.append((False, hsi_hz, 0, 0, {"sysclk_source": "HSI", "hsi_enabled": True}))
+        if rcc_params.get("hse_enabled"):
+            hse_hz = rcc_params.get("hse_value_hz", defines.get('HSE_DEFAULT_HZ', 8000000))
+            candidates.append((False, hse_hz, 0, 0, {"sysclk_source": "HSE"}))
+        candidates.sort(key=lambda c: c[1])
+    pll_input_hz = pll_input_hz_from_rcc_params(rcc_params, mcu_family, target_device)
+    if pll_input_hz <= 0:
+        return candidates
+    pll_source_updates = {"hsi_enabled": True} if rcc_params.get("pll_source", "HSI") == "HSI" else {}
+    seen_sysclks = set()
+    # Ranked against a 1 Hz target, the solutions come in ascending SYSCLK, lowest VCO first within one
+    for solution in cached_solve_f2_f4_pll(pll_input_hz, 1, mcu_family, target_device, PLL_CANDIDATES_TO_PLAN):
+        if solution.sysclk_hz in seen_sysclks: continue
+        if need_48mhz and abs(solution.pll48_hz - PLL48_TARGET_HZ) / PLL48_TARGET_HZ > usb_tolerance: continue
+        seen_sysclks.add(solution.sysclk_hz)
+        candidates.append((True, solution.sysclk_hz, solution.vco_output_hz, solution.pll48_hz, dict(
+            pll_source_updates, sysclk_source="PLL", pllm_or_xtpre=solution.m, plln_or_mul=solution.n,
+            pllp=solution.p, pllq=solution.q)))
+    return candidates
+
+
+def plan_low_power_clock_tree(project_config, min_hclk_hz=0, need_48mhz=False, tolerances=None):
+    """Lowest-power F4 clock tree that meets the enabled peripherals' timing needs, or None.
+
+    Returns {"params": RCC params, "calculated": RCC 'calculated' dict, "prescalers": {"spi"/"timer"/"adc":
+             {instance: value}}, "frequencies": {...}, "errors": {requirement: relative error}}.
+    """
+    rcc_params = project_config.get("RCC", {}).get("params", {})
+    mcu_family = rcc_params.get("mcu_family", project_config.get("mcu_family", "STM32F4"))
+    target_device = rcc_params.get("target_device", project_config.get("target_device", "STM32F407VG"))
+    if mcu_family != "STM32F4":
+        print(f"Warning: Low-power clock planning is only available for STM32F4, not {mcu_family}.")
+        return None
+    if not rcc_params:
+        print("Warning: Low-power clock planning needs an RCC configuration to start from.")
+        return None
+    tolerances = dict(PLANNER_TOLERANCES, **(tolerances or {}))
+    defines = resolve_defines(mcu_family, target_device)
+    targets = clock_targets_from_project(project_config, mcu_family, target_device, 0, need_48mhz)
+    timers = _timer_requirements(project_config, defines, ClockTree(rcc_params).calculated())
+    adcs = _adc_instances(project_config)
+    min_i2c_pclk1_hz = defines.get("I2C_MIN_PCLK_MHZ", 2) * 1000000
+    get_lowest_power_vos_func = defines['get_lowest_power_vos']
+    get_vos_clock_limits_func = defines['get_vos_clock_limits']
+    ahb_divs = sorted(defines.get('AHB_PRESCALER_MAP', {1: 0}), reverse=True)  # Slowest HCLK first
+    apb_divs = sorted(defines.get('APB_PRESCALER_MAP', {1: 0}), reverse=True)  # Slowest PCLK first
+    bus_plan_memo = {}
+
+    def slowest_apb(hclk, bus, max_pclk):
+        for apb_div in apb_divs:
+            pclk = hclk / apb_div
+            if pclk > max_pclk: continue
+            memo_key = (bus, pclk, apb_div == 1)
+            if memo_key not in bus_plan_memo:
+                tim_kernel_hz = pclk if apb_div == 1 else pclk * 2
+                bus_plan_memo[memo_key] = _bus_plan(pclk, tim_kernel_hz, bus, targets, timers, adcs, tolerances,
+                                                    min_i2c_pclk1_hz)
+            if bus_plan_memo[memo_key] is not None:
+                return apb_div, bus_plan_memo[memo_key]
+        return None
+
+    for pll_on, sysclk, vco_out_hz, pll48_hz, rcc_updates in _sysclk_candidates(
+            rcc_params, mcu_family, target_device, defines, need_48mhz, tolerances["usb"]):
+        for ahb_div in ahb_divs:
+            hclk = sysclk / ahb_div
+            if hclk < min_hclk_hz: continue
+            vos_scale_id, _ = get_lowest_power_vos_func(hclk, target_device)
+            max_hclk, max_pclk1, max_pclk2 = get_vos_clock_limits_func(target_device, vos_scale_id)
+            if hclk > max_hclk: break  # Only gets faster from here
+            apb1 = slowest_apb(hclk, "APB1", max_pclk1)
+            apb2 = slowest_apb(hclk, "APB2", max_pclk2) if apb1 else None
+            if apb2 is None: continue
+            (apb1_div, (apb1_errors, apb1_prescalers)), (apb2_div, (apb2_errors, apb2_prescalers)) = apb1, apb2
+            params = dict(rcc_params, pll_enabled_for_sysclk=pll_on, pll_enabled=pll_on, ahb_div=ahb_div,
+                          apb1_div=apb1_div, apb2_div=apb2_div, vos_policy=VOS_POLICY_LOW_POWER, **rcc_updates)
+            calculated = ClockTree(params).calculated()
+            if calculated["errors"]: continue  # Anything the search doesn't model (e.g. HSE range) still counts
+            errors = dict(apb1_errors, **apb2_errors)
+            if need_48mhz:
+                errors["48MHz"] = abs(pll48_hz - PLL48_TARGET_HZ) / PLL48_TARGET_HZ
+            return {"params": params, "calculated": calculated,
+                    "prescalers": {kind: dict(apb1_prescalers[kind], **apb2_prescalers[kind]) for kind in apb1_prescalers},
+                    "frequencies": {"sysclk_freq_hz": sysclk, "hclk_freq_hz": hclk, "pclk1_freq_hz": hclk / apb1_div,
+                                    "pclk2_freq_hz": hclk / apb2_div, "vco_output_freq_hz": vco_out_hz,
+                                    "pll48_freq_hz": pll48_hz},
+                    "errors": errors}
+    return None
+
+
+def low_power_project_config(project_config, plan):
+    """Copy of project_config running on plan's RCC config, with the planned SPI/timer/ADC prescalers."""
+    low_power_config = copy.deepcopy(project_config)
+    low_power_config["RCC"] = {"params": dict(plan["params"]), "calculated": plan["calculated"]}
+    prescalers = plan["prescalers"]
+    for module_config in module_config_list(low_power_config.get("SPI")):
+        params = module_config.get("params", {})
+        if params.get("instance_name") in prescalers["spi"]:
+            params["baud_prescaler_str"] = str(prescalers["spi"][params["instance_name"]])
+    for module_config in module_config_list(low_power_config.get("TIMERS")):
+        params = module_config.get("params", {})
+        if params.get("instance_name") in prescalers["timer"]:
+            params["prescaler"] = prescalers["timer"][params["instance_name"]]
+    for module_config in module_config_list(low_power_config.get("ADC")):
+        params = module_config.get("params", {})
+        if params.get("adc_instance", params.get("instance_name")) in prescalers["adc"]:
+            params["common_prescaler"] = f"PCLK2 / {prescalers['adc'][params.get('adc_instance', params.get('instance_name'))]}"
+    return low_power_config
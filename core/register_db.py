@@ -0,0 +1,187 @@
+# --- NEW FILE core/register_db.py ---
+# Structured register/bit-field database: peripheral -> register -> field (position, width).
+#
+# The family defines files spell bit positions as loose globals (DMA_SxCR_CHSEL_Pos = 25,
+# DMA_SxCR_CHSEL_Msk = (0x7 << 25)). build_register_db() folds those into small __slots__
+# records, indexed by full field name ("DMA_SxCR_CHSEL") for O(1) access from generators and
+# by absolute register address when the source knows base addresses/offsets (SVD imports do,
+# the hand-maintained defines files don't).
+
+POS_SUFFIX = "_Pos"
+MSK_SUFFIX = "_Msk"
+
+
+def is_bitfield_define(name):
+    return name.endswith(POS_SUFFIX) or name.endswith(MSK_SUFFIX)
+
+
+class BitField:
+    __slots__ = ("peripheral", "register", "name", "pos", "width")
+
+    def __init__(self, peripheral, register, name, pos, width=0):
+        self.peripheral = peripheral
+        self.register = register
+        self.name = name
+        self.pos = pos
+        self.width = width  # 0 = unknown (only the position was defined)
+
+    @property
+    def full_name(self):
+        return f"{self.peripheral}_{self.register}_{self.name}"
+
+    @property
+    def mask(self):
+        """((1 << width) - 1) << pos, or None if the width is unknown."""
+        if not self.width:
+            return None
+        return ((1 << self.width) - 1) << self.pos
+
+    def __repr__(self):
+        return f"BitField({self.full_name}, pos={self.pos}, width={self.width})"
+
+
+class Register:
+    __slots__ = ("peripheral", "name", "offset", "fields")
+
+    def __init__(self, peripheral, name, offset=None):
+        self.peripheral = peripheral
+        self.name = name
+        self.offset = offset  # Byte offset from the peripheral base, None if unknown
+        self.fields = {}  # field name -> BitField
+
+    def __repr__(self):
+        return f"Register({self.peripheral}_{self.name}, offset={self.offset}, {len(self.fields)} fields)"
+
+
+class Peripheral:
+    __slots__ = ("name", "base_address", "registers")
+
+    def __init__(self, name, base_address=None):
+        self.name = name
+        self.base_address = base_address  # None if unknown
+        self.registers = {}  # register name -> Register
+
+    def __repr__(self):
+        return f"Peripheral({self.name}, base={self.base_address}, {len(self.registers)} registers)"
+
+
+class RegisterDatabase:
+    """Register/bit-field lookup for one family (or one device, once SVDs are imported)."""
+    __slots__ = ("peripherals", "_fields", "_registers_by_address")
+
+    def __init__(self):
+        self.peripherals = {}  # peripheral name -> Peripheral
+        self._fields = {}  # "PERIPH_REG_FIELD" -> BitField
+        self._registers_by_address = {}  # absolute address -> Register
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __contains__(self, full_name):
+        return full_name in self._fields
+
+    def __iter__(self):
+        return iter(self._fields.values())
+
+    def add_peripheral(self, name, base_address=None):
+        peripheral = self.peripherals.get(name)
+        if peripheral is None:
+            peripheral = self.peripherals[name] = Peripheral(name, base_address)
+        elif base_address is not None:
+            peripheral.base_address = base_address
+        return peripheral
+
+    def add_register(self, peripheral_name, register_name, offset=None):
+        peripheral = self.add_peripheral(peripheral_name)
+        register = peripheral.registers.get(register_name)
+        if register is None:
+            register = peripheral.registers[register_name] = Register(peripheral_name, register_name, offset)
+        elif offset is not None:
+            register.offset = offset
+        if peripheral.base_address is not None and register.offset is not None:
+            self._registers_by_address[peripheral.base_address + register.offset] = register
+        return register
+
+    def add_field(self, peripheral_name, register_name, field_name, pos, width=0):
+        register = self.add_register(peripheral_name, register_name)
+        field = BitField(peripheral_name, register_name, field_name, pos, width)
+        register.fields[field_name] = field
+        self._fields[field.full_name] = field
+        return field
+
+    def add_fields(self, register, field_specs):
+        """Bulk add of (field name, pos, width) tuples to an existing Register."""
+        prefix = f"{register.peripheral}_{register.name}_"
+        for field_name, pos, width in field_specs:
+            field = register.fields[field_name] = BitField(register.peripheral, register.name, field_name, pos, width)
+            self._fields[prefix + field_name] = field
+
+    def field(self, full_name):
+        """BitField for e.g. "DMA_SxCR_CHSEL", or None."""
+        return self._fields.get(full_name)
+
+    def pos(self, full_name, default=None):
+        field = self._fields.get(full_name)
+        return field.pos if field is not None else default
+
+    def mask(self, full_name, default=None):
+        field = self._fields.get(full_name)
+        if field is None or not field.width:
+            return default
+        return field.mask
+
+    def register(self, peripheral_name, register_name):
+        peripheral = self.peripherals.get(peripheral_name)
+        return peripheral.registers.get(register_name) if peripheral is not None else None
+
+    def register_at(self, address):
+        """Register at an absolute address, or None (also None if addresses are unknown)."""
+        return self._registers_by_address.get(address)
+
+
+EMPTY_REGISTER_DB = RegisterDatabase()
+
+
+def merge_register_dbs(*dbs):
+    """New database with the contents of dbs in order; later databases win per field/address."""
+    merged = RegisterDatabase()
+    for db in dbs:
+        for peripheral in db.peripherals.values():
+            merged.add_peripheral(peripheral.name, peripheral.base_address)
+            for register in peripheral.registers.values():
+                merged.add_fields(merged.add_register(peripheral.name, register.name, register.offset),
+                                  [(f.name, f.pos, f.width) for f in register.fields.values()])
+    return merged
+
+
+def _split_define_name(name):
+    """ "DMA_SxCR_CHSEL" -> ("DMA", "SxCR", "CHSEL"); "USART_BRR_DIV_Mantissa" -> ("USART", "BRR", "DIV_Mantissa")."""
+    parts = name.split("_", 2)
+    if len(parts) < 3:
+        return None
+    return parts[0], parts[1], parts[2]
+
+
+def build_register_db(bitfield_defines, other_defines=None):
+    """Builds a RegisterDatabase from {"X_Pos": pos, "X_Msk": mask} style defines.
+
+    The width comes from X_Msk if defined, else from a single-bit X = (1 << pos) in other_defines,
+    otherwise it is left unknown (0).
+    """
+    other_defines = other_defines or {}
+    db = RegisterDatabase()
+    for key, pos in bitfield_defines.items():
+        if not key.endswith(POS_SUFFIX) or not isinstance(pos, int):
+            continue
+        full_name = key[:-len(POS_SUFFIX)]
+        split_name = _split_define_name(full_name)
+        if split_name is None:
+            continue
+        width = 0
+        msk = bitfield_defines.get(full_name + MSK_SUFFIX)
+        if isinstance(msk, int) and msk:
+            width = (msk >> pos).bit_length()
+        elif other_defines.get(full_name) == (1 << pos):
+            width = 1
+        db.add_field(*split_name, pos, width)
+    return db
@@ -0,0 +1,121 @@
+# --- NEW FILE core/solution_cache.py ---
+# Process-wide LRU memo for clock solver results (PLL / clock-tree solutions).
+#
+# Keys are plain tuples (solver name, family, device, input clock, target, constraints...), so
+# every RCC widget instance, the engine and batch workers share one SOLUTION_CACHE. The cache
+# can optionally be persisted: set STM32_CODEGEN_SOLUTION_CACHE=<file> (or pass --solution-cache
+# in batch mode) and solutions are loaded lazily on first use and written back by save().
+# save() merges with what is already on disk, so parallel batch workers don't lose entries.
+
+import os
+import pickle
+from collections import OrderedDict
+
+SOLUTION_CACHE_ENV_VAR = "STM32_CODEGEN_SOLUTION_CACHE"
+SOLUTION_CACHE_FORMAT_VERSION = 1
+DEFAULT_MAX_ENTRIES = 1024
+
+_MISSING = object()
+
+
+class SolutionCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, path=None):
+        self.max_entries = max_entries
+        self.path = path  # None = memory only
+        self._entries = OrderedDict()  # key -> solution, least recently used first
+        self._loaded = False
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        self._load_once()
+        return key in self._entries
+
+    def get(self, key, default=None):
+        self._load_once()
+        value = self._entries.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._load_once()
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._dirty = True
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute_func):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute_func()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self._dirty = False
+
+    def set_path(self, path):
+        """Switches (or disables, with None) persistence; entries from the new file are loaded on next use."""
+        self.path = path
+        self._loaded = False
+
+    def _read_file(self):
+        try:
+            with open(self.path, 'rb') as f:
+                version, entries = pickle.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError, TypeError) as e:
+            print(f"Warning: Ignoring unreadable solution cache {self.path}: {e}")
+            return []
+        return entries if version == SOLUTION_CACHE_FORMAT_VERSION else []
+
+    def _load_once(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path:
+            return
+        in_memory = list(self._entries.items())
+        self._entries = OrderedDict(self._read_file())
+        for key, value in in_memory:  # This session's entries are the most recent
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def save(self):
+        """Writes the cache to self.path (merged with the file's current contents). Returns True if written."""
+        if not self.path or not self._dirty:
+            return False
+        merged = OrderedDict(self._read_file())
+        for key, value in self._entries.items():
+            merged[key] = value
+            merged.move_to_end(key)
+        entries = list(merged.items())[-self.max_entries:]
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            cache_dir = os.path.dirname(self.path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump((SOLUTION_CACHE_FORMAT_VERSION, entries), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)  # Atomic, so concurrent writers never leave half a file
+        except OSError as e:
+            print(f"Warning: Could not write solution cache {self.path}: {e}")
+            return False
+        self._dirty = False
+        return True
+
+
+SOLUTION_CACHE = SolutionCache(path=os.environ.get(SOLUTION_CACHE_ENV_VAR) or None)
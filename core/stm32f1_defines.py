@@ -4,6 +4,11 @@
 HSI_VALUE_HZ = 8000000  # Internal 8 MHz RC oscillator
 HSE_DEFAULT_HZ = 8000000 # Default external crystal frequency (can be different, typically 4-16 MHz for F103, up to 25MHz for F100)
 
+# Start-up and wake-up timings (typical, STM32F103 datasheet; used for the STOP wake-up latency estimate)
+HSE_STARTUP_TIME_US = 2000  # tSU(HSE), 8 MHz crystal; depends on the crystal, override per project
+PLL_LOCK_TIME_US = 200  # tLOCK
+STOP_WAKEUP_TIME_US = {"main": 4, "low_power": 6}  # tWUSTOP by regulator mode in STOP, HSI start included
+
 # PLL Parameters for STM32F101xx, STM32F102xx, STM32F103xx (RM0008 - RCC_CFGR)
 # PLLSRC: HSE or HSI/2 (Bit 16 RCC_CFGR_PLLSRC)
 # PLLXTPRE: HSE or HSE/2 (for HSE as PLLSRC) (Bit 17 RCC_CFGR_PLLXTPRE)
@@ -15,6 +20,11 @@ PLLMUL_MAP_F1 = { # value: register_bits
 }
 PLLMUL_MIN = 2; PLLMUL_MAX = 16 # User-facing values
 PLLXTPRE_VALUES = [1, 2] # Divisor for HSE before PLL (1=not divided, 2=divided by 2)
+PLL_INPUT_MIN_HZ_F1 = 1000000; PLL_INPUT_MAX_HZ_F1 = 25000000 # After PLLXTPRE (DS5319 PLL characteristics)
+PLL_OUTPUT_MIN_HZ_F1 = 16000000
+# USBPRE (Bit 22 RCC_CFGR): 0 = PLL / 1.5, 1 = PLL / 1. USB needs exactly 48 MHz (+-0.25%) from an HSE-based PLL
+USB_PRESCALER_MAP_F1 = {"1.5": 0, "1": 1}
+USB_CLOCK_TOLERANCE_F1 = 0.0025
 
 # Max Clock Frequencies (STM32F103xx Performance Line, VDD=2.0-3.6V, RM0008 Table 10)
 SYSCLK_MAX_HZ_F103 = 72000000
@@ -66,6 +76,7 @@ TARGET_DEVICES_F1 = {
         "max_pclk2_hz": PCLK2_MAX_HZ_F103,
         "adc_clk_max_hz": ADC_CLK_MAX_HZ_F103,
         "flash_latency_config": FLASH_LATENCY_F103_MAP,
+        "has_usb": True,
         "usart_instances": ["USART1", "USART2", "USART3"],
         "timer_instances": ["TIM1", "TIM2", "TIM3", "TIM4"], # General purpose + Advanced
         "i2c_instances": ["I2C1", "I2C2"],
@@ -85,6 +96,7 @@ TARGET_DEVICES_F1 = {
         "max_pclk2_hz": PCLK2_MAX_HZ_F103,
         "adc_clk_max_hz": ADC_CLK_MAX_HZ_F103,
         "flash_latency_config": FLASH_LATENCY_F103_MAP,
+        "has_usb": True,
         "usart_instances": ["USART1", "USART2", "USART3"],
         "timer_instances": ["TIM1", "TIM2", "TIM3", "TIM4"],
         "i2c_instances": ["I2C1", "I2C2"],
@@ -104,6 +116,7 @@ TARGET_DEVICES_F1 = {
         "max_pclk2_hz": PCLK2_MAX_HZ_F100,
         "adc_clk_max_hz": ADC_CLK_MAX_HZ_F100,
         "flash_latency_config": FLASH_LATENCY_F100_MAP,
+        "has_usb": False,
         "usart_instances": ["USART1", "USART2", "USART3"], # Check RM0041
         "timer_instances": ["TIM2", "TIM3", "TIM4", "TIM6", "TIM7", "TIM15", "TIM16", "TIM17"], # TIM1 not on all F100
         "i2c_instances": ["I2C1", "I2C2"], # I2C2 on some
@@ -2,6 +2,11 @@
 HSI_VALUE_HZ = 16000000  # Internal 16 MHz RC oscillator
 HSE_DEFAULT_HZ = 8000000  # Default external crystal (can be 4-26 MHz for F2)
 
+# Start-up and wake-up timings (typical, STM32F20x datasheet; used for the STOP wake-up latency estimate)
+HSE_STARTUP_TIME_US = 2000  # tSU(HSE), 8 MHz crystal; depends on the crystal, override per project
+PLL_LOCK_TIME_US = 100  # tLOCK, VCO 192-432 MHz
+STOP_WAKEUP_TIME_US = {"main": 17, "low_power": 21}  # tWUSTOP by regulator mode in STOP, HSI start included
+
 # PLL Parameters for STM32F2xx (RM0033 - RCC_PLLCFGR)
 # VCO_IN = HSE_OR_HSI / PLLM  (must be 1-2 MHz, typically 1MHz or 2MHz)
 # VCO_OUT = VCO_IN * PLLN     (must be 192-432 MHz)
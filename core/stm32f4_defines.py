@@ -4,6 +4,12 @@
 HSI_VALUE_HZ = 16000000
 HSE_DEFAULT_HZ = 8000000
 
+# Start-up and wake-up timings (typical, STM32F4 datasheets; used for the STOP wake-up latency estimate)
+HSE_STARTUP_TIME_US = 2000  # tSU(HSE), 8 MHz crystal; depends on the crystal, override per project
+PLL_LOCK_TIME_US = 100  # tLOCK, VCO 192-432 MHz
+STOP_WAKEUP_TIME_US = {"main": 13, "low_power": 17}  # tWUSTOP by regulator mode in STOP (flash in stop), HSI start included
+OVERDRIVE_ENABLE_TIME_US = 100  # ODEN -> ODRDY -> ODSWEN -> ODSWRDY, re-done after every STOP
+
 # PLL Parameters
 PLLM_MIN = 2; PLLM_MAX = 63
 PLLN_MIN_GENERAL = 50; PLLN_MAX_GENERAL = 432
@@ -193,6 +199,33 @@ def get_required_vos(hclk_freq_hz, target_device_id, overdrive_enabled=False):
     best_scale = available_scales[0] if available_scales else "VOS_SCALE_1"
     return best_scale, VOS_SCALE_MAP_CMSIS.get(best_scale, 0b11)
 
+def get_vos_clock_limits(target_device_id, vos_scale_id="VOS_SCALE_1"):
+    """(max HCLK, max PCLK1, max PCLK2) in Hz at a VOS scale. "VOS_SCALE_1_OD" = scale 1 with over-drive."""
+    device_info = TARGET_DEVICES.get(target_device_id, {})
+    overdrive = vos_scale_id.endswith("_OD")
+    scale_id_str = vos_scale_id.replace("_OD", "")
+    max_hclk = device_info.get("vos_max_hclk", {}).get(scale_id_str, device_info.get("max_sysclk_vos1_no_od", 168000000))
+    if scale_id_str == "VOS_SCALE_1" and device_info.get("has_overdrive"):
+        max_hclk = device_info.get("max_sysclk_vos1_od" if overdrive else "max_sysclk_vos1_no_od", max_hclk)
+    map_key_prefix = "VOS" + scale_id_str[-1]  # PCLKx_MAX_HZ_MAP keys are "VOS1_old", "VOS2_od", "VOS3", ...
+    max_pclk1 = next((hz for key, hz in PCLK1_MAX_HZ_MAP.get(target_device_id, {}).items() if key.startswith(map_key_prefix)),
+                     device_info.get("max_pclk1_hz", 42000000))
+    max_pclk2 = next((hz for key, hz in PCLK2_MAX_HZ_MAP.get(target_device_id, {}).items() if key.startswith(map_key_prefix)),
+                     device_info.get("max_pclk2_hz", 84000000))
+    if device_info.get("has_overdrive") and not overdrive:  # The _od maps assume over-drive is on
+        max_pclk1 = min(max_pclk1, max_hclk // 4); max_pclk2 = min(max_pclk2, max_hclk // 2)
+    return max_hclk, max_pclk1, max_pclk2
+
+def get_lowest_power_vos(hclk_freq_hz, target_device_id):
+    """Least demanding VOS scale that still runs hclk_freq_hz, over-drive only if nothing else reaches it."""
+    device_info = TARGET_DEVICES.get(target_device_id)
+    if not device_info or "vos_max_hclk" not in device_info or "vos_scales_available" not in device_info:
+        return get_required_vos(hclk_freq_hz, target_device_id, False)
+    for scale_id_str in reversed(device_info["vos_scales_available"]):  # Listed most demanding (scale 1) first
+        if hclk_freq_hz <= get_vos_clock_limits(target_device_id, scale_id_str)[0]:
+            return scale_id_str, VOS_SCALE_MAP_CMSIS.get(scale_id_str, 0b11)
+    return get_required_vos(hclk_freq_hz, target_device_id, bool(device_info.get("has_overdrive")))
+
 ADC_CHANNELS_MAP = {
     "STM32F407VG": ([f"IN{i}" for i in range(16)] + ["TEMP", "VREFINT", "VBAT"]),
     "STM32F401xE": ([f"IN{i}" for i in range(10)] + ["TEMP", "VREFINT", "VBAT"]),
@@ -206,12 +239,6 @@ USART_PERIPHERALS_INFO = {"USART1":{"bus":"APB2","rcc_macro":"RCC_APB2ENR_USART1
 COMMON_BAUD_RATES = [9600,19200,38400,57600,115200,230400,460800,921600,1000000,1500000,2000000]
 USART_WORD_LENGTH_MAP={"8 bits":0b0,"9 bits":0b1}; USART_PARITY_MAP={"None":0b00,"Even":0b10,"Odd":0b11}; USART_STOP_BITS_MAP={"1":0b00,"0.5":0b01,"2":0b10,"1.5":0b11}; USART_HW_FLOW_CTRL_MAP={"None":0b00,"RTS":0b01,"CTS":0b10,"RTS/CTS":0b11}; USART_MODE_MAP={"RX Only":0b01,"TX Only":0b10,"TX/RX":0b11}; USART_OVERSAMPLING_MAP={"16":0,"8":1}
 USART_CR1_UE_Pos=13; USART_CR1_M_Pos=12; USART_CR1_PCE_Pos=10; USART_CR1_PS_Pos=9; USART_CR1_TE_Pos=3; USART_CR1_RE_Pos=2; USART_CR1_OVER8_Pos=15; USART_CR1_RXNEIE_Pos=5; USART_CR1_TXEIE_Pos=7; USART_CR1_TCIE_Pos=6; USART_CR1_PEIE_Pos=8; USART_CR2_STOP_Pos=12; USART_CR3_RTSE_Pos=8; USART_CR3_CTSE_Pos=9; USART_BRR_DIV_Mantissa_Pos=4; USART_BRR_DIV_Fraction_Pos=0; USART_SR_RXNE_Pos=5; USART_SR_TXE_Pos=7; USART_SR_TC_Pos=6; USART_SR_RXNE=(1<<USART_SR_RXNE_Pos); USART_SR_TXE=(1<<USART_SR_TXE_Pos); USART_SR_TC=(1<<USART_SR_TC_Pos)
-USART_PIN_CONFIG_SUGGESTIONS = {
-    "STM32F407VG":{"USART1":{"TX":"PA9/AF7 or PB6/AF7","RX":"PA10/AF7 or PB7/AF7"},"USART2":{"TX":"PA2/AF7 or PD5/AF7","RX":"PA3/AF7 or PD6/AF7"},"USART3":{"TX":"PB10/AF7 or PC10/AF7 or PD8/AF7","RX":"PB11/AF7 or PC11/AF7 or PD9/AF7"},"UART4":{"TX":"PA0/AF8 or PC10/AF8","RX":"PA1/AF8 or PC11/AF8"},"UART5":{"TX":"PC12/AF8","RX":"PD2/AF8"},"USART6":{"TX":"PC6/AF8 or PG14/AF8","RX":"PC7/AF8 or PG9/AF8"}},
-    "STM32F401xE":{"USART1":{"TX":"PA9/AF7 or PB6/AF7","RX":"PA10/AF7 or PB7/AF7"},"USART2":{"TX":"PA2/AF7","RX":"PA3/AF7"},"USART6":{"TX":"PA11/AF8","RX":"PA12/AF8"}},
-    "STM32F411xE":{"USART1":{"TX":"PA9/AF7 or PB6/AF7","RX":"PA10/AF7 or PB7/AF7"},"USART2":{"TX":"PA2/AF7 or PD5/AF7","RX":"PA3/AF7 or PD6/AF7"},"USART6":{"TX":"PA11/AF8 or PC6/AF8","RX":"PA12/AF8 or PC7/AF8"}},
-    "STM32F429ZI":{"USART1":{"TX":"PA9/AF7 or PB6/AF7","RX":"PA10/AF7 or PB7/AF7"},"USART2":{"TX":"PA2/AF7 or PD5/AF7","RX":"PA3/AF7 or PD6/AF7"},"USART3":{"TX":"PB10/AF7 or PC10/AF7 or PD8/AF7","RX":"PB11/AF7 or PC11/AF7 or PD9/AF7"},"UART4":{"TX":"PA0/AF8 or PC10/AF8 or PD1/AF8","RX":"PA1/AF8 or PC11/AF8 or PD0/AF8"},"UART5":{"TX":"PC12/AF8","RX":"PD2/AF8"},"USART6":{"TX":"PC6/AF8 or PG14/AF8","RX":"PC7/AF8 or PG9/AF8"}, "UART7":{"TX":"PE8/AF8 or PF7/AF8","RX":"PE7/AF8 or PF6/AF8"}, "UART8":{"TX":"PE1/AF8","RX":"PE0/AF8"}},
-    "STM32F446RE":{"USART1":{"TX":"PA9/AF7 or PB6/AF7","RX":"PA10/AF7 or PB7/AF7"},"USART2":{"TX":"PA2/AF7 or PD5/AF7","RX":"PA3/AF7 or PD6/AF7"},"USART3":{"TX":"PB10/AF7 or PC10/AF7 or PD8/AF7","RX":"PB11/AF7 or PC11/AF7 or PD9/AF7"},"UART4":{"TX":"PA0/AF8 or PD1/AF8","RX":"PA1/AF8 or PD0/AF8"},"UART5":{"TX":"PC12/AF8","RX":"PD2/AF8"},"USART6":{"TX":"PC6/AF8 or PG14/AF8","RX":"PC7/AF8 or PG9/AF8"}}}
 
 TIMER_PERIPHERALS_INFO = {"TIM1":{"type":"ADV","bus":"APB2","rcc_macro":"RCC_APB2ENR_TIM1EN","max_channels":4,"has_bdtr":True},"TIM2":{"type":"GP32","bus":"APB1","rcc_macro":"RCC_APB1ENR_TIM2EN","max_channels":4,"has_bdtr":False},"TIM3":{"type":"GP16","bus":"APB1","rcc_macro":"RCC_APB1ENR_TIM3EN","max_channels":4,"has_bdtr":False},"TIM4":{"type":"GP16","bus":"APB1","rcc_macro":"RCC_APB1ENR_TIM4EN","max_channels":4,"has_bdtr":False},"TIM5":{"type":"GP32","bus":"APB1","rcc_macro":"RCC_APB1ENR_TIM5EN","max_channels":4,"has_bdtr":False},"TIM6":{"type":"BASIC","bus":"APB1","rcc_macro":"RCC_APB1ENR_TIM6EN","max_channels":0,"has_bdtr":False},"TIM7":{"type":"BASIC","bus":"APB1","rcc_macro":"RCC_APB1ENR_TIM7EN","max_channels":0,"has_bdtr":False},"TIM8":{"type":"ADV","bus":"APB2","rcc_macro":"RCC_APB2ENR_TIM8EN","max_channels":4,"has_bdtr":True},"TIM9":{"type":"GP16","bus":"APB2","rcc_macro":"RCC_APB2ENR_TIM9EN","max_channels":2,"has_bdtr":False},"TIM10":{"type":"GP16","bus":"APB2","rcc_macro":"RCC_APB2ENR_TIM10EN","max_channels":1,"has_bdtr":False},"TIM11":{"type":"GP16","bus":"APB2","rcc_macro":"RCC_APB2ENR_TIM11EN","max_channels":1,"has_bdtr":False},"TIM12":{"type":"GP16","bus":"APB1","rcc_macro":"RCC_APB1ENR_TIM12EN","max_channels":2,"has_bdtr":False},"TIM13":{"type":"GP16","bus":"APB1","rcc_macro":"RCC_APB1ENR_TIM13EN","max_channels":1,"has_bdtr":False},"TIM14":{"type":"GP16","bus":"APB1","rcc_macro":"RCC_APB1ENR_TIM14EN","max_channels":1,"has_bdtr":False}}
 TIM_CR1_CEN=(1<<0); TIM_CR1_URS_Pos = 2; TIM_CR1_URS = (1 << TIM_CR1_URS_Pos); TIM_CR1_OPM_Pos = 3; TIM_CR1_OPM = (1 << TIM_CR1_OPM_Pos); TIM_CR1_DIR=(1<<4); TIM_CR1_CMS_Pos=5; TIM_CR1_ARPE=(1<<7); TIM_CR1_CKD_Pos=8
@@ -227,23 +254,86 @@ TIM_INTERNAL_CLOCK_SOURCE="Internal Clock (CK_INT)"; TIM_ETR_MODES={"ETR - Mode
 I2C_PERIPHERALS_INFO = {"I2C1":{"bus":"APB1","rcc_macro":"RCC_APB1ENR_I2C1EN"},"I2C2":{"bus":"APB1","rcc_macro":"RCC_APB1ENR_I2C2EN"},"I2C3":{"bus":"APB1","rcc_macro":"RCC_APB1ENR_I2C3EN"}, "FMPI2C1":{"bus":"APB1", "rcc_macro":"RCC_APB1ENR_FMPI2C1EN"}}
 I2C_CLOCK_SPEEDS_HZ={"100000 Hz (Standard Mode)":100000,"400000 Hz (Fast Mode)":400000, "1000000 Hz (Fast Mode Plus - FMPI2C)": 1000000};
 I2C_DUTY_CYCLE_MODES={"2 (t_low / t_high = 2)":0,"16/9 (t_low / t_high = 16/9)":1}; I2C_ADDRESSING_MODES={"7-bit":0,"10-bit":1}
-I2C_PIN_CONFIG_SUGGESTIONS = {
-    "STM32F407VG":{"I2C1":{"SCL":"PB6/AF4 or PB8/AF4","SDA":"PB7/AF4 or PB9/AF4"},"I2C2":{"SCL":"PB10/AF4 or PF1/AF4","SDA":"PB11/AF4 or PF0/AF4"},"I2C3":{"SCL":"PA8/AF4","SDA":"PC9/AF4"}},
-    "STM32F401xE":{"I2C1":{"SCL":"PB6/AF4 or PB8/AF4","SDA":"PB7/AF4 or PB9/AF4"},"I2C2":{"SCL":"PB10/AF4","SDA":"PB3/AF9 or PB9/AF9"},"I2C3":{"SCL":"PA8/AF4","SDA":"PB4/AF9 or PC9/AF4"}},
-    "STM32F411xE":{"I2C1":{"SCL":"PB6/AF4 or PB8/AF4","SDA":"PB7/AF4 or PB9/AF4"},"I2C2":{"SCL":"PB10/AF4 or PB3/AF9","SDA":"PB3/AF9 or PB9/AF9"},"I2C3":{"SCL":"PA8/AF4","SDA":"PB4/AF9 or PC9/AF4"}},
-    "STM32F429ZI":{"I2C1":{"SCL":"PB6/AF4 or PB8/AF4","SDA":"PB7/AF4 or PB9/AF4"},"I2C2":{"SCL":"PB10/AF4 or PF1/AF4 or PH4/AF4","SDA":"PB11/AF4 or PF0/AF4 or PH5/AF4"},"I2C3":{"SCL":"PA8/AF4 or PH7/AF4","SDA":"PC9/AF4 or PH8/AF4"}},
-    "STM32F446RE":{"I2C1":{"SCL":"PB6/AF4 or PB8/AF4","SDA":"PB7/AF4 or PB9/AF4"},"I2C2":{"SCL":"PB10/AF4 or PF1/AF4","SDA":"PB3/AF9 or PF0/AF4"},"I2C3":{"SCL":"PA8/AF4 or PC9/AF4","SDA":"PB4/AF9 or PC9/AF4"}, "FMPI2C1":{"SCL":"PC6/AF4 or PD12/AF4", "SDA":"PC7/AF4 or PD13/AF4"}}
-}
 I2C_CR1_PE_Pos=0; I2C_CR1_PE=(1<<I2C_CR1_PE_Pos); I2C_CR1_SWRST_Pos=15; I2C_CR1_SWRST=(1<<I2C_CR1_SWRST_Pos); I2C_CR1_START_Pos=8; I2C_CR1_START=(1<<I2C_CR1_START_Pos); I2C_CR1_STOP_Pos=9; I2C_CR1_STOP=(1<<I2C_CR1_STOP_Pos); I2C_CR1_ACK_Pos=10; I2C_CR1_ACK=(1<<I2C_CR1_ACK_Pos); I2C_CR2_FREQ_Pos=0; I2C_CR2_FREQ_Msk=(0x3F<<I2C_CR2_FREQ_Pos); I2C_CCR_CCR_Pos=0; I2C_CCR_CCR_Msk=(0xFFF<<I2C_CCR_CCR_Pos); I2C_CCR_FS_Pos=15; I2C_CCR_FS=(1<<I2C_CCR_FS_Pos); I2C_CCR_DUTY_Pos=14; I2C_CCR_DUTY=(1<<I2C_CCR_DUTY_Pos); I2C_SR1_SB_Pos=0; I2C_SR1_SB=(1<<I2C_SR1_SB_Pos); I2C_SR1_ADDR_Pos=1; I2C_SR1_ADDR=(1<<I2C_SR1_ADDR_Pos); I2C_SR1_BTF_Pos=2; I2C_SR1_BTF=(1<<I2C_SR1_BTF_Pos); I2C_SR1_RXNE_Pos=6; I2C_SR1_RXNE=(1<<I2C_SR1_RXNE_Pos); I2C_SR1_TXE_Pos=7; I2C_SR1_TXE=(1<<I2C_SR1_TXE_Pos)
 
 SPI_PERIPHERALS_INFO = {"SPI1":{"bus":"APB2","rcc_macro":"RCC_APB2ENR_SPI1EN"},"SPI2":{"bus":"APB1","rcc_macro":"RCC_APB1ENR_SPI2EN"},"SPI3":{"bus":"APB1","rcc_macro":"RCC_APB1ENR_SPI3EN"}, "SPI4":{"bus":"APB2","rcc_macro":"RCC_APB2ENR_SPI4EN"}, "SPI5":{"bus":"APB2","rcc_macro":"RCC_APB2ENR_SPI5EN"}, "SPI6":{"bus":"APB2","rcc_macro":"RCC_APB2ENR_SPI6EN"}}
 SPI_MODES={"Master":1,"Slave":0}; SPI_DIRECTIONS={"2 Lines Full Duplex":0,"1 Line Bidirectional (Output)":1,"1 Line Bidirectional (Input)":2,"1 Line Simplex RX":3}; SPI_DATA_SIZES={"8-bit":0,"16-bit":1}; SPI_CPOL={"Low":0,"High":1}; SPI_CPHA={"1 Edge":0,"2 Edge":1}; SPI_NSS_MODES={"Software (Master/Slave)":0,"Hardware NSS Output (Master)":1,"Hardware NSS Input (Slave)":2}; SPI_BAUD_PRESCALERS={"2":0b000,"4":0b001,"8":0b010,"16":0b011,"32":0b100,"64":0b101,"128":0b110,"256":0b111}; SPI_FIRST_BIT={"MSB First":0,"LSB First":1}
-SPI_PIN_CONFIG_SUGGESTIONS = {
-    "STM32F407VG":{"SPI1":{"SCK":"PA5/AF5 or PB3/AF5","MISO":"PA6/AF5 or PB4/AF5","MOSI":"PA7/AF5 or PB5/AF5","NSS":"PA4/AF5 or PA15/AF5"},"SPI2":{"SCK":"PB10/AF5 or PB13/AF5 or PI1/AF5","MISO":"PB14/AF5 or PC2/AF5 or PI2/AF5","MOSI":"PB15/AF5 or PC3/AF5 or PI3/AF5","NSS":"PB9/AF5 or PB12/AF5 or PI0/AF5"},"SPI3":{"SCK":"PB3/AF6 or PC10/AF6","MISO":"PB4/AF6 or PC11/AF6","MOSI":"PB5/AF6 or PC12/AF6","NSS":"PA4/AF6 or PA15/AF6"}},
-    "STM32F401xE":{"SPI1":{"SCK":"PA5/AF5 or PB3/AF5","MISO":"PA6/AF5 or PB4/AF5","MOSI":"PA7/AF5 or PB5/AF5","NSS":"PA4/AF5 or PA15/AF5"},"SPI2":{"SCK":"PB10/AF5 or PB13/AF5","MISO":"PB14/AF5 or PC2/AF5","MOSI":"PB15/AF5 or PC3/AF5","NSS":"PB9/AF5 or PB12/AF5"},"SPI3":{"SCK":"PB3/AF6 or PC10/AF6","MISO":"PB4/AF6 or PC11/AF6","MOSI":"PB5/AF6 or PC12/AF6","NSS":"PA4/AF6 or PA15/AF6"},"SPI4":{"SCK":"PE2/AF5 or PE12/AF5","MISO":"PE5/AF5 or PE13/AF5","MOSI":"PE6/AF5 or PE14/AF5","NSS":"PE4/AF5 or PE11/AF5"}},
-    "STM32F411xE":{"SPI1":{"SCK":"PA5/AF5 or PB3/AF5","MISO":"PA6/AF5 or PB4/AF5","MOSI":"PA7/AF5 or PB5/AF5","NSS":"PA4/AF5 or PA15/AF5"},"SPI2":{"SCK":"PB10/AF5 or PB13/AF5 or PC7/AF5(No Remap!)","MISO":"PB14/AF5 or PC2/AF5","MOSI":"PB15/AF5 or PC3/AF5","NSS":"PB9/AF5 or PB12/AF5"},"SPI3":{"SCK":"PB3/AF6 or PC10/AF6","MISO":"PB4/AF6 or PC11/AF6","MOSI":"PB5/AF6 or PC12/AF6","NSS":"PA4/AF6 or PA15/AF6"},"SPI4":{"SCK":"PE2/AF5 or PE12/AF5","MISO":"PE5/AF5 or PE13/AF5","MOSI":"PE6/AF5 or PE14/AF5","NSS":"PE4/AF5 or PE11/AF5"}, "SPI5":{"SCK":"PE2/AF5 or PE12/AF5(Shared with SPI4)","MISO":"PE5/AF5 or PE13/AF5","MOSI":"PE6/AF5 or PE14/AF5","NSS":"PE4/AF5 or PE11/AF5"}},
-    "STM32F429ZI":{"SPI1":{"SCK":"PA5/AF5 or PB3/AF5","MISO":"PA6/AF5 or PB4/AF5","MOSI":"PA7/AF5 or PB5/AF5 or PG11/AF5","NSS":"PA4/AF5 or PA15/AF5"},"SPI2":{"SCK":"PB10/AF5 or PB13/AF5 or PI1/AF5","MISO":"PB14/AF5 or PC2/AF5 or PI2/AF5","MOSI":"PB15/AF5 or PC3/AF5 or PI3/AF5","NSS":"PB9/AF5 or PB12/AF5 or PI0/AF5"},"SPI3":{"SCK":"PB3/AF6 or PC10/AF6","MISO":"PB4/AF6 or PC11/AF6","MOSI":"PB5/AF6 or PC12/AF6","NSS":"PA4/AF6 or PA15/AF6"},"SPI4":{"SCK":"PE2/AF5 or PE12/AF5","MISO":"PE5/AF5 or PE13/AF5","MOSI":"PE6/AF5 or PE14/AF5","NSS":"PE4/AF5 or PE11/AF5"},"SPI5":{"SCK":"PF7/AF5 or PH6/AF5","MISO":"PF8/AF5 or PH7/AF5","MOSI":"PF9/AF5 or PF11/AF5","NSS":"PF6/AF5 or PH5/AF5"},"SPI6":{"SCK":"PG13/AF5","MISO":"PG12/AF5","MOSI":"PG14/AF5","NSS":"PG8/AF5"}},
-    "STM32F446RE":{"SPI1":{"SCK":"PA5/AF5 or PB3/AF5","MISO":"PA6/AF5 or PB4/AF5","MOSI":"PA7/AF5 or PB5/AF5","NSS":"PA4/AF5 or PA15/AF5"},"SPI2":{"SCK":"PB10/AF5 or PC7/AF5","MISO":"PB14/AF5 or PC2/AF5","MOSI":"PB15/AF5 or PC3/AF5","NSS":"PB9/AF5 or PB12/AF5"},"SPI3":{"SCK":"PB3/AF6 or PC10/AF6","MISO":"PB4/AF6 or PC11/AF6","MOSI":"PB5/AF6 or PC12/AF6","NSS":"PA4/AF6 or PA15/AF6"},"SPI4":{"SCK":"PE2/AF5 or PE12/AF5","MISO":"PE5/AF5 or PE13/AF5","MOSI":"PE6/AF5 or PE14/AF5","NSS":"PE4/AF5 or PE11/AF5"}}
+
+PIN_ALTERNATE_FUNCTIONS = {  # device -> ((pin, peripheral signal, AF number), ...); a signal's first pin is its default
+    "STM32F407VG": (
+        ("PA9", "USART1_TX", 7), ("PB6", "USART1_TX", 7), ("PA10", "USART1_RX", 7), ("PB7", "USART1_RX", 7),
+        ("PA2", "USART2_TX", 7), ("PD5", "USART2_TX", 7), ("PA3", "USART2_RX", 7), ("PD6", "USART2_RX", 7),
+        ("PB10", "USART3_TX", 7), ("PC10", "USART3_TX", 7), ("PD8", "USART3_TX", 7), ("PB11", "USART3_RX", 7), ("PC11", "USART3_RX", 7), ("PD9", "USART3_RX", 7),
+        ("PA0", "UART4_TX", 8), ("PC10", "UART4_TX", 8), ("PA1", "UART4_RX", 8), ("PC11", "UART4_RX", 8),
+        ("PC12", "UART5_TX", 8), ("PD2", "UART5_RX", 8),
+        ("PC6", "USART6_TX", 8), ("PG14", "USART6_TX", 8), ("PC7", "USART6_RX", 8), ("PG9", "USART6_RX", 8),
+        ("PB6", "I2C1_SCL", 4), ("PB8", "I2C1_SCL", 4), ("PB7", "I2C1_SDA", 4), ("PB9", "I2C1_SDA", 4),
+        ("PB10", "I2C2_SCL", 4), ("PF1", "I2C2_SCL", 4), ("PB11", "I2C2_SDA", 4), ("PF0", "I2C2_SDA", 4),
+        ("PA8", "I2C3_SCL", 4), ("PC9", "I2C3_SDA", 4),
+        ("PA5", "SPI1_SCK", 5), ("PB3", "SPI1_SCK", 5), ("PA6", "SPI1_MISO", 5), ("PB4", "SPI1_MISO", 5), ("PA7", "SPI1_MOSI", 5), ("PB5", "SPI1_MOSI", 5), ("PA4", "SPI1_NSS", 5), ("PA15", "SPI1_NSS", 5),
+        ("PB10", "SPI2_SCK", 5), ("PB13", "SPI2_SCK", 5), ("PI1", "SPI2_SCK", 5), ("PB14", "SPI2_MISO", 5), ("PC2", "SPI2_MISO", 5), ("PI2", "SPI2_MISO", 5), ("PB15", "SPI2_MOSI", 5), ("PC3", "SPI2_MOSI", 5), ("PI3", "SPI2_MOSI", 5), ("PB9", "SPI2_NSS", 5), ("PB12", "SPI2_NSS", 5), ("PI0", "SPI2_NSS", 5),
+        ("PB3", "SPI3_SCK", 6), ("PC10", "SPI3_SCK", 6), ("PB4", "SPI3_MISO", 6), ("PC11", "SPI3_MISO", 6), ("PB5", "SPI3_MOSI", 6), ("PC12", "SPI3_MOSI", 6), ("PA4", "SPI3_NSS", 6), ("PA15", "SPI3_NSS", 6),
+    ),
+    "STM32F401xE": (
+        ("PA9", "USART1_TX", 7), ("PB6", "USART1_TX", 7), ("PA10", "USART1_RX", 7), ("PB7", "USART1_RX", 7),
+        ("PA2", "USART2_TX", 7), ("PA3", "USART2_RX", 7),
+        ("PA11", "USART6_TX", 8), ("PA12", "USART6_RX", 8),
+        ("PB6", "I2C1_SCL", 4), ("PB8", "I2C1_SCL", 4), ("PB7", "I2C1_SDA", 4), ("PB9", "I2C1_SDA", 4),
+        ("PB10", "I2C2_SCL", 4), ("PB3", "I2C2_SDA", 9), ("PB9", "I2C2_SDA", 9),
+        ("PA8", "I2C3_SCL", 4), ("PB4", "I2C3_SDA", 9), ("PC9", "I2C3_SDA", 4),
+        ("PA5", "SPI1_SCK", 5), ("PB3", "SPI1_SCK", 5), ("PA6", "SPI1_MISO", 5), ("PB4", "SPI1_MISO", 5), ("PA7", "SPI1_MOSI", 5), ("PB5", "SPI1_MOSI", 5), ("PA4", "SPI1_NSS", 5), ("PA15", "SPI1_NSS", 5),
+        ("PB10", "SPI2_SCK", 5), ("PB13", "SPI2_SCK", 5), ("PB14", "SPI2_MISO", 5), ("PC2", "SPI2_MISO", 5), ("PB15", "SPI2_MOSI", 5), ("PC3", "SPI2_MOSI", 5), ("PB9", "SPI2_NSS", 5), ("PB12", "SPI2_NSS", 5),
+        ("PB3", "SPI3_SCK", 6), ("PC10", "SPI3_SCK", 6), ("PB4", "SPI3_MISO", 6), ("PC11", "SPI3_MISO", 6), ("PB5", "SPI3_MOSI", 6), ("PC12", "SPI3_MOSI", 6), ("PA4", "SPI3_NSS", 6), ("PA15", "SPI3_NSS", 6),
+        ("PE2", "SPI4_SCK", 5), ("PE12", "SPI4_SCK", 5), ("PE5", "SPI4_MISO", 5), ("PE13", "SPI4_MISO", 5), ("PE6", "SPI4_MOSI", 5), ("PE14", "SPI4_MOSI", 5), ("PE4", "SPI4_NSS", 5), ("PE11", "SPI4_NSS", 5),
+    ),
+    "STM32F411xE": (
+        ("PA9", "USART1_TX", 7), ("PB6", "USART1_TX", 7), ("PA10", "USART1_RX", 7), ("PB7", "USART1_RX", 7),
+        ("PA2", "USART2_TX", 7), ("PD5", "USART2_TX", 7), ("PA3", "USART2_RX", 7), ("PD6", "USART2_RX", 7),
+        ("PA11", "USART6_TX", 8), ("PC6", "USART6_TX", 8), ("PA12", "USART6_RX", 8), ("PC7", "USART6_RX", 8),
+        ("PB6", "I2C1_SCL", 4), ("PB8", "I2C1_SCL", 4), ("PB7", "I2C1_SDA", 4), ("PB9", "I2C1_SDA", 4),
+        ("PB10", "I2C2_SCL", 4), ("PB3", "I2C2_SCL", 9), ("PB3", "I2C2_SDA", 9), ("PB9", "I2C2_SDA", 9),
+        ("PA8", "I2C3_SCL", 4), ("PB4", "I2C3_SDA", 9), ("PC9", "I2C3_SDA", 4),
+        ("PA5", "SPI1_SCK", 5), ("PB3", "SPI1_SCK", 5), ("PA6", "SPI1_MISO", 5), ("PB4", "SPI1_MISO", 5), ("PA7", "SPI1_MOSI", 5), ("PB5", "SPI1_MOSI", 5), ("PA4", "SPI1_NSS", 5), ("PA15", "SPI1_NSS", 5),
+        ("PB10", "SPI2_SCK", 5), ("PB13", "SPI2_SCK", 5), ("PC7", "SPI2_SCK", 5), ("PB14", "SPI2_MISO", 5), ("PC2", "SPI2_MISO", 5), ("PB15", "SPI2_MOSI", 5), ("PC3", "SPI2_MOSI", 5), ("PB9", "SPI2_NSS", 5), ("PB12", "SPI2_NSS", 5),
+        ("PB3", "SPI3_SCK", 6), ("PC10", "SPI3_SCK", 6), ("PB4", "SPI3_MISO", 6), ("PC11", "SPI3_MISO", 6), ("PB5", "SPI3_MOSI", 6), ("PC12", "SPI3_MOSI", 6), ("PA4", "SPI3_NSS", 6), ("PA15", "SPI3_NSS", 6),
+        ("PE2", "SPI4_SCK", 5), ("PE12", "SPI4_SCK", 5), ("PE5", "SPI4_MISO", 5), ("PE13", "SPI4_MISO", 5), ("PE6", "SPI4_MOSI", 5), ("PE14", "SPI4_MOSI", 5), ("PE4", "SPI4_NSS", 5), ("PE11", "SPI4_NSS", 5),
+        ("PE2", "SPI5_SCK", 5), ("PE12", "SPI5_SCK", 5), ("PE5", "SPI5_MISO", 5), ("PE13", "SPI5_MISO", 5), ("PE6", "SPI5_MOSI", 5), ("PE14", "SPI5_MOSI", 5), ("PE4", "SPI5_NSS", 5), ("PE11", "SPI5_NSS", 5),
+    ),
+    "STM32F429ZI": (
+        ("PA9", "USART1_TX", 7), ("PB6", "USART1_TX", 7), ("PA10", "USART1_RX", 7), ("PB7", "USART1_RX", 7),
+        ("PA2", "USART2_TX", 7), ("PD5", "USART2_TX", 7), ("PA3", "USART2_RX", 7), ("PD6", "USART2_RX", 7),
+        ("PB10", "USART3_TX", 7), ("PC10", "USART3_TX", 7), ("PD8", "USART3_TX", 7), ("PB11", "USART3_RX", 7), ("PC11", "USART3_RX", 7), ("PD9", "USART3_RX", 7),
+        ("PA0", "UART4_TX", 8), ("PC10", "UART4_TX", 8), ("PD1", "UART4_TX", 8), ("PA1", "UART4_RX", 8), ("PC11", "UART4_RX", 8), ("PD0", "UART4_RX", 8),
+        ("PC12", "UART5_TX", 8), ("PD2", "UART5_RX", 8),
+        ("PC6", "USART6_TX", 8), ("PG14", "USART6_TX", 8), ("PC7", "USART6_RX", 8), ("PG9", "USART6_RX", 8),
+        ("PE8", "UART7_TX", 8), ("PF7", "UART7_TX", 8), ("PE7", "UART7_RX", 8), ("PF6", "UART7_RX", 8),
+        ("PE1", "UART8_TX", 8), ("PE0", "UART8_RX", 8),
+        ("PB6", "I2C1_SCL", 4), ("PB8", "I2C1_SCL", 4), ("PB7", "I2C1_SDA", 4), ("PB9", "I2C1_SDA", 4),
+        ("PB10", "I2C2_SCL", 4), ("PF1", "I2C2_SCL", 4), ("PH4", "I2C2_SCL", 4), ("PB11", "I2C2_SDA", 4), ("PF0", "I2C2_SDA", 4), ("PH5", "I2C2_SDA", 4),
+        ("PA8", "I2C3_SCL", 4), ("PH7", "I2C3_SCL", 4), ("PC9", "I2C3_SDA", 4), ("PH8", "I2C3_SDA", 4),
+        ("PA5", "SPI1_SCK", 5), ("PB3", "SPI1_SCK", 5), ("PA6", "SPI1_MISO", 5), ("PB4", "SPI1_MISO", 5), ("PA7", "SPI1_MOSI", 5), ("PB5", "SPI1_MOSI", 5), ("PG11", "SPI1_MOSI", 5), ("PA4", "SPI1_NSS", 5), ("PA15", "SPI1_NSS", 5),
+        ("PB10", "SPI2_SCK", 5), ("PB13", "SPI2_SCK", 5), ("PI1", "SPI2_SCK", 5), ("PB14", "SPI2_MISO", 5), ("PC2", "SPI2_MISO", 5), ("PI2", "SPI2_MISO", 5), ("PB15", "SPI2_MOSI", 5), ("PC3", "SPI2_MOSI", 5), ("PI3", "SPI2_MOSI", 5), ("PB9", "SPI2_NSS", 5), ("PB12", "SPI2_NSS", 5), ("PI0", "SPI2_NSS", 5),
+        ("PB3", "SPI3_SCK", 6), ("PC10", "SPI3_SCK", 6), ("PB4", "SPI3_MISO", 6), ("PC11", "SPI3_MISO", 6), ("PB5", "SPI3_MOSI", 6), ("PC12", "SPI3_MOSI", 6), ("PA4", "SPI3_NSS", 6), ("PA15", "SPI3_NSS", 6),
+        ("PE2", "SPI4_SCK", 5), ("PE12", "SPI4_SCK", 5), ("PE5", "SPI4_MISO", 5), ("PE13", "SPI4_MISO", 5), ("PE6", "SPI4_MOSI", 5), ("PE14", "SPI4_MOSI", 5), ("PE4", "SPI4_NSS", 5), ("PE11", "SPI4_NSS", 5),
+        ("PF7", "SPI5_SCK", 5), ("PH6", "SPI5_SCK", 5), ("PF8", "SPI5_MISO", 5), ("PH7", "SPI5_MISO", 5), ("PF9", "SPI5_MOSI", 5), ("PF11", "SPI5_MOSI", 5), ("PF6", "SPI5_NSS", 5), ("PH5", "SPI5_NSS", 5),
+        ("PG13", "SPI6_SCK", 5), ("PG12", "SPI6_MISO", 5), ("PG14", "SPI6_MOSI", 5), ("PG8", "SPI6_NSS", 5),
+    ),
+    "STM32F446RE": (
+        ("PA9", "USART1_TX", 7), ("PB6", "USART1_TX", 7), ("PA10", "USART1_RX", 7), ("PB7", "USART1_RX", 7),
+        ("PA2", "USART2_TX", 7), ("PD5", "USART2_TX", 7), ("PA3", "USART2_RX", 7), ("PD6", "USART2_RX", 7),
+        ("PB10", "USART3_TX", 7), ("PC10", "USART3_TX", 7), ("PD8", "USART3_TX", 7), ("PB11", "USART3_RX", 7), ("PC11", "USART3_RX", 7), ("PD9", "USART3_RX", 7),
+        ("PA0", "UART4_TX", 8), ("PD1", "UART4_TX", 8), ("PA1", "UART4_RX", 8), ("PD0", "UART4_RX", 8),
+        ("PC12", "UART5_TX", 8), ("PD2", "UART5_RX", 8),
+        ("PC6", "USART6_TX", 8), ("PG14", "USART6_TX", 8), ("PC7", "USART6_RX", 8), ("PG9", "USART6_RX", 8),
+        ("PB6", "I2C1_SCL", 4), ("PB8", "I2C1_SCL", 4), ("PB7", "I2C1_SDA", 4), ("PB9", "I2C1_SDA", 4),
+        ("PB10", "I2C2_SCL", 4), ("PF1", "I2C2_SCL", 4), ("PB3", "I2C2_SDA", 9), ("PF0", "I2C2_SDA", 4),
+        ("PA8", "I2C3_SCL", 4), ("PC9", "I2C3_SCL", 4), ("PB4", "I2C3_SDA", 9), ("PC9", "I2C3_SDA", 4),
+        ("PC6", "FMPI2C1_SCL", 4), ("PD12", "FMPI2C1_SCL", 4), ("PC7", "FMPI2C1_SDA", 4), ("PD13", "FMPI2C1_SDA", 4),
+        ("PA5", "SPI1_SCK", 5), ("PB3", "SPI1_SCK", 5), ("PA6", "SPI1_MISO", 5), ("PB4", "SPI1_MISO", 5), ("PA7", "SPI1_MOSI", 5), ("PB5", "SPI1_MOSI", 5), ("PA4", "SPI1_NSS", 5), ("PA15", "SPI1_NSS", 5),
+        ("PB10", "SPI2_SCK", 5), ("PC7", "SPI2_SCK", 5), ("PB14", "SPI2_MISO", 5), ("PC2", "SPI2_MISO", 5), ("PB15", "SPI2_MOSI", 5), ("PC3", "SPI2_MOSI", 5), ("PB9", "SPI2_NSS", 5), ("PB12", "SPI2_NSS", 5),
+        ("PB3", "SPI3_SCK", 6), ("PC10", "SPI3_SCK", 6), ("PB4", "SPI3_MISO", 6), ("PC11", "SPI3_MISO", 6), ("PB5", "SPI3_MOSI", 6), ("PC12", "SPI3_MOSI", 6), ("PA4", "SPI3_NSS", 6), ("PA15", "SPI3_NSS", 6),
+        ("PE2", "SPI4_SCK", 5), ("PE12", "SPI4_SCK", 5), ("PE5", "SPI4_MISO", 5), ("PE13", "SPI4_MISO", 5), ("PE6", "SPI4_MOSI", 5), ("PE14", "SPI4_MOSI", 5), ("PE4", "SPI4_NSS", 5), ("PE11", "SPI4_NSS", 5),
+    ),
 }
 SPI_CR1_CPHA_Pos=0; SPI_CR1_CPOL_Pos=1; SPI_CR1_MSTR_Pos=2; SPI_CR1_BR_Pos=3; SPI_CR1_SPE_Pos=6; SPI_CR1_LSBFIRST_Pos=7; SPI_CR1_SSI_Pos=8; SPI_CR1_SSM_Pos=9; SPI_CR1_RXONLY_Pos=10; SPI_CR1_DFF_Pos=11; SPI_CR1_BIDIOE_Pos=14; SPI_CR1_BIDIMODE_Pos=15
 SPI_CR2_SSOE_Pos=2; SPI_CR2_TXEIE_Pos=7; SPI_CR2_RXNEIE_Pos=6; SPI_CR2_ERRIE_Pos=5
@@ -0,0 +1,268 @@
+# --- NEW FILE core/svd_importer.py ---
+# CMSIS-SVD importer: builds a RegisterDatabase (core/register_db.py) for a device from the
+# vendor SVD file in a local directory.
+#
+# SVDs are read with ElementTree.iterparse and every <field>/<register>/<peripheral> element is
+# cleared once it has been converted, so multi-megabyte files are never held as one DOM. The
+# converted records are cached as a small pickle of plain tuples named <svd stem>-<sha1>.regdb,
+# keyed by the SVD content hash; after the first import a device loads from that file.
+#
+#   python -m core.svd_importer <svd_dir> [--cache-dir <dir>]    (imports/refreshes every *.svd)
+
+import glob
+import hashlib
+import os
+import pickle
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+from core.register_db import RegisterDatabase
+
+DEFAULT_SVD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "svd")
+CACHE_FILE_EXT = ".regdb"
+CACHE_FORMAT_VERSION = 1
+
+# (svd path, sha1) -> RegisterDatabase, so repeated loads in one process don't even touch the cache file
+_LOADED_SVD_DBS = {}
+
+
+def _svd_int(text, default=None):
+    """SVD scaledNonNegativeInteger: 0x1F, 0X1F, #0101 (binary) or decimal."""
+    if text is None:
+        return default
+    text = text.strip().lower()
+    try:
+        if text.startswith("0x"):
+            return int(text, 16)
+        if text.startswith("#"):
+            return int(text[1:].replace("x", "0"), 2)
+        return int(text, 0) if text.startswith("0b") else int(text)
+    except ValueError:
+        return default
+
+
+def _field_pos_width(field_values):
+    """(pos, width) from bitOffset/bitWidth, lsb/msb or bitRange [msb:lsb]."""
+    if "bitOffset" in field_values:
+        return _svd_int(field_values["bitOffset"], 0), _svd_int(field_values.get("bitWidth"), 1)
+    if "lsb" in field_values and "msb" in field_values:
+        lsb, msb = _svd_int(field_values["lsb"], 0), _svd_int(field_values["msb"], 0)
+        return lsb, msb - lsb + 1
+    bit_range = field_values.get("bitRange", "").strip("[] ")
+    if ":" in bit_range:
+        msb_text, lsb_text = bit_range.split(":", 1)
+        lsb, msb = _svd_int(lsb_text, 0), _svd_int(msb_text, 0)
+        return lsb, msb - lsb + 1
+    return None, None
+
+
+def _dim_names(name, values):
+    """Expands SVD dim arrays: name "CCR%s" with dim 4 -> [("CCR1", 0), ...] as (name, byte offset)."""
+    dim = _svd_int(values.get("dim"))
+    if not dim or "%s" not in name:
+        return [(name.replace("[%s]", "").replace("%s", ""), 0)]
+    increment = _svd_int(values.get("dimIncrement"), 0)
+    dim_index = values.get("dimIndex")
+    if dim_index and "-" in dim_index and "," not in dim_index:
+        first, last = dim_index.split("-", 1)
+        if first.strip().isdigit():
+            indices = [str(i) for i in range(int(first), int(last) + 1)]
+        else:
+            indices = [chr(c) for c in range(ord(first.strip()), ord(last.strip()) + 1)]
+    elif dim_index:
+        indices = [s.strip() for s in dim_index.split(",")]
+    else:
+        indices = [str(i) for i in range(dim)]
+    name = name.replace("[%s]", "%s")
+    return [(name.replace("%s", index), i * increment) for i, index in enumerate(indices[:dim])]
+
+
+def parse_svd(svd_path):
+    """Streams an SVD file into plain records:
+    (device_name, [(peripheral, group_name, base_address, derived_from, [(register, offset, [(field, pos, width)])])])
+    Registers of derivedFrom peripherals are filled in from their base peripheral.
+    """
+    device_name = None
+    peripherals = []
+    stack = []  # Open element tags
+    values = [{}]  # Simple child values (name, baseAddress, ...) per open element
+    registers = None
+    fields = None
+    cluster_offsets = []
+
+    for event, elem in ET.iterparse(svd_path, events=("start", "end")):
+        tag = elem.tag.rsplit("}", 1)[-1]  # Drop any XML namespace
+        if event == "start":
+            stack.append(tag)
+            values.append({})
+            if tag == "peripheral":
+                registers = []
+            elif tag == "register":
+                fields = []
+            elif tag == "cluster":
+                cluster_offsets.append(0)
+            continue
+
+        stack.pop()
+        own_values = values.pop()
+        parent = stack[-1] if stack else None
+        if tag == "field" and fields is not None:
+            pos, width = _field_pos_width(own_values)
+            if own_values.get("name") and pos is not None:
+                for field_name, _ in _dim_names(own_values["name"], own_values):
+                    fields.append((field_name, pos, width))
+        elif tag == "register" and registers is not None:
+            offset = _svd_int(own_values.get("addressOffset"), 0) + sum(cluster_offsets)
+            for register_name, dim_offset in _dim_names(own_values.get("name", ""), own_values):
+                registers.append((register_name, offset + dim_offset, tuple(fields)))
+            fields = None
+        elif tag == "cluster" and cluster_offsets:
+            cluster_offsets.pop()
+        elif tag == "peripheral":
+            peripherals.append((own_values.get("name", ""), own_values.get("groupName"),
+                                _svd_int(own_values.get("baseAddress")), elem.get("derivedFrom"),
+                                tuple(registers or ())))
+            registers = None
+        elif len(elem) == 0 and elem.text is not None:
+            # Leaf value (name, baseAddress, bitOffset, ...): store it on the element it describes
+            values[-1][tag] = elem.text.strip()
+            if tag == "addressOffset" and parent == "cluster" and cluster_offsets:
+                cluster_offsets[-1] = _svd_int(elem.text, 0)
+            elif tag == "name" and parent == "device":
+                device_name = elem.text.strip()
+        if tag in ("field", "register", "cluster", "peripheral"):
+            elem.clear()
+
+    by_name = {p[0]: p for p in peripherals}
+    resolved = []
+    for name, group_name, base_address, derived_from, peripheral_registers in peripherals:
+        base_peripheral = by_name.get(derived_from) if derived_from else None
+        if base_peripheral is not None:
+            group_name = group_name or base_peripheral[1]
+            peripheral_registers = peripheral_registers or base_peripheral[4]
+        resolved.append((name, group_name, base_address, derived_from, peripheral_registers))
+    return device_name, resolved
+
+
+def build_register_db_from_records(peripheral_records):
+    """Fields are indexed per instance (USART1_CR1_UE, with addresses) and, like the CMSIS
+    headers, per group (USART_CR1_UE, first instance of the group wins)."""
+    db = RegisterDatabase()
+    for name, group_name, base_address, _, registers in peripheral_records:
+        db.add_peripheral(name, base_address)
+        group_is_new = bool(group_name) and group_name != name and group_name not in db.peripherals
+        for register_name, offset, fields in registers:
+            db.add_fields(db.add_register(name, register_name, offset), fields)
+            if group_is_new:
+                db.add_fields(db.add_register(group_name, register_name), fields)
+    return db
+
+
+def _file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_path(svd_path, svd_sha1, cache_dir):
+    stem = os.path.splitext(os.path.basename(svd_path))[0]
+    return os.path.join(cache_dir, f"{stem}-{svd_sha1[:16]}{CACHE_FILE_EXT}")
+
+
+def _read_cache(cache_path, svd_sha1):
+    try:
+        with open(cache_path, 'rb') as f:
+            version, cached_sha1, device_name, records = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError):
+        return None
+    if version != CACHE_FORMAT_VERSION or cached_sha1 != svd_sha1:
+        return None
+    return device_name, records
+
+
+def _write_cache(cache_path, svd_sha1, device_name, records):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((CACHE_FORMAT_VERSION, svd_sha1, device_name, records), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)  # Atomic, so concurrent batch workers never see half a file
+    except OSError as e:
+        print(f"Warning: Could not write SVD cache {cache_path}: {e}")
+
+
+def import_svd(svd_path, cache_dir=None):
+    """Returns the RegisterDatabase for one SVD file, parsing it only if no valid cache entry exists."""
+    svd_sha1 = _file_sha1(svd_path)
+    db = _LOADED_SVD_DBS.get((svd_path, svd_sha1))
+    if db is not None:
+        return db
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(svd_path)), ".cache")
+    cache_path = _cache_path(svd_path, svd_sha1, cache_dir)
+    cached = _read_cache(cache_path, svd_sha1)
+    if cached is None:
+        device_name, records = parse_svd(svd_path)
+        _write_cache(cache_path, svd_sha1, device_name, records)
+    else:
+        device_name, records = cached
+    return _LOADED_SVD_DBS.setdefault((svd_path, svd_sha1), build_register_db_from_records(records))
+
+
+def find_svd_file(target_device, svd_dir=DEFAULT_SVD_DIR):
+    """SVD for a device: exact name match, else the longest file stem that prefixes the device
+    name (vendor SVDs are per device line, e.g. STM32F407.svd for STM32F407VG). None if missing."""
+    target_upper = target_device.upper()
+    best_path, best_len = None, 0
+    for svd_path in glob.glob(os.path.join(svd_dir, "*.svd")):
+        stem = os.path.splitext(os.path.basename(svd_path))[0].upper()
+        if stem == target_upper:
+            return svd_path
+        if target_upper.startswith(stem.rstrip("X")) and len(stem) > best_len:
+            best_path, best_len = svd_path, len(stem)
+    return best_path
+
+
+def load_device_register_db(target_device, svd_dir=DEFAULT_SVD_DIR, cache_dir=None):
+    """RegisterDatabase for a device from svd_dir, or None if there is no SVD for it."""
+    svd_path = find_svd_file(target_device, svd_dir) if os.path.isdir(svd_dir) else None
+    if svd_path is None:
+        return None
+    try:
+        return import_svd(svd_path, cache_dir)
+    except ET.ParseError as e:
+        print(f"Error: Could not parse {svd_path}: {e}")
+        return None
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m core.svd_importer",
+                                     description="Import CMSIS-SVD files into the register database cache.")
+    parser.add_argument("svd_dir", nargs="?", default=DEFAULT_SVD_DIR, help="Directory containing *.svd files")
+    parser.add_argument("--cache-dir", default=None, help="Cache directory (default: <svd_dir>/.cache)")
+    args = parser.parse_args(argv)
+
+    svd_paths = sorted(glob.glob(os.path.join(args.svd_dir, "*.svd")))
+    if not svd_paths:
+        print(f"No *.svd files found in {args.svd_dir}")
+        return 1
+    failed = 0
+    for svd_path in svd_paths:
+        start_time = time.perf_counter()
+        try:
+            db = import_svd(svd_path, args.cache_dir)
+        except ET.ParseError as e:
+            failed += 1
+            print(f"  {os.path.basename(svd_path):<32} FAILED  {e}")
+            continue
+        print(f"  {os.path.basename(svd_path):<32} {len(db.peripherals):4d} peripherals {len(db):6d} fields  "
+              f"{(time.perf_counter() - start_time) * 1000:8.2f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
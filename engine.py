@@ -0,0 +1,520 @@
+# --- NEW FILE engine.py ---
+# Headless code generation engine.
+#
+# Everything needed to turn a project configuration (the dict returned by
+# ConfigurationPane.get_all_configurations(), or the same structure loaded from disk)
+# into the final C source lives here. This module must stay importable WITHOUT PyQt5:
+# only core/ and generators/ may be imported at module level. Import-time budget is
+# ~50 ms on a typical build server (check with `python -X importtime -c "import engine"`).
+
+import hashlib
+import json
+import time
+
+from core.define_resolver import resolve_defines
+
+from generators.rcc_generator import generate_rcc_code_cmsis
+from generators.gpio_generator import generate_gpio_code
+from generators.adc_generator import generate_adc_code_cmsis
+from generators.dac_generator import generate_dac_code_cmsis
+from generators.uart_generator import generate_uart_code_cmsis
+from generators.timer_generator import generate_timer_code_cmsis
+from generators.i2c_generator import generate_i2c_code_cmsis
+from generators.spi_generator import generate_spi_code_cmsis
+from generators.dma_generator import generate_dma_code_cmsis
+from generators.delay_generator import generate_delay_code_cmsis
+from generators.boot_profile_generator import boot_profile_stages, generate_boot_profile_code
+from generators.clock_profile_generator import generate_clock_profile_code_cmsis, CLOCK_PROFILE_MODULES
+from generators.stop_mode_generator import generate_stop_mode_code_cmsis
+from generators.clock_config_generator import generate_clock_config_header
+from generators.init_cost_estimator import estimate_project_init_cost
+from generators.register_ir import REG_INIT_INTERPRETER_C, REG_INIT_INTERPRETER_BYTES, estimate_init_cost
+
+IMPORT_TIME_BUDGET_MS = 50
+
+LOGICAL_MODULE_ORDER = [
+    "MCU", "RCC", "GPIO", "DMA", "ADC", "DAC", "TIMERS",
+    "I2C", "SPI", "USART", "Delay"
+]
+
+# module name -> (generator function, needs rcc_calculated_data)
+MODULE_GENERATORS = {
+    "GPIO": (generate_gpio_code, False),
+    "ADC": (generate_adc_code_cmsis, False),
+    "DAC": (generate_dac_code_cmsis, False),
+    "TIMERS": (generate_timer_code_cmsis, True),
+    "I2C": (generate_i2c_code_cmsis, True),
+    "SPI": (generate_spi_code_cmsis, True),
+    "USART": (generate_uart_code_cmsis, True),
+    "DMA": (generate_dma_code_cmsis, False),
+    "Delay": (generate_delay_code_cmsis, True),
+}
+
+# Modules whose registers don't depend on the clock tree; with the RCC param "overlapped_boot" their
+# inits run between RCC_Boot_Start() and RCC_Boot_Finish(), during the HSE start-up and PLL lock.
+CLOCK_INDEPENDENT_MODULES = tuple(m for m, (_, needs_rcc) in MODULE_GENERATORS.items() if not needs_rcc)
+# ...except where the hardware needs the final clocks even though the generated code doesn't read them.
+# ADC: on F1, ADCCLK comes from the RCC->CFGR ADCPRE bits that RCC_Boot_Finish() writes, and the init runs the
+# blocking self-calibration (CR2 CAL) at that clock; on F2/F4 the init ends with ADON + SWSTART, i.e. a running
+# conversion, which must not see RCC_Boot_Finish() change PPRE2 and SYSCLK under it. So ADC stays after the switch.
+CLOCK_SWITCH_DEPENDENT_MODULES = {"STM32F1": ("ADC",), "STM32F2": ("ADC",), "STM32F4": ("ADC",)}
+
+
+def get_clock_independent_modules(mcu_family):
+    """CLOCK_INDEPENDENT_MODULES that can run before RCC_Boot_Finish() on this family."""
+    return tuple(m for m in CLOCK_INDEPENDENT_MODULES if m not in CLOCK_SWITCH_DEPENDENT_MODULES.get(mcu_family, ()))
+
+# Modules whose init functions are built from the register IR; with the MCU param "init_style": "table"
+# they emit a const register table applied by reg_init_apply() instead of straight-line code.
+REGISTER_TABLE_MODULES = ("RCC", "GPIO", "TIMERS")
+
+# module name -> keys of RCC 'calculated' the generator reads. Only these go into the cache key,
+# so e.g. a flash latency change does not invalidate USART output.
+MODULE_RCC_DEPENDENCIES = {
+    "TIMERS": ("pclk1_freq_hz", "pclk2_freq_hz", "apb1_div", "apb2_div", "tim_apb1_kernel_freq_hz",
+               "tim_apb2_kernel_freq_hz"),
+    "I2C": ("pclk1_freq_hz",),
+    "SPI": ("pclk1_freq_hz", "pclk2_freq_hz"),
+    "USART": ("pclk1_freq_hz", "pclk2_freq_hz"),
+    "Delay": ("hclk_freq_hz", "sysclk_freq_hz", "pclk1_freq_hz", "pclk2_freq_hz", "apb1_div", "apb2_div",
+              "tim_apb1_kernel_freq_hz", "tim_apb2_kernel_freq_hz"),
+}
+
+
+def config_hash(*items):
+    """Stable hash of JSON-like data (dict key order does not matter)."""
+    normalized = json.dumps(items, sort_keys=True, default=repr, separators=(',', ':'))
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+class ModuleOutputCache:
+    """Keeps the last generator result per module, keyed by a hash of everything the generator reads.
+
+    The MCU family/device are part of every key since generators read their resolved defines.
+    Cached parts dicts are shared with the caller and must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._entries = {}  # module name -> (key, parts)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, module_name, key):
+        entry = self._entries.get(module_name)
+        if entry and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, module_name, key, parts):
+        self._entries[module_name] = (key, parts)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class GeneratedProject:
+    """Result of one engine.generate() call."""
+
+    def __init__(self, code="", target_device="", mcu_family="", parts=None, error_messages=None,
+                 rcc_calculated_data=None, init_calls=None, regenerated_modules=None, elapsed_s=0.0,
+                 clock_config_header="", init_style_costs=None, init_cost=None):
+        self.code = code
+        self.clock_config_header = clock_config_header  # clock_config.h, written next to the .c on request
+        self.target_device = target_device
+        self.mcu_family = mcu_family
+        self.parts = parts if parts is not None else {}  # module name -> generator result dict
+        self.error_messages = error_messages if error_messages is not None else []
+        self.rcc_calculated_data = rcc_calculated_data if rcc_calculated_data is not None else {}
+        self.init_calls = init_calls if init_calls is not None else []
+        self.regenerated_modules = regenerated_modules if regenerated_modules is not None else []  # cache misses
+        self.elapsed_s = elapsed_s
+        self.init_style_costs = init_style_costs if init_style_costs is not None else {}  # See init_style_costs()
+        self.init_cost = init_cost if init_cost is not None else {}  # See estimate_project_init_cost()
+
+    def to_dict(self):
+        return {"target_device": self.target_device, "mcu_family": self.mcu_family,
+                "error_messages": list(self.error_messages), "init_calls": list(self.init_calls),
+                "regenerated_modules": list(self.regenerated_modules), "elapsed_s": self.elapsed_s,
+                "code": self.code, "clock_config_header": self.clock_config_header,
+                "init_style_costs": self.init_style_costs, "init_cost": self.init_cost}
+
+
+def get_processing_order(available_modules=None):
+    """LOGICAL_MODULE_ORDER filtered to available_modules, unknown modules appended at the end."""
+    if available_modules is None:
+        return list(LOGICAL_MODULE_ORDER)
+    ordered_for_processing = [m for m in LOGICAL_MODULE_ORDER if m in available_modules]
+    for m in available_modules:
+        if m not in ordered_for_processing:
+            ordered_for_processing.append(m)
+    return ordered_for_processing
+
+
+def get_project_mcu(project_config):
+    """Returns (target_device, mcu_family) from a project configuration."""
+    mcu_cfg = project_config.get("MCU") or {}
+    target_device = project_config.get("target_device") or mcu_cfg.get("target_device") or "STM32F407VG"
+    mcu_family = project_config.get("mcu_family") or mcu_cfg.get("mcu_family") or "STM32F4"
+    return target_device, mcu_family
+
+
+def get_project_init_style(project_config):
+    """"code" (straight-line register writes, default) or "table" (MCU param "init_style")."""
+    return (project_config.get("MCU") or {}).get("init_style") or "code"
+
+
+def get_project_boot_profiling(project_config):
+    """True if main() should time every init call with the DWT cycle counter (MCU param "boot_profiling")."""
+    return bool((project_config.get("MCU") or {}).get("boot_profiling"))
+
+
+def init_style_costs(processing_order, generated_code_parts, init_style="code"):
+    """Estimated size/cycles of the register-IR init functions in both output styles.
+
+    Returns {"init_style": ..., "functions": [{"function", "code_bytes", "code_cycles", "table_bytes",
+    "table_cycles"}, ...], "totals": {...}}; table totals include the shared reg_init_apply() once.
+    """
+    functions = []
+    for module_name in processing_order:
+        for function_name, program in (generated_code_parts.get(module_name) or {}).get("register_programs", []):
+            cost = estimate_init_cost(program)
+            functions.append({"function": function_name, "code_bytes": cost["code"][0], "code_cycles": cost["code"][1],
+                              "table_bytes": cost["table"][0], "table_cycles": cost["table"][1]})
+    totals = {key: sum(f[key] for f in functions) for key in ("code_bytes", "code_cycles", "table_bytes", "table_cycles")}
+    if functions: totals["table_bytes"] += REG_INIT_INTERPRETER_BYTES
+    return {"init_style": init_style, "functions": functions, "totals": totals}
+
+
+def format_init_style_costs(costs):
+    """C comment block with the init_style_costs() table, or "" if no init function uses the register IR."""
+    if not costs["functions"]:
+        return ""
+    text = "/* Register init cost estimate, straight-line code vs. register table (Cortex-M3/M4 -Os,\n"
+    text += " * no flash wait states, polls counted once; the table total includes reg_init_apply()).\n"
+    text += " * Active style: " + costs["init_style"] + " (MCU \"init_style\")\n"
+    text += f" *   {'Function':<24} {'Code':>16} {'Table':>16}\n"
+    for row in costs["functions"] + [dict(costs["totals"], function="Total")]:
+        text += (f" *   {row['function']:<24} {row['code_bytes']:>6} B/{row['code_cycles']:>5} cyc"
+                 f" {row['table_bytes']:>6} B/{row['table_cycles']:>5} cyc\n")
+    return text + " */\n\n"
+
+
+def default_rcc_calculated_data(target_device, mcu_family, defines=None):
+    if defines is None: defines = resolve_defines(mcu_family, target_device)
+    hsi_val = defines.get('HSI_VALUE_HZ', 8000000)
+    return {
+        "pclk1_freq_hz": hsi_val, "pclk2_freq_hz": hsi_val,
+        "sysclk_freq_hz": hsi_val, "hclk_freq_hz": hsi_val,
+        "apb1_div": 1, "apb2_div": 1, "ahb_div": 1,
+        "target_device": target_device, "mcu_family": mcu_family,
+        "flash_latency_val": 0,  # Sensible default
+    }
+
+
+def is_module_enabled(module_name, module_config):
+    if not module_config:
+        return False
+    # GPIO always "enabled" conceptually for pins
+    return module_name == "GPIO" or module_config.get("params", {}).get("enabled", False)
+
+
+def generate_module_parts(module_name, module_config, rcc_calculated_data):
+    """Runs the generator for a single (non-RCC) module. Returns {} for unknown modules."""
+    generator_entry = MODULE_GENERATORS.get(module_name)
+    if not generator_entry:
+        return {}
+    generator_func, needs_rcc = generator_entry
+    if needs_rcc:
+        return generator_func(module_config, rcc_calculated_data)
+    return generator_func(module_config)
+
+
+def assemble_code(target_device, mcu_family, processing_order, generated_code_parts, all_includes,
+                  all_error_messages, rcc_calculated_data, init_style="code", boot_profiling=False, defines=None):
+    """Builds the final C source string from per-module generator results.
+
+    Returns (code, ordered_init_calls). defines is the resolved index of the family/device (looked up if None).
+    """
+    if defines is None: defines = resolve_defines(mcu_family, target_device)
+    all_default_helper_functions, all_gpio_af_configs, all_gpio_analog_configs = [], [], []
+    system_core_clock_update_needed = False
+    for module_name in processing_order:
+        parts = generated_code_parts.get(module_name)
+        if not parts:
+            continue
+        if parts.get("gpio_pins_to_configure_af"):
+            # Timer channels only report placeholder names (no pin yet); keep the (port, pin, af, name) entries
+            all_gpio_af_configs.extend(af for af in parts["gpio_pins_to_configure_af"] if isinstance(af, tuple))
+        if parts.get("gpio_pins_to_configure_analog"):
+            all_gpio_analog_configs.extend(parts["gpio_pins_to_configure_analog"])
+        if parts.get("default_helper_functions"):
+            helper = parts["default_helper_functions"]
+            if helper and helper.strip() and helper not in all_default_helper_functions:
+                all_default_helper_functions.append(helper)
+        if parts.get("system_core_clock_update_needed"):
+            system_core_clock_update_needed = True
+
+    temp_function_defs, temp_init_calls, temp_init_call_modules = [], [], []
+    for module_name_ordered in processing_order:
+        if module_name_ordered == "MCU": continue
+        if module_name_ordered in generated_code_parts and generated_code_parts[module_name_ordered]:
+            parts_to_assemble = generated_code_parts[module_name_ordered]
+            if parts_to_assemble.get("source_function"):
+                func_code = parts_to_assemble["source_function"].strip()
+                if func_code and not func_code.startswith(
+                        ("// No", f"// {module_name_ordered} not enabled")):  # Avoid empty/disabled stubs
+                    if func_code not in temp_function_defs: temp_function_defs.append(func_code)
+            if parts_to_assemble.get("init_call"):
+                init_c = parts_to_assemble["init_call"].strip()
+                if init_c and init_c not in temp_init_calls:
+                    temp_init_calls.append(init_c); temp_init_call_modules.append(module_name_ordered)
+
+    final_code_str = ""
+    unique_errors_list = sorted(list(set(all_error_messages)))
+    if unique_errors_list:
+        final_code_str += "/*\n * !!! ERRORS/WARNINGS GENERATED !!!\n"
+        for msg in unique_errors_list: final_code_str += f" * - {msg}\n"
+        final_code_str += " */\n\n"
+
+    define_mcu_name = "".join(c if c.isalnum() else '_' for c in target_device.upper())
+    final_code_str += f"#define {define_mcu_name} 1\n"
+    define_family_name = mcu_family.upper()
+    final_code_str += f"#define {define_family_name.replace('STM32', 'STM32_')}_SERIES 1 // e.g. STM32_F4_SERIES\n\n"
+
+    for inc in sorted(list(all_includes)): final_code_str += f"{inc}\n"
+    if all_includes: final_code_str += "\n"
+
+    costs = init_style_costs(processing_order, generated_code_parts, init_style)
+    final_code_str += format_init_style_costs(costs)
+    if init_style == "table" and costs["functions"]:
+        final_code_str += "// Register table interpreter (init_style \"table\")\n" + REG_INIT_INTERPRETER_C + "\n\n"
+    if temp_function_defs:
+        final_code_str += "// Peripheral Initialization Functions\n"
+        for func_def in temp_function_defs: final_code_str += func_def + "\n\n"
+    if all_default_helper_functions:
+        final_code_str += "// Default Helper Functions\n"
+        for helper in all_default_helper_functions: final_code_str += helper + "\n\n"
+
+    if all_gpio_af_configs:
+        unique_af = sorted(list(set(all_gpio_af_configs)),
+                           key=lambda x: (x[0], int(x[1]) if x[1].isdigit() else -1, x[2]))
+        final_code_str += "/* NOTE: Configure GPIO pins for Alternate Function (AF) in GPIO_User_Init():\n"
+        for p_char, pin_n, af_val, fn_name in unique_af:
+            # F1 remap might not use AF number directly
+            af_str = f"AF{af_val}" if af_val != -1 else "Remap"
+            final_code_str += f" *       - P{p_char}{pin_n}: {af_str} ({fn_name})\n"
+        final_code_str += " */\n\n"
+
+    if all_gpio_analog_configs:
+        unique_ana = {}
+        for item in all_gpio_analog_configs:
+            key = (item['port_char'], item['pin_num'])
+            if key not in unique_ana:
+                unique_ana[key] = item['module']
+            elif item['module'] not in unique_ana[key]:
+                unique_ana[key] += f", {item['module']}"
+
+        final_code_str += "/* NOTE: Configure GPIO pins for Analog mode in GPIO_User_Init():\n"
+        for (p_c, p_n), m_names in sorted(unique_ana.items(), key=lambda x_sort: (x_sort[0][0], x_sort[0][1])):
+            final_code_str += f" *       - P{p_c}{p_n} (for {m_names})\n"
+        final_code_str += " */\n\n"
+
+    ordered_init_calls_final = []
+    rcc_finish_call = (generated_code_parts.get("RCC") or {}).get("init_call_finish")
+    if rcc_finish_call:  # Overlapped boot: clock-independent inits run while HSE starts and the PLL locks
+        ordered_init_calls_final.append(generated_code_parts["RCC"]["init_call"].strip())
+        ordered_init_calls_final.extend(call for call, module_name in zip(temp_init_calls, temp_init_call_modules)
+                                        if module_name in get_clock_independent_modules(mcu_family))
+        ordered_init_calls_final.append(rcc_finish_call)
+    else:
+        if "RCC_User_Init()" in temp_init_calls: ordered_init_calls_final.append("RCC_User_Init()")
+        if "GPIO_User_Init()" in temp_init_calls: ordered_init_calls_final.append("GPIO_User_Init()")
+    other_c = [call for call in temp_init_calls if call not in ordered_init_calls_final]
+    ordered_init_calls_final.extend(other_c)
+
+    profile_stages = boot_profile_stages(ordered_init_calls_final) if boot_profiling else []
+    boot_profiling = bool(profile_stages)  # Nothing to time (and no zero-length arrays) without init calls
+    if boot_profiling:
+        profile_globals, profile_main = generate_boot_profile_code(profile_stages)
+        final_code_str += profile_globals + "\n"
+    final_code_str += "int main(void) {\n    // SystemInit() may be called here by startup code or before main.\n\n"
+    if boot_profiling:
+        final_code_str += profile_main
+    else:
+        for call_main in ordered_init_calls_final:
+            if call_main: final_code_str += f"    {call_main};\n"
+
+    if system_core_clock_update_needed:
+        final_code_str += "\n    SystemCoreClockUpdate();\n"
+
+    final_code_str += "\n    // SysTick_Config(SystemCoreClock / 1000); // For 1ms tick\n"
+    final_code_str += "\n    while(1) {\n        // Application loop\n    }\n    return 0;\n}\n\n"
+
+    # Use calculated HCLK for default SystemCoreClock if RCC wasn't configured
+    scc_val = rcc_calculated_data.get("hclk_freq_hz", defines.get('HSI_VALUE_HZ', 8000000))
+    final_code_str += f"#ifndef SystemCoreClock\nvolatile uint32_t SystemCoreClock = {int(scc_val)}UL;\n#endif\n\n"
+    final_code_str += "#ifndef SystemCoreClockUpdate\nvoid SystemCoreClockUpdate(void) { /* Implement if needed, e.g. read SystemCoreClock after RCC setup */ }\n#endif\n"
+    return final_code_str, ordered_init_calls_final
+
+
+def generate(project_config, processing_order=None, cache=None, defines=None):
+    """Generates the complete C source for a project configuration.
+
+    project_config has the shape returned by ConfigurationPane.get_all_configurations():
+    module name -> module config, plus top-level 'target_device' and 'mcu_family'.
+    With a ModuleOutputCache, only modules whose inputs changed since the previous call are
+    regenerated; the final assembly always runs.
+    defines is the resolve_defines(mcu_family, target_device) snapshot to generate with (resolved here if
+    None). The global CURRENT_MCU_DEFINES is neither read nor switched, so a family change on another
+    thread can't leak into a running job.
+    Raises RuntimeError if the defines for the MCU family cannot be loaded.
+    """
+    start_time = time.perf_counter()
+    target_device, mcu_family = get_project_mcu(project_config)
+    init_style = get_project_init_style(project_config)
+    boot_profiling = get_project_boot_profiling(project_config)
+    if processing_order is None:
+        processing_order = get_processing_order()
+
+    if defines is None:
+        defines = resolve_defines(mcu_family, target_device)
+    if not defines:
+        raise RuntimeError(f"Could not load defines for MCU family {mcu_family}. Code generation aborted.")
+
+    all_includes, all_error_messages, generated_code_parts, all_peripheral_rcc_clocks = set(), [], {}, []
+    regenerated_modules = []
+
+    rcc_config = project_config.get("RCC")
+    rcc_configured = bool(rcc_config and rcc_config.get("params"))
+    if rcc_configured:
+        # The 'calculated' part of RCC config is filled in by the RCC widget's get_config
+        rcc_calculated_data = rcc_config.get("calculated", {})
+
+        if rcc_calculated_data.get("errors"):
+            for err in rcc_calculated_data["errors"]:
+                if err not in all_error_messages: all_error_messages.append(f"RCC Calc: {err}")
+
+        cmsis_header_from_rcc = rcc_config.get("params", {}).get("cmsis_device_header")
+        if not cmsis_header_from_rcc:  # Fallback
+            target_devices_map = defines.get('TARGET_DEVICES', {})
+            cmsis_header_from_rcc = target_devices_map.get(target_device, {}).get(
+                "cmsis_header", f"stm32{mcu_family.lower()}xx.h")
+        if cmsis_header_from_rcc:
+            all_includes.add(f"#include \"{cmsis_header_from_rcc}\"")
+    else:  # Fallback if RCC is not configured
+        all_error_messages.append(
+            "WARNING: RCC module not configured or config is empty. Using default clock assumptions.")
+        rcc_calculated_data = default_rcc_calculated_data(target_device, mcu_family, defines)
+        target_devices_map = defines.get('TARGET_DEVICES', {})
+        default_header = target_devices_map.get(target_device, {}).get("cmsis_header",
+                                                                       f"stm32{mcu_family.lower()}xx.h")
+        all_includes.add(f"#include \"{default_header}\"")
+
+    for module_name in processing_order:
+        if module_name in ["MCU", "RCC"]: continue  # RCC handled separately for peripheral clocks
+        module_config = project_config.get(module_name)
+        if not is_module_enabled(module_name, module_config):
+            continue
+        if init_style != "code" and module_name in REGISTER_TABLE_MODULES:
+            module_config = dict(module_config, init_style=init_style)
+        if boot_profiling and module_name == "Delay":  # DWT_Delay_Init() must not reset the running CYCCNT
+            module_config = dict(module_config, boot_profiling=True)
+
+        parts = None
+        if cache is not None:
+            rcc_deps = {k: rcc_calculated_data.get(k) for k in MODULE_RCC_DEPENDENCIES.get(module_name, ())}
+            cache_key = config_hash(target_device, mcu_family, module_config, rcc_deps)
+            parts = cache.get(module_name, cache_key)
+        if parts is None:
+            parts = generate_module_parts(module_name, module_config, rcc_calculated_data)
+            regenerated_modules.append(module_name)
+            if cache is not None: cache.put(module_name, cache_key, parts)
+        if parts:
+            generated_code_parts[module_name] = parts
+            if parts.get("rcc_clocks_to_enable"):
+                all_peripheral_rcc_clocks.extend(parts["rcc_clocks_to_enable"])
+            if parts.get("error_messages"):
+                for err in parts["error_messages"]:
+                    if err not in all_error_messages: all_error_messages.append(f"{module_name}: {err}")
+
+    # --- Final RCC generation with collected peripheral clocks ---
+    if rcc_configured:
+        unique_clocks = sorted(list(set(all_peripheral_rcc_clocks)))
+        rcc_init_config = dict(rcc_config, init_style=init_style) if init_style != "code" else rcc_config
+        final_rcc_parts = None
+        if cache is not None:
+            cache_key = config_hash(target_device, mcu_family, rcc_init_config, unique_clocks)
+            final_rcc_parts = cache.get("RCC", cache_key)
+        if final_rcc_parts is None:
+            final_rcc_parts = generate_rcc_code_cmsis(rcc_init_config, unique_clocks)
+            regenerated_modules.append("RCC")
+            if cache is not None: cache.put("RCC", cache_key, final_rcc_parts)
+        generated_code_parts["RCC"] = final_rcc_parts
+        # Ensure CMSIS header from RCC is prioritized or added if not present
+        cmsis_header_rcc = final_rcc_parts.get("cmsis_device_header")
+        if cmsis_header_rcc: all_includes.add(f"#include \"{cmsis_header_rcc}\"")
+
+        if final_rcc_parts.get("error_messages"):
+            for err in final_rcc_parts["error_messages"]:
+                if err not in all_error_messages: all_error_messages.append(f"RCC Final: {err}")
+
+        # --- Runtime clock profiles (RCC_SwitchProfile), after the modules whose registers they retune ---
+        if rcc_config.get("clock_profiles"):
+            profile_module_configs = {m: project_config.get(m) for m in CLOCK_PROFILE_MODULES
+                                      if is_module_enabled(m, project_config.get(m))}
+            profile_parts = None
+            if cache is not None:
+                cache_key = config_hash(target_device, mcu_family, rcc_config, profile_module_configs)
+                profile_parts = cache.get("ClockProfiles", cache_key)
+            if profile_parts is None:
+                profile_parts = generate_clock_profile_code_cmsis(rcc_config, profile_module_configs)
+                regenerated_modules.append("ClockProfiles")
+                if cache is not None: cache.put("ClockProfiles", cache_key, profile_parts)
+            generated_code_parts["ClockProfiles"] = profile_parts
+            processing_order = list(processing_order) + ["ClockProfiles"]
+            for err in profile_parts.get("error_messages", []):
+                if err not in all_error_messages: all_error_messages.append(f"Clock Profiles: {err}")
+
+        # --- STOP mode enter/exit (restores whatever clock profile was active) ---
+        if rcc_config.get("params", {}).get("stop_mode_routines"):
+            stop_parts = None
+            if cache is not None:
+                cache_key = config_hash(target_device, mcu_family, rcc_config)
+                stop_parts = cache.get("StopMode", cache_key)
+            if stop_parts is None:
+                stop_parts = generate_stop_mode_code_cmsis(rcc_config)
+                regenerated_modules.append("StopMode")
+                if cache is not None: cache.put("StopMode", cache_key, stop_parts)
+            generated_code_parts["StopMode"] = stop_parts
+            processing_order = list(processing_order) + ["StopMode"]
+            for err in stop_parts.get("error_messages", []):
+                if err not in all_error_messages: all_error_messages.append(f"STOP Mode: {err}")
+
+    code, init_calls = assemble_code(target_device, mcu_family, processing_order, generated_code_parts,
+                                     all_includes, all_error_messages, rcc_calculated_data, init_style,
+                                     boot_profiling, defines)
+    return GeneratedProject(code=code, target_device=target_device, mcu_family=mcu_family,
+                            parts=generated_code_parts, error_messages=sorted(set(all_error_messages)),
+                            rcc_calculated_data=rcc_calculated_data, init_calls=init_calls,
+                            regenerated_modules=regenerated_modules,
+                            clock_config_header=generate_clock_config_header(
+                                target_device, mcu_family, rcc_calculated_data, rcc_config if rcc_configured else None),
+                            init_style_costs=init_style_costs(processing_order, generated_code_parts, init_style),
+                            init_cost=estimate_project_init_cost(processing_order, generated_code_parts,
+                                                                 rcc_calculated_data, mcu_family, target_device,
+                                                                 init_style,
+                                                                 get_clock_independent_modules(mcu_family)),
+                            elapsed_s=time.perf_counter() - start_time)
+
+
+def load_project_config(file_path):
+    """Loads a project configuration saved with save_project_config()."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_project_config(file_path, project_config):
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(project_config, f, indent=2, sort_keys=True)
@@ -0,0 +1,45 @@
+# --- NEW FILE generation_worker.py ---
+import traceback
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+import engine
+
+
+class GenerationWorkerSignals(QObject):
+    # QRunnable is not a QObject, so the signals live here
+    finished = pyqtSignal(int, object)  # job_id, engine.GeneratedProject
+    failed = pyqtSignal(int, str)  # job_id, error text incl. traceback
+
+
+class GenerationWorker(QRunnable):
+    """Runs engine.generate() for one snapshot on a QThreadPool thread.
+
+    project_config must be a private (deep) copy: the GUI keeps editing its own dicts while
+    the job runs. defines is the resolve_defines() index of the snapshot's family/device, resolved
+    on the GUI thread and passed to engine.generate(), which never touches the global
+    CURRENT_MCU_DEFINES the GUI may switch to another family while the job runs.
+    is_current() is polled before starting so superseded jobs that were still
+    queued do no work; results of jobs superseded while running are dropped by the receiver.
+    """
+
+    def __init__(self, job_id, project_config, processing_order, cache=None, is_current=None, defines=None):
+        super().__init__()
+        self.job_id = job_id
+        self.project_config = project_config
+        self.processing_order = list(processing_order)
+        self.cache = cache  # Only safe because the pool runs one job at a time
+        self.is_current = is_current
+        self.defines = defines  # Immutable (MappingProxyType), safe to share with the GUI thread
+        self.signals = GenerationWorkerSignals()
+
+    def run(self):
+        if self.is_current is not None and not self.is_current():
+            return  # Superseded before it started
+        try:
+            generated_project = engine.generate(self.project_config, self.processing_order, self.cache,
+                                                self.defines)
+        except Exception as e:
+            self.signals.failed.emit(self.job_id, f"{str(e)}\n\nTraceback:\n{traceback.format_exc()}")
+            return
+        self.signals.finished.emit(self.job_id, generated_project)
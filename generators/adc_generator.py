@@ -1,38 +1,27 @@
-from core.mcu_defines_loader import CURRENT_MCU_DEFINES
+from core.define_resolver import resolve_defines
+from core.mcu_defines_loader import load_register_db
 
 
 def get_adc_prescaler_val(prescaler_str, mcu_family):
     # Prescaler values can differ or map to different bits
-    map_key_family = f"ADC_PRESCALER_VAL_MAP_{mcu_family}"
-    map_key_generic = "ADC_PRESCALER_VAL_MAP"
-    val_map = CURRENT_MCU_DEFINES.get(map_key_family, CURRENT_MCU_DEFINES.get(map_key_generic, {}))
+    val_map = resolve_defines(mcu_family).get("ADC_PRESCALER_VAL_MAP", {})
     return val_map.get(prescaler_str, 0b01)  # Default PCLK2/4
 
 
 def get_adc_resolution_val(res_str, mcu_family):
-    map_key_family = f"ADC_RESOLUTION_VAL_MAP_{mcu_family}"
-    map_key_generic = "ADC_RESOLUTION_VAL_MAP"
-    val_map = CURRENT_MCU_DEFINES.get(map_key_family, CURRENT_MCU_DEFINES.get(map_key_generic, {}))
+    val_map = resolve_defines(mcu_family).get("ADC_RESOLUTION_VAL_MAP", {})
     return val_map.get(res_str, 0b00)  # Default 12-bit
 
 
 def get_adc_sampling_time_val(st_str, mcu_family):
-    map_key_family = f"ADC_SAMPLING_TIME_VAL_MAP_{mcu_family}"
-    map_key_generic = "ADC_SAMPLING_TIME_VAL_MAP"
-    val_map = CURRENT_MCU_DEFINES.get(map_key_family, CURRENT_MCU_DEFINES.get(map_key_generic, {}))
+    val_map = resolve_defines(mcu_family).get("ADC_SAMPLING_TIME_VAL_MAP", {})
     return val_map.get(st_str, 0b001)  # Default 15 cycles
 
 
 def get_adc_channel_val(ch_str, mcu_family, target_device):
     # Channel mapping can be very device specific within a family
-    # Try target_device specific map first, then family generic, then simple "INx" parsing
-    device_map_key = f"ADC_CHANNEL_STR_TO_VAL_MAP_{target_device}"
-    family_map_key = f"ADC_CHANNEL_STR_TO_VAL_MAP_{mcu_family}"
-    generic_map_key = "ADC_CHANNEL_STR_TO_VAL_MAP"  # For common ones like TEMP, VREF
-
-    val_map = CURRENT_MCU_DEFINES.get(device_map_key,
-                                      CURRENT_MCU_DEFINES.get(family_map_key,
-                                                              CURRENT_MCU_DEFINES.get(generic_map_key, {})))
+    # Resolved map: target_device specific, then family, then generic; then simple "INx" parsing
+    val_map = resolve_defines(mcu_family, target_device).get("ADC_CHANNEL_STR_TO_VAL_MAP", {})
 
     if ch_str in val_map: return val_map[ch_str]
 
@@ -46,50 +35,48 @@ def get_adc_channel_val(ch_str, mcu_family, target_device):
 
 
 def get_adc_ext_trigger_edge_val(edge_str, mcu_family):
-    map_key_family = f"ADC_EXT_TRIG_EDGE_VAL_MAP_{mcu_family}"
-    map_key_generic = "ADC_EXT_TRIG_EDGE_VAL_MAP"
-    val_map = CURRENT_MCU_DEFINES.get(map_key_family, CURRENT_MCU_DEFINES.get(map_key_generic, {}))
+    val_map = resolve_defines(mcu_family).get("ADC_EXT_TRIG_EDGE_VAL_MAP", {})
     return val_map.get(edge_str, 0b00)  # Default Disabled
 
 
 def get_adc_ext_trigger_source_val(src_str, mcu_family):
-    map_key_family = f"ADC_EXT_TRIG_SOURCE_VAL_MAP_{mcu_family}"
-    map_key_generic = "ADC_EXT_TRIG_SOURCE_VAL_MAP"
-    val_map = CURRENT_MCU_DEFINES.get(map_key_family, CURRENT_MCU_DEFINES.get(map_key_generic, {}))
+    val_map = resolve_defines(mcu_family).get("ADC_EXT_TRIG_SOURCE_VAL_MAP", {})
     return val_map.get(src_str, 0x0)  # Default depends on family, often TIM1_CC1
 
 
 def generate_adc_code_cmsis(
-        config):  # rcc_config_calculated removed, ADC gets PCLK from CURRENT_MCU_DEFINES if needed by calc
+        config):  # rcc_config_calculated removed, ADC gets PCLK from the resolved defines if needed by calc
     params = config.get("params", {})
     mcu_family = params.get("mcu_family", "STM32F4")  # Get from config
     target_device = params.get("target_device", "STM32F407VG")  # Get from config
+    defines = resolve_defines(mcu_family, target_device)
+    regs = load_register_db(mcu_family, target_device)
     error_messages = []
 
-    # Get bit positions from CURRENT_MCU_DEFINES
-    ADC_CR1_RES_Pos = CURRENT_MCU_DEFINES.get("ADC_CR1_RES_Pos", 24)  # Default F4
-    ADC_CR1_SCAN_Pos = CURRENT_MCU_DEFINES.get("ADC_CR1_SCAN_Pos", 8)
-    ADC_CR1_EOCIE_Pos = CURRENT_MCU_DEFINES.get("ADC_CR1_EOCIE_Pos", 5)
-    ADC_CR1_OVRIE_Pos = CURRENT_MCU_DEFINES.get("ADC_CR1_OVRIE_Pos", 26)  # F4 has this, F1 handles OVR differently
-
-    ADC_CR2_ADON_Pos = CURRENT_MCU_DEFINES.get("ADC_CR2_ADON_Pos", 0)
-    ADC_CR2_CONT_Pos = CURRENT_MCU_DEFINES.get("ADC_CR2_CONT_Pos", 1)
-    ADC_CR2_ALIGN_Pos = CURRENT_MCU_DEFINES.get("ADC_CR2_ALIGN_Pos", 11)
-    ADC_CR2_EOCS_Pos = CURRENT_MCU_DEFINES.get("ADC_CR2_EOCS_Pos", 10)  # F4 specific
-    ADC_CR2_EXTEN_Pos = CURRENT_MCU_DEFINES.get("ADC_CR2_EXTEN_Pos", 28)
-    ADC_CR2_EXTEN_Msk = CURRENT_MCU_DEFINES.get("ADC_CR2_EXTEN_Msk", (0x3 << ADC_CR2_EXTEN_Pos))
-    ADC_CR2_EXTSEL_Pos = CURRENT_MCU_DEFINES.get("ADC_CR2_EXTSEL_Pos", 24)
-    ADC_CR2_EXTSEL_Msk = CURRENT_MCU_DEFINES.get("ADC_CR2_EXTSEL_Msk", (0xF << ADC_CR2_EXTSEL_Pos))
-    ADC_CR2_SWSTART_Pos = CURRENT_MCU_DEFINES.get("ADC_CR2_SWSTART_Pos", 30)
-
-    ADC_SQR1_L_Pos = CURRENT_MCU_DEFINES.get("ADC_SQR1_L_Pos", 20)
-
-    ADC_CCR_ADCPRE_Pos = CURRENT_MCU_DEFINES.get("ADC_CCR_ADCPRE_Pos", 16)  # F4
-    ADC_CCR_VBATE_Pos = CURRENT_MCU_DEFINES.get("ADC_CCR_VBATE_Pos", 22)
-    ADC_CCR_TSVREFE_Pos = CURRENT_MCU_DEFINES.get("ADC_CCR_TSVREFE_Pos", 23)
+    # Get bit positions from the resolved defines
+    ADC_CR1_RES_Pos = regs.pos("ADC_CR1_RES", 24)  # Default F4
+    ADC_CR1_SCAN_Pos = regs.pos("ADC_CR1_SCAN", 8)
+    ADC_CR1_EOCIE_Pos = regs.pos("ADC_CR1_EOCIE", 5)
+    ADC_CR1_OVRIE_Pos = regs.pos("ADC_CR1_OVRIE", 26)  # F4 has this, F1 handles OVR differently
+
+    ADC_CR2_ADON_Pos = regs.pos("ADC_CR2_ADON", 0)
+    ADC_CR2_CONT_Pos = regs.pos("ADC_CR2_CONT", 1)
+    ADC_CR2_ALIGN_Pos = regs.pos("ADC_CR2_ALIGN", 11)
+    ADC_CR2_EOCS_Pos = regs.pos("ADC_CR2_EOCS", 10)  # F4 specific
+    ADC_CR2_EXTEN_Pos = regs.pos("ADC_CR2_EXTEN", 28)
+    ADC_CR2_EXTEN_Msk = regs.mask("ADC_CR2_EXTEN", (0x3 << ADC_CR2_EXTEN_Pos))
+    ADC_CR2_EXTSEL_Pos = regs.pos("ADC_CR2_EXTSEL", 24)
+    ADC_CR2_EXTSEL_Msk = regs.mask("ADC_CR2_EXTSEL", (0xF << ADC_CR2_EXTSEL_Pos))
+    ADC_CR2_SWSTART_Pos = regs.pos("ADC_CR2_SWSTART", 30)
+
+    ADC_SQR1_L_Pos = regs.pos("ADC_SQR1_L", 20)
+
+    ADC_CCR_ADCPRE_Pos = regs.pos("ADC_CCR_ADCPRE", 16)  # F4
+    ADC_CCR_VBATE_Pos = regs.pos("ADC_CCR_VBATE", 22)
+    ADC_CCR_TSVREFE_Pos = regs.pos("ADC_CCR_TSVREFE", 23)
     # F1 specifics for CR2
-    ADC_CR2_CAL_Pos = CURRENT_MCU_DEFINES.get("ADC_CR2_CAL_Pos", 2)  # F1 Calibration
-    ADC_CR2_EXTTRIG_Pos = CURRENT_MCU_DEFINES.get("ADC_CR2_EXTTRIG_Pos", 20)  # F1 EXTTRIG bit
+    ADC_CR2_CAL_Pos = regs.pos("ADC_CR2_CAL", 2)  # F1 Calibration
+    ADC_CR2_EXTTRIG_Pos = regs.pos("ADC_CR2_EXTTRIG", 20)  # F1 EXTTRIG bit
 
     adc_instance_str = params.get("adc_instance", "ADC1")
     adc_base = adc_instance_str
@@ -102,8 +89,7 @@ def generate_adc_code_cmsis(
     source_function += f"    // {adc_base} ({mcu_family}) Configuration (CMSIS Register Level)\n\n"
 
     rcc_clocks = []
-    adc_rcc_map_key = f"ADC_RCC_MAP_{mcu_family}"
-    adc_rcc_map = CURRENT_MCU_DEFINES.get(adc_rcc_map_key, CURRENT_MCU_DEFINES.get("ADC_RCC_MAP", {}))
+    adc_rcc_map = defines.get("ADC_RCC_MAP", {})
     rcc_macro = adc_rcc_map.get(adc_base)
     if rcc_macro:
         rcc_clocks.append(rcc_macro)
@@ -164,8 +150,8 @@ def generate_adc_code_cmsis(
             cr2_val |= (1 << ADC_CR2_EXTTRIG_Pos)  # Enable external trigger
             # EXTSEL bits for F1 are different
             src_val_f1 = get_adc_ext_trigger_source_val(trigger_source_str, mcu_family)  # Use F1 specific map
-            ADC_CR2_EXTSEL_Pos_F1 = CURRENT_MCU_DEFINES.get("ADC_CR2_EXTSEL_Pos_F1", 17)  # Example, get from defines
-            ADC_CR2_EXTSEL_Msk_F1 = CURRENT_MCU_DEFINES.get("ADC_CR2_EXTSEL_Msk_F1", (0x7 << 17))
+            ADC_CR2_EXTSEL_Pos_F1 = regs.pos("ADC_CR2_EXTSEL", 17)  # Example, get from defines
+            ADC_CR2_EXTSEL_Msk_F1 = regs.mask("ADC_CR2_EXTSEL", (0x7 << 17))
             cr2_val &= ~ADC_CR2_EXTSEL_Msk_F1
             cr2_val |= (src_val_f1 << ADC_CR2_EXTSEL_Pos_F1)
         else:
@@ -233,7 +219,7 @@ def generate_adc_code_cmsis(
 
     gpio_pins_analog = []
     adc_gpio_map_key = f"ADC_PIN_MAP_{target_device}"  # e.g. ADC_PIN_MAP_STM32F407VG
-    adc_gpio_map = CURRENT_MCU_DEFINES.get(adc_gpio_map_key, {})
+    adc_gpio_map = defines.get(adc_gpio_map_key, {})
     for ch_config in regular_channels:
         ch_name_str = ch_config.get("channel")
         # Find pin corresponding to channel string (e.g. "IN0", "PA0_C", "TEMP")
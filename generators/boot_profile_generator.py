@@ -0,0 +1,38 @@
+# --- NEW FILE generators/boot_profile_generator.py ---
+# Boot profiling (MCU param "boot_profiling"): main() starts the DWT cycle counter before the first init
+# call and stores the CYCCNT delta of every init call in boot_profile_cycles[], named by boot_profile_names[].
+# Both are plain global symbols, so a debugger or test rig reads them over SWD from the ELF's addresses once
+# boot_profile_done is 1. Counts are core cycles at whatever clock the stage ran on (the RCC stages span the
+# switch from HSI to SYSCLK). Off by default; without the flag main() is generated exactly as before.
+
+from generators.delay_generator import dwt_cyccnt_enable_code
+
+
+def boot_profile_stages(init_calls):
+    """Individual calls (no ';') of main()'s init call list; one entry can hold several calls (DMA, Delay)."""
+    stages = []
+    for entry in init_calls:
+        for call in (entry or "").split(";"):
+            call = call.strip()
+            if call and call not in stages: stages.append(call)
+    return stages
+
+
+def generate_boot_profile_code(stages):
+    """(globals, main() body) C text for the stage list: the symbol tables and the CYCCNT-wrapped init calls."""
+    stage_count = len(stages)
+    globals_code = "// Boot profiling: DWT CYCCNT cycles of each init call in main(), read over SWD once boot_profile_done == 1\n"
+    globals_code += f"#define BOOT_PROFILE_STAGE_COUNT {stage_count}U\n"
+    globals_code += "const uint32_t boot_profile_stage_count __attribute__((used)) = BOOT_PROFILE_STAGE_COUNT;\n"
+    globals_code += "const char *const boot_profile_names[BOOT_PROFILE_STAGE_COUNT] __attribute__((used)) = {\n"
+    globals_code += "".join(f"    \"{call.split('(')[0].strip()}\",\n" for call in stages) + "};\n"
+    globals_code += "volatile uint32_t boot_profile_cycles[BOOT_PROFILE_STAGE_COUNT] __attribute__((used));\n"
+    globals_code += "volatile uint32_t boot_profile_done __attribute__((used));\n"
+
+    main_code = "    // Boot profiling: cycle counter on before the first init call\n"
+    main_code += dwt_cyccnt_enable_code()
+    main_code += "    uint32_t boot_profile_start;\n"
+    for index, call in enumerate(stages):
+        main_code += f"    boot_profile_start = DWT->CYCCNT; {call}; boot_profile_cycles[{index}] = DWT->CYCCNT - boot_profile_start;\n"
+    main_code += "    boot_profile_done = 1U;\n"
+    return globals_code, main_code
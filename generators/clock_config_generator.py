@@ -0,0 +1,61 @@
+# --- NEW FILE generators/clock_config_generator.py ---
+# clock_config.h: the RCC 'calculated' frequencies as compile-time constants, so user code gets delays,
+# baud rates and timer periods folded by the compiler instead of dividing SystemCoreClock at run time.
+# Written next to the generated .c (GUI "Save clock_config.h", batch --clock-header); the .c itself
+# does not include it and stays self-contained.
+
+from core.clock_tree import timer_kernel_clock_hz
+from generators.clock_profile_generator import profile_macro_name, resolve_clock_profiles
+
+CLOCK_CONFIG_HEADER_NAME = "clock_config.h"
+
+
+def _define(name, value, comment=""):
+    return f"#define {name:<28} {value}" + (f" // {comment}" if comment else "") + "\n"
+
+
+def generate_clock_config_header(target_device, mcu_family, rcc_calculated_data, rcc_config=None):
+    """clock_config.h text for the RCC 'calculated' dict (engine defaults if RCC isn't configured)."""
+    calc = rcc_calculated_data or {}
+    h_code = f"/* {CLOCK_CONFIG_HEADER_NAME}: clock tree of {target_device} ({mcu_family}), generated from the RCC configuration */\n"
+    h_code += "#ifndef CLOCK_CONFIG_H\n#define CLOCK_CONFIG_H\n\n"
+    if rcc_config and rcc_config.get("clock_profiles"):
+        h_code += "// Values of clock profile 0 (RCC_User_Init); RCC_SwitchProfile() changes HCLK/PCLK at run time\n"
+    if not (rcc_config and rcc_config.get("params")):
+        h_code += "// RCC not configured: reset clock (HSI) assumed\n"
+
+    h_code += _define("CLOCK_SYSCLK_HZ", f"{int(calc.get('sysclk_freq_hz', 0))}UL")
+    h_code += _define("CLOCK_HCLK_HZ", f"{int(calc.get('hclk_freq_hz', 0))}UL", "SystemCoreClock")
+    h_code += _define("CLOCK_PCLK1_HZ", f"{int(calc.get('pclk1_freq_hz', 0))}UL")
+    h_code += _define("CLOCK_PCLK2_HZ", f"{int(calc.get('pclk2_freq_hz', 0))}UL")
+    h_code += _define("CLOCK_TIM_APB1_HZ", f"{int(timer_kernel_clock_hz(calc, 'APB1'))}UL", "Timer kernel clock, 2 x PCLK1 if APB1 is divided")
+    h_code += _define("CLOCK_TIM_APB2_HZ", f"{int(timer_kernel_clock_hz(calc, 'APB2'))}UL", "Timer kernel clock, 2 x PCLK2 if APB2 is divided")
+    h_code += _define("CLOCK_AHB_DIV", f"{calc.get('ahb_div', 1)}U")
+    h_code += _define("CLOCK_APB1_DIV", f"{calc.get('apb1_div', 1)}U")
+    h_code += _define("CLOCK_APB2_DIV", f"{calc.get('apb2_div', 1)}U")
+    if calc.get("vco_output_freq_hz") and mcu_family != "STM32F1":  # F1 has no separate VCO/Q outputs
+        h_code += _define("CLOCK_PLL_VCO_INPUT_HZ", f"{int(calc['vco_input_freq_hz'])}UL")
+        h_code += _define("CLOCK_PLL_VCO_OUTPUT_HZ", f"{int(calc['vco_output_freq_hz'])}UL")
+    if calc.get("pll_p_output_freq_hz"):
+        h_code += _define("CLOCK_PLL_P_HZ", f"{int(calc['pll_p_output_freq_hz'])}UL", "PLL SYSCLK output")
+    if calc.get("pll_q_output_freq_hz") and mcu_family != "STM32F1":
+        h_code += _define("CLOCK_PLL_Q_HZ", f"{int(calc['pll_q_output_freq_hz'])}UL", "USB OTG FS/SDIO/RNG clock")
+    if calc.get("adc_freq_hz"):
+        h_code += _define("CLOCK_ADC_HZ", f"{int(calc['adc_freq_hz'])}UL", "ADCCLK (PCLK2 / ADCPRE)")
+    h_code += _define("CLOCK_FLASH_LATENCY_WS", f"{calc.get('flash_latency_val', 0)}U")
+    if mcu_family == "STM32F4" and calc.get("vos_scale_id") not in (None, "N/A"):
+        h_code += f"// Voltage scaling: {calc['vos_scale_id']}{' (over-drive)' if calc.get('overdrive_active') else ''}\n"
+
+    if rcc_config and rcc_config.get("clock_profiles"):
+        h_code += "\n// Per clock profile (RCC_PROFILE_* index for RCC_SwitchProfile())\n"
+        for name, _, profile_calc in resolve_clock_profiles(rcc_config):
+            h_code += _define(f"{profile_macro_name(name)}_HCLK_HZ", f"{int(profile_calc.get('hclk_freq_hz', 0))}UL")
+
+    h_code += "\n// Derived values: constant expressions, folded at compile time\n"
+    h_code += _define("CLOCK_HCLK_CYCLES_PER_US", "(CLOCK_HCLK_HZ / 1000000UL)")
+    h_code += _define("CLOCK_SYSTICK_RELOAD_1MS", "(CLOCK_HCLK_HZ / 1000UL - 1UL)", "SysTick->LOAD for a 1 ms tick")
+    h_code += _define("CLOCK_USART_BRR(pclk_hz, baud)", "(((pclk_hz) + (baud) / 2UL) / (baud))", "Oversampling by 16")
+    h_code += _define("CLOCK_TIMER_PSC(tim_hz, tick_hz)", "((tim_hz) / (tick_hz) - 1UL)")
+    h_code += _define("CLOCK_TIMER_ARR(tick_hz, period_hz)", "((tick_hz) / (period_hz) - 1UL)")
+    h_code += "\n#endif /* CLOCK_CONFIG_H */\n"
+    return h_code
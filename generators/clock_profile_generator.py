@@ -0,0 +1,331 @@
+# --- NEW FILE generators/clock_profile_generator.py ---
+# Runtime clock-profile switching (DVFS): RCC_SwitchProfile(n) moves the running system between
+# named RCC configurations whose register values are all computed here, at generation time.
+#
+# Profile 0 is the project's RCC config (what RCC_User_Init() sets up); every entry of the RCC
+# config's "clock_profiles" list ({"name", "params": RCC param overrides}) adds one more.
+# Per profile the tables hold CFGR (prescalers, SW; F1 also the PLL and ADCPRE/USBPRE bits),
+# PLLCFGR, FLASH_ACR and PWR_CR (VOS, over-drive), plus the clock-dependent registers of the enabled
+# USART (BRR), timer (PSC, same tick rate), I2C (CR2 FREQ, CCR, TRISE, same SCL) and SPI (CR1 BR,
+# fastest SCK not above the profile-0 one) modules.
+#
+# Switch order (glitch-free): flash wait states up first, SYSCLK parked on HSI only if the PLL has
+# to relock (PLL settings, VOS or over-drive change) or the source changes, bus prescalers, PLL
+# relock (VOS written while the PLL is off), SYSCLK switch, unused PLL off, flash wait states down.
+
+from core.clock_math import (PLANNER_TOLERANCES, module_config_list, uart_baud_error, spi_prescaler_and_error,
+                             timer_prescaler_and_error)
+from core.clock_tree import ClockTree, kernel_clock_hz, timer_kernel_clock_hz
+from core.define_resolver import resolve_defines
+from core.mcu_defines_loader import load_register_db
+from generators.i2c_generator import calculate_i2c_timing
+from generators.rcc_generator import rcc_register_values
+from generators.uart_generator import calculate_brr_universal
+
+CLOCK_PROFILE_MODULES = ("USART", "TIMERS", "I2C", "SPI")  # Modules with clock-dependent registers
+CLOCK_PROFILE_DEFAULT_NAME = "DEFAULT"
+
+
+def profile_macro_name(profile_name):
+    return "RCC_PROFILE_" + "".join(c if c.isalnum() else '_' for c in str(profile_name).upper())
+
+
+def resolve_clock_profiles(rcc_config):
+    """[(name, RCC params, RCC 'calculated')] with profile 0 = rcc_config itself."""
+    base_params = rcc_config.get("params", {})
+    profiles = [(base_params.get("profile_name", CLOCK_PROFILE_DEFAULT_NAME), base_params,
+                 rcc_config.get("calculated", {}))]
+    for profile in rcc_config.get("clock_profiles", []):
+        params = dict(base_params, **profile.get("params", {}))
+        params["mcu_family"] = base_params.get("mcu_family", "STM32F4")  # Profiles never change the MCU
+        params["target_device"] = base_params.get("target_device", "STM32F407VG")
+        params["pll_enabled"] = params.get("pll_enabled_for_sysclk", False)
+        profiles.append((profile.get("name", f"PROFILE{len(profiles)}"), params, ClockTree(params).calculated()))
+    return profiles
+
+
+def _c_table(c_type, table_name, values, value_format="0x{:04X}U", comment=""):
+    return f"static const {c_type} {table_name}[RCC_PROFILE_COUNT] = {{" + ", ".join(
+        value_format.format(v) for v in values) + "};" + (f" // {comment}" if comment else "") + "\n"
+
+
+def _peripheral_tables(module_configs, profiles, mcu_family, defines, regs, errors):
+    """(C tables, quiesce code, retune code) for the enabled clock-dependent peripherals."""
+    tables = ""
+    quiesce_code = ""
+    retune_code = ""
+    base_calculated = profiles[0][2]
+
+    usart_info_map = defines.get("USART_PERIPHERALS_INFO", {})
+    oversampling_map = defines.get("USART_OVERSAMPLING_MAP", {"16": 0})
+    for module_config in module_config_list(module_configs.get("USART")):
+        params = module_config.get("params", {})
+        instance_name = params.get("instance_name")
+        instance_info = usart_info_map.get(instance_name)
+        if not params.get("enabled") or not instance_info: continue
+        baud_rate = params.get("baud_rate", 115200)
+        over8 = 0 if mcu_family in ("STM32F1", "STM32F2") else oversampling_map.get(params.get("oversampling", "16"), 0)
+        brr_values = []
+        for name, _, calculated in profiles:
+            pclk_hz = kernel_clock_hz(calculated, instance_info["bus"])
+            brr = calculate_brr_universal(pclk_hz, baud_rate, over8, mcu_family)
+            baud_error = uart_baud_error(pclk_hz, baud_rate, over8) if pclk_hz else None
+            if brr is None or baud_error is None or baud_error > PLANNER_TOLERANCES["uart"]:
+                errors.append(f"Profile {name}: {instance_name} can't run {baud_rate} baud from {pclk_hz / 1e6:.2f}MHz.")
+            brr_values.append(brr or 0)
+        USART_CR1_UE = 1 << regs.pos("USART_CR1_UE", 13)
+        USART_SR_TC = 1 << regs.pos("USART_SR_TC", 6)
+        tables += _c_table("uint16_t", f"{instance_name}_BRR_Profiles", brr_values,
+                           comment=f"{instance_name} {baud_rate} baud")
+        quiesce_code += f"    timeout = 5000; while (!({instance_name}->SR & 0x{USART_SR_TC:X}UL) && timeout--); // Last frame out\n"
+        quiesce_code += f"    {instance_name}->CR1 &= ~0x{USART_CR1_UE:X}UL;\n"
+        retune_code += f"    {instance_name}->BRR = {instance_name}_BRR_Profiles[n];\n"
+        retune_code += f"    {instance_name}->CR1 |= 0x{USART_CR1_UE:X}UL;\n"
+
+    timer_info_map = defines.get("TIMER_PERIPHERALS_INFO", {})
+    for module_config in module_config_list(module_configs.get("TIMERS")):
+        params = module_config.get("params", {})
+        instance_name = params.get("instance_name")
+        instance_info = timer_info_map.get(instance_name)
+        if not params.get("enabled") or not instance_info: continue
+        base_prescaler = int(params.get("prescaler", 0))
+        base_kernel_hz = timer_kernel_clock_hz(base_calculated, instance_info.get("bus", "APB1"))
+        if not base_kernel_hz: continue
+        tick_hz = base_kernel_hz / (base_prescaler + 1)
+        psc_values = []
+        for name, _, calculated in profiles:
+            prescaler, tick_error = timer_prescaler_and_error(
+                timer_kernel_clock_hz(calculated, instance_info.get("bus", "APB1")), tick_hz)
+            if prescaler is None or tick_error > PLANNER_TOLERANCES["timer"]:
+                errors.append(f"Profile {name}: {instance_name} can't keep its {tick_hz:.0f}Hz tick.")
+            psc_values.append(base_prescaler if prescaler is None else prescaler)
+        tables += _c_table("uint16_t", f"{instance_name}_PSC_Profiles", psc_values, "{}U",
+                           comment=f"{instance_name} tick {tick_hz:.0f}Hz")
+        retune_code += f"    {instance_name}->PSC = {instance_name}_PSC_Profiles[n]; // Preloaded: applies at the next update event\n"
+
+    i2c_info_map = defines.get("I2C_PERIPHERALS_INFO", {})
+    i2c_speeds_map = defines.get("I2C_CLOCK_SPEEDS_HZ", {})
+    duty_modes_map = defines.get("I2C_DUTY_CYCLE_MODES", {})
+    min_pclk_mhz = defines.get("I2C_MIN_PCLK_MHZ", 2)
+    for module_config in module_config_list(module_configs.get("I2C")):
+        params = module_config.get("params", {})
+        instance_name = params.get("instance_name")
+        if not params.get("enabled") or instance_name not in i2c_info_map: continue
+        speed_hz = i2c_speeds_map.get(params.get("clock_speed_str", "100000 Hz (Standard Mode)"), 100000)
+        duty_is_16_9 = speed_hz > 100000 and mcu_family != "STM32F1" and \
+            duty_modes_map.get(params.get("duty_cycle_str"), 0) == 1
+        freq_values, ccr_values, trise_values = [], [], []
+        for name, _, calculated in profiles:
+            pclk1_hz = kernel_clock_hz(calculated, "APB1")
+            pclk1_mhz = int(pclk1_hz // 1000000)
+            timing = calculate_i2c_timing(pclk1_hz, speed_hz, duty_is_16_9, mcu_family) if pclk1_hz > 0 else {
+                "error": "PCLK1=0"}
+            if timing.get("error") or pclk1_mhz < min_pclk_mhz:
+                errors.append(f"Profile {name}: {instance_name} needs PCLK1 >= {min_pclk_mhz}MHz.")
+            ccr_reg_val = timing.get("ccr_val", 0x04) << regs.pos("I2C_CCR_CCR", 0)
+            if timing.get("fs_bit"): ccr_reg_val |= (1 << regs.pos("I2C_CCR_FS", 15))
+            if timing.get("duty_bit") and mcu_family != "STM32F1": ccr_reg_val |= (1 << regs.pos("I2C_CCR_DUTY", 14))
+            freq_values.append(max(pclk1_mhz, min_pclk_mhz))
+            ccr_values.append(ccr_reg_val)
+            trise_values.append(timing.get("trise_val", pclk1_mhz + 1))
+        I2C_CR1_PE = 1 << regs.pos("I2C_CR1_PE", 0)
+        I2C_SR2_BUSY = 1 << regs.pos("I2C_SR2_BUSY", 1)
+        I2C_CR2_FREQ_Msk = regs.mask("I2C_CR2_FREQ", 0x3F)
+        tables += _c_table("uint8_t", f"{instance_name}_FREQ_Profiles", freq_values, "{}U")
+        tables += _c_table("uint16_t", f"{instance_name}_CCR_Profiles", ccr_values)
+        tables += _c_table("uint8_t", f"{instance_name}_TRISE_Profiles", trise_values, "{}U",
+                           comment=f"{instance_name} SCL {speed_hz}Hz")
+        quiesce_code += f"    timeout = 5000; while (({instance_name}->SR2 & 0x{I2C_SR2_BUSY:X}UL) && timeout--); // Transfer done\n"
+        quiesce_code += f"    {instance_name}->CR1 &= ~0x{I2C_CR1_PE:X}UL; // CCR/TRISE are written with PE = 0\n"
+        retune_code += f"    {instance_name}->CR2 = ({instance_name}->CR2 & ~0x{I2C_CR2_FREQ_Msk:X}UL) | {instance_name}_FREQ_Profiles[n];\n"
+        retune_code += f"    {instance_name}->CCR = {instance_name}_CCR_Profiles[n];\n"
+        retune_code += f"    {instance_name}->TRISE = {instance_name}_TRISE_Profiles[n];\n"
+        retune_code += f"    {instance_name}->CR1 |= 0x{I2C_CR1_PE:X}UL;\n"
+
+    spi_info_map = defines.get("SPI_PERIPHERALS_INFO", {})
+    spi_baud_psc_map = defines.get("SPI_BAUD_PRESCALERS", {})
+    for module_config in module_config_list(module_configs.get("SPI")):
+        params = module_config.get("params", {})
+        instance_name = params.get("instance_name")
+        instance_info = spi_info_map.get(instance_name)
+        if not params.get("enabled") or not instance_info: continue
+        SPI_CR1_BR_Pos = regs.pos("SPI_CR1_BR", 3)
+        base_br = spi_baud_psc_map.get(params.get("baud_prescaler_str", "2"), 0b000)
+        base_pclk_hz = kernel_clock_hz(base_calculated, instance_info["bus"])
+        if not base_pclk_hz: continue
+        sck_hz = base_pclk_hz / (2 << base_br)
+        br_values = []
+        for name, _, calculated in profiles:
+            pclk_hz = kernel_clock_hz(calculated, instance_info["bus"])
+            prescaler, _ = spi_prescaler_and_error(pclk_hz, sck_hz)
+            if pclk_hz / prescaler > sck_hz:  # Even /256 is too fast for this profile's PCLK
+                errors.append(f"Profile {name}: {instance_name} can't keep SCK <= {sck_hz:.0f}Hz "
+                              f"({pclk_hz / prescaler:.0f}Hz at /{prescaler}).")
+            br_values.append((prescaler.bit_length() - 2) << SPI_CR1_BR_Pos)  # 2 -> 0b000 ... 256 -> 0b111
+        SPI_CR1_SPE = 1 << regs.pos("SPI_CR1_SPE", 6)
+        SPI_SR_BSY = 1 << regs.pos("SPI_SR_BSY", 7)
+        tables += _c_table("uint16_t", f"{instance_name}_BR_Profiles", br_values,
+                           comment=f"{instance_name} SCK <= {sck_hz:.0f}Hz")
+        quiesce_code += f"    timeout = 5000; while (({instance_name}->SR & 0x{SPI_SR_BSY:X}UL) && timeout--);\n"
+        quiesce_code += f"    {instance_name}->CR1 &= ~0x{SPI_CR1_SPE:X}UL;\n"
+        retune_code += f"    {instance_name}->CR1 = ({instance_name}->CR1 & ~0x{0x7 << SPI_CR1_BR_Pos:X}UL) | {instance_name}_BR_Profiles[n];\n"
+        retune_code += f"    {instance_name}->CR1 |= 0x{SPI_CR1_SPE:X}UL;\n"
+    return tables, quiesce_code, retune_code
+
+
+def generate_clock_profile_code_cmsis(rcc_config, module_configs):
+    """RCC_SwitchProfile(n) and its tables; module_configs maps CLOCK_PROFILE_MODULES to project module configs."""
+    cfg_params = rcc_config.get("params", {})
+    mcu_family = cfg_params.get("mcu_family", "STM32F4")
+    target_device = cfg_params.get("target_device", "STM32F407VG")
+    defines = resolve_defines(mcu_family, target_device)
+    regs = load_register_db(mcu_family, target_device)
+    errors = []
+    if not rcc_config.get("clock_profiles"):
+        return {"source_function": "// No clock profiles\n", "init_call": "", "error_messages": errors}
+
+    RCC_CR_HSION = 1 << regs.pos("RCC_CR_HSION", 0)
+    RCC_CR_HSIRDY = 1 << regs.pos("RCC_CR_HSIRDY", 1)
+    RCC_CR_HSEON = 1 << regs.pos("RCC_CR_HSEON", 16)
+    RCC_CR_HSERDY = 1 << regs.pos("RCC_CR_HSERDY", 17)
+    RCC_CR_PLLON = 1 << regs.pos("RCC_CR_PLLON", 24)
+    RCC_CR_PLLRDY = 1 << regs.pos("RCC_CR_PLLRDY", 25)
+    RCC_CFGR_SW_Pos = regs.pos("RCC_CFGR_SW", 0)
+    RCC_CFGR_SWS_Pos = regs.pos("RCC_CFGR_SWS", 2)
+    FLASH_ACR_LATENCY_Msk = regs.mask("FLASH_ACR_LATENCY", 0xF)
+    PWR_CR_VOS_Pos = regs.pos("PWR_CR_VOS", 14)
+    PWR_CR_ODEN = 1 << regs.pos("PWR_CR_ODEN", 16)
+    PWR_CR_ODSWEN = 1 << regs.pos("PWR_CR_ODSWEN", 17)
+    PWR_CSR_ODRDY = 1 << regs.pos("PWR_CSR_ODRDY", 16)
+    PWR_CSR_ODSWRDY = 1 << regs.pos("PWR_CSR_ODSWRDY", 17)
+    RCC_APB1ENR_PWREN = 1 << regs.pos("RCC_APB1ENR_PWREN", 28)
+    sw_mask = 0x3 << RCC_CFGR_SW_Pos
+    sws_mask = 0x3 << RCC_CFGR_SWS_Pos
+    has_pllcfgr = mcu_family in ["STM32F2", "STM32F4"]
+    has_pwr_cr = mcu_family == "STM32F4"
+    has_overdrive = has_pwr_cr and defines.get('TARGET_DEVICES', {}).get(target_device, {}).get("has_overdrive", False)
+    pwr_cr_mask = (0x3 << PWR_CR_VOS_Pos) | ((PWR_CR_ODEN | PWR_CR_ODSWEN) if has_overdrive else 0)
+
+    profiles = resolve_clock_profiles(rcc_config)
+    rows = []
+    cfgr_prescaler_mask = 0
+    cfgr_pll_mask = 0
+    macro_names = []
+    for index, (name, params, calculated) in enumerate(profiles):
+        macro_name = profile_macro_name(name)
+        if macro_name in macro_names:
+            errors.append(f"Duplicate clock profile name: {name}.")
+        macro_names.append(macro_name)
+        for err in calculated.get("errors", []) if index else []:  # Profile 0 errors are already RCC's
+            errors.append(f"Profile {name}: {err}")
+        register_values = rcc_register_values(params, calculated)
+        errors.extend(f"Profile {name}: {err}" for err in register_values["errors"])
+        uses_pll = params.get("sysclk_source") == "PLL" and bool(params.get("pll_enabled"))
+        sw_val = register_values["sw"] if params.get("sysclk_source") != "PLL" or uses_pll else 0  # PLL off: HSI
+        if register_values["flash_acr"] is None:
+            errors.append(f"Profile {name}: flash latency not determined.")
+        if uses_pll and has_pllcfgr and register_values["pllcfgr"] is None:
+            errors.append(f"Profile {name}: F2/F4 PLL M,N,P,Q invalid.")
+        prescaler_mask, prescaler_val = register_values["cfgr_prescaler"]
+        pll_mask, pll_val = register_values["cfgr_pll"]
+        cfgr_prescaler_mask |= prescaler_mask
+        cfgr_pll_mask |= pll_mask
+        pwr_cr = 0
+        if has_pwr_cr:
+            pwr_cr = (calculated.get("vos_scale_pwr_cr_val") or 0) << PWR_CR_VOS_Pos
+            if has_overdrive and calculated.get("overdrive_active"): pwr_cr |= PWR_CR_ODEN | PWR_CR_ODSWEN
+        uses_hse = params.get("hse_enabled") and (params.get("sysclk_source") == "HSE" or (
+            uses_pll and params.get("pll_source") == "HSE"))
+        rows.append({"name": name, "cfgr": prescaler_val | (pll_val if uses_pll else 0) | (sw_val << RCC_CFGR_SW_Pos),
+                     "pllcfgr": (register_values["pllcfgr"] or 0) if uses_pll else 0,
+                     "flash_acr": register_values["flash_acr"] or 0, "pwr_cr": pwr_cr, "uses_pll": uses_pll,
+                     "uses_hse": bool(uses_hse), "calculated": calculated})
+
+    c_code = "// Clock profiles: register values per profile, computed at generation time\n"
+    for index, macro_name in enumerate(macro_names):
+        c_code += f"#define {macro_name} {index}U\n"
+    c_code += f"#define RCC_PROFILE_COUNT {len(rows)}U\n\n"
+    c_code += "typedef struct {\n"
+    c_code += "    uint32_t cfgr;      // HPRE/PPRE1/PPRE2 and SW" + (
+        " (+ PLLSRC/PLLXTPRE/PLLMULL, ADCPRE/USBPRE)\n" if mcu_family == "STM32F1" else "\n")
+    if has_pllcfgr: c_code += "    uint32_t pllcfgr;   // 0 if the profile doesn't run from the PLL\n"
+    c_code += "    uint32_t flash_acr;\n"
+    if has_pwr_cr: c_code += "    uint32_t pwr_cr;    // VOS" + (" (+ ODEN/ODSWEN)\n" if has_overdrive else "\n")
+    c_code += "    uint32_t hclk_hz;   // SystemCoreClock\n"
+    c_code += "    uint8_t uses_pll;\n    uint8_t uses_hse;\n} RCC_ClockProfile_t;\n\n"
+    c_code += "static const RCC_ClockProfile_t RCC_ClockProfiles[RCC_PROFILE_COUNT] = {\n"
+    for row in rows:
+        calculated = row["calculated"]
+        fields = [f"0x{row['cfgr']:08X}UL"]
+        if has_pllcfgr: fields.append(f"0x{row['pllcfgr']:08X}UL")
+        fields.append(f"0x{row['flash_acr']:08X}UL")
+        if has_pwr_cr: fields.append(f"0x{row['pwr_cr']:08X}UL")
+        fields += [f"{int(calculated.get('hclk_freq_hz', 0))}UL", f"{int(row['uses_pll'])}U", f"{int(row['uses_hse'])}U"]
+        c_code += f"    {{{', '.join(fields)}}}, // {row['name']}: SYSCLK {calculated.get('sysclk_freq_hz', 0) / 1e6:.2f}MHz, " \
+                  f"PCLK1 {calculated.get('pclk1_freq_hz', 0) / 1e6:.2f}MHz, PCLK2 {calculated.get('pclk2_freq_hz', 0) / 1e6:.2f}MHz, " \
+                  f"{calculated.get('flash_latency_val', 0)} WS\n"
+    c_code += "};\n"
+
+    tables, quiesce_code, retune_code = _peripheral_tables(module_configs, profiles, mcu_family, defines, regs,
+                                                           errors)
+    c_code += tables + "\n"
+
+    sw_to_sws = f"((p->cfgr & 0x{sw_mask:X}UL) << {RCC_CFGR_SWS_Pos - RCC_CFGR_SW_Pos})"
+    if has_pllcfgr:
+        pll_differs = "RCC->PLLCFGR != p->pllcfgr"
+    else:
+        pll_differs = f"(RCC->CFGR & 0x{cfgr_pll_mask:X}UL) != (p->cfgr & 0x{cfgr_pll_mask:X}UL)"
+    if has_pwr_cr:
+        pll_differs += f" || (PWR->CR & 0x{pwr_cr_mask:X}UL) != p->pwr_cr"  # VOS/OD only change with the PLL off
+
+    c_code += "void RCC_SwitchProfile(uint32_t n) {\n"
+    c_code += "    // Glitch-free switch to clock profile n (RCC_PROFILE_*); peripherals are retuned to keep their rates\n"
+    c_code += "    const RCC_ClockProfile_t *p;\n    uint32_t pll_relock, sysclk_detour;\n    volatile uint32_t timeout;\n"
+    c_code += "    if (n >= RCC_PROFILE_COUNT) return;\n    p = &RCC_ClockProfiles[n];\n\n"
+    if quiesce_code:
+        c_code += "    // Let clock-dependent peripherals finish and stop them while their clock changes\n"
+        c_code += quiesce_code + "\n"
+    c_code += "    // More flash wait states before any clock goes up\n"
+    c_code += f"    if ((p->flash_acr & 0x{FLASH_ACR_LATENCY_Msk:X}UL) > (FLASH->ACR & 0x{FLASH_ACR_LATENCY_Msk:X}UL)) {{\n"
+    c_code += f"        FLASH->ACR = p->flash_acr;\n        while ((FLASH->ACR & 0x{FLASH_ACR_LATENCY_Msk:X}UL) != (p->flash_acr & 0x{FLASH_ACR_LATENCY_Msk:X}UL));\n    }}\n"
+    c_code += f"    if (p->uses_hse && !(RCC->CR & 0x{RCC_CR_HSERDY:X}UL)) {{\n"
+    c_code += f"        RCC->CR |= 0x{RCC_CR_HSEON:X}UL; timeout = 5000; while (!(RCC->CR & 0x{RCC_CR_HSERDY:X}UL) && timeout--);\n    }}\n\n"
+    if has_pwr_cr:
+        c_code += f"    RCC->APB1ENR |= 0x{RCC_APB1ENR_PWREN:X}UL;\n"
+    c_code += f"    pll_relock = p->uses_pll && (!(RCC->CR & 0x{RCC_CR_PLLRDY:X}UL) || {pll_differs});\n"
+    c_code += f"    sysclk_detour = pll_relock || (RCC->CFGR & 0x{sws_mask:X}UL) != {sw_to_sws};\n"
+    c_code += "    if (sysclk_detour) { // Park SYSCLK on HSI: safe for any prescaler, flash and VOS setting\n"
+    c_code += f"        RCC->CR |= 0x{RCC_CR_HSION:X}UL; while (!(RCC->CR & 0x{RCC_CR_HSIRDY:X}UL));\n"
+    c_code += f"        RCC->CFGR &= ~0x{sw_mask:X}UL; timeout = 5000; while ((RCC->CFGR & 0x{sws_mask:X}UL) && timeout--);\n"
+    if has_overdrive:
+        c_code += f"        if (!(p->pwr_cr & 0x{PWR_CR_ODEN:X}UL)) PWR->CR &= ~0x{PWR_CR_ODEN | PWR_CR_ODSWEN:X}UL; // Leave over-drive\n"
+    c_code += "    }\n"
+    c_code += f"    RCC->CFGR = (RCC->CFGR & ~0x{cfgr_prescaler_mask:X}UL) | (p->cfgr & 0x{cfgr_prescaler_mask:X}UL);\n"
+    c_code += "    if (pll_relock) {\n"
+    c_code += f"        RCC->CR &= ~0x{RCC_CR_PLLON:X}UL; while (RCC->CR & 0x{RCC_CR_PLLRDY:X}UL);\n"
+    if has_pwr_cr:
+        c_code += f"        PWR->CR = (PWR->CR & ~0x{0x3 << PWR_CR_VOS_Pos:X}UL) | (p->pwr_cr & 0x{0x3 << PWR_CR_VOS_Pos:X}UL);\n"
+    if has_pllcfgr:
+        c_code += "        RCC->PLLCFGR = p->pllcfgr;\n"
+    else:
+        c_code += f"        RCC->CFGR = (RCC->CFGR & ~0x{cfgr_pll_mask:X}UL) | (p->cfgr & 0x{cfgr_pll_mask:X}UL);\n"
+    c_code += f"        RCC->CR |= 0x{RCC_CR_PLLON:X}UL; timeout = 5000; while (!(RCC->CR & 0x{RCC_CR_PLLRDY:X}UL) && timeout--);\n"
+    if has_overdrive:
+        c_code += f"        if (p->pwr_cr & 0x{PWR_CR_ODEN:X}UL) {{\n"
+        c_code += f"            PWR->CR |= 0x{PWR_CR_ODEN:X}UL; while (!(PWR->CSR & 0x{PWR_CSR_ODRDY:X}UL));\n"
+        c_code += f"            PWR->CR |= 0x{PWR_CR_ODSWEN:X}UL; while (!(PWR->CSR & 0x{PWR_CSR_ODSWRDY:X}UL));\n        }}\n"
+    c_code += "    }\n"
+    c_code += "    if (sysclk_detour) {\n"
+    c_code += f"        RCC->CFGR = (RCC->CFGR & ~0x{sw_mask:X}UL) | (p->cfgr & 0x{sw_mask:X}UL);\n"
+    c_code += f"        timeout = 5000; while ((RCC->CFGR & 0x{sws_mask:X}UL) != {sw_to_sws} && timeout--);\n    }}\n"
+    c_code += f"    if (!p->uses_pll && (RCC->CR & 0x{RCC_CR_PLLON:X}UL)) {{\n"
+    c_code += f"        RCC->CR &= ~0x{RCC_CR_PLLON:X}UL; // Not needed by this profile\n"
+    if has_pwr_cr:
+        c_code += f"        PWR->CR = (PWR->CR & ~0x{0x3 << PWR_CR_VOS_Pos:X}UL) | (p->pwr_cr & 0x{0x3 << PWR_CR_VOS_Pos:X}UL);\n"
+    c_code += "    }\n"
+    c_code += "    FLASH->ACR = p->flash_acr; // Fewer wait states only now that the clock is down\n\n"
+    if retune_code:
+        c_code += "    // Clock-dependent peripheral registers for this profile\n"
+        c_code += retune_code + "\n"
+    c_code += "    SystemCoreClock = p->hclk_hz;\n}\n"
+    return {"source_function": c_code, "init_call": "", "error_messages": errors}
@@ -1,4 +1,5 @@
-from core.mcu_defines_loader import CURRENT_MCU_DEFINES
+from core.define_resolver import resolve_defines
+from core.mcu_defines_loader import load_register_db
 
 
 def generate_dac_code_cmsis(config):
@@ -7,6 +8,8 @@ def generate_dac_code_cmsis(config):
     channels_config = params.get("channels", [])
     mcu_family = params.get("mcu_family", "STM32F4")
     target_device = params.get("target_device", "STM32F407VG")
+    defines = resolve_defines(mcu_family, target_device)
+    regs = load_register_db(mcu_family, target_device)
 
     error_messages = []
     rcc_clocks_to_enable = []
@@ -20,15 +23,14 @@ def generate_dac_code_cmsis(config):
                 "gpio_pins_to_configure_analog": [], "error_messages": []}
 
     # Check DAC availability on target
-    target_mcu_info = CURRENT_MCU_DEFINES.get('TARGET_DEVICES', {}).get(target_device, {})
+    target_mcu_info = defines.get('TARGET_DEVICES', {}).get(target_device, {})
     dac_instances_on_mcu = target_mcu_info.get("dac_instances", [])
     if not dac_instances_on_mcu:
         error_messages.append(f"DAC peripheral is not available on {target_device}.")
         return {"source_function": f"// DAC not available on {target_device}\n", "error_messages": error_messages}
 
     # Get DAC peripheral info (RCC macro, bit positions)
-    dac_info_map_key = f"DAC_PERIPHERALS_INFO_{mcu_family}"
-    dac_info_map = CURRENT_MCU_DEFINES.get(dac_info_map_key, CURRENT_MCU_DEFINES.get("DAC_PERIPHERALS_INFO", {}))
+    dac_info_map = defines.get("DAC_PERIPHERALS_INFO", {})
     # Assume dac_instances_on_mcu[0] is the name of the DAC block (e.g., "DAC1")
     dac_block_name_for_rcc = dac_instances_on_mcu[0]
     dac_block_info = dac_info_map.get(dac_block_name_for_rcc, {})
@@ -39,15 +41,15 @@ def generate_dac_code_cmsis(config):
     else:
         error_messages.append(f"RCC macro not found for DAC on {target_device}")
 
-    # Get bit positions from CURRENT_MCU_DEFINES (with fallbacks to F4 style if not found)
-    DAC_CR_EN1_Pos = CURRENT_MCU_DEFINES.get("DAC_CR_EN1_Pos", 0)
-    DAC_CR_BOFF1_Pos = CURRENT_MCU_DEFINES.get("DAC_CR_BOFF1_Pos", 1)
-    DAC_CR_TEN1_Pos = CURRENT_MCU_DEFINES.get("DAC_CR_TEN1_Pos", 2)
-    DAC_CR_TSEL1_Pos = CURRENT_MCU_DEFINES.get("DAC_CR_TSEL1_Pos", 3)
-    DAC_CR_WAVE1_Pos = CURRENT_MCU_DEFINES.get("DAC_CR_WAVE1_Pos", 6)
-    DAC_CR_DMAEN1_Pos = CURRENT_MCU_DEFINES.get("DAC_CR_DMAEN1_Pos", 12)
+    # Get bit positions from the resolved defines (with fallbacks to F4 style if not found)
+    DAC_CR_EN1_Pos = regs.pos("DAC_CR_EN1", 0)
+    DAC_CR_BOFF1_Pos = regs.pos("DAC_CR_BOFF1", 1)
+    DAC_CR_TEN1_Pos = regs.pos("DAC_CR_TEN1", 2)
+    DAC_CR_TSEL1_Pos = regs.pos("DAC_CR_TSEL1", 3)
+    DAC_CR_WAVE1_Pos = regs.pos("DAC_CR_WAVE1", 6)
+    DAC_CR_DMAEN1_Pos = regs.pos("DAC_CR_DMAEN1", 12)
     # CR offset for channel 2 (usually +16 for EN2, BOFF2 etc.)
-    DAC_CH2_CR_OFFSET = CURRENT_MCU_DEFINES.get("DAC_CH2_CR_OFFSET", 16)
+    DAC_CH2_CR_OFFSET = defines.get("DAC_CH2_CR_OFFSET", 16)
 
     source_function += f"void {dac_instance_name}_User_Init(void) {{\n"
     source_function += f"    // {dac_instance_name} ({mcu_family}) Configuration (CMSIS Register Level)\n\n"
@@ -59,22 +61,19 @@ def generate_dac_code_cmsis(config):
         cr_offset = 0 if channel_id == 1 else DAC_CH2_CR_OFFSET
 
         ob_str = ch_cfg.get("output_buffer_str", "Enabled")
-        ob_options_key = f"DAC_OUTPUT_BUFFER_OPTIONS_{mcu_family}"
-        ob_options = CURRENT_MCU_DEFINES.get(ob_options_key, CURRENT_MCU_DEFINES.get("DAC_OUTPUT_BUFFER_OPTIONS", {}))
+        ob_options = defines.get("DAC_OUTPUT_BUFFER_OPTIONS", {})
         if ob_options.get(ob_str, 0) == 1:  # Buffer Disabled
             cr_val |= (1 << (DAC_CR_BOFF1_Pos + cr_offset))
 
         if ch_cfg.get("trigger_enabled"):
             cr_val |= (1 << (DAC_CR_TEN1_Pos + cr_offset))
             tsel_str = ch_cfg.get("trigger_source_str", "Software")
-            tsel_map_key = f"DAC_TRIGGER_SOURCES_{mcu_family}"
-            tsel_map = CURRENT_MCU_DEFINES.get(tsel_map_key, CURRENT_MCU_DEFINES.get("DAC_TRIGGER_SOURCES", {}))
+            tsel_map = defines.get("DAC_TRIGGER_SOURCES", {})
             tsel_bits = tsel_map.get(tsel_str, 0b111)  # Default Software
             cr_val |= (tsel_bits << (DAC_CR_TSEL1_Pos + cr_offset))
 
         wave_str = ch_cfg.get("wave_generation_str", "Disabled")
-        wave_map_key = f"DAC_WAVE_GENERATION_{mcu_family}"
-        wave_map = CURRENT_MCU_DEFINES.get(wave_map_key, CURRENT_MCU_DEFINES.get("DAC_WAVE_GENERATION", {}))
+        wave_map = defines.get("DAC_WAVE_GENERATION", {})
         wave_bits = wave_map.get(wave_str, 0b00)
         if wave_bits != 0b00:
             cr_val |= (wave_bits << (DAC_CR_WAVE1_Pos + cr_offset))
@@ -84,9 +83,7 @@ def generate_dac_code_cmsis(config):
         if ch_cfg.get("dma_enabled"): cr_val |= (1 << (DAC_CR_DMAEN1_Pos + cr_offset))
         cr_val |= (1 << (DAC_CR_EN1_Pos + cr_offset))  # Enable Channel
 
-        dac_output_pins_map_key = f"DAC_OUTPUT_PINS_{mcu_family}"
-        dac_output_pins_map = CURRENT_MCU_DEFINES.get(dac_output_pins_map_key,
-                                                      CURRENT_MCU_DEFINES.get("DAC_OUTPUT_PINS", {}))
+        dac_output_pins_map = defines.get("DAC_OUTPUT_PINS", {})
         pin_str = dac_output_pins_map.get(target_device, {}).get(f"DAC_OUT{channel_id}")
         if pin_str:
             port_char = pin_str[1];
@@ -1,10 +1,21 @@
-from core.mcu_defines_loader import CURRENT_MCU_DEFINES
+from core.clock_tree import timer_kernel_clock_hz
+from core.define_resolver import resolve_defines
+from core.mcu_defines_loader import load_register_db
+
+
+def dwt_cyccnt_enable_code(indent="    ", reset_counter=True):
+    """C lines that start the DWT cycle counter (trace enable, CYCCNT reset, CYCCNTENA)."""
+    c_code = f"{indent}CoreDebug->DEMCR |= CoreDebug_DEMCR_TRCENA;\n"
+    if reset_counter: c_code += f"{indent}DWT->CYCCNT = 0;\n"  # Reset counter first
+    return c_code + f"{indent}DWT->CTRL |= DWT_CTRL_CYCCNTENA;\n"
 
 
 def generate_delay_code_cmsis(config, rcc_config_calculated):
     params = config.get("params", {})
     mcu_family = params.get("mcu_family", "STM32F4")
     target_device = params.get("target_device", "STM32F407VG")
+    defines = resolve_defines(mcu_family, target_device)
+    regs = load_register_db(mcu_family, target_device)
 
     source_function_blocks = []
     init_calls = []
@@ -20,16 +31,16 @@ def generate_delay_code_cmsis(config, rcc_config_calculated):
         return {"source_function": "// No Delay functions selected\n", "init_call": "",
                 "rcc_clocks_to_enable": [], "default_helper_functions": "", "error_messages": []}
 
-    # Get bit positions and constants from CURRENT_MCU_DEFINES
-    DWT_CTRL_CYCCNTENA_Pos = CURRENT_MCU_DEFINES.get("DWT_CTRL_CYCCNTENA_Pos", 0)
+    # Get bit positions and constants from the resolved defines
+    DWT_CTRL_CYCCNTENA_Pos = regs.pos("DWT_CTRL_CYCCNTENA", 0)
     DWT_CTRL_CYCCNTENA = (1 << DWT_CTRL_CYCCNTENA_Pos)
-    CoreDebug_DEMCR_TRCENA_Pos = CURRENT_MCU_DEFINES.get("CoreDebug_DEMCR_TRCENA_Pos", 24)
+    CoreDebug_DEMCR_TRCENA_Pos = regs.pos("CoreDebug_DEMCR_TRCENA", 24)
     CoreDebug_DEMCR_TRCENA = (1 << CoreDebug_DEMCR_TRCENA_Pos)
-    TIM_CR1_CEN_Pos = CURRENT_MCU_DEFINES.get("TIM_CR1_CEN_Pos", 0);
+    TIM_CR1_CEN_Pos = regs.pos("TIM_CR1_CEN", 0);
     TIM_CR1_CEN = (1 << TIM_CR1_CEN_Pos)  # From F4 defines
-    TIM_CR1_URS_Pos = CURRENT_MCU_DEFINES.get("TIM_CR1_URS_Pos", 2);
+    TIM_CR1_URS_Pos = regs.pos("TIM_CR1_URS", 2);
     TIM_CR1_URS = (1 << TIM_CR1_URS_Pos)
-    TIM_EGR_UG_Pos = CURRENT_MCU_DEFINES.get("TIM_EGR_UG_Pos", 0);
+    TIM_EGR_UG_Pos = regs.pos("TIM_EGR_UG", 0);
     TIM_EGR_UG = (1 << TIM_EGR_UG_Pos)
 
     if delay_source == "SysTick":
@@ -61,9 +72,8 @@ def generate_delay_code_cmsis(config, rcc_config_calculated):
             error_messages.append("DWT delay: SystemCoreClock (SYSCLK) freq needed.")
         elif gen_us:
             dwt_init_func = "void DWT_Delay_Init(void) {\n"
-            dwt_init_func += f"    CoreDebug->DEMCR |= CoreDebug_DEMCR_TRCENA;\n"
-            dwt_init_func += f"    DWT->CYCCNT = 0;\n"  # Reset counter first
-            dwt_init_func += f"    DWT->CTRL |= DWT_CTRL_CYCCNTENA;\n}}\n"
+            # With boot profiling main() already runs CYCCNT; a reset would break the stage counts
+            dwt_init_func += dwt_cyccnt_enable_code(reset_counter=not config.get("boot_profiling")) + "}\n"
             source_function_blocks.append(dwt_init_func);
             init_calls.append("DWT_Delay_Init();")
             default_helper_functions_code += "\n// DWT Cycle Counter based microsecond delay (blocking)\n"
@@ -76,9 +86,7 @@ def generate_delay_code_cmsis(config, rcc_config_calculated):
 
     elif delay_source == "TIMx (General Purpose Timer)":
         timer_instance = params.get("delay_timer_instance")
-        timer_info_map_key = f"TIMER_PERIPHERALS_INFO_{mcu_family}"
-        timer_info_map = CURRENT_MCU_DEFINES.get(timer_info_map_key,
-                                                 CURRENT_MCU_DEFINES.get("TIMER_PERIPHERALS_INFO", {}))
+        timer_info_map = defines.get("TIMER_PERIPHERALS_INFO", {})
         timer_info = timer_info_map.get(timer_instance, {}) if timer_instance else {}
 
         if not timer_instance or not timer_info:
@@ -86,11 +94,7 @@ def generate_delay_code_cmsis(config, rcc_config_calculated):
         else:
             rcc_clocks_to_enable.append(timer_info["rcc_macro"])
             timer_apb_bus = timer_info.get("bus", "APB1")
-            pclk_key = "pclk1_freq_hz" if timer_apb_bus == "APB1" else "pclk2_freq_hz"
-            apb_div_key = "apb1_div" if timer_apb_bus == "APB1" else "apb2_div"
-            apb_clk = rcc_config_calculated.get(pclk_key, 0)
-            apb_div = rcc_config_calculated.get(apb_div_key, 1)
-            timer_kernel_clk = apb_clk if apb_div == 1 else apb_clk * 2
+            timer_kernel_clk = timer_kernel_clock_hz(rcc_config_calculated, timer_apb_bus)
 
             if timer_kernel_clk == 0:
                 error_messages.append(f"Kernel clock for {timer_instance} is 0Hz.")
@@ -125,7 +129,7 @@ def generate_delay_code_cmsis(config, rcc_config_calculated):
                         default_helper_functions_code += f" /* Requires {timer_instance}_Delay_us */ volatile uint32_t k=({timer_kernel_clk}/1000)/4; while(k--);}}\n}}\n"
 
     elif delay_source == "Simple Loop (Blocking, Inaccurate)":
-        sysclk_loop = rcc_config_calculated.get("sysclk_freq_hz", CURRENT_MCU_DEFINES.get("HSI_VALUE_HZ", 16000000))
+        sysclk_loop = rcc_config_calculated.get("sysclk_freq_hz", defines.get("HSI_VALUE_HZ", 16000000))
         if gen_us:
             default_helper_functions_code += "\n// Simple loop microsecond delay (inaccurate)\n"
             default_helper_functions_code += "void Loop_Delay_us(uint32_t us) {\n"
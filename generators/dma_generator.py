@@ -1,10 +1,13 @@
-from core.mcu_defines_loader import CURRENT_MCU_DEFINES
+from core.define_resolver import resolve_defines
+from core.mcu_defines_loader import load_register_db
 
 
 def generate_dma_code_cmsis(config):
     params = config.get("params", {})  # Full config passed, params inside
     mcu_family = params.get("mcu_family", "STM32F4")
     target_device = params.get("target_device", "STM32F407VG")
+    defines = resolve_defines(mcu_family, target_device)
+    regs = load_register_db(mcu_family, target_device)
     dma_items_config = params.get("dma_items", [])  # Renamed from "streams"
 
     error_messages = []
@@ -20,52 +23,45 @@ def generate_dma_code_cmsis(config):
     dma_init_code = f"void {dma_init_func_name}(void) {{\n"
     dma_init_code += f"    // DMA Configuration ({mcu_family} - CMSIS Register Level)\n\n"
 
-    # Get bit positions and maps from CURRENT_MCU_DEFINES
+    # Get bit positions and maps from the resolved defines
     # F2/F4 Stream specific (SxCR)
-    DMA_SxCR_EN_Pos = CURRENT_MCU_DEFINES.get("DMA_SxCR_EN_Pos", 0)
-    DMA_SxCR_CHSEL_Pos = CURRENT_MCU_DEFINES.get("DMA_SxCR_CHSEL_Pos", 25)
-    DMA_SxCR_CHSEL_Msk = CURRENT_MCU_DEFINES.get("DMA_SxCR_CHSEL_Msk", (0x7 << 25))
-    DMA_SxCR_PFCTRL_Pos = CURRENT_MCU_DEFINES.get("DMA_SxCR_PFCTRL_Pos", 5)
-    DMA_SxCR_CIRC_Pos = CURRENT_MCU_DEFINES.get("DMA_SxCR_CIRC_Pos", 8)
+    DMA_SxCR_EN_Pos = regs.pos("DMA_SxCR_EN", 0)
+    DMA_SxCR_CHSEL_Pos = regs.pos("DMA_SxCR_CHSEL", 25)
+    DMA_SxCR_CHSEL_Msk = regs.mask("DMA_SxCR_CHSEL", (0x7 << 25))
+    DMA_SxCR_PFCTRL_Pos = regs.pos("DMA_SxCR_PFCTRL", 5)
+    DMA_SxCR_CIRC_Pos = regs.pos("DMA_SxCR_CIRC", 8)
     # F1 Channel specific (CCRx) - names are different, map them conceptually
-    DMA_CCRx_EN_Pos = CURRENT_MCU_DEFINES.get("DMA_CCRx_EN_Pos", 0)  # F1: EN in CCR
-    DMA_CCRx_CIRC_Pos = CURRENT_MCU_DEFINES.get("DMA_CCRx_CIRC_Pos", 5)  # F1: CIRC in CCR
-
-    # Common concepts (positions might differ slightly but map to same idea)
-    DMA_DIR_Pos = CURRENT_MCU_DEFINES.get(f"DMA_DIR_Pos_{mcu_family}", CURRENT_MCU_DEFINES.get("DMA_SxCR_DIR_Pos", 6))
-    DMA_DIR_Msk = CURRENT_MCU_DEFINES.get(f"DMA_DIR_Msk_{mcu_family}",
-                                          CURRENT_MCU_DEFINES.get("DMA_SxCR_DIR_Msk", (0x3 << 6)))
-    DMA_DIRECTIONS = CURRENT_MCU_DEFINES.get("DMA_DIRECTIONS", {})
-
-    DMA_MINC_Pos = CURRENT_MCU_DEFINES.get(f"DMA_MINC_Pos_{mcu_family}",
-                                           CURRENT_MCU_DEFINES.get("DMA_SxCR_MINC_Pos", 10))
-    DMA_PINC_Pos = CURRENT_MCU_DEFINES.get(f"DMA_PINC_Pos_{mcu_family}",
-                                           CURRENT_MCU_DEFINES.get("DMA_SxCR_PINC_Pos", 9))
-    DMA_INCREMENT_MODES = CURRENT_MCU_DEFINES.get("DMA_INCREMENT_MODES", {})
-
-    DMA_MSIZE_Pos = CURRENT_MCU_DEFINES.get(f"DMA_MSIZE_Pos_{mcu_family}",
-                                            CURRENT_MCU_DEFINES.get("DMA_SxCR_MSIZE_Pos", 13))
-    DMA_PSIZE_Pos = CURRENT_MCU_DEFINES.get(f"DMA_PSIZE_Pos_{mcu_family}",
-                                            CURRENT_MCU_DEFINES.get("DMA_SxCR_PSIZE_Pos", 11))
-    DMA_DATA_SIZES = CURRENT_MCU_DEFINES.get("DMA_DATA_SIZES", {})
-
-    DMA_PL_Pos = CURRENT_MCU_DEFINES.get(f"DMA_PL_Pos_{mcu_family}", CURRENT_MCU_DEFINES.get("DMA_SxCR_PL_Pos", 16))
-    DMA_PRIORITIES = CURRENT_MCU_DEFINES.get("DMA_PRIORITIES", {})
-
-    DMA_TCIE_Pos = CURRENT_MCU_DEFINES.get(f"DMA_TCIE_Pos_{mcu_family}",
-                                           CURRENT_MCU_DEFINES.get("DMA_SxCR_TCIE_Pos", 4))
-    DMA_HTIE_Pos = CURRENT_MCU_DEFINES.get(f"DMA_HTIE_Pos_{mcu_family}",
-                                           CURRENT_MCU_DEFINES.get("DMA_SxCR_HTIE_Pos", 3))
-    DMA_TEIE_Pos = CURRENT_MCU_DEFINES.get(f"DMA_TEIE_Pos_{mcu_family}",
-                                           CURRENT_MCU_DEFINES.get("DMA_SxCR_TEIE_Pos", 2))
+    DMA_CCRx_EN_Pos = regs.pos("DMA_CCRx_EN", 0)  # F1: EN in CCR
+    DMA_CCRx_CIRC_Pos = regs.pos("DMA_CCRx_CIRC", 5)  # F1: CIRC in CCR
+
+    # Common concepts: same bits, but SxCR on F2/F4 streams and CCRx on F1 channels
+    cr_bits = "DMA_SxCR" if mcu_family in ["STM32F2", "STM32F4"] else "DMA_CCRx"
+    DMA_DIR_Pos = regs.pos(f"{cr_bits}_DIR", 6)
+    DMA_DIR_Msk = regs.mask(f"{cr_bits}_DIR", (0x3 if cr_bits == "DMA_SxCR" else 0x1) << DMA_DIR_Pos)
+    DMA_DIRECTIONS = defines.get("DMA_DIRECTIONS", {})
+
+    DMA_MINC_Pos = regs.pos(f"{cr_bits}_MINC", 10)
+    DMA_PINC_Pos = regs.pos(f"{cr_bits}_PINC", 9)
+    DMA_INCREMENT_MODES = defines.get("DMA_INCREMENT_MODES", {})
+
+    DMA_MSIZE_Pos = regs.pos(f"{cr_bits}_MSIZE", 13)
+    DMA_PSIZE_Pos = regs.pos(f"{cr_bits}_PSIZE", 11)
+    DMA_DATA_SIZES = defines.get("DMA_DATA_SIZES", {})
+
+    DMA_PL_Pos = regs.pos(f"{cr_bits}_PL", 16)
+    DMA_PRIORITIES = defines.get("DMA_PRIORITIES", {})
+
+    DMA_TCIE_Pos = regs.pos(f"{cr_bits}_TCIE", 4)
+    DMA_HTIE_Pos = regs.pos(f"{cr_bits}_HTIE", 3)
+    DMA_TEIE_Pos = regs.pos(f"{cr_bits}_TEIE", 2)
 
     # F2/F4 FIFO specific
-    DMA_SxFCR_DMDIS_Pos = CURRENT_MCU_DEFINES.get("DMA_SxFCR_DMDIS_Pos", 2)
-    DMA_SxFCR_FTH_Pos = CURRENT_MCU_DEFINES.get("DMA_SxFCR_FTH_Pos", 0)
-    DMA_SxFCR_FEIE_Pos = CURRENT_MCU_DEFINES.get("DMA_SxFCR_FEIE_Pos", 7)
-    DMA_DMEIE_Pos = CURRENT_MCU_DEFINES.get("DMA_DMEIE_Pos", 1)  # In SxCR for F2/F4
-    DMA_FIFO_MODES = CURRENT_MCU_DEFINES.get("DMA_FIFO_MODES", {})
-    DMA_FIFO_THRESHOLDS = CURRENT_MCU_DEFINES.get("DMA_FIFO_THRESHOLDS", {})
+    DMA_SxFCR_DMDIS_Pos = regs.pos("DMA_SxFCR_DMDIS", 2)
+    DMA_SxFCR_FTH_Pos = regs.pos("DMA_SxFCR_FTH", 0)
+    DMA_SxFCR_FEIE_Pos = regs.pos("DMA_SxFCR_FEIE", 7)
+    DMA_DMEIE_Pos = regs.pos("DMA_DMEIE", 1)  # In SxCR for F2/F4
+    DMA_FIFO_MODES = defines.get("DMA_FIFO_MODES", {})
+    DMA_FIFO_THRESHOLDS = defines.get("DMA_FIFO_THRESHOLDS", {})
 
     dma_item_label = "Stream" if mcu_family in ["STM32F2", "STM32F4"] else "Channel"
 
@@ -76,8 +72,7 @@ def generate_dma_code_cmsis(config):
         item_id_num = item_cfg.get("id_num", 0)  # Stream or Channel number
         item_ptr_cmsis = f"{dma_controller}_{dma_item_label}{item_id_num}"  # e.g. DMA1_Stream0 or DMA1_Channel1
 
-        dma_info_map_key = f"DMA_PERIPHERALS_INFO_{mcu_family}"
-        dma_info_map = CURRENT_MCU_DEFINES.get(dma_info_map_key, CURRENT_MCU_DEFINES.get("DMA_PERIPHERALS_INFO", {}))
+        dma_info_map = defines.get("DMA_PERIPHERALS_INFO", {})
         dma_ctrl_info = dma_info_map.get(dma_controller, {})
         if dma_ctrl_info.get("rcc_macro"):
             rcc_clocks_to_enable.add(dma_ctrl_info["rcc_macro"])
@@ -115,8 +110,7 @@ def generate_dma_code_cmsis(config):
         cr_val |= (DMA_DIRECTIONS.get(item_cfg.get("direction_str"), 0b00) << DMA_DIR_Pos) & DMA_DIR_Msk
 
         mode_str = item_cfg.get("mode_str", "Normal")
-        dma_modes_key = f"DMA_MODES_{mcu_family}"
-        dma_modes_map = CURRENT_MCU_DEFINES.get(dma_modes_key, CURRENT_MCU_DEFINES.get("DMA_MODES", {}))
+        dma_modes_map = defines.get("DMA_MODES", {})
 
         if dma_modes_map.get(mode_str) == 1:  # Circular
             circ_pos = DMA_SxCR_CIRC_Pos if mcu_family in ["STM32F2", "STM32F4"] else DMA_CCRx_CIRC_Pos
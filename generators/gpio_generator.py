@@ -1,12 +1,41 @@
 # --- MODIFIED FILE generators/gpio_generator.py ---
-from core.mcu_defines_loader import CURRENT_MCU_DEFINES
+from core.mcu_defines_loader import load_register_db
+from core.define_resolver import resolve_defines
+from core.pin_af_db import EMPTY_PIN_AF_DB, load_pin_af_db
+from generators.register_ir import RegisterProgram, render_init_body
+
+# Batched mode: register write order per port. Pull/speed/type/AF settle before MODER (CRL/CRH on F1)
+# switches the pin, so no pin glitches through a half-configured state.
+GPIO_PORT_REGISTER_ORDER = ("ODR", "OSPEEDR", "OTYPER", "PUPDR", "AFR[0]", "AFR[1]", "MODER", "CRL", "CRH")
+GPIO_16BIT_REGISTERS = ("ODR", "OTYPER")
 
 
 def get_port_base_name(pin_id_prefix_char):
     return f"GPIO{pin_id_prefix_char.upper()}"
 
 
-def generate_f1_gpio_code(port_base, pin_num, pin_cfg, error_messages, rcc_clocks_to_enable):
+def _add_port_field(port_fields, reg_name, mask, value):
+    """Accumulate one pin's bits of a port register: port_fields[reg_name] = [mask, value]."""
+    field = port_fields.setdefault(reg_name, [0, 0])
+    field[0] |= mask; field[1] = (field[1] & ~mask) | value
+
+
+def add_port_register_ops(port_code, port_base, port_fields):
+    """One write per register of the port: a plain store if all pins are configured, else one masked RMW."""
+    if not port_fields: return  # Only pins with errors on this port
+    for reg_name in GPIO_PORT_REGISTER_ORDER:
+        if reg_name not in port_fields: continue
+        mask, value = port_fields[reg_name]
+        full_mask = 0xFFFF if reg_name in GPIO_16BIT_REGISTERS else 0xFFFFFFFF
+        if mask == full_mask:
+            port_code.write(f"{port_base}->{reg_name}", value, "All pins")
+        else:
+            port_code.modify(f"{port_base}->{reg_name}", mask, value)
+    port_code.blank()
+
+
+def generate_f1_gpio_code(port_base, pin_num, pin_cfg, defines, error_messages, rcc_clocks_to_enable, port_fields=None):
+    """Code for one F1 pin (defines: resolve_defines() index); with port_fields (batched mode) the register bits are collected there instead."""
     c_code_pin = ""
     # Get UI strings, providing F1-style defaults if not present
     mode_str = pin_cfg.get("mode", "Input Floating")
@@ -15,8 +44,8 @@ def generate_f1_gpio_code(port_base, pin_num, pin_cfg, error_messages, rcc_clock
     af_remap_str = pin_cfg.get("af")
 
     # Get F1 specific MODE and CNF bit values from defines
-    f1_mode_map_ui = CURRENT_MCU_DEFINES.get("GPIO_F1_MODE_MAP_UI", {})
-    f1_speed_to_mode_bits = CURRENT_MCU_DEFINES.get("GPIO_F1_SPEED_TO_MODE_BITS_MAP", {})
+    f1_mode_map_ui = defines.get("GPIO_F1_MODE_MAP_UI", {})
+    f1_speed_to_mode_bits = defines.get("GPIO_F1_SPEED_TO_MODE_BITS_MAP", {})
 
     mode_bits_val = 0
     cnf_bits_val = 0
@@ -31,7 +60,7 @@ def generate_f1_gpio_code(port_base, pin_num, pin_cfg, error_messages, rcc_clock
         if mode_bits_val is None:
             error_messages.append(
                 f"Unknown F1 speed '{speed_str}' for output mode on {port_base} Pin {pin_num}. Defaulting to 10MHz.")
-            mode_bits_val = CURRENT_MCU_DEFINES.get("GPIO_F1_MODE_OUTPUT_10MHZ", 0b01)  # Fallback
+            mode_bits_val = defines.get("GPIO_F1_MODE_OUTPUT_10MHZ", 0b01)  # Fallback
         cnf_bits_val = ui_mode_config.get("CNF_BASE")
     else:  # Input modes
         mode_bits_val = ui_mode_config.get("MODE")
@@ -47,41 +76,47 @@ def generate_f1_gpio_code(port_base, pin_num, pin_cfg, error_messages, rcc_clock
     pin_offset_in_reg = (pin_num % 8) * 4
 
     c_code_pin += f"    // Configure {port_base} Pin {pin_num} ({mode_str})\n"
-    c_code_pin += f"    {port_base}->{reg_name} &= ~(0xFUL << {pin_offset_in_reg}); // Clear previous 4 bits for P{pin_num}\n"
-    c_code_pin += f"    {port_base}->{reg_name} |= ({config_val_4bit}UL << {pin_offset_in_reg}); // MODE={mode_bits_val:02b}, CNF={cnf_bits_val:02b}\n"
+    if port_fields is not None:
+        _add_port_field(port_fields, reg_name, 0xF << pin_offset_in_reg, config_val_4bit << pin_offset_in_reg)
+        if mode_str in ("Input Pull-up", "Input Pull-down"):  # ODR bit selects the pull: 1=UP, 0=DOWN
+            _add_port_field(port_fields, "ODR", 1 << pin_num, (mode_str == "Input Pull-up") << pin_num)
+    else:
+        c_code_pin += f"    {port_base}->{reg_name} &= ~(0xFUL << {pin_offset_in_reg}); // Clear previous 4 bits for P{pin_num}\n"
+        c_code_pin += f"    {port_base}->{reg_name} |= ({config_val_4bit}UL << {pin_offset_in_reg}); // MODE={mode_bits_val:02b}, CNF={cnf_bits_val:02b}\n"
 
     # Handle Pull-up/Pull-down for "Input Pull-up" or "Input Pull-down" modes from UI
-    if mode_str == "Input Pull-up":
+    if port_fields is None and mode_str == "Input Pull-up":
         # For Input Pull-up/Pull-down mode (CNF=10), ODR bit selects pull: 1=UP, 0=DOWN
         c_code_pin += f"    {port_base}->ODR |= (1UL << {pin_num}); // Enable Pull-up\n"
-    elif mode_str == "Input Pull-down":
+    elif port_fields is None and mode_str == "Input Pull-down":
         c_code_pin += f"    {port_base}->ODR &= ~(1UL << {pin_num}); // Enable Pull-down (by clearing ODR bit)\n"
 
     if ui_mode_config.get("IS_AF", False) and af_remap_str:
         c_code_pin += f"    // AF/Remap Hint for Pin {pin_num}: '{af_remap_str}'. Ensure AFIO clock & AFIO_MAPR are correctly set if remap is used.\n"
-        afio_rcc_macro = CURRENT_MCU_DEFINES.get("RCC_APB2ENR_AFIOEN")  # From F1 defines
-        if afio_rcc_macro and afio_rcc_macro not in rcc_clocks_to_enable:
+        afio_rcc_macro = "RCC_APB2ENR_AFIOEN"  # Macro name, like the port clocks (the defines hold its bit value)
+        if afio_rcc_macro not in rcc_clocks_to_enable:
             rcc_clocks_to_enable.append(afio_rcc_macro)
 
     return c_code_pin
 
 
-def generate_f2_f4_gpio_code(port_base, pin_num, pin_cfg, error_messages):
+def generate_f2_f4_gpio_code(port_base, pin_num, pin_cfg, defines, error_messages, pin_af_db=EMPTY_PIN_AF_DB, port_fields=None):
+    """Code for one F2/F4 pin (defines: resolve_defines() index); with port_fields (batched mode) the register bits are collected there instead."""
     c_code_pin = ""
     mode_str = pin_cfg.get("mode", "Input")
     pull_str = pin_cfg.get("pull", "No Pull-up/Pull-down")
     speed_str = pin_cfg.get("speed", "Low")
     af_val_str = pin_cfg.get("af")
 
-    MODE_INPUT = CURRENT_MCU_DEFINES.get("GPIO_MODE_INPUT_VAL", 0b00)
-    MODE_OUTPUT = CURRENT_MCU_DEFINES.get("GPIO_MODE_OUTPUT_VAL", 0b01)
-    MODE_AF = CURRENT_MCU_DEFINES.get("GPIO_MODE_AF_VAL", 0b10)
-    MODE_ANALOG = CURRENT_MCU_DEFINES.get("GPIO_MODE_ANALOG_VAL", 0b11)
-    OTYPE_PP = CURRENT_MCU_DEFINES.get("GPIO_OTYPE_PP_VAL", 0)
-    OTYPE_OD = CURRENT_MCU_DEFINES.get("GPIO_OTYPE_OD_VAL", 1)
-    SPEED_MAP = CURRENT_MCU_DEFINES.get("GPIO_OSPEED_MAP", {"Low": 0b00, "Medium": 0b01, "Fast": 0b10, "High": 0b11})
-    PUPD_MAP = CURRENT_MCU_DEFINES.get("GPIO_PUPD_MAP",
-                                       {"No Pull-up/Pull-down": 0b00, "Pull-up": 0b01, "Pull-down": 0b10})
+    MODE_INPUT = defines.get("GPIO_MODE_INPUT_VAL", 0b00)
+    MODE_OUTPUT = defines.get("GPIO_MODE_OUTPUT_VAL", 0b01)
+    MODE_AF = defines.get("GPIO_MODE_AF_VAL", 0b10)
+    MODE_ANALOG = defines.get("GPIO_MODE_ANALOG_VAL", 0b11)
+    OTYPE_PP = defines.get("GPIO_OTYPE_PP_VAL", 0)
+    OTYPE_OD = defines.get("GPIO_OTYPE_OD_VAL", 1)
+    SPEED_MAP = defines.get("GPIO_OSPEED_MAP", {"Low": 0b00, "Medium": 0b01, "Fast": 0b10, "High": 0b11})
+    PUPD_MAP = defines.get("GPIO_PUPD_MAP",
+                           {"No Pull-up/Pull-down": 0b00, "Pull-up": 0b01, "Pull-down": 0b10})
 
     moder_val_bits = 0
     otyper_val_bit = -1
@@ -103,10 +138,15 @@ def generate_f2_f4_gpio_code(port_base, pin_num, pin_cfg, error_messages):
         return f"    // ERROR: Unknown F2/F4 mode '{mode_str}' for Pin {pin_num}\n"
 
     c_code_pin += f"    // Configure {port_base} Pin {pin_num} ({mode_str})\n"
-    c_code_pin += f"    {port_base}->MODER &= ~(0x3UL << ({pin_num} * 2));\n"
-    c_code_pin += f"    {port_base}->MODER |= ({moder_val_bits}UL << ({pin_num} * 2));\n"
+    if port_fields is not None:
+        _add_port_field(port_fields, "MODER", 0x3 << (pin_num * 2), moder_val_bits << (pin_num * 2))
+        if otyper_val_bit != -1:
+            _add_port_field(port_fields, "OTYPER", 1 << pin_num, (otyper_val_bit == OTYPE_OD) << pin_num)
+    else:
+        c_code_pin += f"    {port_base}->MODER &= ~(0x3UL << ({pin_num} * 2));\n"
+        c_code_pin += f"    {port_base}->MODER |= ({moder_val_bits}UL << ({pin_num} * 2));\n"
 
-    if otyper_val_bit != -1:
+    if otyper_val_bit != -1 and port_fields is None:
         if otyper_val_bit == OTYPE_OD:
             c_code_pin += f"    {port_base}->OTYPER |= (1UL << {pin_num}); // Open-Drain\n"
         else:
@@ -115,7 +155,9 @@ def generate_f2_f4_gpio_code(port_base, pin_num, pin_cfg, error_messages):
     is_output_or_af = "Output" in mode_str or "Alternate Function" in mode_str
     if is_output_or_af and mode_str != "Analog" and speed_str:
         ospeedr_val = SPEED_MAP.get(speed_str)
-        if ospeedr_val is not None:
+        if ospeedr_val is not None and port_fields is not None:
+            _add_port_field(port_fields, "OSPEEDR", 0x3 << (pin_num * 2), ospeedr_val << (pin_num * 2))
+        elif ospeedr_val is not None:
             c_code_pin += f"    {port_base}->OSPEEDR &= ~(0x3UL << ({pin_num} * 2));\n"
             c_code_pin += f"    {port_base}->OSPEEDR |= ({ospeedr_val}UL << ({pin_num} * 2)); // Speed: {speed_str}\n"
         else:
@@ -123,7 +165,9 @@ def generate_f2_f4_gpio_code(port_base, pin_num, pin_cfg, error_messages):
 
     if mode_str != "Analog":
         pupdr_val = PUPD_MAP.get(pull_str)
-        if pupdr_val is not None:
+        if pupdr_val is not None and port_fields is not None:
+            _add_port_field(port_fields, "PUPDR", 0x3 << (pin_num * 2), pupdr_val << (pin_num * 2))
+        elif pupdr_val is not None:
             c_code_pin += f"    {port_base}->PUPDR &= ~(0x3UL << ({pin_num} * 2));\n"
             c_code_pin += f"    {port_base}->PUPDR |= ({pupdr_val}UL << ({pin_num} * 2)); // Pull: {pull_str}\n"
         else:
@@ -131,7 +175,10 @@ def generate_f2_f4_gpio_code(port_base, pin_num, pin_cfg, error_messages):
 
     if "Alternate Function" in mode_str and af_val_str:
         af_num = -1
-        if af_val_str.upper().startswith("AF"):
+        signal_af = pin_af_db.af_for(f"P{port_base[-1]}{pin_num}", af_val_str.upper())  # e.g. "USART1_TX"
+        if signal_af is not None:
+            af_num = signal_af
+        elif af_val_str.upper().startswith("AF"):
             try:
                 af_num = int(af_val_str[2:])
             except ValueError:
@@ -140,14 +187,17 @@ def generate_f2_f4_gpio_code(port_base, pin_num, pin_cfg, error_messages):
             try:
                 af_num = int(af_val_str)
             except ValueError:
-                error_messages.append(f"AF value '{af_val_str}' not 'AFx' or int for {port_base} Pin {pin_num}")
+                error_messages.append(f"AF value '{af_val_str}' is not 'AFx', an int or a signal of {port_base} Pin {pin_num}")
 
         if 0 <= af_num <= 15:
             af_reg_idx = 0 if pin_num < 8 else 1
             pin_in_reg = pin_num % 8
             af_reg_name = f"AFR[{af_reg_idx}]"  # F2/F4 use AFR[0] and AFR[1]
-            c_code_pin += f"    {port_base}->{af_reg_name} &= ~(0xFUL << ({pin_in_reg} * 4));\n"
-            c_code_pin += f"    {port_base}->{af_reg_name} |= ({af_num}UL << ({pin_in_reg} * 4)); // AF{af_num}\n"
+            if port_fields is not None:
+                _add_port_field(port_fields, af_reg_name, 0xF << (pin_in_reg * 4), af_num << (pin_in_reg * 4))
+            else:
+                c_code_pin += f"    {port_base}->{af_reg_name} &= ~(0xFUL << ({pin_in_reg} * 4));\n"
+                c_code_pin += f"    {port_base}->{af_reg_name} |= ({af_num}UL << ({pin_in_reg} * 4)); // AF{af_num}\n"
         elif af_num != -1:
             error_messages.append(f"Invalid AF num {af_num} for F2/F4 {port_base} Pin {pin_num} (must be 0-15).")
     return c_code_pin
@@ -156,6 +206,9 @@ def generate_f2_f4_gpio_code(port_base, pin_num, pin_cfg, error_messages):
 def generate_gpio_code(config):
     pins_config = config.get("pins", {})
     mcu_family = config.get("mcu_family", "STM32F4")
+    defines = resolve_defines(mcu_family, config.get("target_device"))
+    regs = load_register_db(mcu_family, config.get("target_device"))
+    pin_af_db = load_pin_af_db(mcu_family, config.get("target_device"))
     error_messages = []
     rcc_clocks_to_enable = []
 
@@ -166,9 +219,7 @@ def generate_gpio_code(config):
     # Get family specific GPIO RCC macros if defined
     # For F1, this map is in stm32f1_defines.py (e.g., RCC_APB2ENR_IOPAEN)
     # For F2/F4, it's in stm32f4_defines.py (e.g., RCC_AHB1ENR_GPIOAEN)
-    gpio_rcc_enable_map_key = f"GPIO_RCC_ENABLE_MAP_{mcu_family}"
-    gpio_rcc_enable_map = CURRENT_MCU_DEFINES.get(gpio_rcc_enable_map_key,
-                                                  CURRENT_MCU_DEFINES.get("GPIO_RCC_ENABLE_MAP", {}))
+    gpio_rcc_enable_map = defines.get("GPIO_RCC_ENABLE_MAP", {})
 
     ports_to_enable_chars = set()
     for pin_id in pins_config.keys():
@@ -177,12 +228,9 @@ def generate_gpio_code(config):
             continue
         port_char = pin_id[0].upper()
 
-        max_port_char_cfg_key = f"GPIO_MAX_PORT_CHAR_{mcu_family}"
-        default_max_char = 'K' if mcu_family == "STM32F4" else \
-            ('I' if mcu_family == "STM32F2" else \
-                 CURRENT_MCU_DEFINES.get("GPIO_MAX_PORT_CHAR_F1", 'G'))  # Use specific define for F1
+        default_max_char = 'K' if mcu_family == "STM32F4" else ('I' if mcu_family == "STM32F2" else 'G')
 
-        max_port_char_ord = ord(CURRENT_MCU_DEFINES.get(max_port_char_cfg_key, default_max_char))
+        max_port_char_ord = ord(defines.get("GPIO_MAX_PORT_CHAR", default_max_char))
 
         if 'A' <= port_char <= chr(max_port_char_ord):
             ports_to_enable_chars.add(port_char)
@@ -203,8 +251,8 @@ def generate_gpio_code(config):
                 rcc_macro_port_fallback = f"RCC_AHB1ENR_GPIO{port_char_to_enable}EN"
 
             # Check if this constructed macro exists in defines
-            if CURRENT_MCU_DEFINES.get(rcc_macro_port_fallback + "_Pos") is not None or \
-                    CURRENT_MCU_DEFINES.get(rcc_macro_port_fallback) is not None:
+            if regs.field(rcc_macro_port_fallback) is not None or \
+                    defines.get(rcc_macro_port_fallback) is not None:
                 if rcc_macro_port_fallback not in rcc_clocks_to_enable:
                     rcc_clocks_to_enable.append(rcc_macro_port_fallback)
             else:
@@ -243,6 +291,10 @@ def generate_gpio_code(config):
     # Sort pins by Port (A, B, C...) then by Pin Number (0, 1, 2...)
     sorted_pin_ids = sorted(pins_config.keys(), key=lambda pin_id_sort: (pin_id_sort[0], int(pin_id_sort[1:])))
 
+    init_style = config.get("init_style", "code")
+    batch_by_port = bool(config.get("batch_by_port")) or init_style == "table"  # The register table needs the port writes
+    batched_code = RegisterProgram()
+    port_fields_by_port = {}  # Batched mode: port_base -> {register: [mask, value]}, written after the port's last pin
     for pin_id in sorted_pin_ids:
         pin_cfg = pins_config[pin_id]
         if not pin_id or len(pin_id) < 2: continue  # Already checked but good to be safe
@@ -258,22 +310,35 @@ def generate_gpio_code(config):
             error_messages.append(f"Pin num out of range: {pin_id}");
             continue
 
+        if batch_by_port and port_fields_by_port and port_base not in port_fields_by_port:  # Previous port complete
+            add_port_register_ops(batched_code, *port_fields_by_port.popitem())
+        port_fields = port_fields_by_port.setdefault(port_base, {}) if batch_by_port else None
+
         pin_code_segment = ""
         if mcu_family == "STM32F1":
-            pin_code_segment = generate_f1_gpio_code(port_base, pin_num, pin_cfg, error_messages, rcc_clocks_to_enable)
+            pin_code_segment = generate_f1_gpio_code(port_base, pin_num, pin_cfg, defines, error_messages, rcc_clocks_to_enable, port_fields)
         elif mcu_family in ["STM32F2", "STM32F4"]:
-            pin_code_segment = generate_f2_f4_gpio_code(port_base, pin_num, pin_cfg, error_messages)
+            pin_code_segment = generate_f2_f4_gpio_code(port_base, pin_num, pin_cfg, defines, error_messages, pin_af_db, port_fields)
         else:
             error_messages.append(f"GPIO generation not implemented for family {mcu_family}")
             pin_code_segment = f"    // GPIO for {pin_id} - Family {mcu_family} not implemented\n"
 
+        if batch_by_port:  # Only comment lines are left in the pin segment
+            for comment_line in pin_code_segment.splitlines(): batched_code.comment(comment_line.strip().lstrip("/ "))
+            continue
         c_code_func += pin_code_segment  # Already includes newline from helper
         if not pin_code_segment.endswith("\n"):  # Ensure newline if helper didn't add one
             c_code_func += "\n"
 
+    register_programs = []
+    if batch_by_port:
+        if port_fields_by_port: add_port_register_ops(batched_code, *port_fields_by_port.popitem())
+        init_body, init_program = render_init_body(batched_code, "GPIO_User_Init_regs", init_style)
+        c_code_func += init_body
+        register_programs.append(("GPIO_User_Init", init_program))
     c_code_func += "}\n"
 
     return {"source_function": c_code_func,
             "init_call": "GPIO_User_Init();" if pins_config else "",
             "rcc_clocks_to_enable": list(set(rcc_clocks_to_enable)),
-            "error_messages": error_messages}
\ No newline at end of file
+            "error_messages": error_messages, "register_programs": register_programs}
\ No newline at end of file
@@ -1,7 +1,11 @@
-from core.mcu_defines_loader import CURRENT_MCU_DEFINES
+from core.clock_tree import kernel_clock_hz
+from core.define_resolver import resolve_defines
+from core.mcu_defines_loader import load_register_db
+from core.pin_af_db import load_pin_af_db
 
 
 def calculate_i2c_timing(pclk1_freq_hz, i2c_clk_speed_hz, duty_cycle_is_16_9, mcu_family):
+    regs = load_register_db(mcu_family)
     if pclk1_freq_hz == 0 or i2c_clk_speed_hz == 0:
         return {"error": "PCLK1 or I2C clock speed is zero."}
     ccr_val = 0;
@@ -50,7 +54,7 @@ def calculate_i2c_timing(pclk1_freq_hz, i2c_clk_speed_hz, duty_cycle_is_16_9, mc
         if trise_val > 0x3F: trise_val = 0x3F
     if trise_val == 0 and pclk1_freq_hz > 0: trise_val = 1  # Min value for TRISE
 
-    I2C_CCR_CCR_Msk = CURRENT_MCU_DEFINES.get("I2C_CCR_CCR_Msk", 0xFFF)  # Default F4
+    I2C_CCR_CCR_Msk = regs.mask("I2C_CCR_CCR", 0xFFF)  # Default F4
     return {"ccr_val": ccr_val & I2C_CCR_CCR_Msk, "fs_bit": fs_bit, "duty_bit": duty_bit,
             "trise_val": trise_val & (0x3F if mcu_family != "STM32F1" else 0xFF), "error": None}
 
@@ -60,6 +64,8 @@ def generate_i2c_code_cmsis(config, rcc_config_calculated):
     instance_name = params.get("instance_name")
     mcu_family = params.get("mcu_family", "STM32F4")
     target_device = params.get("target_device", "STM32F407VG")
+    defines = resolve_defines(mcu_family, target_device)
+    regs = load_register_db(mcu_family, target_device)
 
     error_messages = [];
     gpio_pins_to_configure_af = [];
@@ -70,28 +76,27 @@ def generate_i2c_code_cmsis(config, rcc_config_calculated):
                 "rcc_clocks_to_enable": [], "gpio_pins_to_configure_af": [],
                 "default_helper_functions": "", "error_messages": []}
 
-    # Get peripheral info and bit positions from CURRENT_MCU_DEFINES
-    i2c_info_map_key = f"I2C_PERIPHERALS_INFO_{mcu_family}"
-    i2c_info_map = CURRENT_MCU_DEFINES.get(i2c_info_map_key, CURRENT_MCU_DEFINES.get("I2C_PERIPHERALS_INFO", {}))
+    # Get peripheral info and bit positions from the resolved defines
+    i2c_info_map = defines.get("I2C_PERIPHERALS_INFO", {})
     instance_info = i2c_info_map.get(instance_name)
     if not instance_info: error_messages.append(f"Unknown I2C instance: {instance_name}"); return {
         "error_messages": error_messages}
 
-    I2C_CR1_PE_Pos = CURRENT_MCU_DEFINES.get("I2C_CR1_PE_Pos", 0)
-    I2C_CR1_SWRST_Pos = CURRENT_MCU_DEFINES.get("I2C_CR1_SWRST_Pos", 15)
-    I2C_CR2_FREQ_Pos = CURRENT_MCU_DEFINES.get("I2C_CR2_FREQ_Pos", 0)
-    I2C_CR2_FREQ_Msk = CURRENT_MCU_DEFINES.get("I2C_CR2_FREQ_Msk", 0x3F)
-    I2C_CCR_FS_Pos = CURRENT_MCU_DEFINES.get("I2C_CCR_FS_Pos", 15)
-    I2C_CCR_DUTY_Pos = CURRENT_MCU_DEFINES.get("I2C_CCR_DUTY_Pos", 14)  # Not on F1
-    I2C_CCR_CCR_Pos = CURRENT_MCU_DEFINES.get("I2C_CCR_CCR_Pos", 0)
-    I2C_CR1_ENGC_Pos = CURRENT_MCU_DEFINES.get("I2C_CR1_ENGC_Pos", 6)
-    I2C_CR1_NOSTRETCH_Pos = CURRENT_MCU_DEFINES.get("I2C_CR1_NOSTRETCH_Pos", 7)
-    I2C_CR1_ITEVTEN_Pos = CURRENT_MCU_DEFINES.get("I2C_CR1_ITEVTEN_Pos", 9)  # F1 is bit 9, F4 bit 10
-    I2C_CR1_ITBUFEN_Pos = CURRENT_MCU_DEFINES.get("I2C_CR1_ITBUFEN_Pos", 10)  # F1 is bit 10, F4 bit 9
-    I2C_CR1_ITERREN_Pos = CURRENT_MCU_DEFINES.get("I2C_CR1_ITERREN_Pos", 8)
-    I2C_OAR1_ADDMODE_Pos = CURRENT_MCU_DEFINES.get("I2C_OAR1_ADDMODE_Pos", 15)  # 10-bit mode select
-
-    pclk1_freq = rcc_config_calculated.get("pclk1_freq_hz", 0)
+    I2C_CR1_PE_Pos = regs.pos("I2C_CR1_PE", 0)
+    I2C_CR1_SWRST_Pos = regs.pos("I2C_CR1_SWRST", 15)
+    I2C_CR2_FREQ_Pos = regs.pos("I2C_CR2_FREQ", 0)
+    I2C_CR2_FREQ_Msk = regs.mask("I2C_CR2_FREQ", 0x3F)
+    I2C_CCR_FS_Pos = regs.pos("I2C_CCR_FS", 15)
+    I2C_CCR_DUTY_Pos = regs.pos("I2C_CCR_DUTY", 14)  # Not on F1
+    I2C_CCR_CCR_Pos = regs.pos("I2C_CCR_CCR", 0)
+    I2C_CR1_ENGC_Pos = regs.pos("I2C_CR1_ENGC", 6)
+    I2C_CR1_NOSTRETCH_Pos = regs.pos("I2C_CR1_NOSTRETCH", 7)
+    I2C_CR1_ITEVTEN_Pos = regs.pos("I2C_CR1_ITEVTEN", 9)  # F1 is bit 9, F4 bit 10
+    I2C_CR1_ITBUFEN_Pos = regs.pos("I2C_CR1_ITBUFEN", 10)  # F1 is bit 10, F4 bit 9
+    I2C_CR1_ITERREN_Pos = regs.pos("I2C_CR1_ITERREN", 8)
+    I2C_OAR1_ADDMODE_Pos = regs.pos("I2C_OAR1_ADDMODE", 15)  # 10-bit mode select
+
+    pclk1_freq = kernel_clock_hz(rcc_config_calculated, "APB1")
     if instance_info["bus"] != "APB1": error_messages.append(
         f"I2C {instance_name} unexpected bus: {instance_info['bus']}.")
     if pclk1_freq == 0: error_messages.append(f"PCLK1 for {instance_name} is 0Hz. Check RCC.")
@@ -102,29 +107,16 @@ def generate_i2c_code_cmsis(config, rcc_config_calculated):
     source_function = f"void {instance_name}_User_Init(void) {{\n"
     source_function += f"    // {instance_name} ({mcu_family}) Configuration (CMSIS Register Level)\n\n"
 
-    pin_sugg_map_key = f"I2C_PIN_CONFIG_SUGGESTIONS_{mcu_family}"
-    pin_sugg_map = CURRENT_MCU_DEFINES.get(pin_sugg_map_key, CURRENT_MCU_DEFINES.get("I2C_PIN_CONFIG_SUGGESTIONS", {}))
-    pin_suggestions = pin_sugg_map.get(target_device, {}).get(instance_name, {})
-    if pin_suggestions:  # Populate AF pins
+    pin_af_db = load_pin_af_db(mcu_family, target_device)
+    pin_types = pin_af_db.signal_types(instance_name)
+    if pin_types:  # Populate AF pins
         source_function += f"    // Suggested GPIO for {instance_name} on {target_device} (config in GPIO_User_Init):\n"
-        for pin_type, pin_data_str in pin_suggestions.items():  # SCL, SDA
-            pin_options = pin_data_str.split(" or ")  # "PB6/AF4 or PB8/AF4"
-            first_option = pin_options[0]  # Take first option "PB6/AF4"
-            parts = first_option.split('/')
-            if len(parts) >= 1:
-                pin_name_only = parts[0]  # "PB6"
-                port_char = pin_name_only[1];
-                pin_num = pin_name_only[2:]
-                af_num = 4  # Default I2C AF for F4, F1 uses remap
-                if len(parts) == 2 and parts[1].upper().startswith("AF"):
-                    try:
-                        af_num = int(parts[1][2:])
-                    except ValueError:
-                        pass
-                if mcu_family == "STM32F1": af_num = -1  # Use -1 or special string for F1 remap
-                if port_char.isalpha() and pin_num.isdigit():
-                    gpio_pins_to_configure_af.append((port_char, pin_num, af_num, f"{instance_name}_{pin_type}"))
-                    source_function += f"    //   {pin_type}: {first_option} (Open-Drain, AF{af_num if af_num != -1 else 'Remap'})\n"
+        for pin_type in pin_types:  # SCL, SDA
+            pin_option = pin_af_db.default_option(instance_name, pin_type)  # Preferred pin, e.g. PB6/AF4
+            af_num = pin_option.af
+            if mcu_family == "STM32F1": af_num = -1  # Use -1 or special string for F1 remap
+            gpio_pins_to_configure_af.append((pin_option.port_char, pin_option.pin_num, af_num, pin_option.signal))
+            source_function += f"    //   {pin_type}: {pin_option} (Open-Drain, AF{af_num if af_num != -1 else 'Remap'})\n"
         source_function += "\n"
 
     source_function += f"    if ({instance_name}->CR1 & (1UL << {I2C_CR1_PE_Pos})) {{ {instance_name}->CR1 &= ~(1UL << {I2C_CR1_PE_Pos}); }}\n"
@@ -132,21 +124,18 @@ def generate_i2c_code_cmsis(config, rcc_config_calculated):
     source_function += f"    {instance_name}->CR1 &= ~(1UL << {I2C_CR1_SWRST_Pos});\n\n"
 
     pclk1_mhz = pclk1_freq // 1000000
-    min_pclk_mhz = CURRENT_MCU_DEFINES.get("I2C_MIN_PCLK_MHZ", 2)
+    min_pclk_mhz = defines.get("I2C_MIN_PCLK_MHZ", 2)
     if not (min_pclk_mhz <= pclk1_mhz <= 50):  # F407 max PCLK for I2C is 50MHz
         error_messages.append(f"PCLK1 ({pclk1_mhz}MHz) for I2C out of range ({min_pclk_mhz}-50MHz for F4).")
 
     source_function += f"    {instance_name}->CR2 = ({instance_name}->CR2 & ~{I2C_CR2_FREQ_Msk}) | ({pclk1_mhz if pclk1_mhz >= min_pclk_mhz else min_pclk_mhz}UL << {I2C_CR2_FREQ_Pos});\n\n"
 
-    i2c_speeds_map_key = f"I2C_CLOCK_SPEEDS_HZ_{mcu_family}"
-    i2c_speeds_map = CURRENT_MCU_DEFINES.get(i2c_speeds_map_key, CURRENT_MCU_DEFINES.get("I2C_CLOCK_SPEEDS_HZ", {}))
+    i2c_speeds_map = defines.get("I2C_CLOCK_SPEEDS_HZ", {})
     i2c_speed_hz = i2c_speeds_map.get(params.get("clock_speed_str", "100000 Hz (Standard Mode)"), 100000)
 
     duty_is_16_9 = False
     if i2c_speed_hz > 100000 and mcu_family != "STM32F1":  # Duty cycle bit relevant for F2/F4 Fast Mode
-        duty_modes_map_key = f"I2C_DUTY_CYCLE_MODES_{mcu_family}"
-        duty_modes_map = CURRENT_MCU_DEFINES.get(duty_modes_map_key,
-                                                 CURRENT_MCU_DEFINES.get("I2C_DUTY_CYCLE_MODES", {}))
+        duty_modes_map = defines.get("I2C_DUTY_CYCLE_MODES", {})
         duty_is_16_9 = (duty_modes_map.get(params.get("duty_cycle_str"), 0) == 1)
 
     timing_calc = calculate_i2c_timing(pclk1_freq, i2c_speed_hz, duty_is_16_9, mcu_family) if pclk1_freq > 0 else {
@@ -173,8 +162,7 @@ def generate_i2c_code_cmsis(config, rcc_config_calculated):
     source_function += f"    {instance_name}->CR1 = ({instance_name}->CR1 & ~((1<<I2C_CR1_ENGC_Pos)|(1<<I2C_CR1_NOSTRETCH_Pos)|(1<<I2C_CR1_ITEVTEN_Pos)|(1<<I2C_CR1_ITBUFEN_Pos)|(1<<I2C_CR1_ITERREN_Pos))) | 0x{cr1_val_temp:08X}UL;\n\n"
 
     addr_mode_str = params.get("addressing_mode_str", "7-bit")
-    addr_modes_map_key = f"I2C_ADDRESSING_MODES_{mcu_family}"
-    addr_modes_map = CURRENT_MCU_DEFINES.get(addr_modes_map_key, CURRENT_MCU_DEFINES.get("I2C_ADDRESSING_MODES", {}))
+    addr_modes_map = defines.get("I2C_ADDRESSING_MODES", {})
     addr_mode_bit_val = addr_modes_map.get(addr_mode_str, 0)  # 0 for 7-bit, 1 for 10-bit (conceptual)
     own_addr1 = params.get("own_address1", 0x00)
     oar1_val = 0
@@ -203,14 +191,14 @@ def generate_i2c_code_cmsis(config, rcc_config_calculated):
     if timeout_def not in default_helper_functions_code: default_helper_functions_code += timeout_def
 
     # Bit positions for SR1/CR1 helpers
-    I2C_SR1_SB_Pos_H = CURRENT_MCU_DEFINES.get("I2C_SR1_SB_Pos", 0)
-    I2C_SR1_ADDR_Pos_H = CURRENT_MCU_DEFINES.get("I2C_SR1_ADDR_Pos", 1)
-    I2C_SR1_TXE_Pos_H = CURRENT_MCU_DEFINES.get("I2C_SR1_TXE_Pos", 7)
-    I2C_SR1_RXNE_Pos_H = CURRENT_MCU_DEFINES.get("I2C_SR1_RXNE_Pos", 6)
-    I2C_SR1_BTF_Pos_H = CURRENT_MCU_DEFINES.get("I2C_SR1_BTF_Pos", 2)
-    I2C_CR1_START_Pos_H = CURRENT_MCU_DEFINES.get("I2C_CR1_START_Pos", 8)
-    I2C_CR1_STOP_Pos_H = CURRENT_MCU_DEFINES.get("I2C_CR1_STOP_Pos", 9)
-    I2C_CR1_ACK_Pos_H = CURRENT_MCU_DEFINES.get("I2C_CR1_ACK_Pos", 10)
+    I2C_SR1_SB_Pos_H = regs.pos("I2C_SR1_SB", 0)
+    I2C_SR1_ADDR_Pos_H = regs.pos("I2C_SR1_ADDR", 1)
+    I2C_SR1_TXE_Pos_H = regs.pos("I2C_SR1_TXE", 7)
+    I2C_SR1_RXNE_Pos_H = regs.pos("I2C_SR1_RXNE", 6)
+    I2C_SR1_BTF_Pos_H = regs.pos("I2C_SR1_BTF", 2)
+    I2C_CR1_START_Pos_H = regs.pos("I2C_CR1_START", 8)
+    I2C_CR1_STOP_Pos_H = regs.pos("I2C_CR1_STOP", 9)
+    I2C_CR1_ACK_Pos_H = regs.pos("I2C_CR1_ACK", 10)
 
     if params.get("generate_master_tx_func"):
         default_helper_functions_code += f"\nint {instance_name}_Master_Transmit(uint8_t addr, uint8_t* data, uint16_t size) {{\n"
@@ -0,0 +1,144 @@
+# --- NEW FILE generators/init_cost_estimator.py ---
+# Static flash-size and boot-time estimate of the init functions main() calls (GeneratedProject.init_cost).
+# Functions built from the register IR (parts["register_programs"]) are costed from their ops in the active
+# init style; the string-built ones from a line scan of their C text (register stores, read-modify-writes,
+# read-backs, polls, anything else as opaque C). Cycles add the flash wait states of every instruction fetch
+# line (flash_latency_val once SYSCLK is switched; the RCC init and, with the overlapped boot, the
+# clock-independent inits run on HSI with 0 WS) and the worst case of every poll with a timeout count.
+# Polls without a bound are counted once and listed as unbounded. Rough Cortex-M3/M4 figures, not measurements.
+
+import math
+import re
+
+from core.define_resolver import resolve_defines
+from generators.register_ir import (RegisterProgram, estimate_init_cost, REG_INIT_INTERPRETER_BYTES,
+                                    STRAIGHT_LINE_OP_COST, STRAIGHT_LINE_TIMEOUT_COST)
+
+POLL_ITERATION_CYCLES = STRAIGHT_LINE_OP_COST["wait"][1] + STRAIGHT_LINE_TIMEOUT_COST[1]
+FLASH_FETCH_BYTES = {"STM32F1": 8, "STM32F2": 16, "STM32F4": 16}  # Prefetch buffer / ART line width
+
+_REGISTER_RE = re.compile(r"\b[A-Za-z_]\w*->\w+(?:\[\d+\])?")
+_ASSIGNMENT_RE = re.compile(r"^([A-Za-z_]\w*->\w+(?:\[\d+\])?)\s*([|&^]?=)(?!=)\s*(.*)$")
+_TIMEOUT_RE = re.compile(r"\b\w*timeout\w*\s*=\s*(\d+)")
+
+
+def program_from_c(c_code):
+    """RegisterProgram approximating a function body of generated C, for costing only (masks/values are not kept)."""
+    program, timeout_count = RegisterProgram(), None
+    for line in c_code.splitlines():
+        code = line.split("//")[0].strip()
+        if not code or code in ("{", "}"):
+            continue
+        timeout_match = _TIMEOUT_RE.search(code)
+        if timeout_match: timeout_count = int(timeout_match.group(1))
+        registers = _REGISTER_RE.findall(code)
+        if code.startswith("while") or "; while" in code:
+            program.wait(registers[0] if registers else "", 0, 0, timeout_count if "timeout" in code else None)
+            continue
+        for statement in code.split(";"):
+            statement = statement.strip(" {}")
+            if not statement:
+                continue
+            if statement.startswith("if"):  # Condition read, then the guarded statement (if on the same line)
+                depth, end = 0, len(statement)
+                for i, char in enumerate(statement):
+                    depth += char == "("; depth -= char == ")"
+                    if char == ")" and depth == 0: end = i; break
+                condition_registers = _REGISTER_RE.findall(statement[:end])
+                if condition_registers: program.read(condition_registers[0])
+                statement = statement[end + 1:].strip(" {}")
+                if not statement:
+                    continue
+            assignment = _ASSIGNMENT_RE.match(statement)
+            if assignment:
+                reg, operator, rhs = assignment.groups()
+                if operator != "=" or reg in rhs:
+                    program.modify(reg, "?", "?")
+                else:
+                    program.write(reg, "?")
+            elif re.search(r"=\s*\(?\s*[A-Za-z_]\w*->", statement):
+                program.read(_REGISTER_RE.findall(statement)[0])
+            else:
+                program.raw(statement)
+    return program
+
+
+def _function_body(source, function_name):
+    """Text between the braces of function_name's definition in source, or None."""
+    match = re.search(rf"\b{re.escape(function_name)}\s*\([^)]*\)\s*\{{", source)
+    if not match:
+        return None
+    depth = 1
+    for i in range(match.end(), len(source)):
+        depth += source[i] == "{"; depth -= source[i] == "}"
+        if depth == 0:
+            return source[match.end():i]
+    return None
+
+
+def estimate_function_cost(program, style, wait_states, fetch_bytes):
+    """{"bytes", "cycles", "wait_state_cycles", "poll_worst_cycles", "unbounded_polls"} of one init function."""
+    code_bytes, cycles = estimate_init_cost(program)[style]
+    poll_worst_cycles = unbounded_polls = 0
+    for op in program.ops:
+        if op["op"] != "wait":
+            continue
+        if op["timeout"]:
+            poll_worst_cycles += (op["timeout"] - 1) * POLL_ITERATION_CYCLES  # The first poll is in cycles already
+        else:
+            unbounded_polls += 1
+    return {"bytes": code_bytes, "cycles": cycles,
+            "wait_state_cycles": math.ceil(code_bytes / fetch_bytes) * wait_states,
+            "poll_worst_cycles": poll_worst_cycles, "unbounded_polls": unbounded_polls}
+
+
+def estimate_project_init_cost(processing_order, generated_code_parts, rcc_calculated_data, mcu_family,
+                               target_device, init_style="code", clock_independent_modules=()):
+    """Per init function and per module cost estimate (see the module comment).
+
+    Returns {"init_style", "functions": [{"module", "function", "source" ("ir"/"c-scan"), "bytes", "cycles",
+    "wait_state_cycles", "poll_worst_cycles", "unbounded_polls", "wait_states", "clock_hz", "time_us",
+    "worst_time_us"}, ...], "modules": {module: totals}, "totals": {...}}.
+    """
+    defines = resolve_defines(mcu_family, target_device)
+    hsi_hz = defines.get("HSI_VALUE_HZ", 8000000)
+    hclk_hz = rcc_calculated_data.get("hclk_freq_hz") or hsi_hz
+    flash_wait_states = rcc_calculated_data.get("flash_latency_val") or 0
+    fetch_bytes = FLASH_FETCH_BYTES.get(mcu_family, 16)
+    overlapped_boot = bool((generated_code_parts.get("RCC") or {}).get("init_call_finish"))
+
+    functions, uses_table = [], False
+    for module_name in processing_order:
+        parts = generated_code_parts.get(module_name) or {}
+        init_functions = [call.strip().rstrip(";").strip()[:-2] for call in
+                          (parts.get("init_call") or "", parts.get("init_call_finish") or "") if call.strip()]
+        ir_programs = dict(parts.get("register_programs", []))
+        for function_name in init_functions:
+            if function_name in ir_programs:
+                program, source, style = ir_programs[function_name], "ir", init_style
+            else:
+                body = _function_body(parts.get("source_function", ""), function_name)
+                if body is None:
+                    continue
+                program, source, style = program_from_c(body), "c-scan", "code"
+            uses_table = uses_table or style == "table"
+            on_hsi = module_name == "RCC" or (overlapped_boot and module_name in clock_independent_modules)
+            clock_hz, wait_states = (hsi_hz, 0) if on_hsi else (hclk_hz, flash_wait_states)
+            cost = estimate_function_cost(program, style, wait_states, fetch_bytes)
+            run_cycles = cost["cycles"] + cost["wait_state_cycles"]
+            cost.update(module=module_name, function=function_name, source=source, wait_states=wait_states,
+                        clock_hz=int(clock_hz), time_us=round(run_cycles * 1e6 / clock_hz, 2),
+                        worst_time_us=round((run_cycles + cost["poll_worst_cycles"]) * 1e6 / clock_hz, 2))
+            functions.append(cost)
+
+    summed_keys = ("bytes", "cycles", "wait_state_cycles", "poll_worst_cycles", "unbounded_polls", "time_us",
+                   "worst_time_us")
+    modules = {}
+    for cost in functions:
+        module_totals = modules.setdefault(cost["module"], dict.fromkeys(summed_keys, 0))
+        for key in summed_keys: module_totals[key] += cost[key]
+    totals = {key: sum(cost[key] for cost in functions) for key in summed_keys}
+    if uses_table: totals["bytes"] += REG_INIT_INTERPRETER_BYTES  # reg_init_apply(), shared
+    for entry in list(modules.values()) + [totals]:
+        entry["time_us"] = round(entry["time_us"], 2); entry["worst_time_us"] = round(entry["worst_time_us"], 2)
+    return {"init_style": init_style, "functions": functions, "modules": modules, "totals": totals}
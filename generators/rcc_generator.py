@@ -1,4 +1,92 @@
-from core.mcu_defines_loader import CURRENT_MCU_DEFINES
+from core.define_resolver import resolve_defines
+from core.mcu_defines_loader import load_register_db
+from generators.register_ir import RegisterProgram, render_init_body
+
+RCC_CFGR_SW_DEFAULT_VALS = {"HSI": 0b00, "HSE": 0b01, "PLL": 0b10}  # Same SW/SWS encoding on F1/F2/F4
+
+
+def rcc_register_values(cfg_params, calc_data):
+    """Register values of one RCC config, shared by RCC_User_Init() and the clock profile tables.
+
+    Returns {"flash_acr": value or None, "flash_latency": value or None, "pllcfgr": F2/F4 value or None,
+             "cfgr_pll": (mask, value) of the F1 PLL bits, "cfgr_prescaler": (mask, value) of HPRE/PPRE1/PPRE2
+             (+ F1 ADCPRE/USBPRE), "sw": SW value for sysclk_source, "errors": [...]}.
+    """
+    mcu_family = cfg_params.get("mcu_family", "STM32F4")
+    target_device = cfg_params.get("target_device", "STM32F407VG")
+    defines = resolve_defines(mcu_family, target_device)
+    regs = load_register_db(mcu_family, target_device)
+    errors = []
+    values = {"flash_acr": None, "flash_latency": None, "pllcfgr": None, "cfgr_pll": (0, 0), "errors": errors}
+
+    # Flash Latency (Common concept, register name/bits might differ)
+    flash_latency_val = calc_data.get("flash_latency_val")
+    prften_bit_name = "PRFTEN" if mcu_family in ["STM32F2", "STM32F4"] else "PRFTBE"  # F1 PRFTBE
+    flash_acr_prften = (1 << regs.pos(f"FLASH_ACR_{prften_bit_name}", regs.pos("FLASH_ACR_PRFTEN", 8)))
+    if flash_latency_val is not None:
+        flash_acr_val = (flash_latency_val << regs.pos("FLASH_ACR_LATENCY", 0)) | flash_acr_prften
+        if mcu_family != "STM32F1":  # ICEN/DCEN for F2/F4
+            flash_acr_val |= (1 << regs.pos("FLASH_ACR_ICEN", 9)) | (1 << regs.pos("FLASH_ACR_DCEN", 10))
+        values.update(flash_acr=flash_acr_val, flash_latency=flash_latency_val)
+
+    # PLL Config
+    if mcu_family in ["STM32F2", "STM32F4"]:
+        pllm = cfg_params.get("pllm_or_xtpre");
+        plln = cfg_params.get("plln_or_mul")
+        pllp_map = {"2": 0b00, "4": 0b01, "6": 0b10, "8": 0b11};
+        pllp_reg = pllp_map.get(str(cfg_params.get("pllp")))
+        pllq = cfg_params.get("pllq")
+        pllsrc_reg = (1 << regs.pos("RCC_PLLCFGR_PLLSRC", 22)) if cfg_params.get("pll_source") == "HSE" else 0
+        if not (None in [pllm, plln, pllp_reg, pllq] or not all(isinstance(x, int) for x in [pllm, plln, pllq])):
+            values["pllcfgr"] = (pllm << regs.pos("RCC_PLLCFGR_PLLM", 0)) | (plln << regs.pos("RCC_PLLCFGR_PLLN", 6)) | \
+                                (pllp_reg << regs.pos("RCC_PLLCFGR_PLLP", 16)) | pllsrc_reg | \
+                                (pllq << regs.pos("RCC_PLLCFGR_PLLQ", 24))
+    elif mcu_family == "STM32F1":
+        RCC_CFGR_PLLSRC_F1_Pos = regs.pos("RCC_CFGR_PLLSRC_F1", 16)  # PLLSRC for F1
+        RCC_CFGR_PLLXTPRE_F1_Pos = regs.pos("RCC_CFGR_PLLXTPRE_F1", 17)  # PLLXTPRE for F1
+        RCC_CFGR_PLLMULL_F1_Pos = regs.pos("RCC_CFGR_PLLMULL_F1", 18)  # PLLMULL for F1
+        pllxtpre_f1 = (1 << RCC_CFGR_PLLXTPRE_F1_Pos) if cfg_params.get("pllm_or_xtpre",
+                                                                        1) == 2 else 0  # Div by 2 if val is 2
+        pllmul_f1 = (cfg_params.get("plln_or_mul", 9) - 2) & 0xF  # MUL is (val-2)
+        pllsrc_f1 = (1 << RCC_CFGR_PLLSRC_F1_Pos) if cfg_params.get("pll_source") == "HSE" else 0
+        # Mask for F1 PLL bits in CFGR: PLLSRC, PLLXTPRE, PLLMULL[3:0]
+        values["cfgr_pll"] = ((1 << RCC_CFGR_PLLSRC_F1_Pos) | (1 << RCC_CFGR_PLLXTPRE_F1_Pos) | (
+                0xF << RCC_CFGR_PLLMULL_F1_Pos), (pllsrc_f1 | pllxtpre_f1 | (pllmul_f1 << RCC_CFGR_PLLMULL_F1_Pos)))
+
+    # Prescalers (HPRE, PPRE1, PPRE2 in RCC_CFGR)
+    RCC_CFGR_HPRE_Pos = regs.pos("RCC_CFGR_HPRE", 4)
+    RCC_CFGR_PPRE1_Pos = regs.pos("RCC_CFGR_PPRE1", 10)
+    RCC_CFGR_PPRE2_Pos = regs.pos("RCC_CFGR_PPRE2", 13)
+    RCC_CFGR_ADCPRE_F1_Pos = regs.pos("RCC_CFGR_ADCPRE", 14)  # F1 only: ADC prescaler in RCC
+    RCC_CFGR_USBPRE_F1_Pos = regs.pos("RCC_CFGR_USBPRE", 22)  # F1 only: PLL / 1.5 (0) or / 1 (1)
+    ahb_map = defines.get("AHB_PRESCALER_MAP", {})  # F1 has specific maps (AHB_PRESCALER_MAP_F1)
+    apb_map = defines.get("APB_PRESCALER_MAP", {})
+
+    hpre_val = ahb_map.get(calc_data.get("ahb_div"), 0)
+    ppre1_val = apb_map.get(calc_data.get("apb1_div"), 0)
+    ppre2_val = apb_map.get(calc_data.get("apb2_div"), 0)
+
+    cfgr_prescaler_mask = (0xF << RCC_CFGR_HPRE_Pos) | (0x7 << RCC_CFGR_PPRE1_Pos) | (0x7 << RCC_CFGR_PPRE2_Pos)
+    cfgr_prescaler_val = (hpre_val << RCC_CFGR_HPRE_Pos) | (ppre1_val << RCC_CFGR_PPRE1_Pos) | (
+                ppre2_val << RCC_CFGR_PPRE2_Pos)
+    if mcu_family == "STM32F1":  # ADCPRE/USBPRE only when the RCC params set them (e.g. from the F1 PLL solver)
+        adc_prescaler = cfg_params.get("adc_prescaler")
+        if adc_prescaler:
+            adcpre_val = defines.get("ADC_PRESCALER_VAL_MAP", {}).get(f"PCLK2 / {adc_prescaler}")
+            if adcpre_val is None:
+                errors.append(f"Invalid F1 ADC prescaler: {adc_prescaler}.")
+            else:
+                cfgr_prescaler_mask |= (0x3 << RCC_CFGR_ADCPRE_F1_Pos); cfgr_prescaler_val |= (adcpre_val << RCC_CFGR_ADCPRE_F1_Pos)
+        usb_prescaler = cfg_params.get("usb_prescaler")
+        if usb_prescaler:
+            usbpre_val = defines.get("USB_PRESCALER_MAP", {}).get(str(usb_prescaler))
+            if usbpre_val is None:
+                errors.append(f"Invalid F1 USB prescaler: {usb_prescaler}.")
+            else:
+                cfgr_prescaler_mask |= (1 << RCC_CFGR_USBPRE_F1_Pos); cfgr_prescaler_val |= (usbpre_val << RCC_CFGR_USBPRE_F1_Pos)
+    values["cfgr_prescaler"] = (cfgr_prescaler_mask, cfgr_prescaler_val)
+    values["sw"] = RCC_CFGR_SW_DEFAULT_VALS.get(cfg_params.get("sysclk_source", "HSI"), RCC_CFGR_SW_DEFAULT_VALS["HSI"])
+    return values
 
 
 def generate_rcc_code_cmsis(config, peripheral_rcc_clocks=None):  # Renamed gpio_rcc_clocks
@@ -7,57 +95,43 @@ def generate_rcc_code_cmsis(config, peripheral_rcc_clocks=None):  # Renamed gpio
     calc_data = config.get("calculated", {})
     mcu_family = cfg_params.get("mcu_family", "STM32F4")
     target_device = cfg_params.get("target_device", "STM32F407VG")
+    defines = resolve_defines(mcu_family, target_device)
+    regs = load_register_db(mcu_family, target_device)
 
-    # Get bit positions from CURRENT_MCU_DEFINES
+    # Get bit positions from the resolved defines
     # RCC_CR
-    RCC_CR_HSION_Pos = CURRENT_MCU_DEFINES.get("RCC_CR_HSION_Pos", 0);
+    RCC_CR_HSION_Pos = regs.pos("RCC_CR_HSION", 0);
     RCC_CR_HSION = (1 << RCC_CR_HSION_Pos)
-    RCC_CR_HSIRDY_Pos = CURRENT_MCU_DEFINES.get("RCC_CR_HSIRDY_Pos", 1);
+    RCC_CR_HSIRDY_Pos = regs.pos("RCC_CR_HSIRDY", 1);
     RCC_CR_HSIRDY = (1 << RCC_CR_HSIRDY_Pos)
-    RCC_CR_HSEON_Pos = CURRENT_MCU_DEFINES.get("RCC_CR_HSEON_Pos", 16);
+    RCC_CR_HSEON_Pos = regs.pos("RCC_CR_HSEON", 16);
     RCC_CR_HSEON = (1 << RCC_CR_HSEON_Pos)
-    RCC_CR_HSERDY_Pos = CURRENT_MCU_DEFINES.get("RCC_CR_HSERDY_Pos", 17);
+    RCC_CR_HSERDY_Pos = regs.pos("RCC_CR_HSERDY", 17);
     RCC_CR_HSERDY = (1 << RCC_CR_HSERDY_Pos)
-    RCC_CR_HSEBYP_Pos = CURRENT_MCU_DEFINES.get("RCC_CR_HSEBYP_Pos", 18);
+    RCC_CR_HSEBYP_Pos = regs.pos("RCC_CR_HSEBYP", 18);
     RCC_CR_HSEBYP = (1 << RCC_CR_HSEBYP_Pos)
-    RCC_CR_PLLON_Pos = CURRENT_MCU_DEFINES.get("RCC_CR_PLLON_Pos", 24);
+    RCC_CR_PLLON_Pos = regs.pos("RCC_CR_PLLON", 24);
     RCC_CR_PLLON = (1 << RCC_CR_PLLON_Pos)
-    RCC_CR_PLLRDY_Pos = CURRENT_MCU_DEFINES.get("RCC_CR_PLLRDY_Pos", 25);
+    RCC_CR_PLLRDY_Pos = regs.pos("RCC_CR_PLLRDY", 25);
     RCC_CR_PLLRDY = (1 << RCC_CR_PLLRDY_Pos)
-    # RCC_PLLCFGR (F2/F4)
-    RCC_PLLCFGR_PLLM_Pos = CURRENT_MCU_DEFINES.get("RCC_PLLCFGR_PLLM_Pos", 0)
-    RCC_PLLCFGR_PLLN_Pos = CURRENT_MCU_DEFINES.get("RCC_PLLCFGR_PLLN_Pos", 6)
-    RCC_PLLCFGR_PLLP_Pos = CURRENT_MCU_DEFINES.get("RCC_PLLCFGR_PLLP_Pos", 16)
-    RCC_PLLCFGR_PLLSRC_Pos = CURRENT_MCU_DEFINES.get("RCC_PLLCFGR_PLLSRC_Pos", 22)
-    RCC_PLLCFGR_PLLQ_Pos = CURRENT_MCU_DEFINES.get("RCC_PLLCFGR_PLLQ_Pos", 24)
-    # RCC_CFGR (F1 PLL specific parts)
-    RCC_CFGR_PLLSRC_F1_Pos = CURRENT_MCU_DEFINES.get("RCC_CFGR_PLLSRC_F1_Pos", 16)  # PLLSRC for F1
-    RCC_CFGR_PLLXTPRE_F1_Pos = CURRENT_MCU_DEFINES.get("RCC_CFGR_PLLXTPRE_F1_Pos", 17)  # PLLXTPRE for F1
-    RCC_CFGR_PLLMULL_F1_Pos = CURRENT_MCU_DEFINES.get("RCC_CFGR_PLLMULL_F1_Pos", 18)  # PLLMULL for F1
     # RCC_CFGR (Common)
-    RCC_CFGR_SW_Pos = CURRENT_MCU_DEFINES.get("RCC_CFGR_SW_Pos", 0)
-    RCC_CFGR_SWS_Pos = CURRENT_MCU_DEFINES.get("RCC_CFGR_SWS_Pos", 2)
-    RCC_CFGR_HPRE_Pos = CURRENT_MCU_DEFINES.get("RCC_CFGR_HPRE_Pos", 4)
-    RCC_CFGR_PPRE1_Pos = CURRENT_MCU_DEFINES.get("RCC_CFGR_PPRE1_Pos", 10)
-    RCC_CFGR_PPRE2_Pos = CURRENT_MCU_DEFINES.get("RCC_CFGR_PPRE2_Pos", 13)
+    RCC_CFGR_SW_Pos = regs.pos("RCC_CFGR_SW", 0)
+    RCC_CFGR_SWS_Pos = regs.pos("RCC_CFGR_SWS", 2)
     # FLASH_ACR
-    FLASH_ACR_LATENCY_Pos = CURRENT_MCU_DEFINES.get("FLASH_ACR_LATENCY_Pos", 0)
-    FLASH_ACR_LATENCY_Msk = CURRENT_MCU_DEFINES.get("FLASH_ACR_LATENCY_Msk", 0xF)
-    FLASH_ACR_PRFTEN_Pos = CURRENT_MCU_DEFINES.get("FLASH_ACR_PRFTEN_Pos", 8)  # F4: PRFTEN, F1: PRFTBE
-    FLASH_ACR_ICEN_Pos = CURRENT_MCU_DEFINES.get("FLASH_ACR_ICEN_Pos", 9)
-    FLASH_ACR_DCEN_Pos = CURRENT_MCU_DEFINES.get("FLASH_ACR_DCEN_Pos", 10)
+    FLASH_ACR_LATENCY_Pos = regs.pos("FLASH_ACR_LATENCY", 0)
+    FLASH_ACR_LATENCY_Msk = regs.mask("FLASH_ACR_LATENCY", 0xF)
     # PWR_CR (F4 VOS and Overdrive)
-    PWR_CR_VOS_Pos = CURRENT_MCU_DEFINES.get("PWR_CR_VOS_Pos", 14)
-    PWR_CR_ODEN_Pos = CURRENT_MCU_DEFINES.get("PWR_CR_ODEN_Pos", 16)
-    PWR_CR_ODSWEN_Pos = CURRENT_MCU_DEFINES.get("PWR_CR_ODSWEN_Pos", 17)
+    PWR_CR_VOS_Pos = regs.pos("PWR_CR_VOS", 14)
+    PWR_CR_ODEN_Pos = regs.pos("PWR_CR_ODEN", 16)
+    PWR_CR_ODSWEN_Pos = regs.pos("PWR_CR_ODSWEN", 17)
     # PWR_CSR (F4 Overdrive Ready)
-    PWR_CSR_ODRDY_Pos = CURRENT_MCU_DEFINES.get("PWR_CSR_ODRDY_Pos", 16)
-    PWR_CSR_ODSWRDY_Pos = CURRENT_MCU_DEFINES.get("PWR_CSR_ODSWRDY_Pos", 17)
+    PWR_CSR_ODRDY_Pos = regs.pos("PWR_CSR_ODRDY", 16)
+    PWR_CSR_ODSWRDY_Pos = regs.pos("PWR_CSR_ODSWRDY", 17)
     # RCC APB1ENR PWREN
-    RCC_APB1ENR_PWREN_Pos = CURRENT_MCU_DEFINES.get("RCC_APB1ENR_PWREN_Pos", 28)
+    RCC_APB1ENR_PWREN_Pos = regs.pos("RCC_APB1ENR_PWREN", 28)
     RCC_APB1ENR_PWREN = (1 << RCC_APB1ENR_PWREN_Pos)
 
-    cmsis_header = CURRENT_MCU_DEFINES.get('TARGET_DEVICES', {}).get(target_device, {}).get("cmsis_header",
+    cmsis_header = defines.get('TARGET_DEVICES', {}).get(target_device, {}).get("cmsis_header",
                                                                                             f"stm32{mcu_family.lower()}xx.h")
 
     if not cfg_params or not calc_data:
@@ -65,125 +139,89 @@ def generate_rcc_code_cmsis(config, peripheral_rcc_clocks=None):  # Renamed gpio
         return {"error_messages": errors, "cmsis_device_header": cmsis_header}
     if calc_data.get("errors"): errors.extend(calc_data["errors"])
 
-    c_code = "void RCC_User_Init(void) {\n"
-    c_code += f"    // RCC Configuration ({mcu_family} - CMSIS Register Level)\n\n"
+    # Code is built per step (register IR) so the overlapped boot mode can reorder the steps around the oscillator waits
+    hsi_code, hse_start_code, hse_wait_code, vos_code, overdrive_code, flash_code, pll_off_code, pll_config_code, \
+        pll_on_code, pll_wait_code, prescaler_code, switch_code, clocks_code = (RegisterProgram() for _ in range(13))
 
     # Enable HSI if needed
     if cfg_params.get("hsi_enabled", True) or \
             (cfg_params.get("pll_enabled") and cfg_params.get("pll_source") in ["HSI", "HSI/2"]):
-        c_code += f"    RCC->CR |= RCC_CR_HSION;\n    while (!(RCC->CR & RCC_CR_HSIRDY));\n\n"
+        hsi_code.set_bits("RCC->CR", RCC_CR_HSION, "HSION").wait("RCC->CR", RCC_CR_HSIRDY, RCC_CR_HSIRDY).blank()
 
     # Enable HSE if needed
     if cfg_params.get("hse_enabled") and \
             (cfg_params.get("sysclk_source") == "HSE" or \
              (cfg_params.get("pll_enabled") and cfg_params.get("pll_source") == "HSE")):
+        # HSEBYP may only change while HSE is off: never merged into the HSEON write
         if cfg_params.get("hse_bypass", False):
-            c_code += f"    RCC->CR |= RCC_CR_HSEBYP;\n"
+            hse_start_code.set_bits("RCC->CR", RCC_CR_HSEBYP, "HSEBYP", keep=True)
         else:
-            c_code += f"    RCC->CR &= ~RCC_CR_HSEBYP;\n"
-        c_code += f"    RCC->CR |= RCC_CR_HSEON;\n"
-        c_code += "    uint32_t hse_timeout = 5000;\n    while (!(RCC->CR & RCC_CR_HSERDY) && hse_timeout--) {{}}\n"
-        c_code += "    if (!(RCC->CR & RCC_CR_HSERDY)) { /* Error: HSE not ready! */ }\n\n"
+            hse_start_code.clear_bits("RCC->CR", RCC_CR_HSEBYP, "HSEBYP", keep=True)
+        hse_start_code.set_bits("RCC->CR", RCC_CR_HSEON, "HSEON")
+        hse_wait_code.wait("RCC->CR", RCC_CR_HSERDY, RCC_CR_HSERDY, timeout=5000, comment="HSERDY").blank()
 
     # VOS and Overdrive (F4 specific generally)
     if mcu_family == "STM32F4":
         vos_pwr_val = calc_data.get("vos_scale_pwr_cr_val")
         if vos_pwr_val is not None:
-            c_code += f"    RCC->APB1ENR |= RCC_APB1ENR_PWREN;\n"
-            c_code += f"    PWR->CR = (PWR->CR & ~((0x3UL << {PWR_CR_VOS_Pos}))) | ({vos_pwr_val}UL << {PWR_CR_VOS_Pos}); // Set VOS\n\n"
-        if calc_data.get("overdrive_active", False) and CURRENT_MCU_DEFINES.get('TARGET_DEVICES', {}).get(target_device,
+            vos_code.set_bits("RCC->APB1ENR", RCC_APB1ENR_PWREN, "PWREN")
+            vos_code.modify("PWR->CR", 0x3 << PWR_CR_VOS_Pos, vos_pwr_val << PWR_CR_VOS_Pos, "Set VOS").blank()
+        if calc_data.get("overdrive_active", False) and defines.get('TARGET_DEVICES', {}).get(target_device,
                                                                                                           {}).get(
                 "has_overdrive"):
-            c_code += f"    PWR->CR |= (1UL << {PWR_CR_ODEN_Pos}); while(!(PWR->CSR & (1UL << {PWR_CSR_ODRDY_Pos}))); // Enable OD\n"
-            c_code += f"    PWR->CR |= (1UL << {PWR_CR_ODSWEN_Pos}); while(!(PWR->CSR & (1UL << {PWR_CSR_ODSWRDY_Pos}))); // Switch to OD\n\n"
+            overdrive_code.set_bits("PWR->CR", 1 << PWR_CR_ODEN_Pos, "Enable OD", keep=True)
+            overdrive_code.wait("PWR->CSR", 1 << PWR_CSR_ODRDY_Pos, 1 << PWR_CSR_ODRDY_Pos)
+            overdrive_code.set_bits("PWR->CR", 1 << PWR_CR_ODSWEN_Pos, "Switch to OD", keep=True)
+            overdrive_code.wait("PWR->CSR", 1 << PWR_CSR_ODSWRDY_Pos, 1 << PWR_CSR_ODSWRDY_Pos).blank()
 
-    # Flash Latency (Common concept, register name/bits might differ)
-    flash_latency_val = calc_data.get("flash_latency_val")
-    prften_bit_name = "PRFTEN" if mcu_family in ["STM32F2", "STM32F4"] else "PRFTBE"  # F1 PRFTBE
-    flash_acr_prften = (1 << CURRENT_MCU_DEFINES.get(f"FLASH_ACR_{prften_bit_name}_Pos", FLASH_ACR_PRFTEN_Pos))
+    register_values = rcc_register_values(cfg_params, calc_data)
+    errors.extend(register_values["errors"])
 
+    # Flash Latency (Common concept, register name/bits might differ)
+    flash_latency_val = register_values["flash_latency"]
     if flash_latency_val is not None:
-        flash_acr_val = (flash_latency_val << FLASH_ACR_LATENCY_Pos) | flash_acr_prften
-        if mcu_family != "STM32F1":  # ICEN/DCEN for F2/F4
-            flash_acr_val |= (1 << FLASH_ACR_ICEN_Pos) | (1 << FLASH_ACR_DCEN_Pos)
-        c_code += f"    FLASH->ACR = 0x{flash_acr_val:08X}UL;\n"
-        c_code += f"    if ((FLASH->ACR & {FLASH_ACR_LATENCY_Msk}) != ({flash_latency_val}UL << {FLASH_ACR_LATENCY_Pos})) {{/*Error*/}}\n\n"
+        flash_code.write("FLASH->ACR", register_values["flash_acr"])
+        flash_code.wait("FLASH->ACR", FLASH_ACR_LATENCY_Msk, flash_latency_val << FLASH_ACR_LATENCY_Pos,
+                        comment="New latency taken into account").blank()
     else:
-        errors.append("Flash latency not determined."); c_code += "    // WARNING: Flash latency not configured!\n\n"
+        errors.append("Flash latency not determined."); flash_code.comment("WARNING: Flash latency not configured!").blank()
 
     # PLL Config
     if cfg_params.get("pll_enabled") and cfg_params.get("sysclk_source") == "PLL":
-        c_code += "    RCC->CR &= ~RCC_CR_PLLON; while(RCC->CR & RCC_CR_PLLRDY);\n\n"  # Disable PLL
+        pll_off_code.clear_bits("RCC->CR", RCC_CR_PLLON, "Disable PLL").wait("RCC->CR", RCC_CR_PLLRDY, 0).blank()
         if mcu_family in ["STM32F2", "STM32F4"]:
-            pllm = cfg_params.get("pllm_or_xtpre");
-            plln = cfg_params.get("plln_or_mul")
-            pllp_map = {"2": 0b00, "4": 0b01, "6": 0b10, "8": 0b11};
-            pllp_reg = pllp_map.get(str(cfg_params.get("pllp")))
-            pllq = cfg_params.get("pllq")
-            pllsrc_reg = (1 << RCC_PLLCFGR_PLLSRC_Pos) if cfg_params.get("pll_source") == "HSE" else 0
-            if None in [pllm, plln, pllp_reg, pllq] or not all(isinstance(x, int) for x in [pllm, plln, pllq]):
+            if register_values["pllcfgr"] is None:
                 errors.append("F2/F4 PLL M,N,P,Q invalid.");
-                c_code += "    // ERROR: F2/F4 PLL M,N,P,Q invalid.\n\n"
+                pll_config_code.comment("ERROR: F2/F4 PLL M,N,P,Q invalid.").blank()
             else:
-                pllcfgr = (pllm << RCC_PLLCFGR_PLLM_Pos) | (plln << RCC_PLLCFGR_PLLN_Pos) | \
-                          (pllp_reg << RCC_PLLCFGR_PLLP_Pos) | pllsrc_reg | (pllq << RCC_PLLCFGR_PLLQ_Pos)
-                c_code += f"    RCC->PLLCFGR = 0x{pllcfgr:08X}UL;\n"
+                pll_config_code.write("RCC->PLLCFGR", register_values['pllcfgr'])
         elif mcu_family == "STM32F1":
-            pllxtpre_f1 = (1 << RCC_CFGR_PLLXTPRE_F1_Pos) if cfg_params.get("pllm_or_xtpre",
-                                                                            1) == 2 else 0  # Div by 2 if val is 2
-            pllmul_f1 = (cfg_params.get("plln_or_mul", 9) - 2) & 0xF  # MUL is (val-2)
-            pllsrc_f1 = (1 << RCC_CFGR_PLLSRC_F1_Pos) if cfg_params.get("pll_source") == "HSE" else 0
-            cfgr_pll_bits = (pllsrc_f1 | pllxtpre_f1 | (pllmul_f1 << RCC_CFGR_PLLMULL_F1_Pos))
-            # Mask for F1 PLL bits in CFGR: PLLSRC, PLLXTPRE, PLLMULL[3:0]
-            f1_pll_mask = (1 << RCC_CFGR_PLLSRC_F1_Pos) | (1 << RCC_CFGR_PLLXTPRE_F1_Pos) | (
-                        0xF << RCC_CFGR_PLLMULL_F1_Pos)
-            c_code += f"    RCC->CFGR = (RCC->CFGR & ~{hex(f1_pll_mask)}UL) | {hex(cfgr_pll_bits)}UL;\n"
-
-        c_code += "    RCC->CR |= RCC_CR_PLLON; uint32_t pll_timeout=5000;\n"
-        c_code += "    while(!(RCC->CR & RCC_CR_PLLRDY) && pll_timeout--); if(!(RCC->CR & RCC_CR_PLLRDY)){/*Error*/}\n\n"
-
-    # Prescalers (HPRE, PPRE1, PPRE2 in RCC_CFGR)
-    prescaler_map_key_suffix = f"_{mcu_family}" if mcu_family == "STM32F1" else ""  # F1 has specific maps
-    ahb_map = CURRENT_MCU_DEFINES.get(f"AHB_PRESCALER_MAP{prescaler_map_key_suffix}",
-                                      CURRENT_MCU_DEFINES.get("AHB_PRESCALER_MAP", {}))
-    apb_map = CURRENT_MCU_DEFINES.get(f"APB_PRESCALER_MAP{prescaler_map_key_suffix}",
-                                      CURRENT_MCU_DEFINES.get("APB_PRESCALER_MAP", {}))
+            f1_pll_mask, cfgr_pll_bits = register_values["cfgr_pll"]
+            pll_config_code.modify("RCC->CFGR", f1_pll_mask, cfgr_pll_bits, "PLLSRC/PLLXTPRE/PLLMUL")
 
-    hpre_val = ahb_map.get(calc_data.get("ahb_div"), 0)
-    ppre1_val = apb_map.get(calc_data.get("apb1_div"), 0)
-    ppre2_val = apb_map.get(calc_data.get("apb2_div"), 0)
+        pll_on_code.set_bits("RCC->CR", RCC_CR_PLLON, "PLLON")
+        pll_wait_code.wait("RCC->CR", RCC_CR_PLLRDY, RCC_CR_PLLRDY, timeout=5000, comment="PLLRDY").blank()
 
-    cfgr_prescaler_mask = (0xF << RCC_CFGR_HPRE_Pos) | (0x7 << RCC_CFGR_PPRE1_Pos) | (0x7 << RCC_CFGR_PPRE2_Pos)
-    cfgr_prescaler_val = (hpre_val << RCC_CFGR_HPRE_Pos) | (ppre1_val << RCC_CFGR_PPRE1_Pos) | (
-                ppre2_val << RCC_CFGR_PPRE2_Pos)
-    c_code += f"    RCC->CFGR = (RCC->CFGR & ~{hex(cfgr_prescaler_mask)}UL) | {hex(cfgr_prescaler_val)}UL;\n\n"  # Apply prescalers
+    # Prescalers (HPRE, PPRE1, PPRE2 in RCC_CFGR)
+    cfgr_prescaler_mask, cfgr_prescaler_val = register_values["cfgr_prescaler"]
+    prescaler_code.modify("RCC->CFGR", cfgr_prescaler_mask, cfgr_prescaler_val, "HPRE/PPRE1/PPRE2").blank()
 
-    # SYSCLK Switch
-    sysclk_sw_val = 0;
-    sysclk_sws_val = 0
+    # SYSCLK Switch (SWS reads the SW encoding back, SWS_Pos - SW_Pos bits higher)
     sysclk_source = cfg_params.get("sysclk_source", "HSI")
-    sw_map_key = f"RCC_CFGR_SW_VALS_{mcu_family}"  # e.g. RCC_CFGR_SW_VALS_STM32F1
-    sw_map = CURRENT_MCU_DEFINES.get(sw_map_key, CURRENT_MCU_DEFINES.get("RCC_CFGR_SW_VALS", {}))  # Fallback generic
-    sws_map_key = f"RCC_CFGR_SWS_VALS_{mcu_family}"
-    sws_map = CURRENT_MCU_DEFINES.get(sws_map_key, CURRENT_MCU_DEFINES.get("RCC_CFGR_SWS_VALS", {}))
-
-    sysclk_sw_val = sw_map.get(sysclk_source, sw_map.get("HSI", 0))  # Default HSI if invalid
-    sysclk_sws_val = sws_map.get(sysclk_source, sws_map.get("HSI", 0))
+    sysclk_sw_val = register_values["sw"]
 
     # Sanity checks for SYSCLK source
     if sysclk_source == "HSE" and not cfg_params.get("hse_enabled"):
         errors.append("HSE SYSCLK, but HSE not enabled. Fallback HSI.");
-        sysclk_sw_val = sw_map.get("HSI");
-        sysclk_sws_val = sws_map.get("HSI")
+        sysclk_sw_val = RCC_CFGR_SW_DEFAULT_VALS["HSI"]
     if sysclk_source == "PLL" and not cfg_params.get("pll_enabled"):
         errors.append("PLL SYSCLK, but PLL not enabled. Fallback HSI.");
-        sysclk_sw_val = sw_map.get("HSI");
-        sysclk_sws_val = sws_map.get("HSI")
+        sysclk_sw_val = RCC_CFGR_SW_DEFAULT_VALS["HSI"]
 
     cfgr_sw_mask = (0x3 << RCC_CFGR_SW_Pos)  # SW bits are usually 0-1
-    c_code += f"    RCC->CFGR = (RCC->CFGR & ~{hex(cfgr_sw_mask)}UL) | ({sysclk_sw_val}UL << {RCC_CFGR_SW_Pos});\n"
-    c_code += f"    uint32_t sw_timeout=5000; while((RCC->CFGR & (0x3UL << {RCC_CFGR_SWS_Pos})) != ({sysclk_sws_val}UL << {RCC_CFGR_SWS_Pos}) && sw_timeout--);\n"
-    c_code += f"    if((RCC->CFGR & (0x3UL << {RCC_CFGR_SWS_Pos})) != ({sysclk_sws_val}UL << {RCC_CFGR_SWS_Pos})){{/*Error*/}}\n\n"
+    switch_code.modify("RCC->CFGR", cfgr_sw_mask, sysclk_sw_val << RCC_CFGR_SW_Pos, "SYSCLK switch")
+    switch_code.wait("RCC->CFGR", 0x3 << RCC_CFGR_SWS_Pos,
+                     (sysclk_sw_val << RCC_CFGR_SW_Pos) << (RCC_CFGR_SWS_Pos - RCC_CFGR_SW_Pos), timeout=5000).blank()
 
     # Peripheral clocks (collected from other modules)
     if peripheral_rcc_clocks:
@@ -211,12 +249,48 @@ def generate_rcc_code_cmsis(config, peripheral_rcc_clocks=None):  # Renamed gpio
                 enr_reg_name = f"{bus_name}ENR"  # e.g. AHB1ENR
                 if mcu_family == "STM32F1" and bus_name == "AHB1": enr_reg_name = "AHBENR"  # F1 specific
 
-                c_code += f"    // Enable clocks for {bus_name} peripherals\n"
+                clocks_code.comment(f"Enable clocks for {bus_name} peripherals")
                 # Create ORed mask for all macros on this bus
                 or_mask_str = " | ".join(macros)
-                c_code += f"    RCC->{enr_reg_name} |= ({or_mask_str});\n"
-                c_code += f"    volatile uint32_t dummy_read_{enr_reg_name.lower()} = RCC->{enr_reg_name}; (void)dummy_read_{enr_reg_name.lower()};\n\n"  # Delay after clock enable
+                clocks_code.set_bits(f"RCC->{enr_reg_name}", or_mask_str)
+                clocks_code.read(f"RCC->{enr_reg_name}").blank()  # Delay after clock enable
 
-    c_code += "}\n"
+    init_style = config.get("init_style", "code")  # "table": const register table + reg_init_apply()
+    if cfg_params.get("overlapped_boot"):
+        # RCC_Boot_Start(): bus clocks on and the oscillators started, SYSCLK still on HSI, so main() can run the
+        # clock-independent inits (GPIO, DMA, ...) during the HSE start-up. RCC_Boot_Finish() then waits for HSE,
+        # lets the PLL lock while the over-drive, flash and prescalers are set, and switches SYSCLK.
+        pll_from_hse = bool(pll_on_code.ops) and cfg_params.get("pll_source") == "HSE"
+        start_code = RegisterProgram().extend(hsi_code).extend(clocks_code)
+        if hse_start_code.ops:
+            start_code.comment("HSE start-up runs in the background until RCC_Boot_Finish()").extend(hse_start_code).blank()
+        start_code.extend(vos_code).extend(pll_off_code).extend(pll_config_code)
+        if not pll_from_hse: start_code.extend(pll_on_code).blank()
+        finish_code = RegisterProgram().extend(hse_wait_code)
+        if pll_from_hse: finish_code.extend(pll_on_code).blank()
+        finish_code.extend(overdrive_code).extend(flash_code).extend(prescaler_code)  # Over-drive ramps while the PLL locks
+        finish_code.extend(pll_wait_code).extend(switch_code)
+        start_body, start_program = render_init_body(start_code, "RCC_Boot_Start_regs", init_style)
+        finish_body, finish_program = render_init_body(finish_code, "RCC_Boot_Finish_regs", init_style)
+        c_code = "void RCC_Boot_Start(void) {\n"
+        c_code += f"    // RCC Configuration ({mcu_family} - CMSIS Register Level), overlapped boot: stage 1\n"
+        c_code += start_body + "}\n\n"
+        c_code += "void RCC_Boot_Finish(void) {\n"
+        c_code += "    // Overlapped boot: stage 2, after the clock-independent peripheral inits\n"
+        c_code += finish_body + "}\n"
+        return {"source_function": c_code, "init_call": "RCC_Boot_Start()", "init_call_finish": "RCC_Boot_Finish()",
+                "system_core_clock_update_needed": True, "error_messages": errors, "cmsis_device_header": cmsis_header,
+                "register_programs": [("RCC_Boot_Start", start_program), ("RCC_Boot_Finish", finish_program)]}
+
+    # Prescalers go in while the PLL is off, next to the PLL bits / SYSCLK switch in the same CFGR write
+    init_code = RegisterProgram()
+    for step_code in (hsi_code, hse_start_code, hse_wait_code, vos_code, overdrive_code, flash_code, pll_off_code,
+                      prescaler_code, pll_config_code, pll_on_code, pll_wait_code, switch_code, clocks_code):
+        init_code.extend(step_code)
+    init_body, init_program = render_init_body(init_code, "RCC_User_Init_regs", init_style)
+    c_code = "void RCC_User_Init(void) {\n"
+    c_code += f"    // RCC Configuration ({mcu_family} - CMSIS Register Level)\n"
+    c_code += init_body + "}\n"
     return {"source_function": c_code, "init_call": "RCC_User_Init()",
-            "system_core_clock_update_needed": True, "error_messages": errors, "cmsis_device_header": cmsis_header}
\ No newline at end of file
+            "system_core_clock_update_needed": True, "error_messages": errors, "cmsis_device_header": cmsis_header,
+            "register_programs": [("RCC_User_Init", init_program)]}
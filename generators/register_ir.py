@@ -0,0 +1,288 @@
+# --- NEW FILE generators/register_ir.py ---
+# Register-operation IR for init functions: generators record what they do to each register
+# (full writes, masked read-modify-writes, polls, opaque C) and render C from it after optimize().
+#
+# optimize() only rewrites what is provably equivalent for ordinary control registers:
+#   - adjacent ops on the same register merge (two RMWs become one, a write absorbs a following RMW,
+#     a write makes a preceding write/RMW dead); ops on other registers in between keep them apart,
+#   - an RMW on a register whose value is known (full write earlier in the same function, no poll,
+#     opaque C or keep-op on it since) becomes a plain store of the folded constant, or disappears
+#     if it doesn't change the value,
+#   - a masked write covering all 32 bits becomes a plain store.
+# keep=True marks ops whose exact sequence matters to the hardware (trigger registers like TIMx->EGR,
+# bits that must change in a separate write); they are never merged, folded or dropped.
+# Values are ints; a str value is a C expression, rendered as is and never merged or folded.
+#
+# Two output styles (MCU config "init_style"): straight-line C (render()), or a const table of
+# {register, clear mask, set value, flags} entries in flash applied by the reg_init_apply() loop
+# (render_table(), REG_INIT_INTERPRETER_C). estimate_init_cost() gives rough size/cycles of both.
+
+FULL_MASK = 0xFFFFFFFF
+
+
+class RegisterProgram:
+    """Ordered register operations of one init function."""
+    __slots__ = ("ops",)
+
+    def __init__(self, ops=None):
+        self.ops = list(ops) if ops else []
+
+    def write(self, reg, value, comment="", keep=False):
+        self.ops.append({"op": "write", "reg": reg, "value": value, "comment": comment, "keep": keep})
+        return self
+
+    def modify(self, reg, mask, value, comment="", keep=False):
+        """reg = (reg & ~mask) | value"""
+        self.ops.append({"op": "modify", "reg": reg, "mask": mask, "value": value, "comment": comment, "keep": keep})
+        return self
+
+    def set_bits(self, reg, bits, comment="", keep=False):
+        return self.modify(reg, bits, bits, comment, keep)
+
+    def clear_bits(self, reg, bits, comment="", keep=False):
+        return self.modify(reg, bits, 0, comment, keep)
+
+    def wait(self, reg, mask, value, timeout=None, comment=""):
+        """Poll until (reg & mask) == value; with a timeout, give up after that many polls."""
+        self.ops.append({"op": "wait", "reg": reg, "mask": mask, "value": value, "timeout": timeout, "comment": comment})
+        return self
+
+    def read(self, reg, comment=""):
+        """Dummy read-back, e.g. the bus delay after a peripheral clock enable."""
+        self.ops.append({"op": "read", "reg": reg, "comment": comment})
+        return self
+
+    def raw(self, c_code):
+        """Opaque C statement(s), unindented; may touch any register."""
+        self.ops.append({"op": "raw", "code": c_code})
+        return self
+
+    def comment(self, text):
+        self.ops.append({"op": "comment", "text": text})
+        return self
+
+    def blank(self):
+        self.ops.append({"op": "blank"})
+        return self
+
+    def extend(self, other):
+        self.ops.extend(other.ops)
+        return self
+
+    def register_op_count(self):
+        """(stores, loads) of the write/modify ops: every masked write costs a load as well."""
+        stores = sum(1 for op in self.ops if op["op"] in ("write", "modify"))
+        return stores, sum(1 for op in self.ops if op["op"] == "modify")
+
+    def optimize(self):
+        """Optimized copy of the program (see the module comment for the rules)."""
+        out = []
+        known = {}  # reg -> value after the last full write, while nothing else could have changed it
+        last_reg_op = None  # Index in out of the last write/modify/wait/raw op (comments and blanks don't count)
+        for op in self.ops:
+            kind = op["op"]
+            if kind in ("comment", "blank"):
+                out.append(op)
+                continue
+            if kind == "raw":
+                known.clear()
+                out.append(op); last_reg_op = len(out) - 1
+                continue
+            if kind in ("wait", "read"):
+                known.pop(op["reg"], None)
+                out.append(op); last_reg_op = len(out) - 1
+                continue
+
+            op = dict(op)
+            reg = op["reg"]
+            foldable = not op["keep"] and isinstance(op["value"], int) and isinstance(op.get("mask", 0), int)
+            if foldable and kind == "modify" and reg in known:  # RMW of a known value: plain store, or nothing
+                new_value = (known[reg] & ~op["mask"]) | op["value"]
+                if new_value == known[reg]:
+                    continue
+                op = {"op": "write", "reg": reg, "value": new_value, "comment": op["comment"], "keep": False}
+                kind = "write"
+
+            prev = out[last_reg_op] if last_reg_op is not None else None
+            if foldable and prev is not None and prev["op"] in ("write", "modify") and prev["reg"] == reg and \
+                    not prev["keep"] and isinstance(prev["value"], int) and isinstance(prev.get("mask", 0), int):
+                comment = "; ".join(c for c in (prev["comment"], op["comment"]) if c)
+                if kind == "write":  # The earlier store is dead
+                    merged = dict(op, comment=comment)
+                elif prev["op"] == "write":
+                    merged = dict(prev, value=(prev["value"] & ~op["mask"]) | op["value"], comment=comment)
+                else:
+                    merged = dict(prev, mask=prev["mask"] | op["mask"],
+                                  value=(prev["value"] & ~op["mask"]) | op["value"], comment=comment)
+                out[last_reg_op] = merged
+                op = merged
+            else:
+                out.append(op); last_reg_op = len(out) - 1
+
+            if op["op"] == "modify" and op["mask"] == FULL_MASK:
+                op = out[last_reg_op] = {"op": "write", "reg": reg, "value": op["value"], "comment": op["comment"],
+                                         "keep": op["keep"]}
+            if op["op"] == "write" and not op["keep"] and isinstance(op["value"], int):
+                known[reg] = op["value"]
+            else:
+                known.pop(reg, None)
+        return RegisterProgram(out)
+
+    def render(self, indent="    "):
+        """C statements, one per line; declares the poll timeout counter first if any wait needs it."""
+        lines = []
+        if any(op["op"] == "wait" and op["timeout"] for op in self.ops):
+            lines.append(f"{indent}uint32_t timeout;")
+        for op in self.ops:
+            kind = op["op"]
+            if kind == "blank":
+                if lines and lines[-1]: lines.append("")
+                continue
+            if kind == "comment":
+                lines.append(f"{indent}// {op['text']}")
+                continue
+            if kind == "raw":
+                lines.extend(f"{indent}{line}" for line in op["code"].splitlines())
+                continue
+            reg = op["reg"]
+            if kind == "read":
+                name = "dummy_read_" + reg.split("->")[-1].lower()
+                lines.append(f"{indent}volatile uint32_t {name} = {reg}; (void){name};" + (f" // {op['comment']}" if op["comment"] else ""))
+                continue
+            if kind == "write":
+                value = op["value"]
+                line = f"{reg} = " + (f"0x{value:08X}UL;" if isinstance(value, int) else f"{value};")
+            elif kind == "modify":
+                mask, value = op["mask"], op["value"]
+                mask_str = f"0x{mask:X}UL" if isinstance(mask, int) else f"({mask})"
+                value_str = f"0x{value:X}UL" if isinstance(value, int) else f"({value})"
+                if value == mask:
+                    line = f"{reg} |= {mask_str};"
+                elif value == 0:
+                    line = f"{reg} &= ~{mask_str};"
+                else:
+                    line = f"{reg} = ({reg} & ~{mask_str}) | {value_str};"
+            else:  # wait
+                mask, value = op["mask"], op["value"]
+                if value == mask:
+                    condition = f"!({reg} & 0x{mask:X}UL)"
+                elif value == 0:
+                    condition = f"({reg} & 0x{mask:X}UL)"
+                else:
+                    condition = f"({reg} & 0x{mask:X}UL) != 0x{value:X}UL"
+                if op["timeout"]:
+                    line = f"timeout = {op['timeout']}UL; while ({condition} && timeout--);"
+                else:
+                    line = f"while ({condition});"
+            lines.append(f"{indent}{line}" + (f" // {op['comment']}" if op.get("comment") else ""))
+        while lines and not lines[-1]: lines.pop()
+        return "\n".join(lines) + "\n"
+
+
+def render_optimized(program, indent="    "):
+    """Optimized C of the program (register_op_count() before/after gives the coalescing savings)."""
+    return program.optimize().render(indent)
+
+
+REG_INIT_INTERPRETER_C = """typedef struct { volatile uint32_t *reg; uint32_t clear; uint32_t set; uint32_t flags; } reg_init_entry_t;
+#define REG_INIT_RMW   0U // *reg = (*reg & ~clear) | set
+#define REG_INIT_WRITE 1U // *reg = set
+#define REG_INIT_WAIT  2U // Poll until (*reg & clear) == set, at most flags >> 8 times (0: no timeout)
+#define REG_INIT_READ  3U // Read back only
+
+static void reg_init_apply(const reg_init_entry_t *entry, uint32_t count) {
+    for (; count; count--, entry++) {
+        switch (entry->flags & 0x3U) {
+        case REG_INIT_RMW: *entry->reg = (*entry->reg & ~entry->clear) | entry->set; break;
+        case REG_INIT_WRITE: *entry->reg = entry->set; break;
+        case REG_INIT_WAIT: {
+            uint32_t timeout = entry->flags >> 8;
+            while ((*entry->reg & entry->clear) != entry->set) { if (timeout && !--timeout) break; }
+            break;
+        }
+        default: (void)*entry->reg; break;
+        }
+    }
+}"""
+
+# Rough Cortex-M3/M4 figures (Thumb-2, -Os, no flash wait states): (code bytes incl. literal-pool words, cycles).
+# Polls are counted as one iteration, since how long a ready bit takes is not a property of the code.
+STRAIGHT_LINE_OP_COST = {"write": (12, 6), "modify": (18, 9), "wait": (12, 7), "read": (6, 3), "raw": (8, 4)}
+STRAIGHT_LINE_TIMEOUT_COST = (8, 3)
+TABLE_ENTRY_BYTES = 16
+TABLE_OP_CYCLES = {"write": 12, "modify": 16, "wait": 18, "read": 10}
+TABLE_CALL_COST = (10, 8)  # Per reg_init_apply() call: table address, count, bl
+REG_INIT_INTERPRETER_BYTES = 96  # reg_init_apply() itself, once per image
+
+
+def _c_value(value):
+    return f"0x{value:X}UL" if isinstance(value, int) else f"({value})"
+
+
+def render_table(program, table_name, indent="    "):
+    """Table-driven body: the ops as a static const reg_init_entry_t table (flash), applied by reg_init_apply().
+    Opaque C (raw ops) runs between the table segments around it."""
+    entry_lines, body_lines, entry_count, segment_start = [], [], 0, 0
+    for op in program.ops:
+        kind = op["op"]
+        if kind == "comment":
+            entry_lines.append(f"{indent}    // {op['text']}")
+            continue
+        if kind == "blank":
+            continue
+        if kind == "raw":
+            if entry_count > segment_start:
+                body_lines.append(f"{indent}reg_init_apply(&{table_name}[{segment_start}], {entry_count - segment_start}U);")
+            body_lines.extend(f"{indent}{line}" for line in op["code"].splitlines())
+            segment_start = entry_count
+            continue
+        if kind == "write":
+            clear, set_value, flags = "0xFFFFFFFFUL", _c_value(op["value"]), "REG_INIT_WRITE"
+        elif kind == "modify":
+            clear, set_value, flags = _c_value(op["mask"]), _c_value(op["value"]), "REG_INIT_RMW"
+        elif kind == "wait":
+            clear, set_value = _c_value(op["mask"]), _c_value(op["value"])
+            flags = f"REG_INIT_WAIT | ({op['timeout']}UL << 8)" if op["timeout"] else "REG_INIT_WAIT"
+        else:  # read
+            clear, set_value, flags = "0UL", "0UL", "REG_INIT_READ"
+        entry_lines.append(f"{indent}    {{&{op['reg']}, {clear}, {set_value}, {flags}}},"
+                           + (f" // {op['comment']}" if op.get("comment") else ""))
+        entry_count += 1
+    if entry_count > segment_start:
+        body_lines.append(f"{indent}reg_init_apply(&{table_name}[{segment_start}], {entry_count - segment_start}U);")
+    if not entry_count:
+        return "\n".join(body_lines) + "\n" if body_lines else ""
+    table = [f"{indent}static const reg_init_entry_t {table_name}[{entry_count}] = {{"] + entry_lines + [f"{indent}}};"]
+    return "\n".join(table + body_lines) + "\n"
+
+
+def estimate_init_cost(program):
+    """{"code": (bytes, cycles), "table": (bytes, cycles)} of the program in both output styles.
+    Table bytes exclude the shared reg_init_apply() (REG_INIT_INTERPRETER_BYTES)."""
+    code_bytes = code_cycles = table_bytes = table_cycles = 0
+    table_calls, in_segment = 0, False
+    for op in program.ops:
+        kind = op["op"]
+        if kind in ("comment", "blank"): continue
+        op_bytes, op_cycles = STRAIGHT_LINE_OP_COST[kind]
+        if kind == "wait" and op["timeout"]:
+            op_bytes += STRAIGHT_LINE_TIMEOUT_COST[0]; op_cycles += STRAIGHT_LINE_TIMEOUT_COST[1]
+        code_bytes += op_bytes; code_cycles += op_cycles
+        if kind == "raw":  # Same C in both styles, and it ends the current table segment
+            table_bytes += op_bytes; table_cycles += op_cycles; in_segment = False
+            continue
+        table_bytes += TABLE_ENTRY_BYTES; table_cycles += TABLE_OP_CYCLES[kind]
+        if not in_segment: table_calls += 1; in_segment = True
+    table_bytes += table_calls * TABLE_CALL_COST[0]; table_cycles += table_calls * TABLE_CALL_COST[1]
+    return {"code": (code_bytes, code_cycles), "table": (table_bytes, table_cycles)}
+
+
+def render_init_body(program, table_name, init_style="code", indent="    "):
+    """Optimized body of an init function in the requested style ("code" or "table").
+    Returns (c_code, optimized program) so callers can report the program in "register_programs"."""
+    optimized = program.optimize()
+    if init_style == "table":
+        body = render_table(optimized, table_name, indent)
+    else:
+        body = optimized.render(indent)
+    return body, optimized
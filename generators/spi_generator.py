@@ -1,4 +1,7 @@
-from core.mcu_defines_loader import CURRENT_MCU_DEFINES
+from core.clock_tree import kernel_clock_hz
+from core.define_resolver import resolve_defines
+from core.mcu_defines_loader import load_register_db
+from core.pin_af_db import load_pin_af_db
 
 
 def generate_spi_code_cmsis(config, rcc_config_calculated):
@@ -6,6 +9,8 @@ def generate_spi_code_cmsis(config, rcc_config_calculated):
     instance_name = params.get("instance_name")
     mcu_family = params.get("mcu_family", "STM32F4")
     target_device = params.get("target_device", "STM32F407VG")
+    defines = resolve_defines(mcu_family, target_device)
+    regs = load_register_db(mcu_family, target_device)
 
     error_messages = [];
     gpio_pins_to_configure_af = [];
@@ -16,38 +21,37 @@ def generate_spi_code_cmsis(config, rcc_config_calculated):
                 "rcc_clocks_to_enable": [], "gpio_pins_to_configure_af": [],
                 "default_helper_functions": "", "error_messages": []}
 
-    # Get peripheral info and bit positions from CURRENT_MCU_DEFINES
-    spi_info_map_key = f"SPI_PERIPHERALS_INFO_{mcu_family}"
-    spi_info_map = CURRENT_MCU_DEFINES.get(spi_info_map_key, CURRENT_MCU_DEFINES.get("SPI_PERIPHERALS_INFO", {}))
+    # Get peripheral info and bit positions from the resolved defines
+    spi_info_map = defines.get("SPI_PERIPHERALS_INFO", {})
     instance_info = spi_info_map.get(instance_name)
     if not instance_info: error_messages.append(f"Unknown SPI instance: {instance_name}"); return {
         "error_messages": error_messages}
 
     # Bit positions (with fallbacks to F4 style)
-    SPI_CR1_SPE_Pos = CURRENT_MCU_DEFINES.get("SPI_CR1_SPE_Pos", 6)
-    SPI_CR1_MSTR_Pos = CURRENT_MCU_DEFINES.get("SPI_CR1_MSTR_Pos", 2)
-    SPI_CR1_BR_Pos = CURRENT_MCU_DEFINES.get("SPI_CR1_BR_Pos", 3)
-    SPI_CR1_CPHA_Pos = CURRENT_MCU_DEFINES.get("SPI_CR1_CPHA_Pos", 0)
-    SPI_CR1_CPOL_Pos = CURRENT_MCU_DEFINES.get("SPI_CR1_CPOL_Pos", 1)
-    SPI_CR1_LSBFIRST_Pos = CURRENT_MCU_DEFINES.get("SPI_CR1_LSBFIRST_Pos", 7)
-    SPI_CR1_SSI_Pos = CURRENT_MCU_DEFINES.get("SPI_CR1_SSI_Pos", 8)
-    SPI_CR1_SSM_Pos = CURRENT_MCU_DEFINES.get("SPI_CR1_SSM_Pos", 9)
-    SPI_CR1_RXONLY_Pos = CURRENT_MCU_DEFINES.get("SPI_CR1_RXONLY_Pos", 10)  # For simplex RX
-    SPI_CR1_DFF_Pos = CURRENT_MCU_DEFINES.get("SPI_CR1_DFF_Pos", 11)  # Data frame format (8/16 bit)
-    SPI_CR1_BIDIOE_Pos = CURRENT_MCU_DEFINES.get("SPI_CR1_BIDIOE_Pos", 14)  # Bidir output enable
-    SPI_CR1_BIDIMODE_Pos = CURRENT_MCU_DEFINES.get("SPI_CR1_BIDIMODE_Pos", 15)  # Bidir mode enable
-    SPI_CR1_CRCEN_Pos = CURRENT_MCU_DEFINES.get("SPI_CR1_CRCEN_Pos", 13)
-
-    SPI_CR2_SSOE_Pos = CURRENT_MCU_DEFINES.get("SPI_CR2_SSOE_Pos", 2)  # NSS output enable (HW master)
-    SPI_CR2_TXEIE_Pos = CURRENT_MCU_DEFINES.get("SPI_CR2_TXEIE_Pos", 7)
-    SPI_CR2_RXNEIE_Pos = CURRENT_MCU_DEFINES.get("SPI_CR2_RXNEIE_Pos", 6)
-    SPI_CR2_ERRIE_Pos = CURRENT_MCU_DEFINES.get("SPI_CR2_ERRIE_Pos", 5)
-
-    SPI_SR_RXNE_Pos = CURRENT_MCU_DEFINES.get("SPI_SR_RXNE_Pos", 0)
-    SPI_SR_TXE_Pos = CURRENT_MCU_DEFINES.get("SPI_SR_TXE_Pos", 1)
-    SPI_SR_BSY_Pos = CURRENT_MCU_DEFINES.get("SPI_SR_BSY_Pos", 7)
-
-    apb_clk_freq = rcc_config_calculated.get(f"pclk{instance_info['bus'][-1]}_freq_hz", 0)  # pclk1 or pclk2
+    SPI_CR1_SPE_Pos = regs.pos("SPI_CR1_SPE", 6)
+    SPI_CR1_MSTR_Pos = regs.pos("SPI_CR1_MSTR", 2)
+    SPI_CR1_BR_Pos = regs.pos("SPI_CR1_BR", 3)
+    SPI_CR1_CPHA_Pos = regs.pos("SPI_CR1_CPHA", 0)
+    SPI_CR1_CPOL_Pos = regs.pos("SPI_CR1_CPOL", 1)
+    SPI_CR1_LSBFIRST_Pos = regs.pos("SPI_CR1_LSBFIRST", 7)
+    SPI_CR1_SSI_Pos = regs.pos("SPI_CR1_SSI", 8)
+    SPI_CR1_SSM_Pos = regs.pos("SPI_CR1_SSM", 9)
+    SPI_CR1_RXONLY_Pos = regs.pos("SPI_CR1_RXONLY", 10)  # For simplex RX
+    SPI_CR1_DFF_Pos = regs.pos("SPI_CR1_DFF", 11)  # Data frame format (8/16 bit)
+    SPI_CR1_BIDIOE_Pos = regs.pos("SPI_CR1_BIDIOE", 14)  # Bidir output enable
+    SPI_CR1_BIDIMODE_Pos = regs.pos("SPI_CR1_BIDIMODE", 15)  # Bidir mode enable
+    SPI_CR1_CRCEN_Pos = regs.pos("SPI_CR1_CRCEN", 13)
+
+    SPI_CR2_SSOE_Pos = regs.pos("SPI_CR2_SSOE", 2)  # NSS output enable (HW master)
+    SPI_CR2_TXEIE_Pos = regs.pos("SPI_CR2_TXEIE", 7)
+    SPI_CR2_RXNEIE_Pos = regs.pos("SPI_CR2_RXNEIE", 6)
+    SPI_CR2_ERRIE_Pos = regs.pos("SPI_CR2_ERRIE", 5)
+
+    SPI_SR_RXNE_Pos = regs.pos("SPI_SR_RXNE", 0)
+    SPI_SR_TXE_Pos = regs.pos("SPI_SR_TXE", 1)
+    SPI_SR_BSY_Pos = regs.pos("SPI_SR_BSY", 7)
+
+    apb_clk_freq = kernel_clock_hz(rcc_config_calculated, instance_info['bus'])  # pclk1 or pclk2
     if apb_clk_freq == 0: error_messages.append(f"APB clock for {instance_name} is 0Hz.")
 
     rcc_clocks = [instance_info["rcc_macro"]] if instance_info.get("rcc_macro") else []
@@ -57,39 +61,24 @@ def generate_spi_code_cmsis(config, rcc_config_calculated):
     source_function += f"    // {instance_name} ({mcu_family}) Configuration (CMSIS Register Level)\n"
 
     # Pin suggestions
-    pin_sugg_map_key = f"SPI_PIN_CONFIG_SUGGESTIONS_{mcu_family}"
-    pin_sugg_map_all = CURRENT_MCU_DEFINES.get(pin_sugg_map_key,
-                                               CURRENT_MCU_DEFINES.get("SPI_PIN_CONFIG_SUGGESTIONS", {}))
-    pin_suggestions = pin_sugg_map_all.get(target_device, {}).get(instance_name, {})
-    if pin_suggestions:
+    pin_af_db = load_pin_af_db(mcu_family, target_device)
+    pin_types = pin_af_db.signal_types(instance_name)
+    if pin_types:
         source_function += f"    // Suggested GPIO for {instance_name} on {target_device} (config in GPIO_User_Init):\n"
-        for pin_type, pin_data_str in pin_suggestions.items():
-            pin_options = pin_data_str.split(" or ");
-            first_option = pin_options[0];
-            parts = first_option.split('/')
-            if len(parts) >= 1:
-                port_char = parts[0][1];
-                pin_num = parts[0][2:]
-                af_num = -1  # Default for F1 (remap) or if not specified
-                if len(parts) == 2 and parts[1].upper().startswith("AF"):
-                    try:
-                        af_num = int(parts[1][2:])
-                    except ValueError:
-                        pass
-                if mcu_family == "STM32F1": af_num = -1  # Indicate remap needed for F1
-                if port_char.isalpha() and pin_num.isdigit():
-                    gpio_pins_to_configure_af.append((port_char, pin_num, af_num, f"{instance_name}_{pin_type}"))
-                    source_function += f"    //   {pin_type}: {first_option} (AF{af_num if af_num != -1 else 'Remap'})\n"
+        for pin_type in pin_types:
+            pin_option = pin_af_db.default_option(instance_name, pin_type)
+            af_num = pin_option.af
+            if mcu_family == "STM32F1": af_num = -1  # Indicate remap needed for F1
+            gpio_pins_to_configure_af.append((pin_option.port_char, pin_option.pin_num, af_num, pin_option.signal))
+            source_function += f"    //   {pin_type}: {pin_option} (AF{af_num if af_num != -1 else 'Remap'})\n"
         source_function += "\n"
 
     # --- CR1 Config ---
     cr1_val = 0
-    spi_modes_map_key = f"SPI_MODES_{mcu_family}"
-    spi_modes_map = CURRENT_MCU_DEFINES.get(spi_modes_map_key, CURRENT_MCU_DEFINES.get("SPI_MODES", {}))
+    spi_modes_map = defines.get("SPI_MODES", {})
     cr1_val |= (spi_modes_map.get(params.get("mode_str", "Master"), 1) << SPI_CR1_MSTR_Pos)
 
-    spi_dirs_map_key = f"SPI_DIRECTIONS_{mcu_family}"
-    spi_dirs_map = CURRENT_MCU_DEFINES.get(spi_dirs_map_key, CURRENT_MCU_DEFINES.get("SPI_DIRECTIONS", {}))
+    spi_dirs_map = defines.get("SPI_DIRECTIONS", {})
     dir_val = spi_dirs_map.get(params.get("direction_str", "2 Lines Full Duplex"), 0)
     if dir_val == 0:
         cr1_val &= ~((1 << SPI_CR1_BIDIMODE_Pos) | (1 << SPI_CR1_RXONLY_Pos))
@@ -100,26 +89,25 @@ def generate_spi_code_cmsis(config, rcc_config_calculated):
     elif dir_val == 3:
         cr1_val &= ~(1 << SPI_CR1_BIDIMODE_Pos); cr1_val |= (1 << SPI_CR1_RXONLY_Pos)
 
-    spi_data_sizes_map = CURRENT_MCU_DEFINES.get("SPI_DATA_SIZES", {})  # Usually common
+    spi_data_sizes_map = defines.get("SPI_DATA_SIZES", {})  # Usually common
     cr1_val |= (spi_data_sizes_map.get(params.get("data_size_str", "8-bit"), 0) << SPI_CR1_DFF_Pos)
 
-    spi_cpol_map = CURRENT_MCU_DEFINES.get("SPI_CPOL", {});
-    spi_cpha_map = CURRENT_MCU_DEFINES.get("SPI_CPHA", {})
+    spi_cpol_map = defines.get("SPI_CPOL", {});
+    spi_cpha_map = defines.get("SPI_CPHA", {})
     cr1_val |= (spi_cpol_map.get(params.get("cpol_str", "Low"), 0) << SPI_CR1_CPOL_Pos)
     cr1_val |= (spi_cpha_map.get(params.get("cpha_str", "1 Edge"), 0) << SPI_CR1_CPHA_Pos)
 
-    spi_nss_modes_map_key = f"SPI_NSS_MODES_{mcu_family}"
-    spi_nss_modes_map = CURRENT_MCU_DEFINES.get(spi_nss_modes_map_key, CURRENT_MCU_DEFINES.get("SPI_NSS_MODES", {}))
+    spi_nss_modes_map = defines.get("SPI_NSS_MODES", {})
     nss_val = spi_nss_modes_map.get(params.get("nss_mode_str", "Software (Master/Slave)"), 0)
     if nss_val == 0:
         cr1_val |= (1 << SPI_CR1_SSM_Pos) | (1 << SPI_CR1_SSI_Pos)
     else:
         cr1_val &= ~(1 << SPI_CR1_SSM_Pos)  # HW NSS
 
-    spi_baud_psc_map = CURRENT_MCU_DEFINES.get("SPI_BAUD_PRESCALERS", {})
+    spi_baud_psc_map = defines.get("SPI_BAUD_PRESCALERS", {})
     cr1_val |= (spi_baud_psc_map.get(params.get("baud_prescaler_str", "2"), 0b000) << SPI_CR1_BR_Pos)
 
-    spi_first_bit_map = CURRENT_MCU_DEFINES.get("SPI_FIRST_BIT", {})
+    spi_first_bit_map = defines.get("SPI_FIRST_BIT", {})
     cr1_val |= (spi_first_bit_map.get(params.get("first_bit_str", "MSB First"), 0) << SPI_CR1_LSBFIRST_Pos)
 
     crc_poly = params.get("crc_polynomial", 0)
@@ -0,0 +1,135 @@
+# --- NEW FILE generators/stop_mode_generator.py ---
+# STOP mode enter/exit pair: RCC_EnterStop() sleeps in STOP and returns with the clocks restored by
+# RCC_ExitStop(), which only redoes what STOP loses. STOP keeps CFGR prescalers, PLLCFGR (F1: the CFGR
+# PLL bits), FLASH_ACR, VOS and the peripheral clock enables; it switches HSE and the PLL off, drops
+# the F4 over-drive and leaves SYSCLK on HSI. So the exit is: HSE on, PLL on (after HSERDY only if
+# the PLL is fed by HSE), over-drive back on while the PLL locks, SYSCLK switch.
+# Without clock profiles the sequence is fixed at generation time from the RCC config; with profiles
+# RCC_EnterStop() keeps one word (HSEON/PLLON, SW, over-drive) so the active profile comes back.
+# RCC_STOP_WAKEUP_LATENCY_US is the estimate from core.clock_tree.stop_wakeup_latency_us().
+
+from core.clock_tree import stop_wakeup_latency_us
+from core.define_resolver import resolve_defines
+from core.mcu_defines_loader import load_register_db
+from generators.clock_profile_generator import resolve_clock_profiles
+from generators.rcc_generator import rcc_register_values
+
+
+def _when(condition, statement, indent="    "):
+    """statement if condition is True, nothing if False, else guarded by the C condition string."""
+    if condition is True: return f"{indent}{statement}\n"
+    if not condition: return ""
+    return f"{indent}if ({condition}) {{ {statement} }}\n"
+
+
+def generate_stop_mode_code_cmsis(rcc_config):
+    """RCC_EnterStop()/RCC_ExitStop() for the RCC config (params "stop_mode_routines", "stop_low_power_regulator")."""
+    cfg_params = rcc_config.get("params", {})
+    mcu_family = cfg_params.get("mcu_family", "STM32F4")
+    target_device = cfg_params.get("target_device", "STM32F407VG")
+    defines = resolve_defines(mcu_family, target_device)
+    regs = load_register_db(mcu_family, target_device)
+    errors = []
+    if not cfg_params.get("stop_mode_routines"):
+        return {"source_function": "// STOP mode routines not requested\n", "init_call": "", "error_messages": errors}
+
+    RCC_CR_HSEON = 1 << regs.pos("RCC_CR_HSEON", 16)
+    RCC_CR_HSERDY = 1 << regs.pos("RCC_CR_HSERDY", 17)
+    RCC_CR_PLLON = 1 << regs.pos("RCC_CR_PLLON", 24)
+    RCC_CR_PLLRDY = 1 << regs.pos("RCC_CR_PLLRDY", 25)
+    RCC_CFGR_SW_Pos = regs.pos("RCC_CFGR_SW", 0)
+    RCC_CFGR_SWS_Pos = regs.pos("RCC_CFGR_SWS", 2)
+    RCC_APB1ENR_PWREN = 1 << regs.pos("RCC_APB1ENR_PWREN", 28)
+    PWR_CR_LPDS = 1 << regs.pos("PWR_CR_LPDS", 0)
+    PWR_CR_PDDS = 1 << regs.pos("PWR_CR_PDDS", 1)
+    PWR_CR_ODEN = 1 << regs.pos("PWR_CR_ODEN", 16)
+    PWR_CR_ODSWEN = 1 << regs.pos("PWR_CR_ODSWEN", 17)
+    PWR_CSR_ODRDY = 1 << regs.pos("PWR_CSR_ODRDY", 16)
+    PWR_CSR_ODSWRDY = 1 << regs.pos("PWR_CSR_ODSWRDY", 17)
+    if mcu_family == "STM32F1":
+        pllsrc_register, RCC_PLLSRC_HSE = "CFGR", 1 << regs.pos("RCC_CFGR_PLLSRC", 16)
+    else:
+        pllsrc_register, RCC_PLLSRC_HSE = "PLLCFGR", 1 << regs.pos("RCC_PLLCFGR_PLLSRC", 22)
+    sw_mask = 0x3 << RCC_CFGR_SW_Pos
+    sws_mask = 0x3 << RCC_CFGR_SWS_Pos
+    sw_hse = 1 << RCC_CFGR_SW_Pos  # SW/SWS encoding is the same on F1/F2/F4: HSI 0, HSE 1, PLL 2
+    RCC_STOP_STATE_OD = 1 << (RCC_CFGR_SW_Pos + 2)  # Free bit next to SW in the saved state word
+    has_overdrive = mcu_family == "STM32F4" and defines.get('TARGET_DEVICES', {}).get(target_device, {}).get(
+        "has_overdrive", False)
+    low_power_regulator = bool(cfg_params.get("stop_low_power_regulator"))
+
+    profiles = resolve_clock_profiles(rcc_config)
+    latencies = []
+    for name, params, calculated in profiles:
+        params = dict(params, stop_low_power_regulator=low_power_regulator,
+                      hse_startup_us=cfg_params.get("hse_startup_us"))
+        latencies.append((name,) + stop_wakeup_latency_us(params, calculated))
+    saves_state = len(profiles) > 1
+    if saves_state:  # The active profile is only known at run time
+        any_od = has_overdrive and any(calculated.get("overdrive_active") for _, _, calculated in profiles)
+        hse_on, pll_on = f"state & 0x{RCC_CR_HSEON:X}UL", f"state & 0x{RCC_CR_PLLON:X}UL"
+        pll_from_hse = f"RCC->{pllsrc_register} & 0x{RCC_PLLSRC_HSE:X}UL"
+        od_on = f"state & 0x{RCC_STOP_STATE_OD:X}UL" if any_od else False
+        sw_is_hse = f"(state & 0x{sw_mask:X}UL) == 0x{sw_hse:X}UL"
+        sw_expr, sws_expr = f"(state & 0x{sw_mask:X}UL)", f"((state & 0x{sw_mask:X}UL) << {RCC_CFGR_SWS_Pos - RCC_CFGR_SW_Pos})"
+    else:
+        calculated = rcc_config.get("calculated", {})
+        register_values = rcc_register_values(cfg_params, calculated)
+        pll_on = cfg_params.get("sysclk_source") == "PLL" and bool(cfg_params.get("pll_enabled"))
+        hse_on = bool(cfg_params.get("hse_enabled")) and (cfg_params.get("sysclk_source") == "HSE" or (
+            pll_on and cfg_params.get("pll_source") == "HSE"))
+        pll_from_hse = pll_on and cfg_params.get("pll_source") == "HSE"
+        od_on = has_overdrive and pll_on and bool(calculated.get("overdrive_active"))
+        sw_is_hse = cfg_params.get("sysclk_source") == "HSE"
+        sw_val = register_values["sw"] if cfg_params.get("sysclk_source") != "PLL" or pll_on else 0
+        sw_expr, sws_expr = f"0x{sw_val << RCC_CFGR_SW_Pos:X}UL", f"0x{sw_val << RCC_CFGR_SWS_Pos:X}UL"
+        if cfg_params.get("sysclk_source") == "HSE" and not hse_on: errors.append("SYSCLK is HSE, but HSE is disabled.")
+    wait_hse = f"timeout = 5000; while (!(RCC->CR & 0x{RCC_CR_HSERDY:X}UL) && timeout--);"
+    wait_pll = f"timeout = 5000; while (!(RCC->CR & 0x{RCC_CR_PLLRDY:X}UL) && timeout--);"
+    latency_us = max(total_us for _, total_us, _ in latencies)
+
+    c_code = "// STOP mode: RCC_EnterStop() returns with SYSCLK back on the clocks active before STOP\n"
+    for name, total_us, steps in latencies:
+        c_code += f"// Wake-up latency{f' ({name})' if saves_state else ''} ~{total_us}us: " + " + ".join(
+            f"{step} {us}us" for step, us in steps) + "\n"
+    c_code += f"#define RCC_STOP_WAKEUP_LATENCY_US {latency_us}U // Estimate from typical start-up times\n\n"
+    if saves_state:
+        c_code += "static uint32_t rcc_stop_state; // HSEON/PLLON, SW" + (" and over-drive" if od_on else "") + " before STOP\n\n"
+
+    c_code += "void RCC_ExitStop(void) {\n"
+    if saves_state: c_code += "    uint32_t state = rcc_stop_state;\n"
+    if not (hse_on or pll_on):
+        c_code += "    // SYSCLK is HSI: nothing was lost in STOP\n}\n\n"
+    else:
+        c_code += "    uint32_t timeout;\n"
+        c_code += "    // STOP kept the PLL, prescaler, flash and VOS settings: restart the oscillators only\n"
+        c_code += _when(hse_on, f"RCC->CR |= 0x{RCC_CR_HSEON:X}UL;")
+        if pll_on:
+            pll_code = _when(pll_from_hse, wait_hse)  # The PLL input must be stable before PLLON
+            pll_code += f"    RCC->CR |= 0x{RCC_CR_PLLON:X}UL;\n"
+            if od_on:  # Over-drive was dropped in STOP; its ramp runs while the PLL locks
+                pll_code += _when(od_on, f"PWR->CR |= 0x{PWR_CR_ODEN:X}UL; while (!(PWR->CSR & 0x{PWR_CSR_ODRDY:X}UL));")
+                pll_code += _when(od_on, f"PWR->CR |= 0x{PWR_CR_ODSWEN:X}UL; while (!(PWR->CSR & 0x{PWR_CSR_ODSWRDY:X}UL));")
+            pll_code += f"    {wait_pll}\n"
+            if pll_on is True:
+                c_code += pll_code
+            else:
+                c_code += f"    if ({pll_on}) {{\n" + "".join("    " + line + "\n" for line in pll_code.splitlines()) + "    }\n"
+        c_code += _when(sw_is_hse, wait_hse)
+        c_code += f"    RCC->CFGR = (RCC->CFGR & ~0x{sw_mask:X}UL) | {sw_expr};\n"
+        c_code += f"    while ((RCC->CFGR & 0x{sws_mask:X}UL) != {sws_expr});\n}}\n\n"
+
+    c_code += "void RCC_EnterStop(void) {\n"
+    if saves_state:
+        c_code += f"    rcc_stop_state = (RCC->CR & 0x{RCC_CR_HSEON | RCC_CR_PLLON:X}UL) | (RCC->CFGR & 0x{sw_mask:X}UL)"
+        c_code += f" | ((PWR->CR & 0x{PWR_CR_ODEN:X}UL) ? 0x{RCC_STOP_STATE_OD:X}UL : 0UL);\n" if od_on else ";\n"
+    c_code += f"    RCC->APB1ENR |= 0x{RCC_APB1ENR_PWREN:X}UL;\n"
+    c_code += f"    PWR->CR = (PWR->CR & ~0x{PWR_CR_PDDS | PWR_CR_LPDS:X}UL)" + (
+        f" | 0x{PWR_CR_LPDS:X}UL; // STOP, low-power regulator (slower wake-up)\n" if low_power_regulator else
+        "; // STOP (not STANDBY), main regulator on for the fastest wake-up\n")
+    c_code += "    SCB->SCR |= SCB_SCR_SLEEPDEEP_Msk;\n"
+    c_code += "    __DSB();\n    __WFI(); // Any EXTI wake-up line; its handler runs on HSI before the clocks below are restored\n"
+    c_code += "    SCB->SCR &= ~SCB_SCR_SLEEPDEEP_Msk;\n"
+    c_code += "    RCC_ExitStop();\n}\n"
+    return {"source_function": c_code, "init_call": "", "error_messages": errors,
+            "stop_wakeup_latency_us": latency_us}
@@ -1,6 +1,9 @@
 # --- MODIFIED FILE generators/timer_generator.py ---
 
-from core.mcu_defines_loader import CURRENT_MCU_DEFINES
+from core.clock_tree import kernel_clock_hz, timer_kernel_clock_hz
+from core.define_resolver import resolve_defines
+from core.mcu_defines_loader import load_register_db
+from generators.register_ir import RegisterProgram, render_init_body
 
 
 def generate_timer_code_cmsis(config, rcc_config_calculated):
@@ -8,6 +11,8 @@ def generate_timer_code_cmsis(config, rcc_config_calculated):
     instance_name = params.get("instance_name")
     mcu_family = params.get("mcu_family", "STM32F4")
     target_device = params.get("target_device", "STM32F407VG")
+    defines = resolve_defines(mcu_family, target_device)
+    regs = load_register_db(mcu_family, target_device)
 
     error_messages = []
     gpio_pins_to_configure_af = [] # For OC/IC channels
@@ -16,90 +21,86 @@ def generate_timer_code_cmsis(config, rcc_config_calculated):
         return {"source_function": f"// {instance_name or 'Timer'} not enabled\n", "init_call": "",
                 "rcc_clocks_to_enable": [], "gpio_pins_to_configure_af": [], "error_messages": []}
 
-    # Get peripheral info and bit positions from CURRENT_MCU_DEFINES
-    timer_info_map_key = f"TIMER_PERIPHERALS_INFO_{mcu_family}"
-    timer_info_map = CURRENT_MCU_DEFINES.get(timer_info_map_key, CURRENT_MCU_DEFINES.get("TIMER_PERIPHERALS_INFO", {}))
+    # Get peripheral info and bit positions from the resolved defines
+    timer_info_map = defines.get("TIMER_PERIPHERALS_INFO", {})
     instance_info = timer_info_map.get(instance_name)
     if not instance_info:
         error_messages.append(f"Unknown Timer: {instance_name}")
         return {"error_messages": error_messages, "source_function": f"// Error: Unknown Timer {instance_name}\n", "init_call": ""}
 
     # Common CR1 bits
-    TIM_CR1_CEN_Pos = CURRENT_MCU_DEFINES.get("TIM_CR1_CEN_Pos", 0);
+    TIM_CR1_CEN_Pos = regs.pos("TIM_CR1_CEN", 0);
     TIM_CR1_CEN = (1 << TIM_CR1_CEN_Pos)
-    TIM_CR1_URS_Pos = CURRENT_MCU_DEFINES.get("TIM_CR1_URS_Pos", 2)
+    TIM_CR1_URS_Pos = regs.pos("TIM_CR1_URS", 2)
     TIM_CR1_URS = (1 << TIM_CR1_URS_Pos)
-    TIM_CR1_OPM_Pos = CURRENT_MCU_DEFINES.get("TIM_CR1_OPM_Pos", 3)
+    TIM_CR1_OPM_Pos = regs.pos("TIM_CR1_OPM", 3)
     TIM_CR1_OPM = (1 << TIM_CR1_OPM_Pos)
-    TIM_CR1_DIR_Pos = CURRENT_MCU_DEFINES.get("TIM_CR1_DIR_Pos", 4);
+    TIM_CR1_DIR_Pos = regs.pos("TIM_CR1_DIR", 4);
     TIM_CR1_DIR = (1 << TIM_CR1_DIR_Pos)
-    TIM_CR1_CMS_Pos = CURRENT_MCU_DEFINES.get("TIM_CR1_CMS_Pos", 5)
-    TIM_CR1_ARPE_Pos = CURRENT_MCU_DEFINES.get("TIM_CR1_ARPE_Pos", 7);
+    TIM_CR1_CMS_Pos = regs.pos("TIM_CR1_CMS", 5)
+    TIM_CR1_ARPE_Pos = regs.pos("TIM_CR1_ARPE", 7);
     TIM_CR1_ARPE = (1 << TIM_CR1_ARPE_Pos)
-    TIM_CR1_CKD_Pos = CURRENT_MCU_DEFINES.get("TIM_CR1_CKD_Pos", 8)
+    TIM_CR1_CKD_Pos = regs.pos("TIM_CR1_CKD", 8)
     # DIER bits
-    TIM_DIER_UIE_Pos = CURRENT_MCU_DEFINES.get("TIM_DIER_UIE_Pos", 0);
+    TIM_DIER_UIE_Pos = regs.pos("TIM_DIER_UIE", 0);
     TIM_DIER_UIE = (1 << TIM_DIER_UIE_Pos)
-    TIM_DIER_CC1IE_Pos = CURRENT_MCU_DEFINES.get("TIM_DIER_CC1IE_Pos", 1); TIM_DIER_CC1IE = (1 << TIM_DIER_CC1IE_Pos)
-    TIM_DIER_CC2IE_Pos = CURRENT_MCU_DEFINES.get("TIM_DIER_CC2IE_Pos", 2); TIM_DIER_CC2IE = (1 << TIM_DIER_CC2IE_Pos)
-    TIM_DIER_CC3IE_Pos = CURRENT_MCU_DEFINES.get("TIM_DIER_CC3IE_Pos", 3); TIM_DIER_CC3IE = (1 << TIM_DIER_CC3IE_Pos)
-    TIM_DIER_CC4IE_Pos = CURRENT_MCU_DEFINES.get("TIM_DIER_CC4IE_Pos", 4); TIM_DIER_CC4IE = (1 << TIM_DIER_CC4IE_Pos)
+    TIM_DIER_CC1IE_Pos = regs.pos("TIM_DIER_CC1IE", 1); TIM_DIER_CC1IE = (1 << TIM_DIER_CC1IE_Pos)
+    TIM_DIER_CC2IE_Pos = regs.pos("TIM_DIER_CC2IE", 2); TIM_DIER_CC2IE = (1 << TIM_DIER_CC2IE_Pos)
+    TIM_DIER_CC3IE_Pos = regs.pos("TIM_DIER_CC3IE", 3); TIM_DIER_CC3IE = (1 << TIM_DIER_CC3IE_Pos)
+    TIM_DIER_CC4IE_Pos = regs.pos("TIM_DIER_CC4IE", 4); TIM_DIER_CC4IE = (1 << TIM_DIER_CC4IE_Pos)
 
     # EGR bits
-    TIM_EGR_UG_Pos = CURRENT_MCU_DEFINES.get("TIM_EGR_UG_Pos", 0);
+    TIM_EGR_UG_Pos = regs.pos("TIM_EGR_UG", 0);
     TIM_EGR_UG = (1 << TIM_EGR_UG_Pos)
     # CCMRx bits (generic positions, actual register CCMR1/2 depends on channel)
-    TIM_CCMRx_OCxM_Pos = CURRENT_MCU_DEFINES.get("TIM_CCMRx_OCxM_Pos", 4)
-    TIM_CCMRx_OCxPE_Pos = CURRENT_MCU_DEFINES.get("TIM_CCMRx_OCxPE_Pos", 3)
-    TIM_CCMRx_CCxS_Pos = CURRENT_MCU_DEFINES.get("TIM_CCMRx_CCxS_Pos", 0)
-    TIM_CCMRx_ICxPSC_Pos = CURRENT_MCU_DEFINES.get("TIM_CCMRx_ICxPSC_Pos", 2)
-    TIM_CCMRx_ICxF_Pos = CURRENT_MCU_DEFINES.get("TIM_CCMRx_ICxF_Pos", 4)
+    TIM_CCMRx_OCxM_Pos = regs.pos("TIM_CCMRx_OCxM", 4)
+    TIM_CCMRx_OCxPE_Pos = regs.pos("TIM_CCMRx_OCxPE", 3)
+    TIM_CCMRx_CCxS_Pos = regs.pos("TIM_CCMRx_CCxS", 0)
+    TIM_CCMRx_ICxPSC_Pos = regs.pos("TIM_CCMRx_ICxPSC", 2)
+    TIM_CCMRx_ICxF_Pos = regs.pos("TIM_CCMRx_ICxF", 4)
     # CCER bits
-    TIM_CCER_CC1E_Pos = CURRENT_MCU_DEFINES.get("TIM_CCER_CC1E_Pos", 0); TIM_CCER_CC1E = (1 << TIM_CCER_CC1E_Pos) # Example for CH1
-    TIM_CCER_CC1P_Pos = CURRENT_MCU_DEFINES.get("TIM_CCER_CC1P_Pos", 1); TIM_CCER_CC1P = (1 << TIM_CCER_CC1P_Pos) # Example for CH1
+    TIM_CCER_CC1E_Pos = regs.pos("TIM_CCER_CC1E", 0); TIM_CCER_CC1E = (1 << TIM_CCER_CC1E_Pos) # Example for CH1
+    TIM_CCER_CC1P_Pos = regs.pos("TIM_CCER_CC1P", 1); TIM_CCER_CC1P = (1 << TIM_CCER_CC1P_Pos) # Example for CH1
 
     # BDTR (Advanced timers)
-    TIM_BDTR_MOE_Pos = CURRENT_MCU_DEFINES.get("TIM_BDTR_MOE_Pos", 15);
+    TIM_BDTR_MOE_Pos = regs.pos("TIM_BDTR_MOE", 15);
     TIM_BDTR_MOE = (1 << TIM_BDTR_MOE_Pos)
     # SMCR
-    TIM_SMCR_ECE_Pos = CURRENT_MCU_DEFINES.get("TIM_SMCR_ECE_Pos", 14);
+    TIM_SMCR_ECE_Pos = regs.pos("TIM_SMCR_ECE", 14);
     TIM_SMCR_ECE = (1 << TIM_SMCR_ECE_Pos)
-    TIM_SMCR_SMS_Pos = CURRENT_MCU_DEFINES.get("TIM_SMCR_SMS_Pos", 0)
-    TIM_SMCR_TS_Pos = CURRENT_MCU_DEFINES.get("TIM_SMCR_TS_Pos", 4)
+    TIM_SMCR_SMS_Pos = regs.pos("TIM_SMCR_SMS", 0)
+    TIM_SMCR_TS_Pos = regs.pos("TIM_SMCR_TS", 4)
 
     timer_type_from_config = params.get("timer_type", "GP16") # Get from config if available
     timer_bus = instance_info.get("bus", "APB1")
     rcc_clocks = [instance_info["rcc_macro"]] if instance_info.get("rcc_macro") else []
     if not rcc_clocks: error_messages.append(f"RCC macro for {instance_name} not found.")
 
-    pclk_freq = rcc_config_calculated.get(f"pclk{timer_bus[-1]}_freq_hz", 0)
-    apb_div = rcc_config_calculated.get(f"apb{timer_bus[-1]}_div", 1)
-    tim_kernel_clk = pclk_freq if apb_div == 1 else pclk_freq * 2
+    pclk_freq = kernel_clock_hz(rcc_config_calculated, timer_bus)
+    tim_kernel_clk = timer_kernel_clock_hz(rcc_config_calculated, timer_bus)
     if pclk_freq == 0: error_messages.append(f"PCLK for {instance_name} ({timer_bus}) is 0Hz.")
 
     source_function = f"void {instance_name}_User_Init(void) {{\n"
     source_function += f"    // {instance_name} ({timer_type_from_config}, {mcu_family}) Init (CMSIS Register Level)\n"
-    source_function += f"    // Timer Kernel Clock (approx): {tim_kernel_clk / 1e6:.2f} MHz\n\n"
+    source_function += f"    // Timer Kernel Clock (approx): {tim_kernel_clk / 1e6:.2f} MHz\n"
+    init_code = RegisterProgram().blank()
 
     cr1_val = 0
-    source_function += f"    {instance_name}->PSC = {params.get('prescaler', 0)}UL; // Prescaler\n"
-    source_function += f"    {instance_name}->ARR = {params.get('period', 65535)}UL; // Auto-Reload Register\n"
+    init_code.write(f"{instance_name}->PSC", f"{params.get('prescaler', 0)}UL", "Prescaler")
+    init_code.write(f"{instance_name}->ARR", f"{params.get('period', 65535)}UL", "Auto-Reload Register")
 
-    counter_modes_map_key = f"TIM_COUNTER_MODES_{mcu_family}"
-    counter_modes_map = CURRENT_MCU_DEFINES.get(counter_modes_map_key, CURRENT_MCU_DEFINES.get("TIM_COUNTER_MODES", {}))
+    counter_modes_map = defines.get("TIM_COUNTER_MODES", {})
     cr1_val |= counter_modes_map.get(params.get("counter_mode", "Up"), 0)
 
     if params.get("auto_reload_preload", True): cr1_val |= TIM_CR1_ARPE
 
-    clk_div_map_key = f"TIM_CLOCK_DIVISION_{mcu_family}"
-    clk_div_map = CURRENT_MCU_DEFINES.get(clk_div_map_key, CURRENT_MCU_DEFINES.get("TIM_CLOCK_DIVISION", {}))
+    clk_div_map = defines.get("TIM_CLOCK_DIVISION", {})
     cr1_val |= (clk_div_map.get(params.get("clock_division", "1"), 0) << TIM_CR1_CKD_Pos)
-    source_function += f"    {instance_name}->CR1 = 0x{cr1_val:08X}UL;\n\n"
+    init_code.write(f"{instance_name}->CR1", cr1_val).blank()
 
     smcr_val = 0
-    clk_src_str = params.get("clock_source", CURRENT_MCU_DEFINES.get("TIM_INTERNAL_CLOCK_SOURCE", "Internal Clock (CK_INT)"))
-    etr_modes_map_key = f"TIM_ETR_MODES_{mcu_family}"
-    etr_modes_map = CURRENT_MCU_DEFINES.get(etr_modes_map_key, CURRENT_MCU_DEFINES.get("TIM_ETR_MODES", {}))
+    clk_src_str = params.get("clock_source", defines.get("TIM_INTERNAL_CLOCK_SOURCE", "Internal Clock (CK_INT)"))
+    etr_modes_map = defines.get("TIM_ETR_MODES", {})
 
     if clk_src_str == etr_modes_map.get("ETR - Mode 2 (via ECE, no prescaler/filter on ETR path)"):
         smcr_val |= TIM_SMCR_ECE
@@ -112,7 +113,7 @@ def generate_timer_code_cmsis(config, rcc_config_calculated):
     # Add more slave mode controller configurations here (Encoder, TIxFPx etc.) if supported by UI
 
     if smcr_val != 0:
-        source_function += f"    {instance_name}->SMCR = 0x{smcr_val:08X}UL;\n\n"
+        init_code.write(f"{instance_name}->SMCR", smcr_val).blank()
 
     ccer_val = 0
     # Initialize CCMR registers to 0 or read current if appending
@@ -131,15 +132,13 @@ def generate_timer_code_cmsis(config, rcc_config_calculated):
 
         if ch_cfg.get("mode") == "Output Compare":
             oc = ch_cfg.get("output_compare", {})
-            oc_modes_map_key = f"TIM_OC_MODES_{mcu_family}"
-            oc_modes_map = CURRENT_MCU_DEFINES.get(oc_modes_map_key, CURRENT_MCU_DEFINES.get("TIM_OC_MODES", {}))
+            oc_modes_map = defines.get("TIM_OC_MODES", {})
             ccmr_val_ch_bits |= (oc_modes_map.get(oc.get("oc_mode", "Frozen"), 0) << TIM_CCMRx_OCxM_Pos)
             if oc.get("preload_enable", True): ccmr_val_ch_bits |= (1 << TIM_CCMRx_OCxPE_Pos)
 
-            source_function += f"    {instance_name}->CCR{ch_num} = {oc.get('pulse', 0)}UL; // Channel {ch_num} Pulse\n"
+            init_code.write(f"{instance_name}->CCR{ch_num}", f"{oc.get('pulse', 0)}UL", f"Channel {ch_num} Pulse")
 
-            oc_pol_map_key = f"TIM_OC_POLARITY_{mcu_family}"
-            oc_pol_map = CURRENT_MCU_DEFINES.get(oc_pol_map_key, CURRENT_MCU_DEFINES.get("TIM_OC_POLARITY", {}))
+            oc_pol_map = defines.get("TIM_OC_POLARITY", {})
             if oc_pol_map.get(oc.get("polarity", "High (non-inverted)"), 0) == 1: # Low (inverted)
                 ccer_val |= (1 << (TIM_CCER_CC1P_Pos + (ch_num - 1) * 4))  # CCxP bit
 
@@ -147,22 +146,19 @@ def generate_timer_code_cmsis(config, rcc_config_calculated):
 
             # GPIO AF message (needs more detail about specific pins)
             gpio_pins_to_configure_af.append(f"{instance_name}_CH{ch_num}_OC") # Placeholder string for now
-            source_function += f"    // Configure GPIO for {instance_name} Channel {ch_num} Output Compare AF\n"
+            init_code.comment(f"Configure GPIO for {instance_name} Channel {ch_num} Output Compare AF")
 
         elif ch_cfg.get("mode") == "Input Capture":
             ic = ch_cfg.get("input_capture", {})
-            ic_sel_map_key = f"TIM_IC_SELECTION_{mcu_family}"
-            ic_sel_map = CURRENT_MCU_DEFINES.get(ic_sel_map_key, CURRENT_MCU_DEFINES.get("TIM_IC_SELECTION", {}))
+            ic_sel_map = defines.get("TIM_IC_SELECTION", {})
             ccmr_val_ch_bits |= (ic_sel_map.get(ic.get("selection", "Direct (TIx)"), 0b01) << TIM_CCMRx_CCxS_Pos)
 
-            ic_psc_map_key = f"TIM_IC_PRESCALER_{mcu_family}"
-            ic_psc_map = CURRENT_MCU_DEFINES.get(ic_psc_map_key, CURRENT_MCU_DEFINES.get("TIM_IC_PRESCALER", {}))
+            ic_psc_map = defines.get("TIM_IC_PRESCALER", {})
             ccmr_val_ch_bits |= (ic_psc_map.get(ic.get("prescaler", "1 (every event)"), 0) << TIM_CCMRx_ICxPSC_Pos)
 
             ccmr_val_ch_bits |= ((ic.get("filter", 0) & 0xF) << TIM_CCMRx_ICxF_Pos)
 
-            ic_pol_map_key = f"TIM_IC_POLARITY_{mcu_family}"
-            ic_pol_map = CURRENT_MCU_DEFINES.get(ic_pol_map_key, CURRENT_MCU_DEFINES.get("TIM_IC_POLARITY", {}))
+            ic_pol_map = defines.get("TIM_IC_POLARITY", {})
             pol_bits = ic_pol_map.get(ic.get("polarity", "Rising Edge"), 0b00)
 
             # CCER polarity bits for input capture (CCxP and CCxNP)
@@ -185,7 +181,7 @@ def generate_timer_code_cmsis(config, rcc_config_calculated):
             ccer_val |= (1 << (TIM_CCER_CC1E_Pos + (ch_num - 1) * 4))  # CCxE bit
 
             gpio_pins_to_configure_af.append(f"{instance_name}_CH{ch_num}_IC") # Placeholder
-            source_function += f"    // Configure GPIO for {instance_name} Channel {ch_num} Input Capture AF\n"
+            init_code.comment(f"Configure GPIO for {instance_name} Channel {ch_num} Input Capture AF")
 
         # Apply ccmr_val_ch_bits to the correct CCMR register
         if ccmr_reg_idx == 0: # CCMR1
@@ -195,13 +191,13 @@ def generate_timer_code_cmsis(config, rcc_config_calculated):
 
     if any(ch.get("enabled") for ch in params.get("channels", [])): # Only write if channels were configured
         if instance_info.get("max_channels", 0) >= 1:
-            source_function += f"    {instance_name}->CCMR1 = 0x{ccmr1_val:08X}UL;\n"
+            init_code.write(f"{instance_name}->CCMR1", ccmr1_val)
         if instance_info.get("max_channels", 0) >= 3: # Only if CCMR2 exists
-            source_function += f"    {instance_name}->CCMR2 = 0x{ccmr2_val:08X}UL;\n"
-        source_function += "\n"
+            init_code.write(f"{instance_name}->CCMR2", ccmr2_val)
+        init_code.blank()
 
     if ccer_val != 0:
-        source_function += f"    {instance_name}->CCER = 0x{ccer_val:08X}UL;\n\n"
+        init_code.write(f"{instance_name}->CCER", ccer_val).blank()
 
     dier_val = 0
     if params.get("update_interrupt_enable", False): dier_val |= TIM_DIER_UIE
@@ -210,21 +206,23 @@ def generate_timer_code_cmsis(config, rcc_config_calculated):
     # if ch1_interrupt_enabled: dier_val |= TIM_DIER_CC1IE;
 
     if dier_val != 0:
-        source_function += f"    {instance_name}->DIER = 0x{dier_val:08X}UL;\n\n"
+        init_code.write(f"{instance_name}->DIER", dier_val).blank()
 
     if params.get("has_bdtr", False): # From config params, not just instance_info
         bdtr_val = 0
         if params.get("main_output_enable", False): bdtr_val |= TIM_BDTR_MOE
         # Only write BDTR if it's an advanced timer or if MOE is explicitly set (safety)
         if bdtr_val != 0 or instance_info.get("type") == "ADV":
-            source_function += f"    {instance_name}->BDTR = 0x{bdtr_val:08X}UL;\n\n"
+            init_code.write(f"{instance_name}->BDTR", bdtr_val).blank()
 
-    source_function += f"    {instance_name}->EGR = TIM_EGR_UG; // Generate an update event to re-initialize the counter and prescaler\n"
-    source_function += f"    {instance_name}->CR1 |= TIM_CR1_CEN; // Enable Timer\n\n"
-    source_function += "}\n"
+    # UG is a trigger: the write itself is the event, so it is kept as is
+    init_code.write(f"{instance_name}->EGR", "TIM_EGR_UG", "Generate an update event to re-initialize the counter and prescaler", keep=True)
+    init_code.set_bits(f"{instance_name}->CR1", TIM_CR1_CEN, "Enable Timer")  # Folds into a plain store of the CR1 value
+    init_body, init_program = render_init_body(init_code, f"{instance_name}_regs", config.get("init_style", "code"))
+    source_function += init_body + "}\n"
     init_call = f"{instance_name}_User_Init();"
 
     return {"source_function": source_function, "init_call": init_call,
             "rcc_clocks_to_enable": rcc_clocks,
             "gpio_pins_to_configure_af": gpio_pins_to_configure_af,
-            "error_messages": error_messages}
\ No newline at end of file
+            "error_messages": error_messages, "register_programs": [(f"{instance_name}_User_Init", init_program)]}
\ No newline at end of file
@@ -1,14 +1,16 @@
 # --- MODIFIED FILE generators/uart_generator.py ---
-from core.mcu_defines_loader import CURRENT_MCU_DEFINES
+from core.clock_tree import kernel_clock_hz
+from core.define_resolver import resolve_defines
+from core.mcu_defines_loader import load_register_db
+from core.pin_af_db import load_pin_af_db
 
 
 def calculate_brr_universal(pclk_freq_hz, baud_rate, over8_mode, mcu_family):
     if pclk_freq_hz == 0 or baud_rate == 0: return None
+    regs = load_register_db(mcu_family)
 
-    brr_mant_pos = CURRENT_MCU_DEFINES.get(f"USART_BRR_DIV_Mantissa_Pos_{mcu_family}",
-                                           CURRENT_MCU_DEFINES.get("USART_BRR_DIV_Mantissa_Pos", 4))
-    brr_frac_pos = CURRENT_MCU_DEFINES.get(f"USART_BRR_DIV_Fraction_Pos_{mcu_family}",
-                                           CURRENT_MCU_DEFINES.get("USART_BRR_DIV_Fraction_Pos", 0))
+    brr_mant_pos = regs.pos("USART_BRR_DIV_Mantissa", 4)
+    brr_frac_pos = regs.pos("USART_BRR_DIV_Fraction", 0)
 
     if mcu_family == "STM32F1":
         # For F1, BRR = PCLK / BAUD. USARTDIV = PCLK / (16 * BAUD). BRR holds combined int+frac.
@@ -58,6 +60,8 @@ def generate_uart_code_cmsis(config, rcc_config_calculated):
     instance_name = params.get("instance_name")
     mcu_family = params.get("mcu_family", "STM32F4")
     target_device = params.get("target_device", "STM32F407VG")
+    defines = resolve_defines(mcu_family, target_device)
+    regs = load_register_db(mcu_family, target_device)
 
     error_messages = [];
     gpio_pins_to_configure_af = [];
@@ -68,51 +72,33 @@ def generate_uart_code_cmsis(config, rcc_config_calculated):
                 "rcc_clocks_to_enable": [], "gpio_pins_to_configure_af": [],
                 "default_helper_functions": "", "error_messages": []}
 
-    usart_info_map_key = f"USART_PERIPHERALS_INFO_{mcu_family}"
-    usart_info_map = CURRENT_MCU_DEFINES.get(usart_info_map_key, CURRENT_MCU_DEFINES.get("USART_PERIPHERALS_INFO", {}))
+    usart_info_map = defines.get("USART_PERIPHERALS_INFO", {})
     instance_info = usart_info_map.get(instance_name)
     if not instance_info: error_messages.append(f"Unknown USART instance: {instance_name}"); return {
         "error_messages": error_messages}
 
-    USART_CR1_UE_Pos = CURRENT_MCU_DEFINES.get(f"USART_CR1_UE_Pos_{mcu_family}",
-                                               CURRENT_MCU_DEFINES.get("USART_CR1_UE_Pos", 13))
-    USART_CR1_M_Pos = CURRENT_MCU_DEFINES.get(f"USART_CR1_M_Pos_{mcu_family}",
-                                              CURRENT_MCU_DEFINES.get("USART_CR1_M_Pos", 12))
-    USART_CR1_PCE_Pos = CURRENT_MCU_DEFINES.get(f"USART_CR1_PCE_Pos_{mcu_family}",
-                                                CURRENT_MCU_DEFINES.get("USART_CR1_PCE_Pos", 10))
-    USART_CR1_PS_Pos = CURRENT_MCU_DEFINES.get(f"USART_CR1_PS_Pos_{mcu_family}",
-                                               CURRENT_MCU_DEFINES.get("USART_CR1_PS_Pos", 9))
-    USART_CR1_TE_Pos = CURRENT_MCU_DEFINES.get(f"USART_CR1_TE_Pos_{mcu_family}",
-                                               CURRENT_MCU_DEFINES.get("USART_CR1_TE_Pos", 3))
-    USART_CR1_RE_Pos = CURRENT_MCU_DEFINES.get(f"USART_CR1_RE_Pos_{mcu_family}",
-                                               CURRENT_MCU_DEFINES.get("USART_CR1_RE_Pos", 2))
-    USART_CR1_OVER8_Pos = CURRENT_MCU_DEFINES.get(f"USART_CR1_OVER8_Pos_{mcu_family}",
-                                                  CURRENT_MCU_DEFINES.get("USART_CR1_OVER8_Pos", 15))
-    USART_CR1_RXNEIE_Pos = CURRENT_MCU_DEFINES.get(f"USART_CR1_RXNEIE_Pos_{mcu_family}",
-                                                   CURRENT_MCU_DEFINES.get("USART_CR1_RXNEIE_Pos", 5))
-    USART_CR1_TXEIE_Pos = CURRENT_MCU_DEFINES.get(f"USART_CR1_TXEIE_Pos_{mcu_family}",
-                                                  CURRENT_MCU_DEFINES.get("USART_CR1_TXEIE_Pos", 7))
-    USART_CR1_TCIE_Pos = CURRENT_MCU_DEFINES.get(f"USART_CR1_TCIE_Pos_{mcu_family}",
-                                                 CURRENT_MCU_DEFINES.get("USART_CR1_TCIE_Pos", 6))
-    USART_CR1_PEIE_Pos = CURRENT_MCU_DEFINES.get(f"USART_CR1_PEIE_Pos_{mcu_family}",
-                                                 CURRENT_MCU_DEFINES.get("USART_CR1_PEIE_Pos", 8))
-    USART_CR2_STOP_Pos = CURRENT_MCU_DEFINES.get(f"USART_CR2_STOP_Pos_{mcu_family}",
-                                                 CURRENT_MCU_DEFINES.get("USART_CR2_STOP_Pos", 12))
-    USART_CR3_RTSE_Pos = CURRENT_MCU_DEFINES.get(f"USART_CR3_RTSE_Pos_{mcu_family}",
-                                                 CURRENT_MCU_DEFINES.get("USART_CR3_RTSE_Pos", 8))
-    USART_CR3_CTSE_Pos = CURRENT_MCU_DEFINES.get(f"USART_CR3_CTSE_Pos_{mcu_family}",
-                                                 CURRENT_MCU_DEFINES.get("USART_CR3_CTSE_Pos", 9))
-    USART_SR_RXNE_Pos = CURRENT_MCU_DEFINES.get(f"USART_SR_RXNE_Pos_{mcu_family}",
-                                                CURRENT_MCU_DEFINES.get("USART_SR_RXNE_Pos", 5))
-    USART_SR_TXE_Pos = CURRENT_MCU_DEFINES.get(f"USART_SR_TXE_Pos_{mcu_family}",
-                                               CURRENT_MCU_DEFINES.get("USART_SR_TXE_Pos", 7))
-    USART_SR_TC_Pos = CURRENT_MCU_DEFINES.get(f"USART_SR_TC_Pos_{mcu_family}",
-                                              CURRENT_MCU_DEFINES.get("USART_SR_TC_Pos", 6))
+    USART_CR1_UE_Pos = regs.pos("USART_CR1_UE", 13)
+    USART_CR1_M_Pos = regs.pos("USART_CR1_M", 12)
+    USART_CR1_PCE_Pos = regs.pos("USART_CR1_PCE", 10)
+    USART_CR1_PS_Pos = regs.pos("USART_CR1_PS", 9)
+    USART_CR1_TE_Pos = regs.pos("USART_CR1_TE", 3)
+    USART_CR1_RE_Pos = regs.pos("USART_CR1_RE", 2)
+    USART_CR1_OVER8_Pos = regs.pos("USART_CR1_OVER8", 15)
+    USART_CR1_RXNEIE_Pos = regs.pos("USART_CR1_RXNEIE", 5)
+    USART_CR1_TXEIE_Pos = regs.pos("USART_CR1_TXEIE", 7)
+    USART_CR1_TCIE_Pos = regs.pos("USART_CR1_TCIE", 6)
+    USART_CR1_PEIE_Pos = regs.pos("USART_CR1_PEIE", 8)
+    USART_CR2_STOP_Pos = regs.pos("USART_CR2_STOP", 12)
+    USART_CR3_RTSE_Pos = regs.pos("USART_CR3_RTSE", 8)
+    USART_CR3_CTSE_Pos = regs.pos("USART_CR3_CTSE", 9)
+    USART_SR_RXNE_Pos = regs.pos("USART_SR_RXNE", 5)
+    USART_SR_TXE_Pos = regs.pos("USART_SR_TXE", 7)
+    USART_SR_TC_Pos = regs.pos("USART_SR_TC", 6)
     USART_SR_RXNE = (1 << USART_SR_RXNE_Pos)  # For helper functions
     USART_SR_TXE = (1 << USART_SR_TXE_Pos)
     USART_SR_TC = (1 << USART_SR_TC_Pos)
 
-    pclk_freq = rcc_config_calculated.get(f"pclk{instance_info['bus'][-1]}_freq_hz", 0)
+    pclk_freq = kernel_clock_hz(rcc_config_calculated, instance_info['bus'])
     if pclk_freq == 0: error_messages.append(f"PCLK for {instance_name} is 0Hz.")
     rcc_clocks = [instance_info["rcc_macro"]] if instance_info.get("rcc_macro") else []
     if not rcc_clocks: error_messages.append(f"RCC macro for {instance_name} not found.")
@@ -120,39 +106,27 @@ def generate_uart_code_cmsis(config, rcc_config_calculated):
     source_function = f"void {instance_name}_User_Init(void) {{\n"
     source_function += f"    // {instance_name} ({mcu_family}) Configuration (CMSIS Register Level)\n\n"
 
-    pin_sugg_map_key = f"USART_PIN_CONFIG_SUGGESTIONS_{mcu_family}"
-    pin_sugg_map_all = CURRENT_MCU_DEFINES.get(pin_sugg_map_key,
-                                               CURRENT_MCU_DEFINES.get("USART_PIN_CONFIG_SUGGESTIONS", {}))
-    pin_suggestions = pin_sugg_map_all.get(target_device, {}).get(instance_name, {})
-    if pin_suggestions:
+    pin_af_db = load_pin_af_db(mcu_family, target_device)
+    if pin_af_db.signal_types(instance_name):
         source_function += f"    // Suggested GPIO for {instance_name} on {target_device} (config in GPIO_User_Init):\n"
         pin_types_to_check = ["TX", "RX"]
         hw_flow_active = params.get("hw_flow_control", "None")
         if hw_flow_active in ["CTS", "RTS/CTS"]: pin_types_to_check.append("CTS")
         if hw_flow_active in ["RTS", "RTS/CTS"]: pin_types_to_check.append("RTS")
         for pin_type in pin_types_to_check:
-            if pin_type in pin_suggestions:
-                pin_options = pin_suggestions[pin_type].split(" or ");
-                first_option = pin_options[0];
-                parts = first_option.split('/')
-                if len(parts) >= 1:
-                    port_char = parts[0][1];
-                    pin_num = parts[0][2:]
-                    af_num_str = parts[1][2:] if len(parts) == 2 and parts[1].upper().startswith("AF") else "-1"
-                    af_num = int(af_num_str) if af_num_str.lstrip('-').isdigit() else -1  # Handles "-1" or AF number
-                    if mcu_family == "STM32F1": af_num = -1  # F1 AF is via remap usually
-                    if port_char.isalpha() and pin_num.isdigit():
-                        gpio_pins_to_configure_af.append((port_char, pin_num, af_num, f"{instance_name}_{pin_type}"))
-                        source_function += f"    //   {pin_type}: {first_option} (AF{af_num if af_num != -1 else 'Remap'})\n"
+            pin_option = pin_af_db.default_option(instance_name, pin_type)
+            if pin_option is not None:
+                af_num = pin_option.af
+                if mcu_family == "STM32F1": af_num = -1  # F1 AF is via remap usually
+                gpio_pins_to_configure_af.append((pin_option.port_char, pin_option.pin_num, af_num, pin_option.signal))
+                source_function += f"    //   {pin_type}: {pin_option} (AF{af_num if af_num != -1 else 'Remap'})\n"
         source_function += "\n"
 
     source_function += f"    if ({instance_name}->CR1 & (1UL << {USART_CR1_UE_Pos})) {{ {instance_name}->CR1 &= ~(1UL << {USART_CR1_UE_Pos}); }} // Disable USART\n\n"
 
     brr_val = 0
     baud_rate = params.get("baud_rate", 115200)
-    oversampling_map_key = f"USART_OVERSAMPLING_MAP_{mcu_family}"
-    oversampling_map = CURRENT_MCU_DEFINES.get(oversampling_map_key,
-                                               CURRENT_MCU_DEFINES.get("USART_OVERSAMPLING_MAP", {"16": 0}))
+    oversampling_map = defines.get("USART_OVERSAMPLING_MAP", {"16": 0})
     over8_mode = oversampling_map.get(params.get("oversampling", "16"), 0)
     if mcu_family == "STM32F2": over8_mode = 0  # F2 is always OVER16
 
@@ -167,18 +141,15 @@ def generate_uart_code_cmsis(config, rcc_config_calculated):
     if mcu_family not in ["STM32F1", "STM32F2"]:  # OVER8 bit exists on F4, not F1/F2
         cr1_val |= (over8_mode << USART_CR1_OVER8_Pos)
 
-    word_len_map_key = f"USART_WORD_LENGTH_MAP_{mcu_family}"
-    word_len_map = CURRENT_MCU_DEFINES.get(word_len_map_key, CURRENT_MCU_DEFINES.get("USART_WORD_LENGTH_MAP", {}))
+    word_len_map = defines.get("USART_WORD_LENGTH_MAP", {})
     cr1_val |= (word_len_map.get(params.get("word_length", "8 bits"), 0) << USART_CR1_M_Pos)
 
-    parity_map_key = f"USART_PARITY_MAP_{mcu_family}"
-    parity_map = CURRENT_MCU_DEFINES.get(parity_map_key, CURRENT_MCU_DEFINES.get("USART_PARITY_MAP", {}))
+    parity_map = defines.get("USART_PARITY_MAP", {})
     parity_val_encoded = parity_map.get(params.get("parity", "None"), 0)  # Encoded as 0b00 None, 0b10 Even, 0b11 Odd
     if parity_val_encoded & 0b10: cr1_val |= (1 << USART_CR1_PCE_Pos)  # Parity Enable
     if parity_val_encoded & 0b01: cr1_val |= (1 << USART_CR1_PS_Pos)  # Parity Selection (Odd if PCE=1,PS=1)
 
-    mode_map_key = f"USART_MODE_MAP_{mcu_family}"
-    mode_map = CURRENT_MCU_DEFINES.get(mode_map_key, CURRENT_MCU_DEFINES.get("USART_MODE_MAP", {}))
+    mode_map = defines.get("USART_MODE_MAP", {})
     mode_val_encoded = mode_map.get(params.get("mode", "TX/RX"), 0b11)  # Encoded as 0b01 RX, 0b10 TX, 0b11 TX/RX
     if mode_val_encoded & 0b10: cr1_val |= (1 << USART_CR1_TE_Pos)  # TX Enable
     if mode_val_encoded & 0b01: cr1_val |= (1 << USART_CR1_RE_Pos)  # RX Enable
@@ -190,14 +161,12 @@ def generate_uart_code_cmsis(config, rcc_config_calculated):
     source_function += f"    {instance_name}->CR1 = 0x{cr1_val:08X}UL;\n\n"
 
     cr2_val = 0
-    stop_bits_map_key = f"USART_STOP_BITS_MAP_{mcu_family}"
-    stop_bits_map = CURRENT_MCU_DEFINES.get(stop_bits_map_key, CURRENT_MCU_DEFINES.get("USART_STOP_BITS_MAP", {}))
+    stop_bits_map = defines.get("USART_STOP_BITS_MAP", {})
     cr2_val |= (stop_bits_map.get(params.get("stop_bits", "1"), 0b00) << USART_CR2_STOP_Pos)
     source_function += f"    {instance_name}->CR2 = 0x{cr2_val:08X}UL;\n\n"
 
     cr3_val = 0
-    hw_flow_map_key = f"USART_HW_FLOW_CTRL_MAP_{mcu_family}"
-    hw_flow_map = CURRENT_MCU_DEFINES.get(hw_flow_map_key, CURRENT_MCU_DEFINES.get("USART_HW_FLOW_CTRL_MAP", {}))
+    hw_flow_map = defines.get("USART_HW_FLOW_CTRL_MAP", {})
     hw_flow_val_encoded = hw_flow_map.get(params.get("hw_flow_control", "None"),
                                           0b00)  # Encoded: 01 RTS, 10 CTS, 11 RTS/CTS
     if hw_flow_val_encoded & 0b01: cr3_val |= (1 << USART_CR3_RTSE_Pos)
@@ -1,9 +1,18 @@
 import sys
-from PyQt5.QtWidgets import QApplication
-from main_window import MainWindow
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        # Headless batch regeneration, no PyQt5 needed
+        from batch_cli import main as batch_main
+        sys.exit(batch_main(sys.argv[2:]))
+
+    from PyQt5.QtWidgets import QApplication
+    from main_window import MainWindow
+
     app = QApplication(sys.argv)
     main_win = MainWindow()
     main_win.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    exit_code = app.exec_()
+    from core.solution_cache import SOLUTION_CACHE
+    SOLUTION_CACHE.save()  # Only writes if $STM32_CODEGEN_SOLUTION_CACHE is set
+    sys.exit(exit_code)
@@ -557,6 +557,12 @@ class ADCConfigWidget(QWidget):
         }
         return {"params": params, "calculated": {}}  # Generator will handle 'calculated' if needed
 
+    def set_clock_prescaler(self, instance_name, prescaler):
+        """Selects a planned "PCLK2 / n" prescaler if instance_name is the ADC being configured."""
+        prescaler_text = f"PCLK2 / {prescaler}"
+        if instance_name == self.adc_instance_combo.currentText() and self.adc_prescaler_combo.findText(prescaler_text) >= 0:
+            self.adc_prescaler_combo.setCurrentText(prescaler_text)
+
     def emit_config_update_slot(self, _=None):
         if self._is_initializing: return
         self.config_updated.emit(self.get_config())
\ No newline at end of file
@@ -1,6 +1,7 @@
 # --- MODIFIED FILE modules/gpio_config_widget.py ---
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QFormLayout, QComboBox,
-                             QLineEdit, QPushButton, QLabel, QScrollArea, QGroupBox, QHBoxLayout, QFrame)
+                             QLineEdit, QPushButton, QLabel, QScrollArea, QGroupBox, QHBoxLayout, QFrame,
+                             QCheckBox)
 from PyQt5.QtCore import pyqtSignal, Qt
 
 from core.mcu_defines_loader import CURRENT_MCU_DEFINES
@@ -128,7 +129,7 @@ class GPIOPinConfigWidget(QWidget):
             self.line_af.setPlaceholderText("e.g., USART1_REMAP")
         else:
             self.label_af.setText("Alternate Func:")
-            self.line_af.setPlaceholderText("AF0-AF15")
+            self.line_af.setPlaceholderText("AF0-AF15 or signal, e.g. USART1_TX")
 
         self._is_internal_update = False
         self._update_field_enabled_states()  # Set initial enabled/disabled states after repopulating
@@ -211,6 +212,12 @@ class GPIOConfigWidget(QWidget):
         add_pin_group.setLayout(add_pin_layout)
         self.main_layout.addWidget(add_pin_group)
 
+        self.batch_by_port_checkbox = QCheckBox("Batch register writes per port (one write per register and port)")
+        self.batch_by_port_checkbox.setToolTip("Combine all pins of a port into one masked write per register (a plain store "
+                                               "if all 16 pins are configured) instead of two read-modify-writes per pin and register.")
+        self.batch_by_port_checkbox.stateChanged.connect(self.emit_config_update_slot)
+        self.main_layout.addWidget(self.batch_by_port_checkbox)
+
         self.scroll_area = QScrollArea()
         self.scroll_area.setWidgetResizable(True)
         self.configured_pins_widget = QWidget()
@@ -307,7 +314,8 @@ class GPIOConfigWidget(QWidget):
         for pin_widget in self.pin_widgets:
             cfg = pin_widget.get_config()
             pins_config[cfg["pin_name"]] = cfg
-        return {"pins": pins_config, "mcu_family": self.current_mcu_family}
+        return {"pins": pins_config, "mcu_family": self.current_mcu_family,
+                "batch_by_port": self.batch_by_port_checkbox.isChecked()}
 
     def emit_config_update_slot(self, _=None):  # _ to accept potential signal args
         if self._is_initializing: return
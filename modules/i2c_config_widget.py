@@ -3,6 +3,7 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QFormLayout, QComboBox, QLine
 from PyQt5.QtCore import pyqtSignal
 
 from core.mcu_defines_loader import CURRENT_MCU_DEFINES
+from core.pin_af_db import load_pin_af_db
 
 
 class I2CConfigWidget(QWidget):
@@ -165,16 +166,13 @@ class I2CConfigWidget(QWidget):
         instance_name = self.i2c_instance_combo.currentText()
         if not instance_name: self.pin_info_label.setText("Pinout: N/A"); return
 
-        pin_sugg_map_key = f"I2C_PIN_CONFIG_SUGGESTIONS_{self.current_mcu_family}"
-        pin_sugg_map = CURRENT_MCU_DEFINES.get(pin_sugg_map_key,
-                                               CURRENT_MCU_DEFINES.get("I2C_PIN_CONFIG_SUGGESTIONS", {}))
-        suggestions = pin_sugg_map.get(self.current_target_device, {}).get(instance_name, {})
+        pin_af_db = load_pin_af_db(self.current_mcu_family, self.current_target_device)
+        suggestions = pin_af_db.signal_types(instance_name)
 
         pin_text = []
         if suggestions:
-            if "SCL" in suggestions: pin_text.append(f"SCL: {suggestions['SCL']}")
-            if "SDA" in suggestions: pin_text.append(f"SDA: {suggestions['SDA']}")
-            if "SMBA" in suggestions: pin_text.append(f"SMBA: {suggestions['SMBA']}")  # If SMBus supported
+            for pin_type in ["SCL", "SDA", "SMBA"]:  # SMBA if SMBus supported
+                if pin_type in suggestions: pin_text.append(f"{pin_type}: {pin_af_db.describe(instance_name, pin_type)}")
             self.pin_info_label.setText("; ".join(pin_text) if pin_text else "No specific pin suggestions.")
         else:
             self.pin_info_label.setText(f"Pinout: No suggestions for {instance_name} on {self.current_target_device}")
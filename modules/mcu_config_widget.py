@@ -1,5 +1,5 @@
 # --- MODIFIED FILE modules/mcu_config_widget.py ---
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QFormLayout, QComboBox, QLabel
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QFormLayout, QComboBox, QLabel, QCheckBox
 from PyQt5.QtCore import pyqtSignal
 
 from core.mcu_defines_loader import set_current_mcu_defines, CURRENT_MCU_DEFINES, load_defines
@@ -24,12 +24,26 @@ class MCUConfigWidget(QWidget):
         self.mcu_device_combo = QComboBox()
         self.form_layout.addRow(QLabel("Target Device:"), self.mcu_device_combo)
 
+        # RCC/GPIO/timer init: straight-line register writes, or a const register table + reg_init_apply() loop
+        self.init_style_combo = QComboBox()
+        self.init_style_combo.addItem("Straight-line code", "code")
+        self.init_style_combo.addItem("Register table (smaller for large configs)", "table")
+        self.init_style_combo.setToolTip("Both styles' estimated size and cycles are listed at the top of the generated code.")
+        self.form_layout.addRow(QLabel("Init Code Style:"), self.init_style_combo)
+
+        # main() times each init call with the DWT cycle counter into boot_profile_cycles[] (read over SWD)
+        self.boot_profiling_checkbox = QCheckBox("Boot profiling (DWT cycles per init call)")
+        self.boot_profiling_checkbox.setToolTip("Adds boot_profile_cycles[]/boot_profile_names[] and CYCCNT reads around each init call in main().")
+        self.form_layout.addRow(self.boot_profiling_checkbox)
+
         self.main_layout.addLayout(self.form_layout)
         self.main_layout.addStretch()
 
         # Connect signals AFTER initial population if possible, or use _is_initializing
         self.mcu_family_combo.currentTextChanged.connect(self.on_family_changed_by_user)
         self.mcu_device_combo.currentTextChanged.connect(self.on_device_changed_by_user)
+        self.init_style_combo.currentIndexChanged.connect(self.emit_config_update_slot)
+        self.boot_profiling_checkbox.stateChanged.connect(self.emit_config_update_slot)
 
         self._is_initializing = False
         # Initial population will be triggered by ConfigurationPane calling update_for_target_device
@@ -89,7 +103,9 @@ class MCUConfigWidget(QWidget):
         selected_device = self.mcu_device_combo.currentText()
         return {
             "mcu_family": selected_family,
-            "target_device": selected_device
+            "target_device": selected_device,
+            "init_style": self.init_style_combo.currentData(),
+            "boot_profiling": self.boot_profiling_checkbox.isChecked()
         }
 
     def emit_config_update_slot(self, _=None):  # _=None to accept potential arguments from signals
@@ -1,17 +1,22 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QFormLayout, QCheckBox, QLabel,
-                             QGroupBox, QComboBox, QLineEdit)
+                             QGroupBox, QComboBox, QLineEdit, QPushButton, QListWidget, QHBoxLayout)
 from PyQt5.QtCore import pyqtSignal
 
 from core.mcu_defines_loader import CURRENT_MCU_DEFINES
+from core.pll_solver import cached_solve_f2_f4_pll, cached_solve_f1_pll
+from core.clock_tree import ClockTree, VOS_POLICY_LOW_POWER, VOS_POLICY_MAX_PERFORMANCE, stop_wakeup_latency_us
 
 
 class RCCConfigWidget(QWidget):
     config_updated = pyqtSignal(dict)
+    clock_tree_solve_requested = pyqtSignal(int)  # Target SYSCLK; the main window has the peripheral targets
+    low_power_plan_requested = pyqtSignal()  # Same: the plan depends on every enabled peripheral
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self._is_initializing = True
         self._is_auto_calculating_pll = False
+        self.clock_tree = ClockTree()  # Only the clocks downstream of a changed param are recomputed
         self.current_target_device = ""
         self.current_mcu_family = ""
 
@@ -40,6 +45,10 @@ class RCCConfigWidget(QWidget):
 
         self.auto_calc_status_label = QLabel("PLL params status.")  # Shows calculated/error
         self.main_form_layout.addRow(self.auto_calc_status_label)
+        self.solve_clock_tree_button = QPushButton("Solve Clock Tree (PLL + Bus Prescalers)")
+        self.main_form_layout.addRow(self.solve_clock_tree_button)
+        self.plan_low_power_button = QPushButton("Plan Low-Power Clocks (lowest SYSCLK / VOS / wait states)")
+        self.main_form_layout.addRow(self.plan_low_power_button)
 
         self.label_pll_source = QLabel("PLL Source:")
         self.pll_source_combo = QComboBox()
@@ -72,9 +81,61 @@ class RCCConfigWidget(QWidget):
         self.apb2_div_combo = QComboBox()
         self.main_form_layout.addRow(QLabel("APB2 Prescaler (PCLK2):"), self.apb2_div_combo)
 
+        self.low_power_vos_checkbox = QCheckBox("Least demanding VOS scale for HCLK (no over-drive)")  # F4 only
+        self.main_form_layout.addRow(self.low_power_vos_checkbox)
+
+        # F1 only: the PLL solver also picks USBPRE and ADCPRE, shown here (calculated)
+        self.usb_required_checkbox = QCheckBox("USB clock (48 MHz) required")
+        self.usb_required_checkbox.setChecked(True)
+        self.main_form_layout.addRow(self.usb_required_checkbox)
+        self.label_usb_prescaler = QLabel("USB Prescaler (PLL / n, calculated):")
+        self.usb_prescaler_combo = QComboBox()
+        self.usb_prescaler_combo.addItems(["1", "1.5"])
+        self.main_form_layout.addRow(self.label_usb_prescaler, self.usb_prescaler_combo)
+        self.label_adc_prescaler = QLabel("ADC Prescaler (PCLK2 / n, calculated):")
+        self.adc_prescaler_combo = QComboBox()
+        self.adc_prescaler_combo.addItems(["2", "4", "6", "8"])
+        self.main_form_layout.addRow(self.label_adc_prescaler, self.adc_prescaler_combo)
+
+        self.overlapped_boot_checkbox = QCheckBox("Overlapped boot: GPIO/DMA/DAC init while HSE/PLL start up")
+        self.overlapped_boot_checkbox.setToolTip("The ADC init (F1 calibration, F2/F4 conversion start) still runs after the clock switch.")
+        self.main_form_layout.addRow(self.overlapped_boot_checkbox)
+
+        # STOP mode enter/exit routines (RCC_EnterStop / RCC_ExitStop) and their wake-up latency estimate
+        self.stop_mode_checkbox = QCheckBox("Generate STOP mode enter/exit routines")
+        self.main_form_layout.addRow(self.stop_mode_checkbox)
+        self.stop_low_power_regulator_checkbox = QCheckBox("Low-power regulator in STOP (slower wake-up)")
+        self.stop_low_power_regulator_checkbox.setEnabled(False)
+        self.main_form_layout.addRow(self.stop_low_power_regulator_checkbox)
+        self.hse_startup_lineedit = QLineEdit()
+        self.hse_startup_lineedit.setPlaceholderText("Datasheet typical")
+        self.main_form_layout.addRow(QLabel("HSE Start-up Time (us):"), self.hse_startup_lineedit)
+        self.stop_latency_label = QLabel("")
+        self.main_form_layout.addRow(self.stop_latency_label)
+
         self.rcc_group_box.setLayout(self.main_form_layout)
         self.layout.addWidget(self.rcc_group_box)
 
+        # Runtime clock profiles: snapshots of the settings above, switched with RCC_SwitchProfile(n)
+        self.clock_profiles = []
+        self.profiles_group_box = QGroupBox("Runtime Clock Profiles (RCC_SwitchProfile)")
+        profiles_layout = QVBoxLayout()
+        profile_buttons_layout = QHBoxLayout()
+        self.profile_name_lineedit = QLineEdit()
+        self.profile_name_lineedit.setPlaceholderText("Profile name, e.g. LOW_POWER")
+        self.add_profile_button = QPushButton("Add Current Settings")
+        self.remove_profile_button = QPushButton("Remove Selected")
+        profile_buttons_layout.addWidget(self.profile_name_lineedit)
+        profile_buttons_layout.addWidget(self.add_profile_button)
+        profile_buttons_layout.addWidget(self.remove_profile_button)
+        self.profiles_list = QListWidget()
+        self.profiles_list.setMaximumHeight(90)
+        profiles_layout.addLayout(profile_buttons_layout)
+        profiles_layout.addWidget(QLabel("Profile 0 is always the configuration above (RCC_User_Init)."))
+        profiles_layout.addWidget(self.profiles_list)
+        self.profiles_group_box.setLayout(profiles_layout)
+        self.layout.addWidget(self.profiles_group_box)
+
         self._connect_signals()
         self._is_initializing = False
 
@@ -84,8 +145,8 @@ class RCCConfigWidget(QWidget):
             self.hse_checkbox, self.hse_value_lineedit,
             self.target_sysclk_lineedit,  # For F2/F4 target input
             self.pll_source_combo,
-            self.pllm_or_xtpre_lineedit,  # For F1 manual input
-            self.plln_or_mul_lineedit  # For F1 manual input
+            self.hsi_checkbox,  # F1 solver: HSI/2 candidate
+            self.usb_required_checkbox  # F1 solver: 48 MHz USB constraint
         ]
         for widget in critical_widgets:
             if isinstance(widget, QLineEdit):
@@ -97,9 +158,13 @@ class RCCConfigWidget(QWidget):
 
         # Other params that trigger a general config update
         other_widgets = [
-            self.hsi_checkbox, self.hse_bypass_checkbox,
+            self.hse_bypass_checkbox,
             self.pllq_lineedit,  # For F2/F4
-            self.ahb_div_combo, self.apb1_div_combo, self.apb2_div_combo
+            self.ahb_div_combo, self.apb1_div_combo, self.apb2_div_combo,
+            self.low_power_vos_checkbox,
+            self.usb_prescaler_combo, self.adc_prescaler_combo,  # For F1
+            self.stop_mode_checkbox, self.stop_low_power_regulator_checkbox, self.hse_startup_lineedit,
+            self.overlapped_boot_checkbox
         ]
         for widget in other_widgets:
             if isinstance(widget, QLineEdit):
@@ -110,7 +175,11 @@ class RCCConfigWidget(QWidget):
                 widget.currentTextChanged.connect(self.emit_config_update_slot)
 
         self.pll_enable_for_sysclk_checkbox.stateChanged.connect(self.on_pll_enable_changed)
+        self.solve_clock_tree_button.clicked.connect(self.on_solve_clock_tree_clicked)
+        self.plan_low_power_button.clicked.connect(self.low_power_plan_requested.emit)
         self.sysclk_source_combo.currentTextChanged.connect(self.on_sysclk_source_changed)
+        self.add_profile_button.clicked.connect(self.on_add_profile_clicked)
+        self.remove_profile_button.clicked.connect(self.on_remove_profile_clicked)
 
     def update_for_target_device(self, target_device_name, target_family_name, is_initial_call=False):
         self._is_initializing = True
@@ -118,6 +187,9 @@ class RCCConfigWidget(QWidget):
         family_changed = self.current_mcu_family != target_family_name
         self.current_target_device = target_device_name
         self.current_mcu_family = target_family_name
+        if family_changed:  # Profile snapshots hold family-specific PLL/prescaler values
+            self.clock_profiles = [];
+            self.profiles_list.clear()
 
         target_devices_map = CURRENT_MCU_DEFINES.get('TARGET_DEVICES', {})
         device_info = target_devices_map.get(self.current_target_device, {})
@@ -167,17 +239,14 @@ class RCCConfigWidget(QWidget):
         # --- Adapt PLL parameter labels and interactivity based on family ---
         is_f1 = (self.current_mcu_family == "STM32F1")
 
-        self.label_target_sysclk.setText(
-            "Target SYSCLK (Hz) with PLL:" if not is_f1 else "Target SYSCLK (Hz) with PLL (for reference):")
-        self.target_sysclk_lineedit.setReadOnly(is_f1)  # For F1, it's a reference, user sets factors
+        self.label_target_sysclk.setText("Target SYSCLK (Hz) with PLL:")
+        self.target_sysclk_lineedit.setReadOnly(False)  # PLL factors are solved for the target on every family
 
-        self.label_pllm_or_xtpre.setText("PLLXTPRE (1 or 2):" if is_f1 else "PLLM (calculated for target):")
-        self.pllm_or_xtpre_lineedit.setReadOnly(not is_f1)  # User inputs for F1
-        if is_f1 and (is_initial_call or family_changed): self.pllm_or_xtpre_lineedit.setText("1")
+        self.label_pllm_or_xtpre.setText("PLLXTPRE (calculated for target):" if is_f1 else "PLLM (calculated for target):")
+        self.pllm_or_xtpre_lineedit.setReadOnly(True)
 
-        self.label_plln_or_mul.setText("PLLMUL (2-16):" if is_f1 else "PLLN (calculated for target):")
-        self.plln_or_mul_lineedit.setReadOnly(not is_f1)  # User inputs for F1
-        if is_f1 and (is_initial_call or family_changed): self.plln_or_mul_lineedit.setText("9")
+        self.label_plln_or_mul.setText("PLLMUL (calculated for target):" if is_f1 else "PLLN (calculated for target):")
+        self.plln_or_mul_lineedit.setReadOnly(True)
 
         self.label_pllp.setVisible(not is_f1);
         self.pllp_lineedit.setVisible(not is_f1)
@@ -288,7 +357,6 @@ class RCCConfigWidget(QWidget):
 
         self.label_target_sysclk.setVisible(use_pll_for_sysclk_ui)
         self.target_sysclk_lineedit.setVisible(use_pll_for_sysclk_ui)
-        self.target_sysclk_lineedit.setReadOnly(is_f1)
 
         self.auto_calc_status_label.setVisible(use_pll_for_sysclk_ui)
         self.label_pll_source.setVisible(use_pll_for_sysclk_ui)
@@ -296,18 +364,29 @@ class RCCConfigWidget(QWidget):
 
         self.label_pllm_or_xtpre.setVisible(use_pll_for_sysclk_ui)
         self.pllm_or_xtpre_lineedit.setVisible(use_pll_for_sysclk_ui)
-        self.pllm_or_xtpre_lineedit.setReadOnly(not is_f1)
 
         self.label_plln_or_mul.setVisible(use_pll_for_sysclk_ui)
         self.plln_or_mul_lineedit.setVisible(use_pll_for_sysclk_ui)
-        self.plln_or_mul_lineedit.setReadOnly(not is_f1)
 
         self.label_pllp.setVisible(use_pll_for_sysclk_ui and not is_f1)
         self.pllp_lineedit.setVisible(use_pll_for_sysclk_ui and not is_f1)
         self.label_pllq.setVisible(use_pll_for_sysclk_ui and not is_f1)
         self.pllq_lineedit.setVisible(use_pll_for_sysclk_ui and not is_f1)
+        is_f4 = (self.current_mcu_family == "STM32F4")
+        self.plan_low_power_button.setVisible(is_f4)
+        self.low_power_vos_checkbox.setVisible(is_f4)
+        has_usb = self._f1_has_usb()
+        self.usb_required_checkbox.setVisible(is_f1 and use_pll_for_sysclk_ui and has_usb)
+        self.label_usb_prescaler.setVisible(is_f1 and has_usb)
+        self.usb_prescaler_combo.setVisible(is_f1 and has_usb)
+        self.label_adc_prescaler.setVisible(is_f1)
+        self.adc_prescaler_combo.setVisible(is_f1)
         # self.pllq_lineedit.setReadOnly(is_f1) # Q line edit is not applicable for F1 (hidden)
 
+    def _f1_has_usb(self):
+        device_info = CURRENT_MCU_DEFINES.get('TARGET_DEVICES', {}).get(self.current_target_device, {})
+        return self.current_mcu_family == "STM32F1" and device_info.get("has_usb", False)
+
     def _try_auto_calculate_pll(self):
         if self._is_initializing or self._is_auto_calculating_pll: return
         self._is_auto_calculating_pll = True
@@ -320,23 +399,21 @@ class RCCConfigWidget(QWidget):
                 self._is_auto_calculating_pll = False
                 return
 
-            target_sysclk_for_calc = 0
             try:
                 target_sysclk_for_calc = int(self.target_sysclk_lineedit.text())
             except ValueError:
-                if self.current_mcu_family != "STM32F1":
-                    self.auto_calc_status_label.setText("Invalid Target SYSCLK value for PLL calculation.");
-                    self.auto_calc_status_label.setStyleSheet("color: red;")
-                    self._is_auto_calculating_pll = False
-                    return
+                self.auto_calc_status_label.setText("Invalid Target SYSCLK value for PLL calculation.");
+                self.auto_calc_status_label.setStyleSheet("color: red;")
+                self._is_auto_calculating_pll = False
+                return
+
+            if self.current_mcu_family == "STM32F1":  # The solver picks the PLL source itself
+                self._calculate_f1_pll(target_sysclk_for_calc)
+                return
 
             pll_input_freq = 0
             pll_source_type = self.pll_source_combo.currentText()
-            hsi_val = CURRENT_MCU_DEFINES.get('HSI_VALUE_HZ', 8000000)  # F1 HSI is typically 8MHz, F2/F4 16MHz
-            if self.current_mcu_family == "STM32F1":
-                hsi_val = CURRENT_MCU_DEFINES.get('HSI_VALUE_HZ', 8000000)
-            else:
-                hsi_val = CURRENT_MCU_DEFINES.get('HSI_VALUE_HZ', 16000000)
+            hsi_val = CURRENT_MCU_DEFINES.get('HSI_VALUE_HZ', 16000000)  # F2/F4 HSI is 16MHz
 
             hse_val_str = self.hse_value_lineedit.text()
             hse_val = int(hse_val_str) if hse_val_str.isdigit() else CURRENT_MCU_DEFINES.get('HSE_DEFAULT_HZ', 8000000)
@@ -345,10 +422,6 @@ class RCCConfigWidget(QWidget):
                 if not self.hsi_checkbox.isChecked(): self.auto_calc_status_label.setText(
                     "HSI (PLL src) disabled."); self._is_auto_calculating_pll = False; return
                 pll_input_freq = hsi_val
-            elif pll_source_type == "HSI/2" and self.current_mcu_family == "STM32F1":
-                if not self.hsi_checkbox.isChecked(): self.auto_calc_status_label.setText(
-                    "HSI (PLL src) disabled."); self._is_auto_calculating_pll = False; return
-                pll_input_freq = hsi_val / 2.0
             elif pll_source_type == "HSE":
                 if not self.hse_checkbox.isChecked(): self.auto_calc_status_label.setText(
                     "HSE (PLL src) disabled."); self._is_auto_calculating_pll = False; return
@@ -361,9 +434,7 @@ class RCCConfigWidget(QWidget):
             if pll_input_freq <= 0: self.auto_calc_status_label.setText(
                 "PLL input freq invalid or zero."); self._is_auto_calculating_pll = False; return
 
-            if self.current_mcu_family == "STM32F1":
-                self._calculate_f1_pll(pll_input_freq, target_sysclk_for_calc)
-            elif self.current_mcu_family in ["STM32F2", "STM32F4"]:
+            if self.current_mcu_family in ["STM32F2", "STM32F4"]:
                 if target_sysclk_for_calc <= 0:
                     self.auto_calc_status_label.setText("Target SYSCLK for PLL calc must be > 0.");
                     self.auto_calc_status_label.setStyleSheet("color: red;");
@@ -374,125 +445,53 @@ class RCCConfigWidget(QWidget):
         finally:
             self._is_auto_calculating_pll = False
 
-    def _calculate_f1_pll(self, pll_input_freq, target_sysclk_reference):
-        try:
-            xtpre_str = self.pllm_or_xtpre_lineedit.text()
-            mul_str = self.plln_or_mul_lineedit.text()
-
-            if not xtpre_str.isdigit() or not mul_str.isdigit():
-                self.auto_calc_status_label.setText("PLLXTPRE/PLLMUL must be numbers.");
-                self.auto_calc_status_label.setStyleSheet("color: red;");
-                return
-            xtpre_val = int(xtpre_str);
-            mul_val = int(mul_str)
-
-            valid_xtpre_options = CURRENT_MCU_DEFINES.get('PLLXTPRE_VALUES', [1, 2])
-            min_mul = CURRENT_MCU_DEFINES.get('PLLMUL_MIN', 2);
-            max_mul = CURRENT_MCU_DEFINES.get('PLLMUL_MAX', 16)
-
-            if xtpre_val not in valid_xtpre_options: self.auto_calc_status_label.setText(
-                f"Invalid PLLXTPRE ({xtpre_val}). Use {valid_xtpre_options}."); self.auto_calc_status_label.setStyleSheet(
-                "color: red;"); return
-            if not (min_mul <= mul_val <= max_mul): self.auto_calc_status_label.setText(
-                f"Invalid PLLMUL ({mul_val}). Use {min_mul}-{max_mul}."); self.auto_calc_status_label.setStyleSheet(
-                "color: red;"); return
-
-            effective_pll_in = pll_input_freq
-            if self.pll_source_combo.currentText() == "HSE": effective_pll_in = pll_input_freq / xtpre_val
-            actual_sysclk = effective_pll_in * mul_val
-
-            device_info = CURRENT_MCU_DEFINES.get('TARGET_DEVICES', {}).get(self.current_target_device, {})
-            max_sysclk_for_device = device_info.get("max_sysclk_hz",
-                                                    CURRENT_MCU_DEFINES.get('SYSCLK_MAX_HZ_F103', 72000000))
-
-            if actual_sysclk > max_sysclk_for_device:
-                self.auto_calc_status_label.setText(
-                    f"F1 SYSCLK ({actual_sysclk / 1e6:.1f}MHz) > Max ({max_sysclk_for_device / 1e6:.1f}MHz for {self.current_target_device})."); self.auto_calc_status_label.setStyleSheet(
-                    "color: red;")
-            elif target_sysclk_reference > 0 and abs(actual_sysclk - target_sysclk_reference) > 1000000:
-                self.auto_calc_status_label.setText(
-                    f"F1 SYSCLK: {actual_sysclk / 1e6:.1f}MHz. (Ref Target: {target_sysclk_reference / 1e6:.1f}MHz)."); self.auto_calc_status_label.setStyleSheet(
-                    "color: orange;")
-            else:
-                self.auto_calc_status_label.setText(
-                    f"F1 Calculated SYSCLK: {actual_sysclk / 1e6:.1f} MHz."); self.auto_calc_status_label.setStyleSheet(
-                    "color: green;")
-        except Exception as e:
-            self.auto_calc_status_label.setText(
-                f"Error in F1 PLL params: {e}"); self.auto_calc_status_label.setStyleSheet("color: red;")
+    def _calculate_f1_pll(self, target_sysclk):
+        # Searches HSI/2, HSE, HSE/2 x PLLMUL 2-16 with the bus, ADC and USB prescalers; ranked best first
+        hse_val_str = self.hse_value_lineedit.text()
+        hse_val = int(hse_val_str) if hse_val_str.isdigit() else CURRENT_MCU_DEFINES.get('HSE_DEFAULT_HZ', 8000000)
+        hse_hz = hse_val if self.hse_checkbox.isChecked() else 0
+        hsi_hz = CURRENT_MCU_DEFINES.get('HSI_VALUE_HZ', 8000000) if self.hsi_checkbox.isChecked() else 0
+        need_usb = self.usb_required_checkbox.isChecked()
+        solutions = cached_solve_f1_pll(hse_hz, target_sysclk, self.current_mcu_family, self.current_target_device,
+                                        need_usb=need_usb, max_solutions=1, hsi_hz=hsi_hz)
+
+        if not solutions:
+            self.pllm_or_xtpre_lineedit.setText("N/A");
+            self.plln_or_mul_lineedit.setText("N/A");
+            usb_text = " with 48MHz USB (needs HSE)" if need_usb and self._f1_has_usb() else ""
+            self.auto_calc_status_label.setText(f"Could not find F1 PLL params for {target_sysclk / 1e6:.1f} MHz{usb_text}.");
+            self.auto_calc_status_label.setStyleSheet("color: red;")
+            return
+        best_solution = solutions[0]
+        self.pll_source_combo.setCurrentText(best_solution.pll_source)
+        self.pllm_or_xtpre_lineedit.setText(str(best_solution.xtpre));
+        self.plln_or_mul_lineedit.setText(str(best_solution.mul));
+        self.ahb_div_combo.setCurrentText(str(best_solution.ahb_div))
+        self.apb1_div_combo.setCurrentText(str(best_solution.apb1_div))
+        self.apb2_div_combo.setCurrentText(str(best_solution.apb2_div))
+        self.usb_prescaler_combo.setCurrentText(best_solution.usb_prescaler)
+        self.adc_prescaler_combo.setCurrentText(str(best_solution.adc_prescaler))
+        usb_text = f", USB {best_solution.usb_hz / 1e6:.2f}MHz" if self._f1_has_usb() else ""
+        self.auto_calc_status_label.setText(
+            f"Calc: {best_solution.sysclk_hz / 1e6:.2f}MHz (Target: {target_sysclk / 1e6:.1f}MHz){usb_text}, "
+            f"ADC {best_solution.adc_hz / 1e6:.2f}MHz");
+        self.auto_calc_status_label.setStyleSheet(
+            "color: green;" if best_solution.sysclk_error_hz == 0 else "color: orange;")
 
     def _calculate_f2_f4_pll(self, pll_input_freq, target_sysclk):
-        best_solution = None;
-        smallest_diff = float('inf')
-        pllm_min = CURRENT_MCU_DEFINES.get('PLLM_MIN', 2);
-        pllm_max = CURRENT_MCU_DEFINES.get('PLLM_MAX', 63)
-        pllp_values = CURRENT_MCU_DEFINES.get('PLLP_VALUES', [2, 4, 6, 8])
-        vco_in_min = CURRENT_MCU_DEFINES.get('VCO_INPUT_MIN_HZ', 1e6);
-        vco_in_max = CURRENT_MCU_DEFINES.get('VCO_INPUT_MAX_HZ', 2e6)
-
-        vco_out_min_key = f'VCO_OUTPUT_MIN_HZ_{self.current_mcu_family}';
-        vco_out_max_key = f'VCO_OUTPUT_MAX_HZ_{self.current_mcu_family}'
-        vco_out_min = CURRENT_MCU_DEFINES.get(vco_out_min_key, CURRENT_MCU_DEFINES.get('VCO_OUTPUT_MIN_HZ',
-                                                                                       192e6 if self.current_mcu_family == "STM32F2" else 100e6))
-        vco_out_max = CURRENT_MCU_DEFINES.get(vco_out_max_key, CURRENT_MCU_DEFINES.get('VCO_OUTPUT_MAX_HZ', 432e6))
-
-        get_plln_range_func = CURRENT_MCU_DEFINES.get('get_plln_range')
-        plln_min_default_key = f'PLLN_MIN_{self.current_mcu_family}';
-        plln_max_default_key = f'PLLN_MAX_{self.current_mcu_family}'
-        plln_min_default = CURRENT_MCU_DEFINES.get(plln_min_default_key, CURRENT_MCU_DEFINES.get('PLLN_MIN_GENERAL',
-                                                                                                 192 if self.current_mcu_family == "STM32F2" else 50))
-        plln_max_default = CURRENT_MCU_DEFINES.get(plln_max_default_key,
-                                                   CURRENT_MCU_DEFINES.get('PLLN_MAX_GENERAL', 432))
-
-        min_plln, max_plln = (plln_min_default, plln_max_default)
-        if get_plln_range_func and self.current_mcu_family == "STM32F4": min_plln, max_plln = get_plln_range_func(
-            self.current_target_device)
-
-        current_max_sysclk_for_device = 0
-        device_info_calc = CURRENT_MCU_DEFINES.get('TARGET_DEVICES', {}).get(self.current_target_device, {})
-
-        if self.current_mcu_family == "STM32F2":
-            current_max_sysclk_for_device = device_info_calc.get('max_sysclk_hz',
-                                                                 CURRENT_MCU_DEFINES.get('SYSCLK_MAX_HZ_F2', 120000000))
-        elif self.current_mcu_family == "STM32F4":
-            vos_map_for_device = CURRENT_MCU_DEFINES.get('SYSCLK_MAX_HZ_MAP', {}).get(self.current_target_device, {})
-            highest_f4_clk_for_device = max(vos_map_for_device.values()) if vos_map_for_device else 0
-            current_max_sysclk_for_device = device_info_calc.get('max_sysclk_hz',
-                                                                 highest_f4_clk_for_device or 168000000)
-        else:
-            current_max_sysclk_for_device = device_info_calc.get('max_sysclk_hz', 120000000)
-
-        for pllm_candidate in range(pllm_min, pllm_max + 1):
-            if pllm_candidate == 0: continue
-            vco_in_candidate = pll_input_freq / pllm_candidate
-            if not (vco_in_min <= vco_in_candidate <= vco_in_max): continue
-
-            for pllp_candidate in pllp_values:
-                plln_float = (target_sysclk * pllp_candidate) / vco_in_candidate
-                for plln_offset in range(-2, 3):  # Check rounded value and neighbors
-                    plln_candidate_rounded = round(plln_float) + plln_offset
-                    if not (min_plln <= plln_candidate_rounded <= max_plln): continue
-
-                    vco_out_candidate = vco_in_candidate * plln_candidate_rounded
-                    if not (vco_out_min <= vco_out_candidate <= vco_out_max): continue
-                    actual_sysclk = vco_out_candidate / pllp_candidate
-                    if actual_sysclk > current_max_sysclk_for_device + 1000: continue  # Allow small overshoot
-                    diff = abs(actual_sysclk - target_sysclk)
-
-                    if diff < smallest_diff: smallest_diff = diff; best_solution = (pllm_candidate,
-                                                                                    int(plln_candidate_rounded),
-                                                                                    pllp_candidate, actual_sysclk)
-                    if diff == 0 and actual_sysclk <= current_max_sysclk_for_device: break
-                if best_solution and smallest_diff == 0 and best_solution[3] <= current_max_sysclk_for_device: break
-            if best_solution and smallest_diff == 0 and best_solution[3] <= current_max_sysclk_for_device: break
-
-        if best_solution:
-            m, n, p, actual_f = best_solution
-            self.pllm_or_xtpre_lineedit.setText(str(m));
-            self.plln_or_mul_lineedit.setText(str(n));
-            self.pllp_lineedit.setText(str(p))
+        # Ranked best first: exact SYSCLK, then exact 48 MHz on PLLQ, then lowest VCO
+        solutions = cached_solve_f2_f4_pll(pll_input_freq, target_sysclk, self.current_mcu_family,
+                                           self.current_target_device, max_solutions=1)
+
+        if solutions:
+            best_solution = solutions[0]
+            self.pllm_or_xtpre_lineedit.setText(str(best_solution.m));
+            self.plln_or_mul_lineedit.setText(str(best_solution.n));
+            self.pllp_lineedit.setText(str(best_solution.p))
+            self.pllq_lineedit.setText(str(best_solution.q))
+            pll48_text = "48MHz exact" if best_solution.pll48_error_hz == 0 else f"48MHz: ~{best_solution.pll48_hz / 1e6:.2f}MHz"
             self.auto_calc_status_label.setText(
-                f"Calc: ~{actual_f / 1e6:.2f}MHz (Target: {target_sysclk / 1e6:.1f}MHz)");
+                f"Calc: ~{best_solution.sysclk_hz / 1e6:.2f}MHz (Target: {target_sysclk / 1e6:.1f}MHz), {pll48_text}");
             self.auto_calc_status_label.setStyleSheet("color: green;")
         else:
             self.pllm_or_xtpre_lineedit.setText("N/A");
@@ -501,174 +500,99 @@ class RCCConfigWidget(QWidget):
             self.auto_calc_status_label.setText(f"Could not find PLL params for {target_sysclk / 1e6:.1f} MHz.");
             self.auto_calc_status_label.setStyleSheet("color: red;")
 
-    def _calculate_clocks_and_settings(self, params_in):
-        params = params_in.copy()
-        calculated = {"errors": [], "warnings": []}
-        mcu_family = params.get("mcu_family", self.current_mcu_family)
+    def on_solve_clock_tree_clicked(self):
+        try:
+            target_sysclk = int(self.target_sysclk_lineedit.text())
+        except ValueError:
+            target_sysclk = 0
+        if target_sysclk <= 0:
+            self.auto_calc_status_label.setText("Enter a Target SYSCLK to solve the clock tree.");
+            self.auto_calc_status_label.setStyleSheet("color: red;")
+            return
+        self.clock_tree_solve_requested.emit(target_sysclk)
 
-        target_devices_map = CURRENT_MCU_DEFINES.get('TARGET_DEVICES', {})
-        device_info = target_devices_map.get(params.get("target_device", self.current_target_device), {})
-
-        max_sysclk_for_device = 0
-        if mcu_family == "STM32F1":
-            max_sysclk_for_device = device_info.get("max_sysclk_hz",
-                                                    CURRENT_MCU_DEFINES.get('SYSCLK_MAX_HZ_F103', 72000000))
-        elif mcu_family == "STM32F2":
-            max_sysclk_for_device = device_info.get("max_sysclk_hz",
-                                                    CURRENT_MCU_DEFINES.get('SYSCLK_MAX_HZ_F2', 120000000))
-        elif mcu_family == "STM32F4":
-            # For F4, determine from VOS map if possible, or device default
-            vos_map_f4 = CURRENT_MCU_DEFINES.get('SYSCLK_MAX_HZ_MAP', {}).get(params.get("target_device"), {})
-            max_sysclk_for_device = device_info.get("max_sysclk_hz",
-                                                    max(vos_map_f4.values()) if vos_map_f4 else 168000000)
-
-        hsi_default = 8000000 if mcu_family == "STM32F1" else 16000000
-        hsi_val = CURRENT_MCU_DEFINES.get('HSI_VALUE_HZ', hsi_default)
-
-        sysclk_freq_hz = float(hsi_val)
-        sysclk_source = params.get("sysclk_source", "HSI")
-
-        if sysclk_source == "PLL":
-            if not params.get("pll_enabled_for_sysclk"):
-                calculated["warnings"].append(
-                    "PLL SYSCLK selected, but 'Use PLL' is off. Using HSI."); sysclk_source = "HSI"; params[
-                    "sysclk_source"] = "HSI"
-            else:
-                pll_source_type = params.get("pll_source", "HSI")
-                pll_input_freq = 0.0
-                hse_val_param = float(params.get("hse_value_hz", CURRENT_MCU_DEFINES.get('HSE_DEFAULT_HZ', 8000000)))
-                if pll_source_type == "HSI":
-                    if not params.get("hsi_enabled"): calculated["errors"].append("HSI (PLL src) disabled.")
-                    pll_input_freq = float(hsi_val)
-                elif pll_source_type == "HSI/2" and mcu_family == "STM32F1":
-                    if not params.get("hsi_enabled"): calculated["errors"].append("HSI (PLL src) disabled.")
-                    pll_input_freq = float(hsi_val) / 2.0
-                elif pll_source_type == "HSE":
-                    if not params.get("hse_enabled"): calculated["errors"].append("HSE (PLL src) disabled.")
-                    pll_input_freq = hse_val_param
-                if pll_input_freq <= 0 and not calculated["errors"]: calculated["errors"].append(
-                    "PLL Input Freq is zero or negative.")
-
-                if not calculated["errors"]:
-                    if mcu_family == "STM32F1":
-                        pllxtpre = params.get("pllm_or_xtpre", 1);
-                        pllmul = params.get("plln_or_mul", 9)
-                        if pllxtpre == 0: calculated["errors"].append("PLLXTPRE cannot be 0 for F1.")
-                        effective_pll_in_f1 = pll_input_freq
-                        if pll_source_type == "HSE" and pllxtpre > 0: effective_pll_in_f1 = pll_input_freq / pllxtpre
-                        sysclk_freq_hz = effective_pll_in_f1 * pllmul
-                        if sysclk_freq_hz > max_sysclk_for_device: calculated["errors"].append(
-                            f"F1 SYSCLK ({sysclk_freq_hz / 1e6:.1f}MHz) exceeds max ({max_sysclk_for_device / 1e6:.1f}MHz).")
-                        params["pll_p_output_freq_hz"] = sysclk_freq_hz;
-                        params["vco_output_freq_hz"] = sysclk_freq_hz;
-                        params["vco_input_freq_hz"] = effective_pll_in_f1
-                    elif mcu_family in ["STM32F2", "STM32F4"]:
-                        pllm = params.get("pllm_or_xtpre", 0);
-                        plln = params.get("plln_or_mul", 0);
-                        pllp = params.get("pllp", 0)
-                        if not all(isinstance(val, int) and val > 0 for val in [pllm, plln, pllp]):
-                            calculated["errors"].append(
-                                f"{mcu_family} PLLM,N,P invalid. Using HSI."); sysclk_source = "HSI"; params[
-                                "sysclk_source"] = "HSI"
-                        else:
-                            vco_in = pll_input_freq / pllm;
-                            vco_out = vco_in * plln;
-                            sysclk_freq_hz = vco_out / pllp
-                            if sysclk_freq_hz > max_sysclk_for_device: calculated["errors"].append(
-                                f"{mcu_family} SYSCLK ({sysclk_freq_hz / 1e6:.1f}MHz) exceeds max ({max_sysclk_for_device / 1e6:.1f}MHz).")
-                            params["vco_input_freq_hz"] = vco_in;
-                            params["vco_output_freq_hz"] = vco_out;
-                            params["pll_p_output_freq_hz"] = sysclk_freq_hz
-                            pllq_val = params.get("pllq", 0)
-                            if pllq_val > 0: params["pll_q_output_freq_hz"] = vco_out / pllq_val
-
-        if calculated["errors"] and sysclk_source == "PLL": sysclk_source = "HSI"; params[
-            "sysclk_source"] = "HSI"; sysclk_freq_hz = float(hsi_val); calculated["warnings"].append(
-            "Reverted to HSI due to PLL configuration errors.")
-
-        if sysclk_source == "HSE":
-            if not params.get("hse_enabled"):
-                calculated["errors"].append("HSE SYSCLK selected, but disabled. Using HSI."); sysclk_freq_hz = float(
-                    hsi_val); params["sysclk_source"] = "HSI"
-            else:
-                sysclk_freq_hz = float(params.get("hse_value_hz", CURRENT_MCU_DEFINES.get('HSE_DEFAULT_HZ', 8000000)))
-        if sysclk_source == "HSI":
-            if not params.get("hsi_enabled"): calculated["warnings"].append(
-                "HSI SYSCLK selected, but HSI not enabled by user.")
-            sysclk_freq_hz = float(hsi_val)
-
-        if sysclk_freq_hz > max_sysclk_for_device and max_sysclk_for_device > 0:
-            if not any("SYSCLK" in err for err in calculated["errors"]): calculated["errors"].append(
-                f"Final SYSCLK ({sysclk_freq_hz / 1e6:.1f}MHz) capped to max ({max_sysclk_for_device / 1e6:.1f}MHz).")
-            sysclk_freq_hz = float(max_sysclk_for_device)
-
-        ahb_div = params.get("ahb_div", 1);
-        hclk_freq_hz = sysclk_freq_hz / ahb_div
-        apb1_div = params.get("apb1_div", 1);
-        pclk1_freq_hz = hclk_freq_hz / apb1_div
-        apb2_div = params.get("apb2_div", 1);
-        pclk2_freq_hz = hclk_freq_hz / apb2_div
-
-        max_hclk_dev = device_info.get("max_hclk_hz", max_sysclk_for_device)
-        max_pclk1_dev = device_info.get("max_pclk1_hz", 36000000 if mcu_family != "STM32F4" else 42000000)
-        max_pclk2_dev = device_info.get("max_pclk2_hz", 72000000 if mcu_family != "STM32F4" else 84000000)
-
-        vos_scale_id = "N/A";
-        vos_pwr_cr_val = None;
-        overdrive_active = False
-
-        if mcu_family == "STM32F4":
-            get_required_vos_func = CURRENT_MCU_DEFINES.get('get_required_vos')
-            if get_required_vos_func:
-                vos_max_hclk_dev = device_info.get("vos_max_hclk", {})
-                non_od_max_vos1 = vos_max_hclk_dev.get("VOS_SCALE_1", 0) if vos_max_hclk_dev else 0
-                od_intended = device_info.get("has_overdrive") and hclk_freq_hz > non_od_max_vos1
-                vos_scale_id, vos_pwr_cr_val = get_required_vos_func(hclk_freq_hz, params.get("target_device"),
-                                                                     od_intended)
-                overdrive_active = (vos_scale_id == "VOS_SCALE_1_OD")
-                vos_lookup_key = vos_scale_id.replace("_OD", "")
-                max_hclk_dev = vos_max_hclk_dev.get(vos_lookup_key, max_hclk_dev) if vos_max_hclk_dev else max_hclk_dev
-                if overdrive_active: max_hclk_dev = device_info.get("max_sysclk_vos1_od", max_hclk_dev)
-                max_pclk1_dev = CURRENT_MCU_DEFINES.get('PCLK1_MAX_HZ_MAP', {}).get(params.get("target_device"),
-                                                                                    {}).get(vos_lookup_key,
-                                                                                            max_pclk1_dev)
-                max_pclk2_dev = CURRENT_MCU_DEFINES.get('PCLK2_MAX_HZ_MAP', {}).get(params.get("target_device"),
-                                                                                    {}).get(vos_lookup_key,
-                                                                                            max_pclk2_dev)
-
-        if hclk_freq_hz > max_hclk_dev: calculated["errors"].append(
-            f"HCLK ({hclk_freq_hz / 1e6:.1f}MHz) > max ({max_hclk_dev / 1e6:.1f}MHz).")
-        if pclk1_freq_hz > max_pclk1_dev: calculated["errors"].append(
-            f"PCLK1 ({pclk1_freq_hz / 1e6:.1f}MHz) > max ({max_pclk1_dev / 1e6:.1f}MHz).")
-        if pclk2_freq_hz > max_pclk2_dev: calculated["errors"].append(
-            f"PCLK2 ({pclk2_freq_hz / 1e6:.1f}MHz) > max ({max_pclk2_dev / 1e6:.1f}MHz).")
-
-        flash_latency_val = 0
-        get_flash_latency_func_name = f"get_{mcu_family.lower()}_flash_latency"
-        get_flash_latency_func = CURRENT_MCU_DEFINES.get(get_flash_latency_func_name)
-        if get_flash_latency_func:
-            if mcu_family == "STM32F4":
-                flash_latency_val = get_flash_latency_func(hclk_freq_hz, params.get("target_device"), vos_scale_id)
-            else:
-                flash_latency_val = get_flash_latency_func(hclk_freq_hz, params.get("target_device"))
-        else:
-            flash_latency_val = CURRENT_MCU_DEFINES.get('get_flash_latency', lambda f, d, v=None: 0)(hclk_freq_hz,
-                                                                                                     params.get(
-                                                                                                         "target_device"),
-                                                                                                     vos_scale_id if mcu_family == "STM32F4" else None)
-
-        calculated.update({
-            "sysclk_freq_hz": int(sysclk_freq_hz), "hclk_freq_hz": int(hclk_freq_hz),
-            "pclk1_freq_hz": int(pclk1_freq_hz), "pclk2_freq_hz": int(pclk2_freq_hz),
-            "vco_input_freq_hz": int(params.get("vco_input_freq_hz", 0)),
-            "vco_output_freq_hz": int(params.get("vco_output_freq_hz", 0)),
-            "pll_p_output_freq_hz": int(params.get("pll_p_output_freq_hz", 0)),
-            "pll_q_output_freq_hz": int(params.get("pll_q_output_freq_hz", 0)),
-            "flash_latency_val": flash_latency_val, "vos_scale_id": vos_scale_id,
-            "vos_scale_pwr_cr_val": vos_pwr_cr_val,
-            "overdrive_active": overdrive_active, "ahb_div": ahb_div, "apb1_div": apb1_div, "apb2_div": apb2_div
-        })
-        return calculated
+    def apply_clock_tree_solution(self, solution):
+        """Loads a core.clock_tree_solver.solve_clock_tree() result into the PLL fields and prescaler combos."""
+        if solution is None:
+            self.auto_calc_status_label.setText("No clock tree meets the device limits for these targets.");
+            self.auto_calc_status_label.setStyleSheet("color: red;")
+            return
+        solved_params = solution["params"]
+        self._is_auto_calculating_pll = True  # Keep the per-field auto-calc from overwriting the solution
+        try:
+            # Target SYSCLK follows the solution so later PLL auto-calcs land on the same SYSCLK
+            self.target_sysclk_lineedit.setText(str(int(round(solution["frequencies"]["sysclk_freq_hz"]))))
+            self.pllm_or_xtpre_lineedit.setText(str(solved_params["pllm_or_xtpre"]))
+            self.plln_or_mul_lineedit.setText(str(solved_params["plln_or_mul"]))
+            if "pllp" in solved_params: self.pllp_lineedit.setText(str(solved_params["pllp"]))
+            if "pllq" in solved_params: self.pllq_lineedit.setText(str(solved_params["pllq"]))
+            self.ahb_div_combo.setCurrentText(str(solved_params["ahb_div"]))
+            self.apb1_div_combo.setCurrentText(str(solved_params["apb1_div"]))
+            self.apb2_div_combo.setCurrentText(str(solved_params["apb2_div"]))
+        finally:
+            self._is_auto_calculating_pll = False
+        worst_target = max(solution["errors"], key=solution["errors"].get)
+        self.auto_calc_status_label.setText(
+            f"Clock tree: SYSCLK {solution['frequencies']['sysclk_freq_hz'] / 1e6:.2f}MHz, total error {solution['total_error'] * 100:.3f}% "
+            f"(worst: {worst_target} {solution['errors'][worst_target] * 100:.3f}%)");
+        self.auto_calc_status_label.setStyleSheet("color: green;")
+        self.emit_config_update_slot()
+
+    def apply_low_power_plan(self, plan):
+        """Loads a core.power_planner.plan_low_power_clock_tree() result: clock sources, PLL, prescalers, VOS policy."""
+        if plan is None:
+            self.auto_calc_status_label.setText("No low-power clock tree meets the enabled peripherals' requirements.");
+            self.auto_calc_status_label.setStyleSheet("color: red;")
+            return
+        planned_params = plan["params"]
+        self._is_auto_calculating_pll = True  # Keep the per-field auto-calc from overwriting the plan
+        try:
+            self.hsi_checkbox.setChecked(bool(planned_params.get("hsi_enabled")))
+            self.pll_enable_for_sysclk_checkbox.setChecked(bool(planned_params["pll_enabled_for_sysclk"]))
+            self.sysclk_source_combo.setCurrentText(planned_params["sysclk_source"])
+            if planned_params["pll_enabled_for_sysclk"]:
+                self.target_sysclk_lineedit.setText(str(int(round(plan["frequencies"]["sysclk_freq_hz"]))))
+                self.pllm_or_xtpre_lineedit.setText(str(planned_params["pllm_or_xtpre"]))
+                self.plln_or_mul_lineedit.setText(str(planned_params["plln_or_mul"]))
+                self.pllp_lineedit.setText(str(planned_params["pllp"]))
+                self.pllq_lineedit.setText(str(planned_params["pllq"]))
+            self.ahb_div_combo.setCurrentText(str(planned_params["ahb_div"]))
+            self.apb1_div_combo.setCurrentText(str(planned_params["apb1_div"]))
+            self.apb2_div_combo.setCurrentText(str(planned_params["apb2_div"]))
+            self.low_power_vos_checkbox.setChecked(True)
+        finally:
+            self._is_auto_calculating_pll = False
+        self._update_ui_element_visibility()
+        calculated = plan["calculated"]
+        self.auto_calc_status_label.setText(
+            f"Low power: SYSCLK {calculated['sysclk_freq_hz'] / 1e6:.2f}MHz, HCLK {calculated['hclk_freq_hz'] / 1e6:.2f}MHz, "
+            f"{calculated['vos_scale_id']}, {calculated['flash_latency_val']} wait state(s)");
+        self.auto_calc_status_label.setStyleSheet("color: green;")
+        self.emit_config_update_slot()
+
+    def on_add_profile_clicked(self):
+        name = self.profile_name_lineedit.text().strip() or f"PROFILE{len(self.clock_profiles) + 1}"
+        if any(p["name"].upper() == name.upper() for p in self.clock_profiles):
+            self.auto_calc_status_label.setText(f"Clock profile '{name}' already exists.");
+            self.auto_calc_status_label.setStyleSheet("color: red;")
+            return
+        config = self.get_config();
+        params = {k: v for k, v in config["params"].items() if k not in ("target_device", "mcu_family")}
+        self.clock_profiles.append({"name": name, "params": params})
+        self.profiles_list.addItem(
+            f"{len(self.clock_profiles)}: {name} - SYSCLK {config['calculated'].get('sysclk_freq_hz', 0) / 1e6:.2f}MHz, HCLK {config['calculated'].get('hclk_freq_hz', 0) / 1e6:.2f}MHz")
+        self.profile_name_lineedit.clear()
+        self.emit_config_update_slot()
+
+    def on_remove_profile_clicked(self):
+        row = self.profiles_list.currentRow()
+        if row < 0: return
+        del self.clock_profiles[row]
+        self.profiles_list.takeItem(row)
+        for i in range(self.profiles_list.count()):  # Keep the displayed profile numbers in sync
+            item = self.profiles_list.item(i);
+            item.setText(f"{i + 1}:" + item.text().split(":", 1)[1])
+        self.emit_config_update_slot()
 
     def get_config(self):
         mcu_fam = self.current_mcu_family;
@@ -695,12 +619,32 @@ class RCCConfigWidget(QWidget):
             "ahb_div": int(self.ahb_div_combo.currentText()) if self.ahb_div_combo.currentText().isdigit() else 1,
             "apb1_div": int(self.apb1_div_combo.currentText()) if self.apb1_div_combo.currentText().isdigit() else 1,
             "apb2_div": int(self.apb2_div_combo.currentText()) if self.apb2_div_combo.currentText().isdigit() else 1,
+            "vos_policy": VOS_POLICY_LOW_POWER if self.low_power_vos_checkbox.isChecked() and mcu_fam == "STM32F4" else VOS_POLICY_MAX_PERFORMANCE,
         }
+        if mcu_fam == "STM32F1":
+            params["adc_prescaler"] = int(self.adc_prescaler_combo.currentText())
+            if self._f1_has_usb(): params["usb_prescaler"] = self.usb_prescaler_combo.currentText()
+        if self.overlapped_boot_checkbox.isChecked(): params["overlapped_boot"] = True
+        if self.stop_mode_checkbox.isChecked():
+            params["stop_mode_routines"] = True
+            params["stop_low_power_regulator"] = self.stop_low_power_regulator_checkbox.isChecked()
+            if self.hse_startup_lineedit.text().strip().isdigit(): params["hse_startup_us"] = int(self.hse_startup_lineedit.text())
         params["pll_enabled"] = params[
             "pll_enabled_for_sysclk"]  # Keep pll_enabled for backward compatibility if used elsewhere
-        calculated_data = self._calculate_clocks_and_settings(params)
-        return {"params": params, "calculated": calculated_data}
+        self.clock_tree.update(params)
+        calculated_data = self.clock_tree.calculated()
+        config = {"params": params, "calculated": calculated_data}
+        if self.clock_profiles: config["clock_profiles"] = [dict(p) for p in self.clock_profiles]
+        return config
 
     def emit_config_update_slot(self, _=None):
         if self._is_initializing or self._is_auto_calculating_pll: return
-        self.config_updated.emit(self.get_config())
\ No newline at end of file
+        config = self.get_config()
+        self.stop_low_power_regulator_checkbox.setEnabled(self.stop_mode_checkbox.isChecked())
+        if config["params"].get("stop_mode_routines"):
+            latency_us, steps = stop_wakeup_latency_us(config["params"], config["calculated"])
+            self.stop_latency_label.setText(f"Estimated STOP wake-up latency: {latency_us}us (" + ", ".join(
+                f"{step} {us}us" for step, us in steps) + ")")
+        else:
+            self.stop_latency_label.setText("")
+        self.config_updated.emit(config)
\ No newline at end of file
@@ -3,6 +3,7 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QFormLayout, QComboBox, QLine
 from PyQt5.QtCore import pyqtSignal
 
 from core.mcu_defines_loader import CURRENT_MCU_DEFINES
+from core.pin_af_db import load_pin_af_db
 
 
 class SPIConfigWidget(QWidget):
@@ -43,6 +44,9 @@ class SPIConfigWidget(QWidget):
         self.form_layout.addRow(QLabel("NSS (Slave Select):"), self.nss_mode_combo)
         self.baud_prescaler_combo = QComboBox()
         self.form_layout.addRow(QLabel("Baud Rate Prescaler (vs APB):"), self.baud_prescaler_combo)
+        self.target_sck_lineedit = QLineEdit()
+        self.target_sck_lineedit.setPlaceholderText("Optional, used by RCC 'Solve Clock Tree'")
+        self.form_layout.addRow(QLabel("Target SCK (Hz):"), self.target_sck_lineedit)
         self.first_bit_combo = QComboBox()
         self.form_layout.addRow(QLabel("First Bit Transmitted:"), self.first_bit_combo)
 
@@ -161,19 +165,22 @@ class SPIConfigWidget(QWidget):
         instance_name = self.spi_instance_combo.currentText()
         if not instance_name: self.pin_info_label.setText("Pinout: N/A"); return
 
-        pin_sugg_map_key = f"SPI_PIN_CONFIG_SUGGESTIONS_{self.current_mcu_family}"
-        pin_sugg_map = CURRENT_MCU_DEFINES.get(pin_sugg_map_key,
-                                               CURRENT_MCU_DEFINES.get("SPI_PIN_CONFIG_SUGGESTIONS", {}))
-        suggestions = pin_sugg_map.get(self.current_target_device, {}).get(instance_name, {})
+        pin_af_db = load_pin_af_db(self.current_mcu_family, self.current_target_device)
+        suggestions = pin_af_db.signal_types(instance_name)
 
         pin_text = []
         if suggestions:
             for pin_type in ["SCK", "MISO", "MOSI", "NSS"]:
-                if pin_type in suggestions: pin_text.append(f"{pin_type}: {suggestions[pin_type]}")
+                if pin_type in suggestions: pin_text.append(f"{pin_type}: {pin_af_db.describe(instance_name, pin_type)}")
             self.pin_info_label.setText("; ".join(pin_text) if pin_text else "No specific pin suggestions.")
         else:
             self.pin_info_label.setText(f"Pinout: No suggestions for {instance_name} on {self.current_target_device}")
 
+    def set_baud_prescaler(self, instance_name, prescaler):
+        """Selects a solved SCK prescaler (e.g. 8) if instance_name is the instance being configured."""
+        if instance_name == self.spi_instance_combo.currentText() and self.baud_prescaler_combo.findText(str(prescaler)) >= 0:
+            self.baud_prescaler_combo.setCurrentText(str(prescaler))
+
     def update_ui_visibility(self):
         enabled = self.enable_spi_checkbox.isChecked()
         self.params_groupbox.setEnabled(enabled)
@@ -207,6 +214,7 @@ class SPIConfigWidget(QWidget):
             "cpha_str": self.cpha_combo.currentText(),
             "nss_mode_str": self.nss_mode_combo.currentText(),
             "baud_prescaler_str": self.baud_prescaler_combo.currentText(),
+            "target_sck_hz": int(self.target_sck_lineedit.text()) if self.target_sck_lineedit.text().isdigit() else 0,
             "first_bit_str": self.first_bit_combo.currentText(),
             "crc_polynomial": crc_poly_val,
             "interrupt_txe": self.txe_ie_checkbox.isChecked(),
@@ -420,6 +420,11 @@ class TimerConfigWidget(QWidget):
         # After enabling/disabling groups, refresh specific visibilities inside them
         if enabled: self.update_ui_for_timer_instance()
 
+    def set_prescaler(self, instance_name, prescaler):
+        """Sets a planned PSC value if instance_name is the timer being configured."""
+        if instance_name == self.timer_instance_combo.currentText():
+            self.prescaler_spin.setValue(prescaler)
+
     def emit_config_update_slot(self, _=None):
         if self._is_initializing: return
         self.config_updated.emit(self.get_config())
@@ -4,6 +4,7 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QFormLayout, QComboBox,
 from PyQt5.QtCore import pyqtSignal
 
 from core.mcu_defines_loader import CURRENT_MCU_DEFINES
+from core.pin_af_db import load_pin_af_db
 
 
 class UARTConfigWidget(QWidget):
@@ -165,20 +166,17 @@ class UARTConfigWidget(QWidget):
         instance_name = self.uart_instance_combo.currentText()
         if not instance_name: self.pin_info_label.setText("Pinout: N/A"); return
 
-        pin_sugg_map_key = f"USART_PIN_CONFIG_SUGGESTIONS_{self.current_mcu_family}"
-        pin_sugg_map = CURRENT_MCU_DEFINES.get(pin_sugg_map_key,
-                                               CURRENT_MCU_DEFINES.get("USART_PIN_CONFIG_SUGGESTIONS", {}))
-        suggestions = pin_sugg_map.get(self.current_target_device, {}).get(instance_name, {})
+        pin_af_db = load_pin_af_db(self.current_mcu_family, self.current_target_device)
+        suggestions = pin_af_db.signal_types(instance_name)
 
         pin_text = []
         if suggestions:
             flow_control_active = self.hw_flow_ctrl_combo.currentText()
-            if "TX" in suggestions: pin_text.append(f"TX: {suggestions['TX']}")
-            if "RX" in suggestions: pin_text.append(f"RX: {suggestions['RX']}")
-            if flow_control_active in ["CTS", "RTS/CTS"] and "CTS" in suggestions:
-                pin_text.append(f"CTS: {suggestions['CTS']}")
-            if flow_control_active in ["RTS", "RTS/CTS"] and "RTS" in suggestions:
-                pin_text.append(f"RTS: {suggestions['RTS']}")
+            pin_types = ["TX", "RX"]
+            if flow_control_active in ["CTS", "RTS/CTS"]: pin_types.append("CTS")
+            if flow_control_active in ["RTS", "RTS/CTS"]: pin_types.append("RTS")
+            for pin_type in pin_types:
+                if pin_type in suggestions: pin_text.append(f"{pin_type}: {pin_af_db.describe(instance_name, pin_type)}")
             self.pin_info_label.setText("; ".join(pin_text) if pin_text else "No specific pin suggestions.")
         else:
             self.pin_info_label.setText(f"Pinout: No suggestions for {instance_name} on {self.current_target_device}")
@@ -0,0 +1,51 @@
+# --- NEW FILE regeneration_scheduler.py ---
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+class RegenerationScheduler(QObject):
+    """Collapses bursts of config_changed signals into one regeneration.
+
+    Every mark_dirty() restarts a single-shot timer; once no change has arrived for
+    quiet_period_ms, regeneration_requested is emitted once with the set of modules
+    that were dirtied during the burst.
+    """
+    regeneration_requested = pyqtSignal(object)  # set of dirty module names
+
+    DEFAULT_QUIET_PERIOD_MS = 150
+
+    def __init__(self, quiet_period_ms=DEFAULT_QUIET_PERIOD_MS, parent=None):
+        super().__init__(parent)
+        self._dirty_modules = set()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(quiet_period_ms)
+        self._timer.timeout.connect(self.flush)
+
+    def quiet_period_ms(self):
+        return self._timer.interval()
+
+    def set_quiet_period_ms(self, quiet_period_ms):
+        self._timer.setInterval(max(0, int(quiet_period_ms)))
+
+    def dirty_modules(self):
+        return set(self._dirty_modules)
+
+    def is_pending(self):
+        return bool(self._dirty_modules)
+
+    def mark_dirty(self, module_name):
+        self._dirty_modules.add(module_name)
+        self._timer.start()  # (Re)start the quiet period
+
+    def flush(self):
+        """Emits now if anything is dirty (also called by the timer)."""
+        self._timer.stop()
+        if not self._dirty_modules:
+            return
+        dirty_modules = self._dirty_modules
+        self._dirty_modules = set()
+        self.regeneration_requested.emit(dirty_modules)
+
+    def cancel(self):
+        self._timer.stop()
+        self._dirty_modules = set()
@@ -1,9 +1,12 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton, QFileDialog, QMessageBox
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton, QFileDialog, QMessageBox,
+                             QGroupBox, QTableWidget, QTableWidgetItem, QHeaderView)
 from PyQt5.QtGui import QIcon, QGuiApplication
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, pyqtSignal
 
 
 class CodePane(QWidget):
+    save_project_requested = pyqtSignal()  # MainWindow owns the configurations, so it does the actual save
+
     def __init__(self):
         super().__init__()
         self.main_layout = QVBoxLayout(self)
@@ -20,6 +23,16 @@ class CodePane(QWidget):
         self.save_button.clicked.connect(self.save_code_to_file)
         buttons_layout.addWidget(self.save_button)
 
+        self.save_header_button = QPushButton("Save clock_config.h")
+        self.save_header_button.setIcon(QIcon.fromTheme("document-save"))
+        self.save_header_button.clicked.connect(self.save_clock_config_header)
+        buttons_layout.addWidget(self.save_header_button)
+
+        self.save_project_button = QPushButton("Save Project (.json)")
+        self.save_project_button.setIcon(QIcon.fromTheme("document-save-as"))
+        self.save_project_button.clicked.connect(self.save_project_requested.emit)
+        buttons_layout.addWidget(self.save_project_button)
+
         buttons_layout.addStretch()
         self.main_layout.addLayout(buttons_layout)
 
@@ -29,11 +42,46 @@ class CodePane(QWidget):
         self.code_edit.setLineWrapMode(QTextEdit.NoWrap) # Important for code
         self.main_layout.addWidget(self.code_edit)
 
+        # Static estimate of the init functions (engine GeneratedProject.init_cost), one row per module
+        self.init_cost_group = QGroupBox("Init Cost Estimate (flash / boot cycles per module)")
+        self.init_cost_group.setCheckable(True)
+        self.init_cost_group.setChecked(False)
+        init_cost_layout = QVBoxLayout(self.init_cost_group)
+        self.init_cost_table = QTableWidget(0, len(self.INIT_COST_COLUMNS))
+        self.init_cost_table.setHorizontalHeaderLabels([title for title, _ in self.INIT_COST_COLUMNS])
+        self.init_cost_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.init_cost_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.init_cost_table.verticalHeader().setVisible(False)
+        init_cost_layout.addWidget(self.init_cost_table)
+        self.init_cost_group.toggled.connect(self.init_cost_table.setVisible)
+        self.init_cost_table.setVisible(False)
+        self.main_layout.addWidget(self.init_cost_group)
+
         self.setLayout(self.main_layout)
+        self.clock_config_header = ""
 
     def set_code(self, code_text):
         self.code_edit.setPlainText(code_text)
 
+    def set_clock_config_header(self, header_text):
+        self.clock_config_header = header_text or ""
+
+    INIT_COST_COLUMNS = (("Module", None), ("Flash (B)", "bytes"), ("Cycles", "cycles"),
+                         ("Wait-state cycles", "wait_state_cycles"), ("Worst-case poll cycles", "poll_worst_cycles"),
+                         ("Unbounded polls", "unbounded_polls"), ("Time (us)", "time_us"),
+                         ("Worst-case time (us)", "worst_time_us"))
+
+    def set_init_cost(self, init_cost):
+        """Fills the per-module table from GeneratedProject.init_cost, largest worst-case time first."""
+        modules = sorted((init_cost or {}).get("modules", {}).items(), key=lambda item: -item[1]["worst_time_us"])
+        rows = modules + ([("Total", init_cost["totals"])] if modules else [])
+        self.init_cost_table.setRowCount(len(rows))
+        for row, (module_name, cost) in enumerate(rows):
+            for column, (_, key) in enumerate(self.INIT_COST_COLUMNS):
+                item = QTableWidgetItem(module_name if key is None else str(cost[key]))
+                if key is not None: item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.init_cost_table.setItem(row, column, item)
+
     def copy_code_to_clipboard(self):
         clipboard = QGuiApplication.clipboard()
         if clipboard:
@@ -63,4 +111,17 @@ class CodePane(QWidget):
                     f.write(code_text)
                 # Optional: QMessageBox.information(self, "File Saved", f"Code saved to {file_name}")
             except Exception as e:
-                QMessageBox.critical(self, "Save Error", f"Could not save file: {e}")
\ No newline at end of file
+                QMessageBox.critical(self, "Save Error", f"Could not save file: {e}")
+
+    def save_clock_config_header(self):
+        if not self.clock_config_header:
+            QMessageBox.information(self, "No Header", "Generate code first.")
+            return
+        file_name, _ = QFileDialog.getSaveFileName(self, "Save Clock Constants Header", "clock_config.h",
+                                                   "C Headers (*.h);;All Files (*)")
+        if file_name:
+            try:
+                with open(file_name, 'w', encoding='utf-8') as f:
+                    f.write(self.clock_config_header)
+            except Exception as e:
+                QMessageBox.critical(self, "Save Error", f"Could not save file: {e}")